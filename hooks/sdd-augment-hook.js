@@ -37,6 +37,39 @@ function findGraphFile(startDir) {
   return null;
 }
 
+// Read the code-intelligence.jsonl sidecar (mirrors readCodeIntelligence in graph-loader.ts)
+function readCodeIntelligence(sidecarPath) {
+  try {
+    const buf = fs.readFileSync(sidecarPath);
+    const headerEnd = buf.indexOf(0x0a);
+    if (headerEnd < 0) return undefined;
+    const header = JSON.parse(buf.subarray(0, headerEnd).toString("utf-8"));
+    const body = buf.subarray(headerEnd + 1);
+    const section = (name) => {
+      const span = header.sections && header.sections[name];
+      if (!span) return [];
+      return body
+        .subarray(span[0], span[0] + span[1])
+        .toString("utf-8")
+        .split("\n")
+        .filter((line) => line)
+        .map((line) => JSON.parse(line));
+    };
+    return {
+      indexed: header.indexed,
+      indexedAt: header.indexedAt,
+      engine: header.engine,
+      engineVersion: header.engineVersion,
+      symbols: section("symbols"),
+      callGraph: section("callGraph"),
+      processes: section("processes"),
+      stats: header.stats,
+    };
+  } catch {
+    return undefined;
+  }
+}
+
 function loadGraph(cwd) {
   if (cachedGraph && cachedIndex) return { graph: cachedGraph, index: cachedIndex };
 
@@ -47,6 +80,20 @@ function loadGraph(cwd) {
     const raw = fs.readFileSync(graphPath, "utf-8");
     const graph = JSON.parse(raw);
 
+    // codeIntelligence lives in a sidecar; read it only when context needs it
+    const ciRef = graph.codeIntelligenceRef;
+    if (!graph.codeIntelligence && ciRef) {
+      let loaded = null;
+      Object.defineProperty(graph, "codeIntelligence", {
+        configurable: true,
+        enumerable: false,
+        get() {
+          if (loaded === null) loaded = readCodeIntelligence(path.join(path.dirname(graphPath), ciRef.path));
+          return loaded;
+        },
+      });
+    }
+
     // Build indexes
     const byId = new Map();
     const codeRefsByFile = new Map();
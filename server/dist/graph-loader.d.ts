@@ -76,6 +76,12 @@ export interface Relationship {
     type: string;
     sourceFile: string;
     line: number;
+    /** Times the reference is stated across all markdown files (markdown-derived edges) */
+    occurrences?: number;
+    /** Distinct files stating the reference */
+    fileCount?: number;
+    /** First [file, line] locations, capped */
+    locations?: [string, number][];
 }
 export interface CoverageMetric {
     count: number;
@@ -157,6 +163,18 @@ export interface CodeIntelligence {
         processesWithRefs: number;
     };
 }
+/** Header of the code-intelligence.jsonl sidecar, as referenced from the graph */
+export interface CodeIntelligenceRef {
+    path: string;
+    format: string;
+    version: number;
+    indexed: boolean;
+    indexedAt: string;
+    engine: string;
+    engineVersion: string;
+    hash: string;
+    stats: CodeIntelligence["stats"];
+}
 export interface TraceabilityGraph {
     $schema: string;
     generatedAt: string;
@@ -166,7 +184,9 @@ export interface TraceabilityGraph {
     relationships: Relationship[];
     statistics: Statistics;
     adoption?: Record<string, unknown>;
+    /** Resolved lazily from the sidecar named by codeIntelligenceRef */
     codeIntelligence?: CodeIntelligence;
+    codeIntelligenceRef?: CodeIntelligenceRef;
 }
 export interface GraphIndex {
     byId: Map<string, Artifact>;
@@ -179,6 +199,13 @@ export interface GraphIndex {
         ref: CodeRef;
     }>>;
 }
+/**
+ * Read a code-intelligence.jsonl sidecar back into a CodeIntelligence block.
+ * Line 1 is the header; its byte ranges (relative to the end of that line)
+ * say which of the following JSON lines are symbols, call-graph edges and
+ * processes.
+ */
+export declare function readCodeIntelligence(sidecarPath: string): CodeIntelligence | undefined;
 export declare function loadGraph(cwd?: string): {
     graph: TraceabilityGraph;
     index: GraphIndex;
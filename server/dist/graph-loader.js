@@ -41,6 +41,62 @@ function buildIndex(graph) {
     }
     return idx;
 }
+/**
+ * Read a code-intelligence.jsonl sidecar back into a CodeIntelligence block.
+ * Line 1 is the header; its byte ranges (relative to the end of that line)
+ * say which of the following JSON lines are symbols, call-graph edges and
+ * processes.
+ */
+export function readCodeIntelligence(sidecarPath) {
+    try {
+        const buf = readFileSync(sidecarPath);
+        const headerEnd = buf.indexOf(0x0a);
+        if (headerEnd < 0)
+            return undefined;
+        const header = JSON.parse(buf.subarray(0, headerEnd).toString("utf-8"));
+        const body = buf.subarray(headerEnd + 1);
+        const section = (name) => {
+            const span = header.sections?.[name];
+            if (!span)
+                return [];
+            return body
+                .subarray(span[0], span[0] + span[1])
+                .toString("utf-8")
+                .split("\n")
+                .filter((line) => line)
+                .map((line) => JSON.parse(line));
+        };
+        return {
+            indexed: header.indexed,
+            indexedAt: header.indexedAt,
+            engine: header.engine,
+            engineVersion: header.engineVersion,
+            symbols: section("symbols"),
+            callGraph: section("callGraph"),
+            processes: section("processes"),
+            stats: header.stats,
+        };
+    }
+    catch {
+        return undefined;
+    }
+}
+/** Expose graph.codeIntelligence as a getter that reads the sidecar on first use */
+function attachCodeIntelligence(graph, graphDir) {
+    const ref = graph.codeIntelligenceRef;
+    if (graph.codeIntelligence || !ref)
+        return;
+    let loaded = null;
+    Object.defineProperty(graph, "codeIntelligence", {
+        configurable: true,
+        enumerable: false,
+        get() {
+            if (loaded === null)
+                loaded = readCodeIntelligence(join(graphDir, ref.path));
+            return loaded;
+        },
+    });
+}
 function findGraphFile(startDir) {
     let dir = startDir;
     for (let i = 0; i < 6; i++) {
@@ -75,6 +131,7 @@ export function loadGraph(cwd) {
     try {
         const raw = readFileSync(graphPath, "utf-8");
         const graph = JSON.parse(raw);
+        attachCodeIntelligence(graph, dirname(graphPath));
         const index = buildIndex(graph);
         cachedGraph = graph;
         cachedIndex = index;
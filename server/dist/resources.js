@@ -113,14 +113,16 @@ export function readResource(uri, graph, index) {
                     text: [
                         "SDD Traceability Graph Schema v3",
                         "",
-                        "Root: { $schema, generatedAt, projectName, pipeline, artifacts[], relationships[], statistics, adoption?, codeIntelligence? }",
+                        "Root: { $schema, generatedAt, projectName, pipeline, artifacts[], relationships[], statistics, adoption?, codeIntelligenceRef? }",
                         "",
                         "Artifact types: REQ, UC, WF, API, BDD, INV, ADR, NFR, RN, FASE, TASK",
                         "Relationship types: implements, orchestrates, verifies, guarantees, decides, decomposes, implemented-by, implemented-by-code, tested-by, implemented-by-commit, reads-from, traces-to",
                         "",
                         "Each artifact has: id, type, category, title, file, line, priority, stage, classification?, codeRefs[], testRefs[], commitRefs[]",
                         "",
-                        "codeIntelligence (optional, from /sdd:code-index): symbols[], callGraph[], processes[], stats",
+                        "codeIntelligenceRef (optional, from /sdd:code-index): { path, format, version, indexed, indexedAt, engine, engineVersion, stats, hash }",
+                        "  The symbols[], callGraph[] and processes[] live in the sidecar named by path (dashboard/code-intelligence.jsonl):",
+                        "  line 1 is a header with byte ranges of each section and of each file's symbols; every following line is one record",
                         "",
                         "Full schema: see skills/dashboard/references/graph-schema.md",
                     ].join("\n"),
@@ -43,6 +43,8 @@ export function executeImpact(args, graph, index) {
     for (let depth = 1; depth <= maxDepth; depth++) {
         const nextLevel = [];
         byDepth[depth] = [];
+        // Neighbor id -> item, to add the weight of every edge reaching it
+        const levelItems = new Map();
         for (const nodeId of currentLevel) {
             // Choose relationship direction
             const rels = direction === "downstream"
@@ -50,22 +52,33 @@ export function executeImpact(args, graph, index) {
                 : index.relBySource.get(nodeId) ?? [];
             for (const rel of rels) {
                 const neighborId = direction === "downstream" ? rel.source : rel.target;
+                const weight = rel.occurrences ?? 1;
+                const seen = levelItems.get(neighborId);
+                if (seen) {
+                    seen.weight += weight;
+                    continue;
+                }
                 if (visited.has(neighborId))
                     continue;
                 visited.add(neighborId);
                 const neighbor = index.byId.get(neighborId);
                 if (neighbor) {
-                    byDepth[depth].push({
+                    const item = {
                         id: neighbor.id,
                         type: neighbor.type,
                         title: neighbor.title,
                         file: neighbor.file,
                         viaRelationship: rel.type,
-                    });
+                        weight,
+                    };
+                    byDepth[depth].push(item);
+                    levelItems.set(neighborId, item);
                 }
                 nextLevel.push(neighborId);
             }
         }
+        // Most-stated links first within a depth
+        byDepth[depth].sort((a, b) => b.weight - a.weight);
         currentLevel = nextLevel;
         if (currentLevel.length === 0)
             break;
@@ -84,6 +84,12 @@ export interface Relationship {
   type: string;
   sourceFile: string;
   line: number;
+  /** Times the reference is stated across all markdown files (markdown-derived edges) */
+  occurrences?: number;
+  /** Distinct files stating the reference */
+  fileCount?: number;
+  /** First [file, line] locations, capped */
+  locations?: [string, number][];
 }
 
 export interface CoverageMetric {
@@ -157,6 +163,19 @@ export interface CodeIntelligence {
   };
 }
 
+/** Header of the code-intelligence.jsonl sidecar, as referenced from the graph */
+export interface CodeIntelligenceRef {
+  path: string;
+  format: string;
+  version: number;
+  indexed: boolean;
+  indexedAt: string;
+  engine: string;
+  engineVersion: string;
+  hash: string;
+  stats: CodeIntelligence["stats"];
+}
+
 export interface TraceabilityGraph {
   $schema: string;
   generatedAt: string;
@@ -166,7 +185,9 @@ export interface TraceabilityGraph {
   relationships: Relationship[];
   statistics: Statistics;
   adoption?: Record<string, unknown>;
+  /** Resolved lazily from the sidecar named by codeIntelligenceRef */
   codeIntelligence?: CodeIntelligence;
+  codeIntelligenceRef?: CodeIntelligenceRef;
 }
 
 // ---------------------------------------------------------------------------
@@ -234,6 +255,59 @@ function buildIndex(graph: TraceabilityGraph): GraphIndex {
   return idx;
 }
 
+/**
+ * Read a code-intelligence.jsonl sidecar back into a CodeIntelligence block.
+ * Line 1 is the header; its byte ranges (relative to the end of that line)
+ * say which of the following JSON lines are symbols, call-graph edges and
+ * processes.
+ */
+export function readCodeIntelligence(sidecarPath: string): CodeIntelligence | undefined {
+  try {
+    const buf = readFileSync(sidecarPath);
+    const headerEnd = buf.indexOf(0x0a);
+    if (headerEnd < 0) return undefined;
+    const header = JSON.parse(buf.subarray(0, headerEnd).toString("utf-8"));
+    const body = buf.subarray(headerEnd + 1);
+    const section = (name: string) => {
+      const span: [number, number] | undefined = header.sections?.[name];
+      if (!span) return [];
+      return body
+        .subarray(span[0], span[0] + span[1])
+        .toString("utf-8")
+        .split("\n")
+        .filter((line) => line)
+        .map((line) => JSON.parse(line));
+    };
+    return {
+      indexed: header.indexed,
+      indexedAt: header.indexedAt,
+      engine: header.engine,
+      engineVersion: header.engineVersion,
+      symbols: section("symbols"),
+      callGraph: section("callGraph"),
+      processes: section("processes"),
+      stats: header.stats,
+    };
+  } catch {
+    return undefined;
+  }
+}
+
+/** Expose graph.codeIntelligence as a getter that reads the sidecar on first use */
+function attachCodeIntelligence(graph: TraceabilityGraph, graphDir: string): void {
+  const ref = graph.codeIntelligenceRef;
+  if (graph.codeIntelligence || !ref) return;
+  let loaded: CodeIntelligence | undefined | null = null;
+  Object.defineProperty(graph, "codeIntelligence", {
+    configurable: true,
+    enumerable: false,
+    get() {
+      if (loaded === null) loaded = readCodeIntelligence(join(graphDir, ref.path));
+      return loaded;
+    },
+  });
+}
+
 function findGraphFile(startDir: string): string | null {
   let dir = startDir;
   for (let i = 0; i < 6; i++) {
@@ -272,6 +346,7 @@ export function loadGraph(cwd?: string): {
   try {
     const raw = readFileSync(graphPath, "utf-8");
     const graph: TraceabilityGraph = JSON.parse(raw);
+    attachCodeIntelligence(graph, dirname(graphPath));
     const index = buildIndex(graph);
     cachedGraph = graph;
     cachedIndex = index;
@@ -38,6 +38,7 @@ interface AffectedArtifact {
   title: string;
   file: string;
   viaRelationship: string;
+  weight: number;
 }
 
 const DEPTH_LABELS: Record<number, string> = {
@@ -69,6 +70,8 @@ export function executeImpact(
   for (let depth = 1; depth <= maxDepth; depth++) {
     const nextLevel: string[] = [];
     byDepth[depth] = [];
+    // Neighbor id -> item, to add the weight of every edge reaching it
+    const levelItems = new Map<string, AffectedArtifact>();
 
     for (const nodeId of currentLevel) {
       // Choose relationship direction
@@ -80,23 +83,35 @@ export function executeImpact(
       for (const rel of rels) {
         const neighborId =
           direction === "downstream" ? rel.source : rel.target;
+        const weight = rel.occurrences ?? 1;
+        const seen = levelItems.get(neighborId);
+        if (seen) {
+          seen.weight += weight;
+          continue;
+        }
         if (visited.has(neighborId)) continue;
         visited.add(neighborId);
 
         const neighbor = index.byId.get(neighborId);
         if (neighbor) {
-          byDepth[depth].push({
+          const item: AffectedArtifact = {
             id: neighbor.id,
             type: neighbor.type,
             title: neighbor.title,
             file: neighbor.file,
             viaRelationship: rel.type,
-          });
+            weight,
+          };
+          byDepth[depth].push(item);
+          levelItems.set(neighborId, item);
         }
         nextLevel.push(neighborId);
       }
     }
 
+    // Most-stated links first within a depth
+    byDepth[depth].sort((a, b) => b.weight - a.weight);
+
     currentLevel = nextLevel;
     if (currentLevel.length === 0) break;
   }
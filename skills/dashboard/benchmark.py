@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+SDD Dashboard Benchmark
+Generates seeded synthetic SDD projects at several scales, runs every
+generate.py phase on them under the profiler, and compares the timings with
+a stored baseline.
+
+Usage:
+    python benchmark.py                                   # 1k and 10k artifacts
+    python benchmark.py --scales 1000,10000,100000 --repeat 3
+    python benchmark.py --save-baseline bench-baseline.json
+    python benchmark.py --baseline bench-baseline.json    # exit 1 on regression
+    python benchmark.py --generate /tmp/synthetic --artifacts 10000
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import generate  # noqa: E402
+
+BENCHMARK_FORMAT = "sdd-dashboard-benchmark"
+BENCHMARK_VERSION = 3
+DEFAULT_SCALES = (1000, 10000)
+
+# Share of the artifact budget per type; REQs absorb what the capped types cannot take
+ARTIFACT_MIX = (("REQ", 0.30), ("UC", 0.15), ("INV", 0.10), ("BDD", 0.10), ("TASK", 0.30), ("ADR", 0.05))
+UC_LIMIT = 9999            # UC-\d{3,4}
+TASKS_PER_FASE = 300
+REQS_PER_FILE = 500
+ROWS_PER_FILE = 400        # INV tables, BDD and TASK files
+MAX_COMMITS = 30000
+IMPLEMENTED_SHARE = 0.6   # tasks with a commit; the synthetic pipeline is in task-implementer
+
+_WORDS = ("user", "invoice", "session", "token", "report", "export", "document", "payment", "audit",
+          "search", "index", "profile", "role", "permission", "queue", "retry", "cache", "schedule",
+          "notification", "upload", "parser", "matching", "offer", "validation", "workflow", "backup")
+_VERBS = ("validate", "create", "update", "delete", "list", "sync", "render", "import", "encrypt",
+          "approve", "reject", "archive", "notify", "compute", "reconcile")
+
+
+# ──────────────────────────────────────────────────────────
+# Synthetic project generator
+# ──────────────────────────────────────────────────────────
+
+def _title(rnd):
+    return f"{rnd.choice(_VERBS).capitalize()} {rnd.choice(_WORDS)} {rnd.choice(_WORDS)}"
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _near(rnd, ids, k, at):
+    """k distinct ids from a window around relative position at (0..1).
+
+    Real projects reference within a feature far more than across the whole
+    spec; sampling from a local window keeps the synthetic graph similarly
+    clustered instead of a dense random small world.
+    """
+    if not ids:
+        return []
+    width = min(len(ids), max(4 * k, 16))
+    lo = min(max(0, int(at * len(ids)) - width // 2), len(ids) - width)
+    return rnd.sample(ids[lo:lo + width], min(k, width))
+
+
+def _artifact_counts(n):
+    counts = {kind: int(n * share) for kind, share in ARTIFACT_MIX}
+    counts["UC"] = min(counts["UC"], UC_LIMIT)
+    counts["ADR"] = min(counts["ADR"], 9999)
+    counts["REQ"] += n - sum(counts.values())
+    return counts
+
+
+def _req_ids(count, categories):
+    """REQ-<CAT>-NNNN spread over categories (each category holds at most 9999)."""
+    per_cat = max(1, -(-count // len(categories)))
+    ids = []
+    for cat in categories:
+        for i in range(1, min(per_cat, 9999) + 1):
+            if len(ids) == count:
+                return ids
+            ids.append(f"REQ-{cat}-{i:04d}")
+    return ids
+
+
+def generate_project(root, n_artifacts, seed=0, git=True):
+    """Write a synthetic SDD project with about n_artifacts artifacts under root.
+
+    Layout follows what scan_files() and the code/test/commit/audit scanners
+    expect: heading and table definitions, ID ranges, per-UC spec files,
+    task files with Refs: lines, src/ and tests/ with Refs: comments, a git
+    history with Refs:/Task: trailers and versioned audits. The same seed
+    and size always produce the same project. Returns the artifact counts.
+    """
+    rnd = random.Random(seed)
+    counts = _artifact_counts(n_artifacts)
+    categories = sorted(generate.REQ_DOMAIN_PREFIXES)[:max(4, min(40, counts["REQ"] // 250 or 4))]
+
+    reqs = _req_ids(counts["REQ"], categories)
+    ucs = [f"UC-{i:04d}" for i in range(1, counts["UC"] + 1)]
+    invs = _req_ids(counts["INV"], categories)
+    invs = [rid.replace("REQ-", "INV-", 1) for rid in invs]
+    bdds = [f"BDD-{rnd.choice(_WORDS)}-{i:05d}" for i in range(1, counts["BDD"] + 1)]
+    adrs = [f"ADR-{i:04d}" for i in range(1, counts["ADR"] + 1)]
+    n_fases = max(1, min(99, -(-counts["TASK"] // TASKS_PER_FASE)))
+    tasks = [f"TASK-F{i % n_fases + 1}-{i // n_fases + 1:04d}" for i in range(counts["TASK"])]
+
+    def near(ids, k, at):
+        return _near(rnd, ids, k, at)
+
+    # requirements/: headings, priorities and table rows, chunked per category
+    by_cat = {}
+    for rid in reqs:
+        by_cat.setdefault(rid.split("-")[1], []).append(rid)
+    req_pos = {rid: i / len(reqs) for i, rid in enumerate(reqs)}
+    for cat, ids in by_cat.items():
+        for chunk_no, start in enumerate(range(0, len(ids), REQS_PER_FILE), 1):
+            lines = [f"# Requirements {cat} ({chunk_no})", ""]
+            table = []
+            for rid in ids[start:start + REQS_PER_FILE]:
+                if rnd.random() < 0.2:
+                    table.append(f"| {rid} | {_title(rnd)} | {rnd.choice(('Must', 'Should', 'Could'))} |")
+                    continue
+                lines += [f"### {rid}: {_title(rnd)}",
+                          f"**Priority:** {rnd.choice(('Critical', 'High', 'Medium', 'Low'))}",
+                          f"The system shall {rnd.choice(_VERBS)} the {rnd.choice(_WORDS)}"
+                          + (f" (see {near(reqs, 1, req_pos[rid])[0]})." if rnd.random() < 0.3 else "."),
+                          ""]
+            _write(os.path.join(root, "requirements", cat.lower(), f"REQ-{cat}-{chunk_no:03d}.md"),
+                   "\n".join(lines) + "\n")
+            if table:
+                # A summary table of its own: rows below a heading would read as that REQ's references
+                _write(os.path.join(root, "requirements", cat.lower(), f"REQ-{cat}-{chunk_no:03d}-table.md"),
+                       "\n".join([f"# Requirements {cat} ({chunk_no}) — table", "",
+                                  "| ID | Title | Priority |", "|----|-------|----------|"] + table) + "\n")
+
+    # spec/use-cases/: one file per UC, with plain refs and ranges
+    for i, uc in enumerate(ucs):
+        at = i / len(ucs)
+        base = near(reqs, 1, at)[0]
+        prefix, num = base.rsplit("-", 1)
+        hi = min(int(num) + rnd.randint(1, 4), 9999)
+        lines = [f"# {uc}: {_title(rnd)}", "",
+                 f"**Implements:** {', '.join(near(reqs, rnd.randint(1, 3), at))}"]
+        if rnd.random() < 0.25:
+            lines.append(f"**Covers:** {base}..{hi:04d}")
+        lines += [f"**Invariants:** {', '.join(near(invs, 2, at))}", "",
+                 "## Main flow", "1. The user submits the form.", "2. The system stores the result."]
+        _write(os.path.join(root, "spec", "use-cases", f"{uc}-{rnd.choice(_WORDS)}.md"), "\n".join(lines) + "\n")
+
+    # spec/invariants/: table definitions
+    for chunk_no, start in enumerate(range(0, len(invs), ROWS_PER_FILE), 1):
+        rows = [f"| {inv} | {_title(rnd)} | {near(reqs, 1, (start + j) / len(invs))[0]} |"
+                for j, inv in enumerate(invs[start:start + ROWS_PER_FILE])]
+        _write(os.path.join(root, "spec", "invariants", f"INVARIANTS-{chunk_no:03d}.md"),
+               "# Invariants\n\n| ID | Rule | Source |\n|----|------|--------|\n" + "\n".join(rows) + "\n")
+
+    # spec/adr/
+    for i, adr in enumerate(adrs):
+        _write(os.path.join(root, "spec", "adr", f"{adr}-{rnd.choice(_WORDS)}.md"),
+               f"# {adr}: {_title(rnd)}\n\nDecides {', '.join(near(reqs, 2, i / len(adrs)))}.\n")
+
+    # test/: BDD scenarios grouped per file
+    for chunk_no, start in enumerate(range(0, len(bdds), ROWS_PER_FILE), 1):
+        lines = [f"# BDD scenarios {chunk_no}", ""]
+        for j, bdd in enumerate(bdds[start:start + ROWS_PER_FILE]):
+            at = (start + j) / len(bdds)
+            lines += [f"## {bdd}: {_title(rnd)}",
+                      f"Verifies {', '.join(near(ucs, 1, at) + near(reqs, 1, at))}",
+                      "Given a user, When they submit, Then it is saved", ""]
+        _write(os.path.join(root, "test", f"BDD-SCENARIOS-{chunk_no:03d}.md"), "\n".join(lines))
+
+    # plan/ and task/: tasks are numbered per phase, phases cover consecutive features
+    for f in range(1, n_fases + 1):
+        _write(os.path.join(root, "plan", f"FASE-{f}.md"),
+               f"# FASE-{f}: Phase {f}\n\nReads {', '.join(near(ucs, 5, (f - 0.5) / n_fases))}\n")
+    by_fase = {}
+    for i, tid in enumerate(tasks):
+        by_fase.setdefault(tid.split("-")[1], []).append((i / len(tasks), tid))
+    for fase, entries in by_fase.items():
+        lines = [f"# Tasks {fase}", ""]
+        for at, tid in entries:
+            if rnd.random() < 0.3:
+                lines.append(f"- [{rnd.choice(' x')}] {tid} {_title(rnd)} {' '.join(near(ucs, 1, at))}")
+            else:
+                lines += [f"### {tid}: {_title(rnd)}",
+                          f"Refs: {', '.join(near(ucs, 1, at) + near(reqs, 1, at))}", ""]
+        _write(os.path.join(root, "task", f"TASK-FASE-{fase[1:]}.md"), "\n".join(lines) + "\n")
+
+    # src/ and tests/
+    n_src = max(1, len(tasks) // 3)
+    src_files = []
+    for i in range(n_src):
+        at = i / n_src
+        targets = near(ucs, 2, at) + near(invs, 2, at) + near(reqs, 2, at)
+        module = _WORDS[i % len(_WORDS)]
+        kind = rnd.random()
+        if kind < 0.7:
+            rel = f"src/{module}/{module}-{i:05d}.ts"
+            body = []
+            for j in range(rnd.randint(3, 8)):
+                if rnd.random() < 0.6:
+                    body.append(f"// Refs: {', '.join(rnd.sample(targets, min(rnd.randint(1, 2), len(targets))))}")
+                body.append(f"export function {rnd.choice(_VERBS)}{j}(input: string): string {{\n"
+                            f"  return input.trim();\n}}\n")
+        elif kind < 0.85:
+            rel = f"src/{module}/{module}_{i:05d}.py"
+            body = []
+            for j in range(rnd.randint(3, 8)):
+                if rnd.random() < 0.6:
+                    body.append(f"# Refs: {rnd.choice(targets)}")
+                body.append(f"def {rnd.choice(_VERBS)}_{j}(value):\n    return value\n")
+        else:
+            rel = f"src/{module}/{module}{i:05d}.go"
+            body = [f"package {module}\n"]
+            for j in range(rnd.randint(3, 8)):
+                if rnd.random() < 0.6:
+                    body.append(f"// Refs: {rnd.choice(targets)}")
+                body.append(f"func {rnd.choice(_VERBS).capitalize()}{j}(v string) string {{\n\treturn v\n}}\n")
+        _write(os.path.join(root, rel), "\n".join(body))
+        src_files.append(rel)
+    n_tests = max(1, n_src // 2)
+    for i in range(n_tests):
+        at = i / n_tests
+        module = _WORDS[i % len(_WORDS)]
+        cases = []
+        for j in range(rnd.randint(2, 6)):
+            cases.append(f"  // Refs: {rnd.choice(near(ucs, 1, at) + near(bdds, 1, at))}\n"
+                         f"  it('should {rnd.choice(_VERBS)} {rnd.choice(_WORDS)} {j}', () => {{\n"
+                         f"    expect(true).toBe(true);\n  }});\n")
+        _write(os.path.join(root, "tests", "unit", module, f"{module}-{i:05d}.test.ts"),
+               "import { describe, it, expect } from 'vitest';\n\n"
+               f"describe('{module} {i}', () => {{\n" + "\n".join(cases) + "});\n")
+
+    # audits/: five versions, the newest with the full progression table
+    progression = []
+    for v in range(1, 6):
+        findings = max(0, 40 - v * 8 + rnd.randint(0, 4))
+        gate = "PASS" if v >= 4 else "FAIL"
+        progression.append(f"| v{v}.0 | {findings} | {v * 3} | {v} | {v // 2} | {gate} |")
+        _write(os.path.join(root, "audits", f"AUDIT-v{v}.0.md"), "\n".join([
+            f"# Audit v{v}.0", "",
+            "| Metric | Value |", "|--------|-------|",
+            f"| Total findings | {findings} |", f"| Critical | {max(0, 3 - v)} |", f"| High | {findings // 4} |",
+            f"| Medium | {findings // 3} |", f"| Low | {findings // 5} |",
+            f"| Corrections applied | {v * 3}/{v * 3 + findings} |", f"| Accepted | {v} |",
+            f"| Deferred | {v // 2} |", f"| 3C Gate | {gate} |", "",
+            "| Version | Findings | Fixed | Accepted | Deferred | 3C |", "|---|---|---|---|---|---|",
+        ] + progression) + "\n")
+
+    _write(os.path.join(root, "pipeline-state.json"), json.dumps({
+        "project": f"synthetic-{n_artifacts}",
+        "currentStage": "task-implementer",
+        "stages": {name: {"status": "done", "lastRun": "2026-01-01T00:00:00Z"} for name in (
+            "requirements-engineer", "specifications-engineer", "spec-auditor", "test-planner",
+            "plan-architect", "task-generator")},
+    }, indent=2))
+
+    if git:
+        _write_git_history(root, rnd, tasks, ucs, invs, src_files)
+    counts["FASE"] = n_fases
+    return counts
+
+
+def _write_git_history(root, rnd, tasks, ucs, invs, src_files):
+    """Create a throwaway git repo via git fast-import, shaped like a task-implementer history.
+
+    The first commit imports the generated tree. Then the first
+    IMPLEMENTED_SHARE of the tasks are done: each has one commit with a
+    Refs: trailer (its UC, sometimes an INV) and a Task: trailer that edits
+    one or two source files of its feature, and sometimes a trailer-less
+    follow-up fix. Trailer-less maintenance commits are mixed in. Every
+    commit touches a handful of files and states one or two IDs. The
+    edits are written back and the index is reset to HEAD, so the working
+    tree is clean.
+    """
+    if shutil.which("git") is None:
+        print("  Warning: git not found — synthetic project has no commit history")
+        return
+    subprocess.run(["git", "init", "-q", root], check=True)
+    tree = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != ".git")
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                tree[os.path.relpath(path, root).replace(os.sep, "/")] = f.read()
+    done = tasks[:min(MAX_COMMITS, int(len(tasks) * IMPLEMENTED_SHARE))]
+    history = [("chore: import specification and scaffolding", "", sorted(tree))]  # (subject, trailers, files)
+    for i, tid in enumerate(done):
+        at = i / len(done)
+        files = _near(rnd, src_files, rnd.randint(1, 2), at)
+        refs = _near(rnd, ucs, 1, at) + (_near(rnd, invs, 1, at) if rnd.random() < 0.5 else [])
+        history.append((f"feat: implement {tid}", f"Refs: {', '.join(refs)}\nTask: {tid}\n", files))
+        if rnd.random() < 0.4:
+            history.append((f"fix: review comments on {tid}", "", files[:1]))
+        if rnd.random() < 0.25:
+            history.append(("chore: tidy up", "", [rnd.choice(src_files)]))
+
+    stream = []
+    edited = set()
+    when = 1767225600  # 2026-01-01
+    for mark, (subject, trailers, files) in enumerate(history, 1):
+        message = (f"{subject}\n\n{trailers}" if trailers else f"{subject}\n").encode("utf-8")
+        stream.append(f"commit refs/heads/main\nmark :{mark}\n"
+                      f"committer Bench <bench@example.invalid> {when + mark * 60} +0000\n"
+                      f"data {len(message)}\n".encode("utf-8") + message)
+        if mark > 1:
+            stream.append(f"from :{mark - 1}\n".encode("utf-8"))
+            for rel in files:
+                comment = "#" if rel.endswith(".py") else "//"
+                tree[rel] += f"\n{comment} change {mark}\n".encode("utf-8")
+                edited.add(rel)
+        for rel in files:
+            stream.append(f"M 100644 inline {rel}\ndata {len(tree[rel])}\n".encode("utf-8") + tree[rel])
+        stream.append(b"\n")
+    subprocess.run(["git", "fast-import", "--quiet"], input=b"".join(stream), cwd=root, check=True)
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=root, check=True)
+    for rel in edited:
+        with open(os.path.join(root, rel), "wb") as f:
+            f.write(tree[rel])
+    subprocess.run(["git", "reset", "-q"], cwd=root, check=True)
+
+
+# ──────────────────────────────────────────────────────────
+# Harness
+# ──────────────────────────────────────────────────────────
+
+def _project_for(work_dir, scale, seed, git):
+    """Generated project for a scale, reused across runs while the parameters match."""
+    root = os.path.join(work_dir, f"synthetic-{scale}-s{seed}")
+    marker = os.path.join(root, ".synthetic.json")
+    params = {"scale": scale, "seed": seed, "git": git, "version": BENCHMARK_VERSION}
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f).get("params") == params:
+                return root
+        shutil.rmtree(root)
+    print(f"Generating synthetic project ({scale} artifacts, seed {seed})...")
+    counts = generate_project(root, scale, seed, git)
+    _write(marker, json.dumps({"params": params, "counts": counts}))
+    return root
+
+
+def run_once(project_dir, trace_memory=False):
+    """One cold generate.py run under the profiler; returns {phase path: wall ms}."""
+    output_dir = os.path.join(project_dir, "dashboard")
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    generate._CLASSIFIER_CACHE.clear()
+    generate._JS_FRAMEWORK_DEFAULTS.clear()
+    paths = generate.resolve_output_paths(project_dir, output_dir)
+    profiler = generate.enable_profiling(trace_memory)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            generate.generate_dashboard(project_dir, output_dir, os.path.basename(project_dir), paths)
+    finally:
+        generate.disable_profiling()
+    phases = {}
+    for p in profiler.phases:
+        phases[p["path"]] = phases.get(p["path"], 0) + p["wallMs"]
+    phases["total"] = sum(p["wallMs"] for p in profiler.phases if p["depth"] == 0)
+    if trace_memory:
+        phases["peakMB"] = max((p["peakBytes"] for p in profiler.phases), default=0) / 1e6
+    return phases
+
+
+def run_benchmark(scales, seed=0, repeat=1, work_dir=None, git=True, trace_memory=False):
+    """Best-of-repeat phase timings per scale, as a benchmark results document."""
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), "sdd-dashboard-bench")
+    results = {}
+    for scale in scales:
+        project_dir = _project_for(work_dir, scale, seed, git)
+        best = {}
+        for _ in range(repeat):
+            for phase, ms in run_once(project_dir, trace_memory).items():
+                best[phase] = min(best.get(phase, ms), ms)
+        results[str(scale)] = {k: round(v, 2) for k, v in best.items()}
+        print(f"  {scale:>7} artifacts: {best['total']:.0f} ms")
+    return {
+        "format": BENCHMARK_FORMAT,
+        "version": BENCHMARK_VERSION,
+        "seed": seed,
+        "repeat": repeat,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.25, min_delta_ms=10.0):
+    """Return [(scale, phase, baseline ms, current ms, ratio, regressed)] for shared phases.
+
+    A phase regresses when it is more than threshold slower (relative) and
+    more than min_delta_ms slower (absolute, to ignore noise on tiny phases).
+    """
+    rows = []
+    for scale, phases in current["results"].items():
+        base = baseline.get("results", {}).get(scale)
+        if not base:
+            continue
+        for phase, ms in phases.items():
+            if phase not in base or phase == "peakMB":
+                continue
+            ref = base[phase]
+            ratio = ms / ref if ref else float("inf") if ms else 1.0
+            regressed = ratio > 1 + threshold and ms - ref > min_delta_ms
+            rows.append((scale, phase, ref, ms, ratio, regressed))
+    return rows
+
+
+def print_results(current, rows=None):
+    if rows is None:
+        for scale, phases in current["results"].items():
+            print(f"\n{scale} artifacts")
+            for phase, ms in phases.items():
+                print(f"  {phase:<40} {ms:>10.1f}")
+        return
+    print(f"\n  {'scale':>7} {'phase':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for scale, phase, ref, ms, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"  {scale:>7} {phase:<40} {ref:>10.1f} {ms:>10.1f} {(ratio - 1) * 100:>7.0f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate.py on synthetic SDD projects")
+    parser.add_argument(
+        "--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+        help="Comma-separated artifact counts (default: 1000,10000; e.g. 1000,10000,100000)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scale; the fastest is kept (default: 1)")
+    parser.add_argument(
+        "--work-dir", default=None,
+        help="Where synthetic projects are generated and reused (default: TMPDIR/sdd-dashboard-bench)"
+    )
+    parser.add_argument("--no-git", action="store_true", help="Generate projects without a git history")
+    parser.add_argument("--memory", action="store_true",
+                        help="Trace memory with tracemalloc (slower; adds peakMB per scale)")
+    parser.add_argument("--output", default=None, help="Write the results JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against this results file; exit 1 on regression")
+    parser.add_argument("--save-baseline", default=None, help="Write the results as a new baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative slowdown that counts as a regression (default: 0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0,
+                        help="Ignore slowdowns smaller than this many ms (default: 10)")
+    parser.add_argument("--generate", metavar="DIR", default=None,
+                        help="Only write a synthetic project to DIR and exit")
+    parser.add_argument("--artifacts", type=int, default=1000, help="Artifact count for --generate (default: 1000)")
+    args = parser.parse_args()
+
+    if args.generate:
+        counts = generate_project(os.path.abspath(args.generate), args.artifacts, args.seed, not args.no_git)
+        print(f"Wrote {args.generate}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+        return 0
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    print(f"Benchmarking generate.py at {', '.join(map(str, scales))} artifacts (seed {args.seed})")
+    current = run_benchmark(scales, args.seed, args.repeat, args.work_dir, not args.no_git, args.memory)
+
+    if args.output:
+        generate._safe_write_json(os.path.abspath(args.output), current)
+    if args.save_baseline:
+        generate._safe_write_json(os.path.abspath(args.save_baseline), current)
+        print(f"Wrote baseline {args.save_baseline}")
+
+    if not args.baseline:
+        print_results(current)
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold, args.min_delta_ms)
+    print_results(current, rows)
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"\n{len(regressions)} phase(s) regressed more than {args.threshold:.0%} "
+              f"(and {args.min_delta_ms:g} ms) against {args.baseline}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+SDD Dashboard Federation
+Merges the traceability-graph.json of several projects into one federated
+graph. Artifact IDs are namespaced per project ("billing:UC-001"), and
+references to artifacts owned by another project resolve through explicit
+mappings. Input graphs are streamed, and each project's namespaced part is
+cached by graph hash, so a re-merge only re-reads the projects that changed.
+
+Usage:
+    python federate.py federation.json
+    python federate.py federation.json --output /tmp/federated
+    python federate.py --graph platform=../platform/dashboard/traceability-graph.json \\
+                       --graph billing=../billing --output /tmp/federated
+
+federation.json:
+    {
+      "name": "acme",
+      "projects": [
+        {"namespace": "platform", "path": "../platform"},
+        {"namespace": "billing", "graph": "../billing/out/traceability-graph.json"}
+      ],
+      "mappings": [
+        {"from": "billing", "ids": ["REQ-AUTH-*"], "to": "platform"},
+        {"from": "*", "ids": ["REQ-LEGACY-001"], "to": "platform:REQ-AUTH-009"}
+      ]
+    }
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import codecs
+import hashlib
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timezone
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import generate  # noqa: E402
+
+FEDERATION_FORMAT = "sdd-federated-graph"
+FEDERATION_VERSION = 1
+SEGMENT_FORMAT = "sdd-federation-segment"
+FEDERATED_GRAPH_FILE = "traceability-graph.json"
+FEDERATION_CACHE_DIR = ".federation"
+FEDERATION_INDEX_FILE = "index.json"
+NAMESPACE_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+STREAMED_KEYS = ("artifacts", "relationships")
+READ_CHUNK = 1 << 16
+
+
+# ──────────────────────────────────────────────────────────
+# Streaming graph reader
+# ──────────────────────────────────────────────────────────
+
+class GraphStream:
+    """Incremental reader for a traceability-graph.json document.
+
+    sections() yields (key, value) for each top-level key in file order.
+    The "artifacts" and "relationships" arrays come back as iterators that
+    decode one element at a time from a sliding buffer, so memory stays at
+    roughly one element plus one read chunk. Every other section is decoded
+    whole. An iterator must be consumed (or abandoned) before the next
+    section is requested; whatever is left of it is skipped. The SHA-256 of
+    the bytes read so far is kept in digest.
+    """
+
+    def __init__(self, path, streamed=STREAMED_KEYS, chunk=READ_CHUNK):
+        self.path = path
+        self.streamed = set(streamed)
+        self.chunk = chunk
+        self.digest = hashlib.sha256()
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._file = None
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read more text, dropping the consumed prefix; False at end of file."""
+        if self._eof:
+            return False
+        data = self._file.read(max(self.chunk, len(self._buf) - self._pos))
+        if not data:
+            self._eof = True
+            return False
+        self.digest.update(data)
+        self._buf = self._buf[self._pos:] + self._text.decode(data)
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character ("" at end of file), without consuming it."""
+        while True:
+            buf, pos, n = self._buf, self._pos, len(self._buf)
+            while pos < n and buf[pos] in " \t\r\n":
+                pos += 1
+            self._pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"{self.path}: expected {char!r} but found {found or 'end of file'!r}")
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue  # a number may continue in the next chunk
+            self._pos = end
+            return value
+
+    def _items(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("]")
+            return
+
+    def sections(self):
+        with open(self.path, "rb") as f:
+            self._file = f
+            self._expect("{")
+            if self._peek() == "}":
+                return
+            while True:
+                key = self._value()
+                self._expect(":")
+                if key in self.streamed:
+                    items = self._items()
+                    yield key, items
+                    for _ in items:
+                        pass
+                else:
+                    yield key, self._value()
+                if self._peek() == ",":
+                    self._pos += 1
+                    continue
+                self._expect("}")
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    self.digest.update(block)  # trailing whitespace still counts towards the hash
+                return
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+
+def graph_hash(path):
+    """sha256 of a graph file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def _atomic_text(path):
+    """Open a temp file next to path for writing; replace path with it on success."""
+    out_dir = os.path.dirname(path)
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _compact(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+# ──────────────────────────────────────────────────────────
+# Federation config and ID mapping
+# ──────────────────────────────────────────────────────────
+
+def load_federation(config_path=None, graphs=()):
+    """Read federation.json and/or --graph NS=PATH pairs into {name, projects, mappings}.
+
+    A project's "graph" is its traceability-graph.json; "path" is a project
+    root whose dashboard/traceability-graph.json is used. Relative paths are
+    taken from the config file's directory. Raises ValueError on invalid
+    namespaces, duplicates or mappings.
+    """
+    config = {}
+    base = os.getcwd()
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        base = os.path.dirname(os.path.abspath(config_path))
+    entries = list(config.get("projects") or [])
+    for item in graphs:
+        namespace, sep, path = item.partition("=")
+        if not sep:
+            raise ValueError(f"--graph must be NAMESPACE=PATH: {item!r}")
+        entries.append({"namespace": namespace.strip(), "graph": path.strip(), "_base": os.getcwd()})
+
+    projects = []
+    seen = set()
+    for entry in entries:
+        namespace = entry.get("namespace", "")
+        if not NAMESPACE_RE.match(namespace):
+            raise ValueError(f"invalid namespace {namespace!r} (letters, digits, '_', '.', '-')")
+        if namespace in seen:
+            raise ValueError(f"duplicate namespace {namespace!r}")
+        seen.add(namespace)
+        graph = os.path.abspath(os.path.join(entry.get("_base", base),
+                                             os.path.expanduser(entry.get("graph") or entry.get("path") or namespace)))
+        if os.path.isdir(graph):
+            direct = os.path.join(graph, FEDERATED_GRAPH_FILE)
+            graph = direct if os.path.exists(direct) else os.path.join(graph, "dashboard", FEDERATED_GRAPH_FILE)
+        projects.append({"namespace": namespace, "graph": graph})
+
+    mappings = []
+    for rule in config.get("mappings") or []:
+        source, target = rule.get("from", "*"), rule.get("to", "")
+        ids = rule.get("ids") or ([rule["id"]] if rule.get("id") else [])
+        if source != "*" and source not in seen:
+            raise ValueError(f"mapping from unknown project {source!r}")
+        target_ns = target.split(":", 1)[0]
+        if target_ns not in seen:
+            raise ValueError(f"mapping to unknown project {target!r}")
+        if not ids:
+            raise ValueError(f"mapping {rule!r} lists no ids")
+        if ":" in target and (len(ids) != 1 or any(c in ids[0] for c in "*?")):
+            raise ValueError(f"mapping to a single artifact ({target}) needs exactly one literal id")
+        mappings.append({"from": source, "ids": list(ids), "to": target})
+    return {"name": config.get("name") or "federation", "projects": projects, "mappings": mappings}
+
+
+class IdResolver:
+    """Qualifies one project's artifact IDs, sending mapped IDs to the owning project.
+
+    The mapping rules that apply to the project (its own plus "from": "*")
+    are compiled into a single regex with one named alternative per rule,
+    in rule order, so the first matching rule wins. Unmapped IDs stay in
+    the project's namespace.
+    """
+
+    def __init__(self, namespace, mappings):
+        self.namespace = namespace
+        self.rules = [rule for rule in mappings if rule["from"] in (namespace, "*")]
+        alternatives = [f"(?P<r{i}>{'|'.join(generate._glob_to_regex(p) for p in rule['ids'])})"
+                        for i, rule in enumerate(self.rules)]
+        self._matcher = re.compile("|".join(alternatives)) if alternatives else None
+        self._memo = {}
+
+    def key(self):
+        """Stable key of the rules in effect (part of the segment cache key)."""
+        return _compact(self.rules)
+
+    def mapped(self, local_id):
+        """The qualified target of a mapping rule for local_id, or None."""
+        if self._matcher is None:
+            return None
+        m = self._matcher.fullmatch(local_id)
+        if m is None:
+            return None
+        target = self.rules[int(m.lastgroup[1:])]["to"]
+        return target if ":" in target else f"{target}:{local_id}"
+
+    def __call__(self, local_id):
+        qualified = self._memo.get(local_id)
+        if qualified is None:
+            qualified = self._memo[local_id] = self.mapped(local_id) or f"{self.namespace}:{local_id}"
+        return qualified
+
+
+# ──────────────────────────────────────────────────────────
+# Per-project segments (cached by graph hash)
+# ──────────────────────────────────────────────────────────
+
+def _segment_path(cache_dir, namespace):
+    return os.path.join(cache_dir, f"{namespace}.jsonl")
+
+
+def read_segment_meta(path):
+    """(header, summary) of a segment file, or (None, None) if missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            summary = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None, None
+    if header.get("format") != SEGMENT_FORMAT or header.get("version") != FEDERATION_VERSION:
+        return None, None
+    return header, summary
+
+
+def build_segment(project, resolver, path):
+    """Stream one project graph into a namespaced segment file; return its header.
+
+    A segment is JSON Lines: a header (hash, counts), a summary (project
+    name, REQ and artifact IDs, cross-project edges, statistics), then one
+    artifact per line followed by one relationship per line. Artifacts get
+    id "<ns>:<id>" plus localId and project; refIds inside their code, test
+    and commit refs and both ends of every relationship go through the
+    resolver, and relationships that leave the project are marked
+    crossProject.
+    """
+    namespace = project["namespace"]
+    stream = GraphStream(project["graph"])
+    out_dir = os.path.dirname(path)
+    os.makedirs(out_dir, exist_ok=True)
+    summary = {"projectName": namespace, "generatedAt": None, "schema": None,
+               "definedIds": [], "reqIds": [], "crossEdges": [], "shadowedMappings": [], "statistics": {}}
+    counts = {"artifacts": 0, "relationships": 0}
+    prefix = namespace + ":"
+    body_fd, body_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    try:
+        with os.fdopen(body_fd, "w", encoding="utf-8") as body:
+            for key, value in stream.sections():
+                if key == "artifacts":
+                    if counts["relationships"]:
+                        raise ValueError(f"{project['graph']}: relationships precede artifacts")
+                    for art in value:
+                        local = art["id"]
+                        if resolver.mapped(local):
+                            summary["shadowedMappings"].append(local)
+                        art["id"] = prefix + local
+                        art["localId"] = local
+                        art["project"] = namespace
+                        for ref_key in ("codeRefs", "testRefs", "commitRefs"):
+                            for ref in art.get(ref_key) or ():
+                                if ref.get("refIds"):
+                                    ref["refIds"] = [resolver(r) for r in ref["refIds"]]
+                        summary["definedIds"].append(local)
+                        if art.get("type") == "REQ":
+                            summary["reqIds"].append(local)
+                        body.write(_compact(art))
+                        body.write("\n")
+                        counts["artifacts"] += 1
+                elif key == "relationships":
+                    for rel in value:
+                        rel["source"] = resolver(rel["source"])
+                        rel["target"] = resolver(rel["target"])
+                        if not (rel["source"].startswith(prefix) and rel["target"].startswith(prefix)):
+                            rel["crossProject"] = True
+                            summary["crossEdges"].append([rel["source"], rel["target"]])
+                        body.write(_compact(rel))
+                        body.write("\n")
+                        counts["relationships"] += 1
+                elif key == "projectName":
+                    summary["projectName"] = value
+                elif key == "generatedAt":
+                    summary["generatedAt"] = value
+                elif key == "$schema":
+                    summary["schema"] = value
+                elif key == "statistics":
+                    cov = dict(value.get("traceabilityCoverage") or {})
+                    cov.pop("reqBreakdown", None)
+                    summary["statistics"] = {"totalArtifacts": value.get("totalArtifacts", 0),
+                                             "byType": value.get("byType", {}),
+                                             "traceabilityCoverage": cov}
+
+        header = {"format": SEGMENT_FORMAT, "version": FEDERATION_VERSION, "namespace": namespace,
+                  "graph": project["graph"], "hash": stream.hexdigest(), "rules": resolver.key()}
+        header.update(counts)
+        with _atomic_text(path) as f, open(body_path, "r", encoding="utf-8") as body:
+            f.write(_compact(header) + "\n")
+            f.write(_compact(summary) + "\n")
+            for line in body:
+                f.write(line)
+    finally:
+        if os.path.exists(body_path):
+            os.unlink(body_path)
+    return header
+
+
+def _segment_lines(path, header):
+    """Yield (section, line) for the artifact and relationship lines of a segment."""
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()
+        f.readline()
+        for _ in range(header["artifacts"]):
+            yield "artifacts", f.readline().rstrip("\n")
+        for _ in range(header["relationships"]):
+            yield "relationships", f.readline().rstrip("\n")
+
+
+# ──────────────────────────────────────────────────────────
+# Federated graph
+# ──────────────────────────────────────────────────────────
+
+def federation_statistics(segments):
+    """statistics and federation report from the segment summaries alone (no artifact lines read).
+
+    crossProjectCoverage gives, per project, how many of its REQs are
+    referenced from another project. Cross-project edges whose target the
+    owning project does not define are listed as unresolved.
+    """
+    defined = set()
+    for header, summary in segments:
+        prefix = header["namespace"] + ":"
+        defined.update(prefix + local for local in summary["definedIds"])
+    by_type = {}
+    referenced_from_outside = {}
+    unresolved = []
+    cross_edges = 0
+    for header, summary in segments:
+        for t, count in summary["statistics"].get("byType", {}).items():
+            by_type[t] = by_type.get(t, 0) + count
+        prefix = header["namespace"] + ":"
+        for source, target in summary["crossEdges"]:
+            cross_edges += 1
+            if target not in defined:
+                unresolved.append({"source": source, "target": target})
+            elif not target.startswith(prefix):
+                referenced_from_outside.setdefault(target, set()).add(header["namespace"])
+    coverage = {}
+    for header, summary in segments:
+        prefix = header["namespace"] + ":"
+        total = len(summary["reqIds"])
+        count = sum(1 for local in summary["reqIds"] if prefix + local in referenced_from_outside)
+        coverage[header["namespace"]] = {
+            "count": count,
+            "total": total,
+            "percentage": round(count / total * 100, 1) if total else 0,
+        }
+    stats = {
+        "totalArtifacts": sum(h["artifacts"] for h, _ in segments),
+        "byType": dict(sorted(by_type.items())),
+        "totalRelationships": sum(h["relationships"] for h, _ in segments),
+        "crossProjectRelationships": cross_edges,
+        "unresolvedCrossReferences": len(unresolved),
+        "crossProjectCoverage": coverage,
+        "byProject": {h["namespace"]: dict(s["statistics"], artifacts=h["artifacts"],
+                                           relationships=h["relationships"]) for h, s in segments},
+    }
+    report = {
+        "unresolved": unresolved,
+        "shadowedMappings": {h["namespace"]: s["shadowedMappings"] for h, s in segments if s["shadowedMappings"]},
+    }
+    return stats, report
+
+
+def write_federated_graph(path, federation, segments, segment_paths, federation_hash):
+    """Stream the segments into one federated graph at path (written atomically)."""
+    stats, report = federation_statistics(segments)
+    head = {
+        "$schema": "traceability-graph-v6",
+        "format": FEDERATION_FORMAT,
+        "version": FEDERATION_VERSION,
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "projectName": federation["name"],
+        "federationHash": federation_hash,
+        "projects": [{"namespace": h["namespace"], "projectName": s["projectName"], "graph": h["graph"],
+                      "hash": h["hash"], "generatedAt": s["generatedAt"],
+                      "artifacts": h["artifacts"], "relationships": h["relationships"]}
+                     for h, s in segments],
+        "mappings": federation["mappings"],
+    }
+    with _atomic_text(path) as f:
+        f.write("{\n")
+        for key, value in head.items():
+            f.write(f"  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n")
+        for section in STREAMED_KEYS:
+            f.write(f'  "{section}": [')
+            first = True
+            for (header, _), seg_path in zip(segments, segment_paths):
+                for line_section, line in _segment_lines(seg_path, header):
+                    if line_section != section:
+                        continue
+                    f.write("\n    " if first else ",\n    ")
+                    f.write(line)
+                    first = False
+            f.write("\n  ],\n" if not first else "],\n")
+        f.write(f'  "statistics": {json.dumps(stats, ensure_ascii=False)},\n')
+        f.write(f'  "federation": {json.dumps(report, ensure_ascii=False)}\n')
+        f.write("}\n")
+    return stats, report
+
+
+def federate(federation, output_dir, force=False):
+    """Merge the federation's graphs into output_dir; return a run summary.
+
+    Each project graph's hash is looked up in the cache index by its
+    (mtime, size) signature, and only hashed again when the signature moved.
+    A project whose hash and mapping rules match its cached segment is not
+    read at all. The federated graph is only rewritten when some segment
+    changed (or force is set).
+    """
+    start = time.perf_counter()
+    cache_dir = os.path.join(output_dir, FEDERATION_CACHE_DIR)
+    index_path = os.path.join(cache_dir, FEDERATION_INDEX_FILE)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    hashes = index.get("hashes", {})
+
+    segments, segment_paths, rebuilt, reused, missing = [], [], [], [], []
+    for project in federation["projects"]:
+        namespace, graph = project["namespace"], project["graph"]
+        if not os.path.isfile(graph):
+            print(f"  Warning: {namespace}: no graph at {graph} (run generate.py for it first); left out")
+            missing.append(namespace)
+            continue
+        signature = list(generate._file_signature(graph))
+        cached = hashes.get(graph)
+        digest = cached["hash"] if cached and cached["signature"] == signature else graph_hash(graph)
+        hashes[graph] = {"signature": signature, "hash": digest}
+        resolver = IdResolver(namespace, federation["mappings"])
+        seg_path = _segment_path(cache_dir, namespace)
+        header, summary = read_segment_meta(seg_path)
+        if force or header is None or header["hash"] != digest or header["rules"] != resolver.key() \
+                or header["graph"] != graph:
+            header = build_segment(project, resolver, seg_path)
+            hashes[graph]["hash"] = header["hash"]
+            header, summary = read_segment_meta(seg_path)
+            rebuilt.append(namespace)
+            print(f"  {namespace}: merged {header['artifacts']} artifacts, {header['relationships']} relationships")
+        else:
+            reused.append(namespace)
+            print(f"  {namespace}: unchanged (graph hash {digest[:12]})")
+        segments.append((header, summary))
+        segment_paths.append(seg_path)
+
+    federation_hash = hashlib.sha256(_compact(
+        [federation["name"], federation["mappings"],
+         [[h["namespace"], h["hash"], h["rules"]] for h, _ in segments]]).encode("utf-8")).hexdigest()
+    graph_path = os.path.join(output_dir, FEDERATED_GRAPH_FILE)
+    output = index.get("output") or {}
+    up_to_date = (not force and output.get("hash") == federation_hash
+                  and output.get("signature") == list(generate._file_signature(graph_path)))
+    if up_to_date:
+        stats, report = None, None
+    else:
+        stats, report = write_federated_graph(graph_path, federation, segments, segment_paths, federation_hash)
+        output = {"hash": federation_hash, "signature": list(generate._file_signature(graph_path))}
+    generate._safe_write_json(index_path, {"version": FEDERATION_VERSION, "hashes": hashes, "output": output})
+    return {
+        "graph": graph_path,
+        "written": not up_to_date,
+        "rebuilt": rebuilt,
+        "reused": reused,
+        "missing": missing,
+        "statistics": stats,
+        "federation": report,
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge several projects' traceability-graph.json into one federated graph"
+    )
+    parser.add_argument("config", nargs="?", default=None,
+                        help="federation.json listing projects and cross-project ID mappings")
+    parser.add_argument("--graph", action="append", default=[], metavar="NS=PATH",
+                        help="Add a project graph (file, or project directory) under namespace NS (repeatable)")
+    parser.add_argument("--output", default=None,
+                        help="Output directory (default: 'federated' next to the config, or ./federated)")
+    parser.add_argument("--force", action="store_true", help="Re-merge every project, ignoring the cache")
+    args = parser.parse_args()
+    if not args.config and not args.graph:
+        parser.error("give a federation.json or at least one --graph NS=PATH")
+    try:
+        federation = load_federation(args.config, args.graph)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    base = os.path.dirname(os.path.abspath(args.config)) if args.config else os.getcwd()
+    output_dir = os.path.abspath(args.output) if args.output else os.path.join(base, "federated")
+
+    print(f"Federating {len(federation['projects'])} projects into {output_dir}")
+    result = federate(federation, output_dir, args.force)
+    if not result["written"]:
+        print(f"Federated graph up to date ({result['graph']})")
+        return 0
+    stats, report = result["statistics"], result["federation"]
+    print(f"Wrote {result['graph']} in {result['elapsedMs']:.0f} ms "
+          f"({len(result['rebuilt'])} re-merged, {len(result['reused'])} reused)")
+    print(f"Artifacts: {stats['totalArtifacts']}, relationships: {stats['totalRelationships']}, "
+          f"cross-project: {stats['crossProjectRelationships']} ({stats['unresolvedCrossReferences']} unresolved)")
+    for namespace, cov in stats["crossProjectCoverage"].items():
+        if cov["count"]:
+            print(f"  {namespace}: {cov['count']}/{cov['total']} REQs referenced by other projects ({cov['percentage']}%)")
+    for namespace, ids in report["shadowedMappings"].items():
+        print(f"  Warning: {namespace} defines mapped IDs itself: {', '.join(ids[:10])}")
+    return 1 if result["missing"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
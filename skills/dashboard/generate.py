@@ -13,13 +13,39 @@ Usage:
 
 import os
 import re
+import io
 import json
 import sys
+import time
+import glob
+import stat
+import mmap
+import zlib
+import heapq
+import bisect
+import shutil
+import socket
+import struct
+import select
+import ctypes
+import ctypes.util
+import logging
 import argparse
+import hashlib
+import threading
+import traceback
+import contextlib
 import subprocess
 import tempfile
+import tracemalloc
+import socketserver
+import xml.etree.ElementTree as ET
+from bisect import bisect_left
 from datetime import datetime, timezone
-from collections import OrderedDict
+from itertools import accumulate
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 
 # ──────────────────────────────────────────────────────────
 # Constants (static — do not depend on CLI args)
@@ -179,6 +205,38 @@ STAGE_COUNT_UNITS = {
 # Helpers
 # ──────────────────────────────────────────────────────────
 
+_LOGGER = None  # callable(message) installed by set_logger(); None prints to stdout
+
+
+def log(message=""):
+    """Progress output: printed to stdout unless a logger was installed with set_logger()."""
+    if _LOGGER is None:
+        print(message)
+    else:
+        _LOGGER(message)
+
+
+def set_logger(logger):
+    """Route log() output to logger; return the previous one.
+
+    logger is a callable taking one message, a logging.Logger (blank lines
+    dropped, "Warning:" lines at WARNING, the rest at INFO) or None for
+    stdout. Like the profiler, it is process-wide.
+    """
+    global _LOGGER
+    previous = _LOGGER
+    if logger is not None and hasattr(logger, "log") and hasattr(logger, "isEnabledFor"):
+        target = logger
+
+        def logger(message):
+            text = str(message).strip("\n")
+            if text.strip():
+                level = logging.WARNING if text.lstrip().startswith("Warning") else logging.INFO
+                target.log(level, text)
+    _LOGGER = logger
+    return previous
+
+
 def detect_project_name(project_dir):
     """Auto-detect project name from package.json, pipeline-state.json, or directory name."""
     for f in ["package.json", "pipeline-state.json"]:
@@ -211,28 +269,54 @@ def resolve_template(project_dir):
     return next((p for p in candidates if os.path.exists(p)), candidates[0])
 
 
+def load_dashboard_config(project_dir):
+    """Read the optional project config at .sdd/dashboard.json ({} when absent or invalid)."""
+    path = os.path.join(project_dir, ".sdd", "dashboard.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return config if isinstance(config, dict) else {}
+    except Exception as e:
+        log(f"  Warning: could not read {path}: {e}")
+        return {}
+
+
+_RELATIONSHIP_TYPES = {
+    ("UC", "REQ"): "implements",
+    ("WF", "API"): "orchestrates",
+    ("BDD", "REQ"): "verifies",
+    ("BDD", "UC"): "verifies",
+    ("INV", "REQ"): "guarantees",
+    ("ADR", "REQ"): "decides",
+    ("ADR", "NFR"): "decides",
+    ("TASK", "FASE"): "decomposes",
+    ("TASK", "UC"): "implemented-by",
+    ("TASK", "API"): "implemented-by",
+    ("TASK", "INV"): "implemented-by",
+    ("FASE", "UC"): "reads-from",
+    ("FASE", "API"): "reads-from",
+}
+
+
 def infer_relationship_type(source_type, target_type):
     """Infer the relationship type based on source and target types."""
-    pairs = {
-        ("UC", "REQ"): "implements",
-        ("WF", "API"): "orchestrates",
-        ("BDD", "REQ"): "verifies",
-        ("BDD", "UC"): "verifies",
-        ("INV", "REQ"): "guarantees",
-        ("ADR", "REQ"): "decides",
-        ("ADR", "NFR"): "decides",
-        ("TASK", "FASE"): "decomposes",
-        ("TASK", "UC"): "implemented-by",
-        ("TASK", "API"): "implemented-by",
-        ("TASK", "INV"): "implemented-by",
-        ("FASE", "UC"): "reads-from",
-        ("FASE", "API"): "reads-from",
-    }
-    return pairs.get((source_type, target_type), "traces-to")
+    return _RELATIONSHIP_TYPES.get((source_type, target_type), "traces-to")
+
+
+_ID_TYPE_CACHE = {}  # id -> type prefix (or None); the graph classifies each ID many times
 
 
 def classify_id(id_str):
     """Return the type prefix for an artifact ID."""
+    id_type = _ID_TYPE_CACHE.get(id_str, False)
+    if id_type is False:
+        id_type = _ID_TYPE_CACHE[id_str] = _classify_id(id_str)
+    return id_type
+
+
+def _classify_id(id_str):
     if id_str.startswith("REQ-"): return "REQ"
     if id_str.startswith("UC-"): return "UC"
     if id_str.startswith("WF-"): return "WF"
@@ -304,24 +388,656 @@ def _rel_path(filepath, project_dir):
     return os.path.relpath(filepath, project_dir).replace("\\", "/")
 
 
+def _decode_blob(data):
+    """Decode file bytes the way the scanners open files: UTF-8 with replacement, universal newlines."""
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _text_lines(text):
+    """Split decoded text into lines with their "\\n" kept, as readlines() does."""
+    lines = text.split("\n")
+    tail = lines.pop()
+    return [line + "\n" for line in lines] + ([tail] if tail else [])
+
+
+# ──────────────────────────────────────────────────────────
+# Profiling (--profile)
+# ──────────────────────────────────────────────────────────
+
+PROFILE_REPORT_FILE = "profile.json"
+PROFILE_TRACE_FILE = "profile-trace.json"
+
+
+class _NullPhase:
+    """Shared no-op phase returned by profile_phase() when profiling is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_files(self, paths):
+        pass
+
+    def count(self, **counters):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """One timed span: wall and CPU time, child-process CPU, files, bytes and memory peak."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.files = 0
+        self.bytes = 0
+        self.counters = {}
+        self._peak = 0
+
+    def add_files(self, paths):
+        """Count input files and their on-disk size."""
+        for path in paths:
+            try:
+                self.bytes += os.path.getsize(path)
+            except OSError:
+                continue
+            self.files += 1
+
+    def count(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def __enter__(self):
+        stack = self.profiler._stack
+        if tracemalloc.is_tracing():
+            if stack:
+                # Fold the parent's peak so far in before this phase resets it
+                stack[-1]._peak = max(stack[-1]._peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.depth = len(stack)
+        stack.append(self)
+        times = os.times()
+        self._child_cpu = times.children_user + times.children_system
+        self._cpu = time.process_time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        cpu = time.process_time_ns() - self._cpu
+        times = os.times()
+        child_cpu = times.children_user + times.children_system - self._child_cpu
+        stack = self.profiler._stack
+        stack.pop()
+        if tracemalloc.is_tracing():
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, self._peak)
+        self.profiler._record({
+            "name": self.name,
+            "path": "/".join([p.name for p in stack] + [self.name]),
+            "depth": self.depth,
+            "startMs": round((self._start - self.profiler.origin) / 1e6, 3),
+            "wallMs": round((end - self._start) / 1e6, 3),
+            "cpuMs": round(cpu / 1e6, 3),
+            "childCpuMs": round(child_cpu * 1000, 3),
+            "files": self.files,
+            "bytes": self.bytes,
+            "peakBytes": self._peak,
+            "counters": self.counters,
+        })
+        return False
+
+
+class Profiler:
+    """Collects phase spans for --profile and writes the JSON and trace-event reports.
+
+    Installed as the module-level _PROFILER only when --profile is given;
+    otherwise profile_phase() returns a shared no-op and nothing is timed.
+    tracemalloc runs for the whole profiled run, so memory peaks are exact
+    but wall times include its overhead.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.origin = time.perf_counter_ns()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.phases = []
+        self.sections = {}  # extra report sections contributed by other collectors
+        self._stack = []
+        self._owns_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _record(self, record):
+        self.phases.append(record)
+
+    def close(self):
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def report(self, project_dir):
+        """The profile.json document: phases in start order plus any extra sections."""
+        phases = sorted(self.phases, key=lambda p: (p["startMs"], p["depth"]))
+        report = {
+            "format": "sdd-dashboard-profile",
+            "version": 1,
+            "generatedAt": self.started_at,
+            "project": project_dir,
+            "python": sys.version.split()[0],
+            "totalWallMs": round(sum(p["wallMs"] for p in phases if p["depth"] == 0), 3),
+            "phases": phases,
+        }
+        report.update(self.sections)
+        return report
+
+    def trace_events(self):
+        """Chrome trace-event document (chrome://tracing, Perfetto, speedscope)."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                   "args": {"name": "generate.py"}}]
+        for p in self.phases:
+            events.append({
+                "name": p["name"],
+                "cat": p["path"].split("/", 1)[0],
+                "ph": "X",
+                "ts": round(p["startMs"] * 1000, 1),
+                "dur": round(p["wallMs"] * 1000, 1),
+                "pid": pid,
+                "tid": 0,
+                "args": dict({key: p[key] for key in ("cpuMs", "childCpuMs", "files", "bytes", "peakBytes")},
+                             **p["counters"]),
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, profile_dir, project_dir):
+        """Write profile.json and profile-trace.json; return their paths."""
+        report_path = os.path.join(profile_dir, PROFILE_REPORT_FILE)
+        trace_path = os.path.join(profile_dir, PROFILE_TRACE_FILE)
+        _safe_write_json(report_path, self.report(project_dir))
+        _safe_write_json(trace_path, self.trace_events())
+        return report_path, trace_path
+
+
+_PROFILER = None
+
+
+def enable_profiling(trace_memory=True):
+    """Install a Profiler for this process and return it."""
+    global _PROFILER
+    _PROFILER = Profiler(trace_memory)
+    return _PROFILER
+
+
+def disable_profiling():
+    """Stop collecting; the Profiler keeps what it recorded."""
+    global _PROFILER
+    if _PROFILER is not None:
+        _PROFILER.close()
+    _PROFILER = None
+
+
+def profile_phase(name):
+    """Context manager timing one phase under --profile (a shared no-op otherwise)."""
+    if _PROFILER is None:
+        return _NULL_PHASE
+    return _PROFILER.phase(name)
+
+
+def current_phase():
+    """The innermost open phase, so scanners can report files and counters to it."""
+    if _PROFILER is None or not _PROFILER._stack:
+        return _NULL_PHASE
+    return _PROFILER._stack[-1]
+
+
+def print_profile(report):
+    """Print the per-phase table for a profile report."""
+    log(f"\nProfile ({report['totalWallMs']:.0f} ms total):")
+    log(f"  {'phase':<36} {'wall ms':>9} {'cpu ms':>9} {'files':>7} {'MB read':>8} {'peak MB':>8}")
+    for p in report["phases"]:
+        label = ("  " * p["depth"] + p["name"])[:36]
+        files = str(p["files"]) if p["files"] else ""
+        read = f"{p['bytes'] / 1e6:.1f}" if p["bytes"] else ""
+        log(f"  {label:<36} {p['wallMs']:>9.1f} {p['cpuMs'] + p['childCpuMs']:>9.1f} "
+            f"{files:>7} {read:>8} {p['peakBytes'] / 1e6:>8.1f}")
+    regex = report.get("regex")
+    if regex:
+        log(f"\nRegex telemetry ({regex['totalTimeMs']:.0f} ms in {regex['totalAttempts']} calls):")
+        log(f"  {'pattern':<44} {'calls':>9} {'matches':>9} {'ms':>9} {'us/call':>8}")
+        for p in regex["patterns"][:REGEX_REPORT_TOP]:
+            log(f"  {p['name'][:44]:<44} {p['attempts']:>9} {p['matches']:>9} "
+                f"{p['timeMs']:>9.1f} {p['avgUs']:>8.2f}")
+        if regex["neverMatched"]:
+            log(f"  Never matched: {', '.join(regex['neverMatched'])}")
+        for s in regex["slowestLines"][:5]:
+            where = f"{s['file']}:{s['line']}" if s.get("line") else s["file"]
+            log(f"  Slow: {s['ms']:.2f} ms {s['pattern']} on {where} ({s['length']} chars)")
+
+
+# ──────────────────────────────────────────────────────────
+# Regex telemetry (--profile-regex)
+# ──────────────────────────────────────────────────────────
+
+REGEX_SLOWEST_LINES = 20
+REGEX_REPORT_TOP = 15
+_REGEX_SAMPLE_CHARS = 160
+
+
+class _TimedPattern:
+    """Stand-in for a compiled pattern that counts and times every call.
+
+    Exposes the re.Pattern methods the scanners use and forwards everything
+    else (pattern, flags, groupindex) to the wrapped pattern. finditer() is
+    timed per step, so only the regex engine's work is counted, not the
+    caller's loop body.
+    """
+
+    __slots__ = ("name", "_pattern", "_telemetry")
+
+    def __init__(self, telemetry, name, pattern):
+        self.name = name
+        self._pattern = pattern
+        self._telemetry = telemetry
+
+    def __getattr__(self, attr):
+        return getattr(self._pattern, attr)
+
+    def _timed(self, method, string, args):
+        start = time.perf_counter_ns()
+        result = method(string, *args)
+        self._telemetry.record(self.name, time.perf_counter_ns() - start, result is not None, string)
+        return result
+
+    def search(self, string, *args):
+        return self._timed(self._pattern.search, string, args)
+
+    def match(self, string, *args):
+        return self._timed(self._pattern.match, string, args)
+
+    def fullmatch(self, string, *args):
+        return self._timed(self._pattern.fullmatch, string, args)
+
+    def findall(self, string, *args):
+        start = time.perf_counter_ns()
+        result = self._pattern.findall(string, *args)
+        self._telemetry.record(self.name, time.perf_counter_ns() - start, len(result), string)
+        return result
+
+    def finditer(self, string, *args):
+        it = self._pattern.finditer(string, *args)
+        total = slowest = matches = 0
+        slowest_pos = 0
+        try:
+            while True:
+                start = time.perf_counter_ns()
+                m = next(it, None)
+                step = time.perf_counter_ns() - start
+                total += step
+                if step > slowest:
+                    slowest = step
+                    slowest_pos = m.start() if m is not None else len(string)
+                if m is None:
+                    return
+                matches += 1
+                yield m
+        finally:
+            self._telemetry.record(self.name, total, matches, string, slowest, slowest_pos)
+
+    def subn(self, repl, string, count=0):
+        start = time.perf_counter_ns()
+        result = self._pattern.subn(repl, string, count)
+        self._telemetry.record(self.name, time.perf_counter_ns() - start, result[1], string)
+        return result
+
+    def sub(self, repl, string, count=0):
+        return self.subn(repl, string, count)[0]
+
+    def split(self, string, maxsplit=0):
+        start = time.perf_counter_ns()
+        result = self._pattern.split(string, maxsplit)
+        self._telemetry.record(self.name, time.perf_counter_ns() - start, len(result) - 1, string)
+        return result
+
+
+class RegexTelemetry:
+    """Per-pattern attempts, matches and time, split by the type of the file being scanned.
+
+    install() swaps every compiled pattern reachable from the module
+    namespace (globals, the pattern tables, extractors and test frameworks)
+    for a _TimedPattern; matchers compiled at run time opt in through
+    track_regex(). Scanners name the file they are reading with
+    regex_scope(), which keys the per-file-type split and the slowest-line
+    list. uninstall() puts the original patterns back.
+    """
+
+    def __init__(self):
+        self.stats = {}        # name -> [attempts, matches, ns, {file type: [attempts, matches, ns]}]
+        self.sources = {}      # name -> pattern source
+        self.slowest = []      # min-heap of (ns, seq, name, file, line, length, text)
+        self.file = None
+        self.file_type = "-"
+        self._seq = 0
+        self._undo = []
+        self._seen = set()
+
+    def track(self, name, pattern):
+        source = pattern.pattern
+        self.sources[name] = source.decode("utf-8", "replace") if isinstance(source, bytes) else source
+        self.stats.setdefault(name, [0, 0, 0, {}])
+        return _TimedPattern(self, name, pattern)
+
+    def install(self, namespace):
+        for name, value in list(namespace.items()):
+            if name.startswith("__") or value is self:
+                continue
+            new = self._wrap(name, value)
+            if new is not value:
+                self._undo.append((namespace.__setitem__, name, value))
+                namespace[name] = new
+
+    def _wrap(self, name, value):
+        """Wrapped value for value; lists, dicts and module objects are patched in place."""
+        if isinstance(value, re.Pattern):
+            return self.track(name, value)
+        if isinstance(value, tuple):
+            head = f"{value[0]}" if value and isinstance(value[0], str) else ""
+            new = tuple(self._wrap(f"{name}:{head}" if head and i else f"{name}[{i}]", item)
+                        for i, item in enumerate(value))
+            return new if any(a is not b for a, b in zip(new, value)) else value
+        if id(value) in self._seen:
+            return value
+        if isinstance(value, list):
+            self._seen.add(id(value))
+            for i, item in enumerate(value):
+                new = self._wrap(f"{name}[{i}]", item)
+                if new is not item:
+                    self._undo.append((value.__setitem__, i, item))
+                    value[i] = new
+        elif isinstance(value, dict):
+            self._seen.add(id(value))
+            for key, item in list(value.items()):
+                new = self._wrap(f"{name}[{key}]", item)
+                if new is not item:
+                    self._undo.append((value.__setitem__, key, item))
+                    value[key] = new
+        elif type(value).__module__ == __name__ and hasattr(value, "__dict__"):
+            self._seen.add(id(value))
+            label = getattr(value, "name", None)
+            prefix = f"{type(value).__name__}({label})" if isinstance(label, str) else name
+            for attr, item in list(vars(value).items()):
+                new = self._wrap(f"{prefix}.{attr}", item)
+                if new is not item:
+                    self._undo.append((value.__setattr__, attr, item))
+                    setattr(value, attr, new)
+        return value
+
+    def uninstall(self):
+        for setter, key, original in reversed(self._undo):
+            setter(key, original)
+        self._undo = []
+        self._seen = set()
+
+    def scope(self, path):
+        self.file = path
+        self.file_type = (os.path.splitext(path)[1].lower() or "(none)") if path else "-"
+
+    def record(self, name, ns, matches, string, step_ns=None, pos=0):
+        stats = self.stats[name]
+        stats[0] += 1
+        stats[1] += matches
+        stats[2] += ns
+        by_type = stats[3].get(self.file_type)
+        if by_type is None:
+            by_type = stats[3][self.file_type] = [0, 0, 0]
+        by_type[0] += 1
+        by_type[1] += matches
+        by_type[2] += ns
+        step_ns = ns if step_ns is None else step_ns
+        if len(self.slowest) < REGEX_SLOWEST_LINES or step_ns > self.slowest[0][0]:
+            # Cut the line out now: the scanned buffer may be an mmap closed later
+            nl = "\n" if isinstance(string, str) else b"\n"
+            start = string.rfind(nl, 0, pos) + 1
+            end = string.find(nl, pos)
+            line = string[start:end if end != -1 else len(string)]
+            line_no = string[:start].count(nl) + 1 if string.find(nl) != -1 else None
+            if not isinstance(line, str):
+                line = bytes(line).decode("utf-8", "replace")
+            self._seq += 1
+            entry = (step_ns, self._seq, name, self.file, line_no, len(line), line[:_REGEX_SAMPLE_CHARS])
+            if len(self.slowest) < REGEX_SLOWEST_LINES:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heapreplace(self.slowest, entry)
+
+    def report(self, project_dir):
+        """The "regex" section of profile.json."""
+        patterns = []
+        for name, (attempts, matches, ns, by_type) in self.stats.items():
+            patterns.append({
+                "name": name,
+                "pattern": self.sources[name][:200],
+                "attempts": attempts,
+                "matches": matches,
+                "timeMs": round(ns / 1e6, 3),
+                "avgUs": round(ns / attempts / 1e3, 3) if attempts else 0,
+                "byFileType": {ftype: {"attempts": a, "matches": m, "timeMs": round(t / 1e6, 3)}
+                               for ftype, (a, m, t) in sorted(by_type.items())},
+            })
+        patterns.sort(key=lambda p: (-p["timeMs"], p["name"]))
+        slowest = []
+        for ns, _, name, path, line_no, length, text in sorted(self.slowest, reverse=True):
+            slowest.append({
+                "pattern": name,
+                "file": _rel_path(path, project_dir) if path and os.path.isabs(path) else path or "-",
+                "line": line_no,
+                "ms": round(ns / 1e6, 3),
+                "length": length,
+                "text": text,
+            })
+        return {
+            "totalAttempts": sum(p["attempts"] for p in patterns),
+            "totalTimeMs": round(sum(p["timeMs"] for p in patterns), 3),
+            "patterns": patterns,
+            "neverMatched": sorted(p["name"] for p in patterns if p["attempts"] and not p["matches"]),
+            "neverRun": sorted(p["name"] for p in patterns if not p["attempts"]),
+            "slowestLines": slowest,
+        }
+
+
+_REGEX_TELEMETRY = None
+
+
+def enable_regex_telemetry():
+    """Wrap every module-level compiled pattern with counters; return the RegexTelemetry."""
+    global _REGEX_TELEMETRY
+    _REGEX_TELEMETRY = RegexTelemetry()
+    _REGEX_TELEMETRY.install(globals())
+    return _REGEX_TELEMETRY
+
+
+def disable_regex_telemetry():
+    """Restore the original patterns; the RegexTelemetry keeps what it counted."""
+    global _REGEX_TELEMETRY
+    if _REGEX_TELEMETRY is not None:
+        _REGEX_TELEMETRY.uninstall()
+    _REGEX_TELEMETRY = None
+
+
+def track_regex(name, pattern):
+    """Telemetry wrapper for a pattern compiled at run time (the pattern itself when off)."""
+    if _REGEX_TELEMETRY is None:
+        return pattern
+    return _REGEX_TELEMETRY.track(name, pattern)
+
+
+def regex_scope(path):
+    """Name the file the following regex calls scan (None once a scanner is done)."""
+    if _REGEX_TELEMETRY is not None:
+        _REGEX_TELEMETRY.scope(path)
+
+
+# ──────────────────────────────────────────────────────────
+# Scan scopes (.sdd/dashboard.json "scan")
+# ──────────────────────────────────────────────────────────
+
+SOURCE_DIRS = ("src", "lib", "app", "tests", "test", "pkg", "cmd", "internal")
+SCAN_SCOPE_DEFAULTS = {
+    "markdown": {"roots": SCAN_DIRS},
+    "code": {"roots": ["src"]},
+    "tests": {"roots": ["tests", "test", "*/tests", "*/test"]},  # "colocated" defaults to the code roots
+    "sources": {"include": [f"**/{d}/**" for d in SOURCE_DIRS]},
+}
+_SCAN_SCOPE_CACHE = {}  # (project dir, scan config JSON) -> {scope name: ScanScope}
+
+
+def _scope_glob_regex(patterns):
+    """Join project-relative globs into one alternation (a bare name matches at any depth)."""
+    parts = []
+    for pattern in patterns:
+        pattern = pattern.replace("\\", "/").strip("/")
+        if pattern:
+            parts.append(_glob_to_regex(pattern if "/" in pattern else "**/" + pattern))
+    return "|".join(parts)
+
+
+class ScanScope:
+    """Roots plus include/exclude globs for one scanner, compiled once per project config.
+
+    Roots are project-relative directories whose segments may use * and ?
+    ("packages/*/src"). Globs are matched against project-relative paths;
+    a bare name ("node_modules") matches at any depth, and an excluded
+    directory excludes everything below it. walk() prunes excluded subtrees
+    instead of filtering their files afterwards.
+    """
+
+    def __init__(self, name, project_dir, roots=(), include=None, exclude=(), colocated=()):
+        self.name = name
+        self.project_dir = project_dir
+        self.roots = list(roots)
+        self.colocated = list(colocated)
+        self._prefix_len = len(os.path.join(project_dir, ""))
+        include_re = _scope_glob_regex(include or ())
+        exclude_re = _scope_glob_regex(exclude)
+        self._include = track_regex(f"ScanScope({name}).include", re.compile(include_re)) if include_re else None
+        self._exclude = (track_regex(f"ScanScope({name}).exclude", re.compile(f"(?:{exclude_re})(?:/.*)?"))
+                         if exclude_re else None)
+
+    def _rel(self, path):
+        return path[self._prefix_len:].replace(os.sep, "/")
+
+    def prunes(self, dir_path):
+        """True if an absolute directory path is excluded (its whole subtree is skipped)."""
+        return self._exclude is not None and self._exclude.fullmatch(self._rel(dir_path) + "/") is not None
+
+    def accepts(self, path):
+        """True if an absolute file path passes the include and exclude globs."""
+        rel = self._rel(path)
+        if self._exclude is not None and self._exclude.fullmatch(rel):
+            return False
+        return self._include is None or self._include.fullmatch(rel) is not None
+
+    def root_dirs(self, roots=None):
+        """Existing, non-excluded directories the roots (default: self.roots) expand to."""
+        found = []
+        for pattern in self.roots if roots is None else roots:
+            dirs = [self.project_dir]
+            for part in pattern.replace("\\", "/").strip("/").split("/"):
+                if not part or part == ".":
+                    continue
+                if "*" in part or "?" in part:
+                    part_re = re.compile(_glob_to_regex(part))
+                    candidates = []
+                    for d in dirs:
+                        try:
+                            names = sorted(os.listdir(d))
+                        except OSError:
+                            continue
+                        candidates.extend(os.path.join(d, n) for n in names
+                                          if not n.startswith(".") and part_re.fullmatch(n))
+                else:
+                    candidates = [os.path.join(d, part) for d in dirs]
+                dirs = [d for d in candidates if os.path.isdir(d) and not self.prunes(d)]
+            found.extend(d for d in dirs if d not in found)
+        return found
+
+    def covers(self, rel_path, roots=None):
+        """True if walk(roots) would yield a project-relative file, judged from its path alone.
+
+        Nothing is read from disk, so this works for paths listed from a git
+        tree (a directory that exists only at some revision).
+        """
+        parts = rel_path.split("/")
+        for pattern in self.roots if roots is None else roots:
+            segments = [p for p in pattern.replace("\\", "/").strip("/").split("/") if p and p != "."]
+            if len(parts) <= len(segments):
+                continue
+            for segment, part in zip(segments, parts):
+                if "*" in segment or "?" in segment:
+                    if part.startswith(".") or not re.fullmatch(_glob_to_regex(segment), part):
+                        break
+                elif segment != part:
+                    break
+            else:
+                return self.accepts(os.path.join(self.project_dir, rel_path))
+        return False
+
+    def walk(self, roots=None):
+        """Yield (absolute path, file name) for accepted files under the roots, pruning excluded dirs."""
+        seen = set()
+        for top in self.root_dirs(roots):
+            for root, dirs, filenames in os.walk(top):
+                dirs[:] = [d for d in dirs if not self.prunes(os.path.join(root, d))]
+                for fname in filenames:
+                    fpath = os.path.join(root, fname)
+                    if fpath not in seen and self.accepts(fpath):
+                        seen.add(fpath)
+                        yield fpath, fname
+
+
+def scan_scopes(project_dir):
+    """The project's ScanScopes: markdown, code, tests and sources (commit-inferred refs), plus "project".
+
+    .sdd/dashboard.json "scan" may set "exclude" (added to SKIP_DIRS for
+    every scanner) and, per scanner, "roots", "include" and "exclude";
+    "tests" also takes "colocated" roots (default: the code roots) searched
+    for *.test.* / *.spec.* files. Unset keys keep the built-in layout.
+    "project" carries only the shared excludes (used by the watchers).
+    """
+    cfg = load_dashboard_config(project_dir).get("scan") or {}
+    cache_key = (project_dir, json.dumps(cfg, sort_keys=True))
+    if cache_key not in _SCAN_SCOPE_CACHE:
+        shared = sorted(SKIP_DIRS) + list(cfg.get("exclude") or [])
+        scopes = {"project": ScanScope("project", project_dir, exclude=shared)}
+        for name, defaults in SCAN_SCOPE_DEFAULTS.items():
+            opts = dict(defaults)
+            opts.update(cfg.get(name) or {})
+            colocated = opts.get("colocated")
+            if name == "tests" and colocated is None:
+                colocated = scopes["code"].roots
+            scopes[name] = ScanScope(name, project_dir, opts.get("roots") or (), opts.get("include"),
+                                     shared + list(opts.get("exclude") or []), colocated or ())
+        _SCAN_SCOPE_CACHE[cache_key] = scopes
+    return _SCAN_SCOPE_CACHE[cache_key]
+
+
 # ──────────────────────────────────────────────────────────
 # Main extraction
 # ──────────────────────────────────────────────────────────
 
 def collect_md_files(project_dir):
-    """Walk scan directories and collect all .md files."""
-    files = []
-    for dirname in SCAN_DIRS:
-        dirpath = os.path.join(project_dir, dirname)
-        if not os.path.isdir(dirpath):
-            continue
-        for root, dirs, filenames in os.walk(dirpath):
-            # Skip unwanted directories
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-            for fname in filenames:
-                if fname.lower().endswith(".md"):
-                    files.append(os.path.join(root, fname))
-    return files
+    """Walk the markdown scope's roots and collect all .md files."""
+    return [fpath for fpath, fname in scan_scopes(project_dir)["markdown"].walk()
+            if fname.lower().endswith(".md")]
 
 
 def extract_priority_from_context(lines, line_idx):
@@ -339,146 +1055,245 @@ def extract_priority_from_context(lines, line_idx):
     return None
 
 
-def scan_files(project_dir):
-    """Scan all markdown files, extract definitions and references."""
-    artifacts = OrderedDict()  # id -> artifact dict (first definition wins)
-    references = []  # list of (source_id, target_id, file, line)
-    all_ref_ids = set()  # all IDs found as references anywhere
-
-    md_files = collect_md_files(project_dir)
-    print(f"Scanning {len(md_files)} .md files across {SCAN_DIRS}...")
+def _scan_md_file(fpath, project_dir, text=None):
+    """Scan one markdown file for definitions and references.
 
-    for fpath in md_files:
+    Returns (definitions, references, ref_ids) where definitions is the list of
+    artifact dicts in encounter order (first definition per ID within the file),
+    references is a list of (source_id, target_id, file, line) and ref_ids is the
+    set of all IDs mentioned in the file. Returns None if the file cannot be read.
+    text is parsed instead of reading fpath when given.
+    """
+    regex_scope(fpath)
+    if text is not None:
+        lines = _text_lines(text)
+    else:
         try:
             with open(fpath, "r", encoding="utf-8", errors="replace") as f:
                 lines = f.readlines()
         except Exception as e:
-            print(f"  Warning: cannot read {fpath}: {e}")
-            continue
+            log(f"  Warning: cannot read {fpath}: {e}")
+            return None
 
-        frel = _rel_path(fpath, project_dir)
-        fname = os.path.basename(fpath)
+    definitions = OrderedDict()  # id -> artifact dict (first definition in file wins)
+    references = []
+    all_ref_ids = set()
 
-        # Check filename for artifact definition
-        for ftype, fpat in FILENAME_PATTERNS:
-            m = fpat.match(fname)
+    frel = _rel_path(fpath, project_dir)
+    fname = os.path.basename(fpath)
+
+    # Check filename for artifact definition
+    for ftype, fpat in FILENAME_PATTERNS:
+        m = fpat.match(fname)
+        if m:
+            fid = normalize_id(m.group(1))
+            if fid not in definitions:
+                # Read first heading for title
+                title = ""
+                for ln in lines[:10]:
+                    hm = re.match(r'^#{1,6}\s+(.*)', ln)
+                    if hm:
+                        title = hm.group(1).strip()
+                        # Remove the ID itself from the title
+                        title = re.sub(r'^' + re.escape(fid) + r'\s*[:\—\u2013\u2014–-]?\s*', '', title).strip()
+                        break
+                definitions[fid] = {
+                    "id": fid,
+                    "type": ftype,
+                    "category": extract_category(fid, ftype),
+                    "title": title,
+                    "file": frel,
+                    "line": 1,
+                    "priority": None,
+                    "stage": TYPE_TO_STAGE.get(ftype, "unknown"),
+                }
+
+    # Scan line by line
+    # Track which IDs are defined in this file (for reference context)
+    file_context_ids = []
+
+    for line_idx, line in enumerate(lines):
+        line_num = line_idx + 1
+        line_stripped = line.rstrip()
+
+        # 1. Check heading-based definitions
+        for dtype, dpat in DEF_PATTERNS:
+            m = dpat.match(line_stripped)
             if m:
-                fid = normalize_id(m.group(1))
-                if fid not in artifacts:
-                    # Read first heading for title
+                did = normalize_id(m.group(2))
+                title = m.group(3).strip() if m.group(3) else ""
+                # Clean common suffixes from title
+                title = re.sub(r'\s*\[.*?\]\s*$', '', title).strip()
+                title = title.rstrip(":").strip()
+
+                if did not in definitions:
+                    priority = extract_priority_from_context(lines, line_idx)
+                    definitions[did] = {
+                        "id": did,
+                        "type": dtype,
+                        "category": extract_category(did, dtype),
+                        "title": title,
+                        "file": frel,
+                        "line": line_num,
+                        "priority": priority,
+                        "stage": TYPE_TO_STAGE.get(dtype, "unknown"),
+                    }
+                file_context_ids.append(did)
+                break  # only match first pattern per line
+
+        # 2. Check table-based definitions
+        for ttype, tpat in TABLE_DEF_PATTERNS:
+            for tm in tpat.finditer(line_stripped):
+                tid = normalize_id(tm.group(1))
+                if tid not in definitions:
+                    # Try to get title from the same table row
+                    cells = [c.strip() for c in line_stripped.split("|") if c.strip()]
                     title = ""
-                    for ln in lines[:10]:
-                        hm = re.match(r'^#{1,6}\s+(.*)', ln)
-                        if hm:
-                            title = hm.group(1).strip()
-                            # Remove the ID itself from the title
-                            title = re.sub(r'^' + re.escape(fid) + r'\s*[:\—\u2013\u2014–-]?\s*', '', title).strip()
+                    for i, cell in enumerate(cells):
+                        if tid in cell and i + 1 < len(cells):
+                            title = cells[i + 1]
                             break
-                    artifacts[fid] = {
-                        "id": fid,
-                        "type": ftype,
-                        "category": extract_category(fid, ftype),
+                    definitions[tid] = {
+                        "id": tid,
+                        "type": ttype,
+                        "category": extract_category(tid, ttype),
                         "title": title,
                         "file": frel,
-                        "line": 1,
+                        "line": line_num,
                         "priority": None,
-                        "stage": TYPE_TO_STAGE.get(ftype, "unknown"),
+                        "stage": TYPE_TO_STAGE.get(ttype, "unknown"),
                     }
 
-        # Scan line by line
-        # Track which IDs are defined in this file (for reference context)
-        file_context_ids = []
-
-        for line_idx, line in enumerate(lines):
-            line_num = line_idx + 1
-            line_stripped = line.rstrip()
-
-            # 1. Check heading-based definitions
-            for dtype, dpat in DEF_PATTERNS:
-                m = dpat.match(line_stripped)
-                if m:
-                    did = normalize_id(m.group(2))
-                    title = m.group(3).strip() if m.group(3) else ""
-                    # Clean common suffixes from title
-                    title = re.sub(r'\s*\[.*?\]\s*$', '', title).strip()
-                    title = title.rstrip(":").strip()
-
-                    if did not in artifacts:
-                        priority = extract_priority_from_context(lines, line_idx)
-                        artifacts[did] = {
-                            "id": did,
-                            "type": dtype,
-                            "category": extract_category(did, dtype),
-                            "title": title,
-                            "file": frel,
-                            "line": line_num,
-                            "priority": priority,
-                            "stage": TYPE_TO_STAGE.get(dtype, "unknown"),
-                        }
-                    file_context_ids.append(did)
-                    break  # only match first pattern per line
-
-            # 2. Check table-based definitions
-            for ttype, tpat in TABLE_DEF_PATTERNS:
-                for tm in tpat.finditer(line_stripped):
-                    tid = normalize_id(tm.group(1))
-                    if tid not in artifacts:
-                        # Try to get title from the same table row
-                        cells = [c.strip() for c in line_stripped.split("|") if c.strip()]
-                        title = ""
-                        for i, cell in enumerate(cells):
-                            if tid in cell and i + 1 < len(cells):
-                                title = cells[i + 1]
-                                break
-                        artifacts[tid] = {
-                            "id": tid,
-                            "type": ttype,
-                            "category": extract_category(tid, ttype),
-                            "title": title,
-                            "file": frel,
-                            "line": line_num,
-                            "priority": None,
-                            "stage": TYPE_TO_STAGE.get(ttype, "unknown"),
-                        }
-
-            # 3. Extract all references on this line (expand ranges first)
-            ref_ids = set()
-            expanded_line = expand_ranges(line_stripped)
-            for rm in REF_PATTERN.finditer(expanded_line):
-                rid = normalize_id(rm.group(1))
-                # Skip noise IDs
-                if any(rid.startswith(p) for p in NOISE_PREFIXES):
-                    continue
-                # Skip very short API matches that look like noise (API-v1, API-v2)
-                if rid.startswith("API-v"):
-                    continue
-                ref_ids.add(rid)
-                all_ref_ids.add(rid)
-
-            # Build references: if this line has an ID definition, all other IDs on same line are references from that definition
-            # Otherwise, use file context (the most recent heading-defined ID)
-            if len(ref_ids) > 1:
-                ref_list = sorted(ref_ids)
-                for i, src in enumerate(ref_list):
-                    for j, tgt in enumerate(ref_list):
-                        if i != j:
-                            references.append((src, tgt, frel, line_num))
-                # Also connect the file context ID (e.g., API heading) to each ref ID on this line
-                # This fixes orphaned APIs when a Refs: line under an API heading has 2+ IDs
-                if file_context_ids:
-                    ctx_id = file_context_ids[-1]
-                    for rid in ref_list:
-                        if rid != ctx_id:
-                            references.append((ctx_id, rid, frel, line_num))
-            elif len(ref_ids) == 1 and file_context_ids:
-                rid = list(ref_ids)[0]
+        # 3. Extract all references on this line (expand ranges first)
+        ref_ids = set()
+        expanded_line = expand_ranges(line_stripped)
+        for rm in REF_PATTERN.finditer(expanded_line):
+            rid = normalize_id(rm.group(1))
+            # Skip noise IDs
+            if any(rid.startswith(p) for p in NOISE_PREFIXES):
+                continue
+            # Skip very short API matches that look like noise (API-v1, API-v2)
+            if rid.startswith("API-v"):
+                continue
+            ref_ids.add(rid)
+            all_ref_ids.add(rid)
+
+        # Build references: if this line has an ID definition, all other IDs on same line are references from that definition
+        # Otherwise, use file context (the most recent heading-defined ID)
+        if len(ref_ids) > 1:
+            ref_list = sorted(ref_ids)
+            for i, src in enumerate(ref_list):
+                for j, tgt in enumerate(ref_list):
+                    if i != j:
+                        references.append((src, tgt, frel, line_num))
+            # Also connect the file context ID (e.g., API heading) to each ref ID on this line
+            # This fixes orphaned APIs when a Refs: line under an API heading has 2+ IDs
+            if file_context_ids:
                 ctx_id = file_context_ids[-1]
-                if rid != ctx_id:
-                    references.append((ctx_id, rid, frel, line_num))
+                for rid in ref_list:
+                    if rid != ctx_id:
+                        references.append((ctx_id, rid, frel, line_num))
+        elif len(ref_ids) == 1 and file_context_ids:
+            rid = list(ref_ids)[0]
+            ctx_id = file_context_ids[-1]
+            if rid != ctx_id:
+                references.append((ctx_id, rid, frel, line_num))
+
+    return list(definitions.values()), references, all_ref_ids
+
+
+RELATIONSHIP_LOCATION_CAP = 10  # locations kept per relationship; occurrences counts all of them
+
+
+class ReferenceAggregator:
+    """Collapse (source, target, file, line) references into weighted edges as they arrive.
+
+    The raw reference list is never kept: each (source, target) pair holds
+    its occurrence count, the number of files stating it and the first
+    RELATIONSHIP_LOCATION_CAP locations. References are expected grouped by
+    file (as the per-file scanners produce them), which lets the file count
+    be kept without a set per edge. first_by_target records where every
+    target ID was first referenced, for broken-reference reporting.
+    """
+
+    def __init__(self, location_cap=RELATIONSHIP_LOCATION_CAP):
+        self.location_cap = location_cap
+        self.raw_count = 0
+        self._edges = {}  # (source, target) -> [occurrences, file count, last file, locations]
+        self.first_by_target = {}
+
+    def __len__(self):
+        return self.raw_count
+
+    def add(self, src, tgt, sfile, line):
+        self.raw_count += 1
+        edge = self._edges.get((src, tgt))
+        if edge is None:
+            self._edges[(src, tgt)] = [1, 1, sfile, [[sfile, line]]]
+        else:
+            edge[0] += 1
+            if edge[2] != sfile:
+                edge[1] += 1
+                edge[2] = sfile
+            if len(edge[3]) < self.location_cap:
+                edge[3].append([sfile, line])
+        if tgt not in self.first_by_target:
+            self.first_by_target[tgt] = (sfile, line)
+
+    def extend(self, references):
+        for src, tgt, sfile, line in references:
+            self.add(src, tgt, sfile, line)
+
+    def edges(self):
+        """Yield (source, target, occurrences, file count, locations) in first-seen order."""
+        for (src, tgt), (count, files, _, locations) in self._edges.items():
+            yield src, tgt, count, files, locations
+
+    def to_json(self):
+        return {
+            "locationCap": self.location_cap,
+            "rawCount": self.raw_count,
+            "edges": [[src, tgt] + edge for (src, tgt), edge in self._edges.items()],
+            "firstByTarget": self.first_by_target,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        agg = cls(data["locationCap"])
+        agg.raw_count = data["rawCount"]
+        agg._edges = {(e[0], e[1]): e[2:] for e in data["edges"]}
+        agg.first_by_target = {tgt: tuple(loc) for tgt, loc in data["firstByTarget"].items()}
+        return agg
+
 
+def _merge_md_results(results):
+    """Merge per-file markdown scan results in file order (first definition wins)."""
+    artifacts = OrderedDict()  # id -> artifact dict (first definition wins)
+    references = ReferenceAggregator()  # weighted (source, target) edges
+    all_ref_ids = set()  # all IDs found as references anywhere
+    for result in results:
+        if result is None:
+            continue
+        definitions, file_refs, file_ref_ids = result
+        for art in definitions:
+            if art["id"] not in artifacts:
+                artifacts[art["id"]] = dict(art)
+        references.extend(file_refs)
+        all_ref_ids.update(file_ref_ids)
     return artifacts, references, all_ref_ids
 
 
+def scan_files(project_dir, md_files=None):
+    """Scan all markdown files (collect_md_files() unless given), extract definitions and references."""
+    if md_files is None:
+        md_files = collect_md_files(project_dir)
+    current_phase().add_files(md_files)
+    log(f"Scanning {len(md_files)} .md files across {scan_scopes(project_dir)['markdown'].roots}...")
+    result = _merge_md_results(_scan_md_file(fpath, project_dir) for fpath in md_files)
+    regex_scope(None)
+    return result
+
+
 # Valid SDD artifact ID pattern for ref validation (Step 0.3)
 ARTIFACT_ID_RE = re.compile(r'^(REQ|UC|WF|API|BDD|INV|ADR|RN|NFR|FASE|TASK)-[\w.-]+$')
 
@@ -498,14 +1313,16 @@ SKIP_FILE_PATTERNS = [
 ]
 
 
-def _is_source_file(filepath):
-    """Return True if file is likely a source/test file (not config/utility)."""
+def _is_source_file(filepath, sources):
+    """Return True if file is likely a source/test file (not config/utility).
+
+    sources is the "sources" ScanScope; filepath is project-relative.
+    """
     for pat in SKIP_FILE_PATTERNS:
         if pat.search(filepath):
             return False
     # Must be under a source-like directory
-    src_prefixes = ("src/", "lib/", "app/", "tests/", "test/", "pkg/", "cmd/", "internal/")
-    return any(filepath.startswith(p) or ("/" + p) in filepath for p in src_prefixes)
+    return sources.accepts(os.path.join(sources.project_dir, filepath))
 
 
 def _parse_validated_refs(raw_refs_str):
@@ -516,11 +1333,12 @@ def _parse_validated_refs(raw_refs_str):
     return [r for r in raw if ARTIFACT_ID_RE.match(r)]
 
 
-def scan_commits(project_dir):
+def scan_commits(project_dir, rev_range=None):
     """Scan git log for commits with Refs: and Task: trailers.
 
     Uses a single git log call with null-byte delimiters and --name-only
-    to get both metadata and changed files efficiently.
+    to get both metadata and changed files efficiently. rev_range
+    ("base..head") limits the scan to those commits instead of --all.
     Returns list of commit dicts.
     """
     # Check git availability
@@ -530,10 +1348,10 @@ def scan_commits(project_dir):
             capture_output=True, text=True, cwd=project_dir, timeout=5
         )
         if result.returncode != 0:
-            print("  Git not available — skipping commit scan.")
+            log("  Git not available — skipping commit scan.")
             return []
     except Exception:
-        print("  Git not available — skipping commit scan.")
+        log("  Git not available — skipping commit scan.")
         return []
 
     # Single git log call: null-byte delimiters (Step 0.1), trailer extraction (Step 0.2),
@@ -542,38 +1360,33 @@ def scan_commits(project_dir):
     try:
         result = subprocess.run(
             [
-                "git", "log", "--all", "--name-only",
-                f"--format=%H%x00%h%x00%s%x00%an%x00%aI%x00%(trailers:key=Refs,valueonly)%x00%(trailers:key=Task,valueonly){COMMIT_DELIM}"
+                "git", "log", rev_range or "--all", "--name-only",
+                f"--format={COMMIT_DELIM}%H%x00%h%x00%s%x00%an%x00%aI%x00%(trailers:key=Refs,valueonly)%x00%(trailers:key=Task,valueonly)%x00"
             ],
             capture_output=True, text=True, cwd=project_dir, timeout=60
         )
         if result.returncode != 0:
-            print(f"  Warning: git log failed (rc={result.returncode})")
+            log(f"  Warning: git log failed (rc={result.returncode})")
             return []
     except Exception as e:
-        print(f"  Warning: git log scan failed: {e}")
+        log(f"  Warning: git log scan failed: {e}")
         return []
 
+    # Each record starts with the delimiter; its --name-only file list follows the
+    # last NUL, and trailer values may span lines (one per Refs:/Task: trailer).
     commits = []
     for chunk in result.stdout.split(COMMIT_DELIM):
-        chunk = chunk.strip()
-        if not chunk:
-            continue
-        lines = chunk.split("\n")
-        if not lines or not lines[0]:
-            continue
-
-        header = lines[0].split("\x00", 6)
-        if len(header) < 5:
+        fields = chunk.split("\x00", 7)
+        if len(fields) < 8 or not fields[0]:
             continue
 
-        full_sha = header[0]
-        short_sha = header[1]
-        subject = header[2]
-        author = header[3]
-        date = header[4]
-        trailer_refs = header[5].strip() if len(header) > 5 else ""
-        trailer_task = header[6].strip() if len(header) > 6 else ""
+        full_sha = fields[0]
+        short_sha = fields[1]
+        subject = fields[2]
+        author = fields[3]
+        date = fields[4]
+        trailer_refs = fields[5].strip().replace("\n", ",")
+        trailer_task = fields[6].strip().split("\n")[0]
 
         # Parse and validate ref IDs (Step 0.3)
         ref_ids = _parse_validated_refs(trailer_refs)
@@ -590,7 +1403,7 @@ def scan_commits(project_dir):
             continue
 
         # Extract changed files from remaining lines
-        files = [f.strip() for f in lines[1:] if f.strip()]
+        files = [f.strip() for f in fields[7].split("\n") if f.strip()]
 
         commits.append({
             "sha": short_sha,
@@ -603,17 +1416,19 @@ def scan_commits(project_dir):
             "files": files,
         })
 
-    print(f"  Found {len(commits)} commits with Refs:/Task: trailers")
+    current_phase().count(gitLogBytes=len(result.stdout), commits=len(commits))
+    log(f"  Found {len(commits)} commits with Refs:/Task: trailers")
     return commits
 
 
-def infer_code_refs_from_commits(commits, artifacts, incoming, outgoing):
+def infer_code_refs_from_commits(commits, artifacts, incoming, outgoing, sources):
     """Infer code references from commits with Refs:/Task: trailers (Step 1.2).
 
     For each commit that has changed files AND trailer refs:
     - Files from Refs: trailer → origin "commit-inferred"
     - Files from Task: trailer (transitive via graph) → origin "task-inferred"
 
+    Only files the sources ScanScope accepts get a ref.
     Returns list of inferred codeRef dicts.
     """
     SIGNIFICANT_TYPES = {"UC", "INV", "API", "BDD", "REQ", "ADR", "WF"}
@@ -654,14 +1469,14 @@ def infer_code_refs_from_commits(commits, artifacts, incoming, outgoing):
             continue
 
         # Combine all ref IDs (direct trailers + task-inferred)
-        all_ref_ids = list(set(ref_ids + task_inferred_ids))
+        all_ref_ids = sorted(set(ref_ids + task_inferred_ids))
         if not all_ref_ids:
             continue
 
         # Create inferred code refs for source files in this commit
         for filepath in commit["files"]:
             fpath_fwd = filepath.replace("\\", "/")
-            if not _is_source_file(fpath_fwd):
+            if not _is_source_file(fpath_fwd, sources):
                 continue
 
             inferred_refs.append({
@@ -678,11 +1493,11 @@ def infer_code_refs_from_commits(commits, artifacts, incoming, outgoing):
                 },
             })
 
-    print(f"  Inferred {len(inferred_refs)} code refs from commits")
+    log(f"  Inferred {len(inferred_refs)} code refs from commits")
     return inferred_refs
 
 
-def propagate_refs_to_reqs(reqs, ref_map, incoming, outgoing, max_depth=3):
+def propagate_refs_to_reqs(reqs, ref_map, incoming, outgoing, max_depth=3, reach=None):
     """BFS N-hop propagation: find REQs reachable from artifacts with refs (Step 1.3).
 
     Args:
@@ -690,15 +1505,25 @@ def propagate_refs_to_reqs(reqs, ref_map, incoming, outgoing, max_depth=3):
         ref_map: dict {artifactId: [...refs]} — artifacts that have code/test/commit refs
         incoming/outgoing: adjacency dicts from the relationship graph
         max_depth: maximum BFS depth
+        reach: optional ReachabilityIndex.reach ({reqId: nodes within max_depth});
+            REQs found there are answered from it instead of walking again
     Returns:
         set of REQ IDs that have refs reachable within max_depth hops
     """
     result = set()
+    ref_ids = ref_map.keys()
     for req_id in reqs:
         # Quick check: direct ref on the REQ itself
         if ref_map.get(req_id):
             result.add(req_id)
             continue
+        if reach is not None and req_id in reach:
+            if req_id in ref_map:  # listed with no refs: must not count itself
+                if any(node in ref_map for node in reach[req_id] if node != req_id):
+                    result.add(req_id)
+            elif not ref_ids.isdisjoint(reach[req_id]):
+                result.add(req_id)
+            continue
         # BFS from REQ through non-REQ neighbors
         visited = {req_id}
         queue = [(req_id, 0)]
@@ -719,1199 +1544,4945 @@ def propagate_refs_to_reqs(reqs, ref_map, incoming, outgoing, max_depth=3):
     return result
 
 
-def apply_overrides(code_refs, overrides_path):
-    """Apply manual overrides from .sdd/overrides.json (Step 1.5).
+# ──────────────────────────────────────────────────────────
+# Reachability index (reachability.json)
+# ──────────────────────────────────────────────────────────
 
-    Supports:
-    - "pin": force-add refs for specific files
-    - "suppress": remove inferred refs for specific files
-    """
-    if not os.path.exists(overrides_path):
-        return code_refs, 0
+REACHABILITY_FILE = "reachability.json"
+REACHABILITY_FORMAT = "sdd-reachability"
+REACHABILITY_VERSION = 1
+REACHABILITY_KINDS = ("files", "symbols", "tests", "commits")
+REACHABILITY_REBUILD_RATIO = 0.25  # rebuild from scratch once this share of REQs is dirty
 
-    try:
-        with open(overrides_path, "r", encoding="utf-8") as f:
-            overrides = json.load(f)
-    except Exception as e:
-        print(f"  Warning: could not read overrides file: {e}")
-        return code_refs, 0
 
-    count = 0
+def reachable_nodes(req_id, incoming, outgoing, max_depth=3, adjacency=None):
+    """Every node propagate_refs_to_reqs() would visit from req_id: the REQ itself
+    plus the non-REQ nodes within max_depth hops through non-REQ nodes.
 
-    # Apply pins (add/force refs)
-    for pin in overrides.get("pin", []):
-        pin_file = pin.get("file", "").replace("\\", "/")
-        pin_refs = pin.get("refs", [])
-        if pin_file and pin_refs:
-            code_refs.append({
-                "file": pin_file,
-                "line": 0,
-                "symbol": os.path.basename(pin_file),
-                "symbolType": "file",
-                "refIds": pin_refs,
-                "origin": "manual-override",
-                "inferredFrom": None,
-            })
-            count += 1
-
-    # Apply suppressions (remove inferred refs for specific files)
-    for sup in overrides.get("suppress", []):
-        sup_file = sup.get("file", "").replace("\\", "/")
-        sup_refs = sup.get("refs", ["*"])
-        if sup_file:
-            if "*" in sup_refs:
-                # Suppress all inferred refs for this file
-                code_refs = [r for r in code_refs
-                             if not (r["file"] == sup_file and r.get("origin", "direct") != "direct")]
-            else:
-                # Suppress specific ref IDs
-                for cr in code_refs:
-                    if cr["file"] == sup_file and cr.get("origin", "direct") != "direct":
-                        cr["refIds"] = [rid for rid in cr["refIds"] if rid not in sup_refs]
-                code_refs = [r for r in code_refs if r.get("refIds")]
-            count += 1
-
-    if count > 0:
-        print(f"  Applied {count} manual overrides from .sdd/overrides.json")
-    return code_refs, count
-
-
-def scan_code_refs(project_dir):
-    """Scan src/ for Refs: comments linking to SDD artifacts."""
-    src_dir = os.path.join(project_dir, "src")
-    if not os.path.isdir(src_dir):
-        return [], {"totalFiles": 0, "totalSymbols": 0, "symbolsWithRefs": 0}
+    adjacency, when given, memoizes each node's non-REQ neighbours across calls.
+    """
+    if adjacency is None:
+        adjacency = {}
+    visited = {req_id}
+    frontier = [req_id]
+    for _ in range(max_depth):
+        next_frontier = []
+        for current in frontier:
+            neighbors = adjacency.get(current)
+            if neighbors is None:
+                neighbors = adjacency[current] = [
+                    n for n in set(outgoing.get(current, ())) | set(incoming.get(current, ()))
+                    if not n.startswith("REQ-")]
+            for neighbor in neighbors:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    next_frontier.append(neighbor)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return frozenset(visited)
 
-    code_refs = []
-    total_files = 0
-    total_symbols = 0
-    symbols_with_refs = 0
-    extensions = {".ts", ".js", ".tsx", ".jsx"}
-
-    # Pattern for Refs: in JSDoc/inline comments
-    refs_pattern = re.compile(r'Refs?:\s*((?:(?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR|FASE|TASK)[-][A-Za-z0-9-]+(?:,\s*)?)+)')
-    inline_ref_pattern = re.compile(r'//\s*((?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR)[-][A-Za-z0-9-]+)')
-    symbol_pattern = re.compile(r'(?:export\s+)?(?:async\s+)?(?:function|class|const|let|var|interface|type|enum)\s+(\w+)')
-
-    for root, dirs, filenames in os.walk(src_dir):
-        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-        for fname in filenames:
-            ext = os.path.splitext(fname)[1].lower()
-            if ext not in extensions:
-                continue
-            total_files += 1
-            fpath = os.path.join(root, fname)
-            try:
-                with open(fpath, "r", encoding="utf-8", errors="replace") as f:
-                    lines = f.readlines()
-            except Exception:
-                continue
 
-            frel = _rel_path(fpath, project_dir)
-            # Count symbols in file
-            file_symbols = []
-            for i, line in enumerate(lines):
-                sm = symbol_pattern.search(line)
-                if sm:
-                    file_symbols.append((i, sm.group(1)))
-                    total_symbols += 1
-
-            # Find Refs: comments
-            for i, line in enumerate(lines):
-                ref_ids = []
-                rm = refs_pattern.search(line)
-                if rm:
-                    raw = rm.group(1)
-                    ref_ids = [r.strip() for r in re.split(r'[,\s]+', raw) if r.strip() and classify_id(r.strip())]
-                else:
-                    im = inline_ref_pattern.search(line)
-                    if im:
-                        ref_ids = [im.group(1)]
-
-                if ref_ids:
-                    # Find nearest symbol
-                    symbol = f"{os.path.basename(fpath)}:{i+1}"
-                    symbol_type = "unknown"
-                    for si, sname in reversed(file_symbols):
-                        if si <= i + 2:
-                            symbol = sname
-                            # Determine type from the line
-                            sline = lines[si] if si < len(lines) else ""
-                            if "function" in sline or "async function" in sline:
-                                symbol_type = "function"
-                            elif "class " in sline:
-                                symbol_type = "class"
-                            elif "const " in sline:
-                                symbol_type = "const"
-                            elif "interface " in sline:
-                                symbol_type = "interface"
-                            elif "type " in sline:
-                                symbol_type = "type"
-                            elif "enum " in sline:
-                                symbol_type = "enum"
-                            else:
-                                symbol_type = "variable"
-                            symbols_with_refs += 1
-                            break
+def _delta_encode(values):
+    """Sorted ints -> first value, then gaps (short numbers in the JSON)."""
+    out, prev = [], 0
+    for value in values:
+        out.append(value - prev)
+        prev = value
+    return out
 
-                    code_refs.append({
-                        "file": frel,
-                        "line": i + 1,
-                        "symbol": symbol,
-                        "symbolType": symbol_type,
-                        "refIds": ref_ids,
-                    })
 
-    print(f"  Code: {total_files} files, {total_symbols} symbols, {symbols_with_refs} with refs, {len(code_refs)} ref comments")
-    return code_refs, {
-        "totalFiles": total_files,
-        "totalSymbols": total_symbols,
-        "symbolsWithRefs": symbols_with_refs,
-    }
+def _delta_decode(deltas):
+    return accumulate(deltas)
 
 
-def _discover_test_dirs(project_dir):
-    """Discover test directories: tests/, test/, and */tests/ one level deep."""
-    candidates = [
-        os.path.join(project_dir, "tests"),
-        os.path.join(project_dir, "test"),
-    ]
-    # Auto-discover */tests/ and */test/ one level deep (e.g. frontend/tests/)
-    try:
-        for entry in os.listdir(project_dir):
-            if entry.startswith(".") or entry in SKIP_DIRS:
-                continue
-            subdir = os.path.join(project_dir, entry)
-            if os.path.isdir(subdir):
-                for tname in ("tests", "test"):
-                    tpath = os.path.join(subdir, tname)
-                    if os.path.isdir(tpath) and tpath not in candidates:
-                        candidates.append(tpath)
-    except OSError:
-        pass
-    return candidates
+def _crc(items):
+    return zlib.crc32("\n".join(items).encode("utf-8"))
 
 
-def scan_test_refs(project_dir):
-    """Scan tests/ for Refs: comments and test descriptions referencing SDD artifacts."""
-    test_dirs = _discover_test_dirs(project_dir)
-    test_refs = []
-    total_test_files = 0
-    total_tests = 0
-    tests_with_refs = 0
-    extensions = {".ts", ".js", ".tsx", ".jsx"}
+class ReachabilityIndex:
+    """REQ <-> code files, symbols, tests and commits within the propagation depth.
 
-    refs_pattern = re.compile(r'Refs?:\s*((?:(?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR|FASE|TASK)[-][A-Za-z0-9-]+(?:,\s*)?)+)')
-    test_desc_ref_pattern = re.compile(r'(?:describe|it|test)\(\s*[\'"`](.*?(?:REQ|UC|INV|BDD|WF|API|ADR|NFR)[-][A-Za-z0-9-]+.*?)[\'"`]')
-    test_block_pattern = re.compile(r'(?:it|test)\(\s*[\'"`](.*?)[\'"`]')
+    forward[kind][req] and reverse[kind][key] answer either direction with
+    one lookup; keys are file paths, "symbol@file", "testName@file" and
+    commit SHAs. reach[req] keeps the nodes each REQ reaches, so update()
+    only walks again from REQs whose reach contains a node whose adjacency
+    or refs changed since the previous run (or every REQ, when more than
+    REACHABILITY_REBUILD_RATIO of them are dirty). The file interns every
+    string once and stores the lists as delta-encoded indices.
+    """
 
-    for test_dir in test_dirs:
-        if not os.path.isdir(test_dir):
-            continue
-        for root, dirs, filenames in os.walk(test_dir):
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-            for fname in filenames:
-                ext = os.path.splitext(fname)[1].lower()
-                if ext not in extensions:
-                    continue
-                total_test_files += 1
-                fpath = os.path.join(root, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8", errors="replace") as f:
-                        lines = f.readlines()
-                except Exception:
-                    continue
+    def __init__(self, max_depth=3):
+        self.max_depth = max_depth
+        self.reach = {}
+        self.digests = {}  # node -> (adjacency crc, refs crc)
+        self.forward = {kind: {} for kind in REACHABILITY_KINDS}
+        self.reverse = {kind: {} for kind in REACHABILITY_KINDS}
+        self.last_update = None
+        self._written = None  # path whose content matches the index, while nothing changed
+        self._inputs = None  # (incoming, outgoing, ref_maps) of the last update()
+
+    @classmethod
+    def load(cls, path, max_depth=3):
+        """Read a reachability.json; an empty index when it is missing, unreadable or stale."""
+        index = cls(max_depth)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if (data.get("format") != REACHABILITY_FORMAT or data.get("version") != REACHABILITY_VERSION
+                or data.get("maxDepth") != max_depth):
+            return index
+        reqs, nodes, digests = data["reqs"], data["nodes"], data["digests"]
+        index.digests = {node: (digests[2 * i], digests[2 * i + 1]) for i, node in enumerate(nodes)}
+        index.reach = {req: frozenset(nodes[i] for i in _delta_decode(deltas))
+                       for req, deltas in zip(reqs, data["reach"])}
+        for kind in REACHABILITY_KINDS:
+            keys = data["keys"][kind]
+            index.forward[kind] = {req: frozenset(keys[i] for i in _delta_decode(deltas))
+                                   for req, deltas in zip(reqs, data["forward"][kind]) if deltas}
+            index.reverse[kind] = {key: {reqs[i] for i in _delta_decode(deltas)}
+                                   for key, deltas in zip(keys, data["reverse"][kind])}
+        index._written = path
+        return index
+
+    def reqs_for(self, kind, key):
+        """The set of REQs that reach a file / symbol / test / commit."""
+        return self.reverse[kind].get(key, frozenset())
+
+    def targets(self, req_id, kind):
+        """The set of files / symbols / tests / commits a REQ reaches."""
+        return self.forward[kind].get(req_id, frozenset())
+
+    @staticmethod
+    def _node_keys(node, ref_maps):
+        code = ref_maps["code"].get(node, ())
+        return {
+            "files": {cr["file"] for cr in code},
+            "symbols": {f"{cr['symbol']}@{cr['file']}" for cr in code},
+            "tests": {f"{tr['testName']}@{tr['file']}" for tr in ref_maps["tests"].get(node, ())},
+            "commits": {cr["sha"] for cr in ref_maps["commits"].get(node, ())},
+        }
 
-                frel = _rel_path(fpath, project_dir)
-                current_describe = ""
-
-                for i, line in enumerate(lines):
-                    # Track describe blocks
-                    dm = re.search(r'describe\(\s*[\'"`](.*?)[\'"`]', line)
-                    if dm:
-                        current_describe = dm.group(1)
-
-                    # Count test blocks
-                    tm = test_block_pattern.search(line)
-                    if tm:
-                        total_tests += 1
-
-                    # Find refs
-                    ref_ids = []
-                    rm = refs_pattern.search(line)
-                    if rm:
-                        raw = rm.group(1)
-                        ref_ids = [r.strip() for r in re.split(r'[,\s]+', raw) if r.strip() and classify_id(r.strip())]
-
-                    # Find refs in test descriptions
-                    drm = test_desc_ref_pattern.search(line)
-                    if drm:
-                        desc_text = drm.group(1)
-                        for m in REF_PATTERN.finditer(desc_text):
-                            rid = m.group(1)
-                            if rid not in ref_ids:
-                                ref_ids.append(rid)
-
-                    if ref_ids:
-                        test_name = ""
-                        tmatch = test_block_pattern.search(line)
-                        if tmatch:
-                            test_name = tmatch.group(1)
-                            if current_describe:
-                                test_name = f"{current_describe} > {test_name}"
-                        elif current_describe:
-                            test_name = current_describe
+    def update(self, reqs, incoming, outgoing, ref_maps):
+        """Bring the index up to date with the current graph; return {"reqs", "recomputed", "full"}.
+
+        ref_maps holds the artifact id -> refs maps build_graph() propagates:
+        "code" (codeRefs), "tests" (testRefs) and "commits" (commitRefs).
+        """
+        code_refs, test_refs, commit_refs = ref_maps["code"], ref_maps["tests"], ref_maps["commits"]
+
+        def digest(node):
+            adjacency = set(outgoing.get(node, ())) | set(incoming.get(node, ()))
+            refs = [f"{cr['symbol']}@{cr['file']}" for cr in code_refs.get(node, ())]
+            refs.extend(f"{tr['testName']}@{tr['file']}" for tr in test_refs.get(node, ()))
+            refs.extend(cr["sha"] for cr in commit_refs.get(node, ()))
+            return _crc(sorted(adjacency)), _crc(refs)
+
+        # Kept in memory (watch, daemon), only nodes whose links or refs differ
+        # from the previous update() need a new digest
+        previous, self._inputs = self._inputs, (incoming, outgoing, ref_maps)
+        if previous is None:
+            current = {node: digest(node) for node in self.digests}
+        else:
+            maps = (incoming, outgoing, code_refs, test_refs, commit_refs)
+            old_maps = (previous[0], previous[1], previous[2]["code"], previous[2]["tests"], previous[2]["commits"])
+            current = dict(self.digests)
+            for new_map, old_map in zip(maps, old_maps):
+                if new_map == old_map:
+                    continue
+                for node in self.digests:
+                    if new_map.get(node) != old_map.get(node):
+                        current[node] = digest(node)
+        changed = {node for node, old in self.digests.items() if current[node] != old}
+        reqs = set(reqs)
+        stale = {req for req in self.reach if req not in reqs}
+        dirty = {req for req in reqs
+                 if req not in self.reach or (changed and not changed.isdisjoint(self.reach[req]))}
+        full = not self.reach or len(dirty) > REACHABILITY_REBUILD_RATIO * len(reqs)
+        if full:
+            dirty, stale = reqs, set()
+            self.reach = {}
+            self.forward = {kind: {} for kind in REACHABILITY_KINDS}
+            self.reverse = {kind: {} for kind in REACHABILITY_KINDS}
+        stale |= dirty
+
+        # Drop what the stale REQs contributed, then walk again from the dirty ones
+        for req in stale:
+            self.reach.pop(req, None)
+            for kind in REACHABILITY_KINDS:
+                reverse = self.reverse[kind]
+                for key in self.forward[kind].pop(req, ()):
+                    reverse[key].discard(req)
+                    if not reverse[key]:
+                        del reverse[key]
+        adjacency, node_keys = {}, {}
+        for req in dirty:
+            nodes = self.reach[req] = reachable_nodes(req, incoming, outgoing, self.max_depth, adjacency)
+            for node in nodes:
+                if node not in node_keys:
+                    node_keys[node] = self._node_keys(node, ref_maps)
+            for kind in REACHABILITY_KINDS:
+                keys = frozenset().union(*[node_keys[node][kind] for node in nodes])
+                if keys:
+                    self.forward[kind][req] = keys
+                    reverse = self.reverse[kind]
+                    for key in keys:
+                        if key in reverse:
+                            reverse[key].add(req)
                         else:
-                            test_name = f"{fname}:{i+1}"
-
-                        tests_with_refs += 1
-                        test_refs.append({
-                            "file": frel,
-                            "line": i + 1,
-                            "testName": test_name,
-                            "framework": "vitest",
-                            "refIds": ref_ids,
-                        })
-
-    print(f"  Tests: {total_test_files} files, {total_tests} tests, {tests_with_refs} with refs")
-    return test_refs, {
-        "totalTestFiles": total_test_files,
-        "totalTests": total_tests,
-        "testsWithRefs": tests_with_refs,
-    }
+                            reverse[key] = {req}
+
+        nodes = set().union(*self.reach.values()) if self.reach else set()
+        self.digests = {node: current[node] if node in current else digest(node) for node in nodes}
+        self.last_update = {"reqs": len(reqs), "recomputed": len(dirty), "full": full}
+        if stale:
+            self._written = None
+        return self.last_update
+
+    def to_json(self):
+        reqs = sorted(self.reach)
+        req_index = {req: i for i, req in enumerate(reqs)}
+        nodes = sorted(self.digests)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        data = {
+            "format": REACHABILITY_FORMAT,
+            "version": REACHABILITY_VERSION,
+            "maxDepth": self.max_depth,
+            "reqs": reqs,
+            "nodes": nodes,
+            "digests": [value for node in nodes for value in self.digests[node]],
+            "reach": [_delta_encode(sorted(node_index[node] for node in self.reach[req])) for req in reqs],
+            "keys": {},
+            "forward": {},
+            "reverse": {},
+        }
+        for kind in REACHABILITY_KINDS:
+            keys = sorted(self.reverse[kind])
+            key_index = {key: i for i, key in enumerate(keys)}
+            data["keys"][kind] = keys
+            data["forward"][kind] = [_delta_encode(sorted(key_index[key] for key in self.forward[kind].get(req, ())))
+                                     for req in reqs]
+            data["reverse"][kind] = [_delta_encode(sorted(req_index[req] for req in self.reverse[kind][key]))
+                                     for key in keys]
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+    def write(self, path):
+        """Write reachability.json (skipped when path already holds this index)."""
+        if self._written == path and os.path.exists(path):
+            return
+        _safe_write_text(path, self.to_json())
+        self._written = path
+
+
+def _glob_to_regex(pattern):
+    """Translate a path glob to a regex: ** spans directories, * and ? stay within one.
+
+    "[" is literal, so exact paths such as "src/pages/[id].tsx" keep working.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                i += 2
+                if pattern.startswith("/", i):
+                    i += 1
+                    out.append("(?:[^/]*/)*")
+                else:
+                    out.append(".*")
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
 
 
-def scan_audits(project_dir):
-    """Scan audits/*.md for severity breakdown, 3C gate status, corrections, and progression."""
-    audits_dir = os.path.join(project_dir, "audits")
-    result = {
-        "auditFiles": [],
-        "latestGate": None,
-        "totalFindings": 0,
-        "bySeverity": {"critical": 0, "high": 0, "medium": 0, "low": 0},
-        "corrected": 0,
-        "accepted": 0,
-        "deferred": 0,
-        "progression": [],
-    }
+class OverrideRules:
+    """Pin and suppress rules from .sdd/overrides.json, compiled into one path matcher.
 
-    if not os.path.isdir(audits_dir):
-        return result
+    A rule's "file" is an exact path, a directory ("src/generated/") or a
+    glob ("src/**/*.gen.ts"). Exact paths go in a dict; every directory and
+    glob rule becomes an optional lookahead of a single regex, so one
+    match() per file reports all rules that apply to it. hits[i] counts
+    what rule i did (files pinned, refs suppressed) for stale-rule reports.
+    """
 
-    md_files = sorted(
-        [f for f in os.listdir(audits_dir) if f.lower().endswith(".md")]
-    )
-    if not md_files:
-        return result
+    def __init__(self, overrides):
+        self.rules = []
+        for kind, default_refs in (("pin", []), ("suppress", ["*"])):
+            for rule in overrides.get(kind, []):
+                pattern = rule.get("file", "").replace("\\", "/")
+                refs = rule.get("refs", default_refs)
+                if pattern and (refs or kind == "suppress"):
+                    self.rules.append({"kind": kind, "file": pattern, "refs": refs})
+        self.hits = [0] * len(self.rules)
+        self._exact = {}
+        self._pattern_rules = []
+        self._pattern_set = set()
+        lookaheads = []
+        for idx, rule in enumerate(self.rules):
+            pattern = rule["file"]
+            if pattern.endswith("/"):
+                regex = re.escape(pattern) + ".*"
+            elif "*" in pattern or "?" in pattern:
+                regex = _glob_to_regex(pattern)
+            else:
+                self._exact.setdefault(pattern, []).append(idx)
+                continue
+            self._pattern_rules.append(idx)
+            self._pattern_set.add(idx)
+            lookaheads.append(f"(?:(?=({regex})\\Z))?")
+        self._matcher = track_regex("OverrideRules.matcher", re.compile("".join(lookaheads))) if lookaheads else None
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def is_pattern(self, idx):
+        return idx in self._pattern_set
+
+    def match(self, path):
+        """Indices of the rules that apply to a project-relative path, in rule order."""
+        found = self._memo.get(path)
+        if found is None:
+            found = list(self._exact.get(path, ()))
+            if self._matcher is not None:
+                groups = self._matcher.match(path).groups()
+                found.extend(idx for idx, g in zip(self._pattern_rules, groups) if g is not None)
+                found.sort()
+            self._memo[path] = found
+        return found
+
+    def stats(self):
+        """overrideStats for the graph: rule counts and per-rule hits."""
+        rules = [dict(rule, hits=hits) for rule, hits in zip(self.rules, self.hits)]
+        return {
+            "rules": len(rules),
+            "pins": sum(1 for r in rules if r["kind"] == "pin"),
+            "suppressions": sum(1 for r in rules if r["kind"] == "suppress"),
+            "unused": sum(1 for r in rules if not r["hits"]),
+            "byRule": rules,
+        }
 
-    result["auditFiles"] = [f"audits/{f}" for f in md_files]
 
-    # Patterns for table rows (pipe-delimited markdown tables)
-    re_total = re.compile(
-        r'\|\s*(?:Findings in audit|Total hallazgos|Total findings)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_critical = re.compile(
-        r'\|\s*(?:Criticos|Critical|Cr[ií]ticos)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_high = re.compile(
-        r'\|\s*(?:Altos|High)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_medium = re.compile(
-        r'\|\s*(?:Medios|Medium)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_low = re.compile(
-        r'\|\s*(?:Bajos|Low)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_corrected = re.compile(
-        r'\|\s*(?:Corrections applied|Correcciones aplicadas|Corrected)\s*\|\s*(\d+)\s*/?\s*\d*\s*\|', re.IGNORECASE
-    )
-    re_accepted = re.compile(
-        r'\|\s*(?:Accepted|Aceptados)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_deferred = re.compile(
-        r'\|\s*(?:Deferred|Diferidos)\s*\|\s*(\d+)\s*\|', re.IGNORECASE
-    )
-    re_gate = re.compile(
-        r'\|\s*(?:3C Gate|3C)\s*\|\s*(PASS|FAIL)\s*\|', re.IGNORECASE
-    )
-    # Progression table row: | vN.N | N | N | N | N | PASS/FAIL |
-    re_progression = re.compile(
-        r'\|\s*(v[\d.]+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(PASS|FAIL)\s*\|', re.IGNORECASE
-    )
+def load_overrides(overrides_path):
+    """Read .sdd/overrides.json into OverrideRules, or None if absent or unreadable."""
+    if not os.path.exists(overrides_path):
+        return None
+    try:
+        with open(overrides_path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    except Exception as e:
+        log(f"  Warning: could not read overrides file: {e}")
+        return None
+    return OverrideRules(overrides)
 
-    latest_gate = None
-    latest_total = 0
-    latest_severity = {"critical": 0, "high": 0, "medium": 0, "low": 0}
-    latest_corrected = 0
-    latest_accepted = 0
-    latest_deferred = 0
-    progression = []
 
-    for fname in md_files:
-        fpath = os.path.join(audits_dir, fname)
+def apply_overrides(code_refs, rules, project_dir=None, code_files=None):
+    """Apply manual overrides from .sdd/overrides.json (Step 1.5).
+
+    Supports:
+    - "pin": force-add file-level refs for matching files
+    - "suppress": remove inferred refs (all, or the listed IDs) for matching files
+
+    Each distinct file is matched against all rules in one (memoized) call,
+    so the cost is O(files + refs) rather than O(rules x refs).
+    Glob and directory pins expand over the files with code refs plus, when
+    project_dir is given, the project's source files (code_files, as
+    project-relative paths, when given; collect_code_files() otherwise).
+    """
+    if rules is None or not len(rules):
+        return code_refs, 0
+
+    # Pins: one file-level ref per pinned file, after the scanned refs
+    pattern_pins = {}
+    if any(rules.is_pattern(idx) for idx, rule in enumerate(rules.rules) if rule["kind"] == "pin"):
+        candidates = {cr["file"] for cr in code_refs}
+        if code_files is not None:
+            candidates.update(code_files)
+        elif project_dir:
+            candidates.update(_rel_path(p, project_dir) for p in collect_code_files(project_dir))
+        for fp in sorted(candidates):
+            for idx in rules.match(fp):
+                if rules.rules[idx]["kind"] == "pin" and rules.is_pattern(idx):
+                    pattern_pins.setdefault(idx, []).append(fp)
+    pinned = []
+    for idx, rule in enumerate(rules.rules):
+        if rule["kind"] != "pin":
+            continue
+        files = pattern_pins.get(idx, []) if rules.is_pattern(idx) else [rule["file"]]
+        for fp in files:
+            pinned.append({
+                "file": fp,
+                "line": 0,
+                "symbol": os.path.basename(fp),
+                "symbolType": "file",
+                "refIds": list(rule["refs"]),
+                "origin": "manual-override",
+                "inferredFrom": None,
+            })
+        rules.hits[idx] += len(files)
+
+    # Suppressions: one pass over the non-direct refs; a "*" rule drops the
+    # ref, ID rules remove their IDs (and the ref once none are left)
+    kept = []
+    for cr in code_refs + pinned:
+        if cr.get("origin", "direct") == "direct":
+            kept.append(cr)
+            continue
+        drop_all = False
+        drop_ids = set()
+        for idx in rules.match(cr["file"]):
+            rule = rules.rules[idx]
+            if rule["kind"] != "suppress":
+                continue
+            if "*" in rule["refs"]:
+                drop_all = True
+                rules.hits[idx] += 1
+            elif any(rid in rule["refs"] for rid in cr["refIds"]):
+                drop_ids.update(rule["refs"])
+                rules.hits[idx] += 1
+        if drop_all:
+            continue
+        if drop_ids:
+            cr["refIds"] = [rid for rid in cr["refIds"] if rid not in drop_ids]
+        if cr.get("refIds"):
+            kept.append(cr)
+
+    count = len(rules)
+    unused = sum(1 for hits in rules.hits if not hits)
+    log(f"  Applied {count} manual overrides from .sdd/overrides.json"
+        + (f" ({unused} matched nothing)" if unused else ""))
+    return kept, count
+
+
+# ──────────────────────────────────────────────────────────
+# Code reference extractors (per-language comment lexers)
+# ──────────────────────────────────────────────────────────
+
+# Pattern for Refs: in JSDoc/inline comments
+CODE_REFS_PATTERN = re.compile(r'Refs?:\s*((?:(?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR|FASE|TASK)[-][A-Za-z0-9-]+(?:,\s*)?)+)')
+# Inline ref: a comment whose text starts with an artifact ID (// UC-001, # INV-EXT-005)
+CODE_INLINE_REF_PATTERN = re.compile(r'((?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR)[-][A-Za-z0-9-]+)')
+# Cheap whole-file prefilter: files without any ID prefix cannot contain refs
+CODE_REF_HINT = re.compile(r'(?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR|FASE|TASK)-')
+# Leading comment/docstring markers stripped before matching a comment line
+_COMMENT_MARKER_RE = re.compile(r'^\s*(?:[rRuU]?(?:"""|\'\'\')|//+|/\*+|\*+|#+)?\s*')
+
+# Shared token alternatives — strings are matched only so they can be skipped
+_TOK_LINE_COMMENT = r'(?P<com>//[^\n]*)'
+_TOK_BLOCK_COMMENT = r'(?P<blk>/\*[\s\S]*?(?:\*/|\Z))'
+_TOK_DQ_STRING = r'"(?:\\.|[^"\\\n])*"'
+_TOK_SQ_STRING = r"'(?:\\.|[^'\\\n])*'"
+_TOK_CHAR = r"'(?:\\.[^'\n]{0,8}|[^'\\\n])'"
+
+
+class CodeExtractor:
+    """Comment lexer and symbol matcher for one language family.
+
+    token_pattern is a single compiled regex whose finditer() visits only
+    string literals (group "str", skipped) and comments (groups "com"/"blk",
+    or "doc" for docstrings), so code between them is skipped by the regex
+    engine. symbol_pattern runs once over the whole file and
+    symbol_info(match, line_text) returns the (name, type) of each match.
+    With indent_scopes=True (Python) a ref belongs to the symbol whose body
+    encloses it by indentation; otherwise to the preceding symbol.
+    """
+
+    def __init__(self, name, token_pattern, symbol_pattern, symbol_info, indent_scopes=False):
+        self.name = name
+        self.token_pattern = token_pattern
+        self.symbol_pattern = symbol_pattern
+        self.symbol_info = symbol_info
+        self.indent_scopes = indent_scopes
+
+
+CODE_EXTRACTORS = {}  # extension -> CodeExtractor
+
+
+def register_code_extractor(extensions, extractor):
+    """Register an extractor for the given file extensions (lower-case, with dot)."""
+    for ext in extensions:
+        CODE_EXTRACTORS[ext] = extractor
+
+
+def _js_symbol_info(match, line):
+    """TS/JS symbol name and type, the type inferred from the declaration line."""
+    name = match.group("name")
+    if "function" in line or "async function" in line:
+        return name, "function"
+    if "class " in line:
+        return name, "class"
+    if "const " in line:
+        return name, "const"
+    if "interface " in line:
+        return name, "interface"
+    if "type " in line:
+        return name, "type"
+    if "enum " in line:
+        return name, "enum"
+    return name, "variable"
+
+
+def _keyword_symbol_info(kinds):
+    """Symbol name from group "name", type from the declaration keyword in group "kw"."""
+    def _info(match, line):
+        kw = match.group("kw")
+        return match.group("name"), kinds.get(kw, kw)
+    return _info
+
+
+register_code_extractor({".ts", ".js", ".tsx", ".jsx", ".mjs", ".cjs"}, CodeExtractor(
+    "typescript",
+    re.compile("|".join([
+        _TOK_LINE_COMMENT, _TOK_BLOCK_COMMENT,
+        r'(?P<str>' + _TOK_DQ_STRING + '|' + _TOK_SQ_STRING + r'|`(?:\\.|[^`\\])*`)',
+    ])),
+    # Unanchored, first match per line — same heuristic as the original line scanner
+    re.compile(r'(?:export[ \t]+)?(?:async[ \t]+)?(?:function|class|const|let|var|interface|type|enum)[ \t]+(?P<name>\w+)'),
+    _js_symbol_info,
+))
+
+register_code_extractor({".py"}, CodeExtractor(
+    "python",
+    re.compile("|".join([
+        # Docstrings: triple-quoted strings that start a statement line
+        r'(?P<doc>^[ \t]*[rRuU]?(?:"""[\s\S]*?(?:"""|\Z)|\'\'\'[\s\S]*?(?:\'\'\'|\Z)))',
+        r'(?P<str>[rRbBuUfF]{0,2}(?:"""[\s\S]*?(?:"""|\Z)|\'\'\'[\s\S]*?(?:\'\'\'|\Z)|'
+        + _TOK_DQ_STRING + '|' + _TOK_SQ_STRING + '))',
+        r'(?P<com>#[^\n]*)',
+    ]), re.MULTILINE),
+    re.compile(r'^[ \t]*(?:async[ \t]+)?(?P<kw>def|class)[ \t]+(?P<name>\w+)', re.MULTILINE),
+    _keyword_symbol_info({"def": "function", "class": "class"}),
+    indent_scopes=True,
+))
+
+register_code_extractor({".go"}, CodeExtractor(
+    "go",
+    re.compile("|".join([
+        _TOK_LINE_COMMENT, _TOK_BLOCK_COMMENT,
+        r'(?P<str>' + _TOK_DQ_STRING + r'|`[^`]*`|' + _TOK_CHAR + ')',
+    ])),
+    re.compile(r'^(?:(?P<kw>func)[ \t]+(?:\([^)\n]*\)[ \t]*)?|(?P<tkw>type|var|const)[ \t]+)(?P<name>\w+)'
+               r'(?:[ \t]+(?P<tdef>struct|interface))?', re.MULTILINE),
+    lambda m, line: (m.group("name"),
+                     "function" if m.group("kw") else
+                     m.group("tdef") or {"type": "type", "const": "const"}.get(m.group("tkw"), "variable")),
+))
+
+register_code_extractor({".rs"}, CodeExtractor(
+    "rust",
+    re.compile("|".join([
+        _TOK_LINE_COMMENT, _TOK_BLOCK_COMMENT,
+        # Raw strings (r"..", r#".."#), normal strings (may span lines), char literals — lifetimes never close
+        r'(?P<str>r#*"[\s\S]*?"#*|b?"(?:\\[\s\S]|[^"\\])*"|b?' + _TOK_CHAR + ')',
+    ])),
+    re.compile(r'^[ \t]*(?:pub(?:\([^)\n]*\))?[ \t]+)?(?:(?:async|unsafe|const|extern)[ \t]+)*'
+               r'(?P<kw>fn|struct|enum|trait|type|const|static|mod)[ \t]+(?P<name>\w+)', re.MULTILINE),
+    _keyword_symbol_info({"fn": "function", "struct": "class", "trait": "interface",
+                          "static": "variable", "mod": "module"}),
+))
+
+_JVM_MODIFIERS = r'(?:(?:public|protected|private|internal|static|final|abstract|sealed|override|virtual|' \
+                 r'async|partial|readonly|synchronized|native|default|extern|unsafe|new)[ \t]+)*'
+_JVM_SYMBOL_PATTERN = re.compile(
+    r'^[ \t]*(?:@\w+(?:\([^)\n]*\))?[ \t]*|\[[^\]\n]*\][ \t]*)*' + _JVM_MODIFIERS +
+    r'(?:(?P<kw>class|interface|enum|record|struct|namespace)[ \t]+(?P<tname>\w+)'
+    r'|(?!(?:return|new|else|throw|await|yield|case|goto)\b)[\w<>\[\],.?]+(?:[ \t]+[\w<>\[\],.?]+)*[ \t]+'
+    r'(?!(?:if|for|foreach|while|switch|catch|using|lock|return)\b)(?P<mname>\w+)[ \t]*\((?![^)\n]*\)[ \t]*;))',
+    re.MULTILINE)
+
+
+def _jvm_symbol_info(match, line):
+    """Java/C# symbol: a type declaration (class, interface, ...) or a method."""
+    kw = match.group("kw")
+    if kw:
+        return match.group("tname"), {"record": "class", "struct": "class"}.get(kw, kw)
+    return match.group("mname"), "function"
+
+
+register_code_extractor({".java", ".kt"}, CodeExtractor(
+    "java",
+    re.compile("|".join([
+        _TOK_LINE_COMMENT, _TOK_BLOCK_COMMENT,
+        r'(?P<str>"""[\s\S]*?(?:"""|\Z)|' + _TOK_DQ_STRING + '|' + _TOK_CHAR + ')',
+    ])),
+    _JVM_SYMBOL_PATTERN,
+    _jvm_symbol_info,
+))
+
+register_code_extractor({".cs"}, CodeExtractor(
+    "csharp",
+    re.compile("|".join([
+        _TOK_LINE_COMMENT, _TOK_BLOCK_COMMENT,
+        r'(?P<str>\$?@"(?:""|[^"])*"|\$?' + _TOK_DQ_STRING + '|' + _TOK_CHAR + ')',
+    ])),
+    _JVM_SYMBOL_PATTERN,
+    _jvm_symbol_info,
+))
+
+CODE_EXTENSIONS = set(CODE_EXTRACTORS)
+
+
+def collect_code_files(project_dir):
+    """Walk the code scope's roots (src/ by default) and collect files with a registered extractor."""
+    return [fpath for fpath, fname in scan_scopes(project_dir)["code"].walk()
+            if os.path.splitext(fname)[1].lower() in CODE_EXTENSIONS]
+
+
+def _build_symbol_index(text, extractor):
+    """Return (starts, symbols): sorted 0-based symbol lines and their (name, kind), one per line."""
+    starts = []
+    symbols = []
+    line = 0
+    pos = 0
+    for m in extractor.symbol_pattern.finditer(text):
+        line += text.count("\n", pos, m.start())
+        pos = m.start()
+        if starts and starts[-1] == line:
+            continue
+        line_start = text.rfind("\n", 0, m.start()) + 1
+        line_end = text.find("\n", m.start())
+        line_text = text[line_start:line_end if line_end >= 0 else len(text)]
+        starts.append(line)
+        symbols.append(extractor.symbol_info(m, line_text))
+    return starts, symbols
+
+
+def _iter_comment_lines(text, extractor):
+    """Yield (0-based line, text, kind, token line) for every comment/docstring line, skipping string literals.
+
+    kind is the token group ("com", "blk" or "doc"); token line is the line
+    the comment or docstring starts on.
+    """
+    line = 0
+    pos = 0
+    for m in extractor.token_pattern.finditer(text):
+        kind = m.lastgroup
+        if kind == "str":
+            continue
+        start = m.start(kind)
+        line += text.count("\n", pos, start)
+        pos = start
+        for offset, comment_line in enumerate(m.group(kind).split("\n")):
+            yield line + offset, comment_line, kind, line
+
+
+_LEADING_LINE_PREFIXES = ("//", "/*", "*", "#", "@", "[")  # comment continuations, decorators, attributes
+
+
+def _indent(line_text):
+    return len(line_text) - len(line_text.lstrip())
+
+
+def _ref_symbol_index(starts, lines, i, comment_line, kind, token_line, indent_scopes):
+    """Index into starts of the symbol a ref on line i belongs to, or -1.
+
+    A comment that has its line to itself and leads a declaration — the
+    declaration starts within two lines and only comment, decorator or
+    attribute lines come between — belongs to that declaration (JSDoc,
+    /// docs, # comments right above a def). Anything else, including every
+    docstring, belongs to the enclosing symbol by indentation (indent_scopes)
+    or to the preceding symbol.
+    """
+    k = bisect.bisect_right(starts, i) - 1
+    nxt = k + 1
+    if (kind != "doc" and nxt < len(starts) and starts[nxt] <= i + 2
+            and lines[i].strip() == comment_line.strip()
+            and all(lines[j].strip().startswith(_LEADING_LINE_PREFIXES) for j in range(i + 1, starts[nxt]))):
+        return nxt
+    if indent_scopes:
+        level = _indent(lines[token_line])
+        while k >= 0 and (_indent(lines[starts[k]]) >= level and starts[k] != i):
+            k -= 1
+    return k
+
+
+def _scan_code_file(fpath, project_dir, text=None):
+    """Scan one source file for Refs: comments.
+
+    Only comment tokens and docstrings are inspected (Refs: inside string
+    literals is ignored); the nearest symbol is found by bisecting a sorted
+    index of symbol start lines (see _ref_symbol_index() for which symbol a
+    ref belongs to). Returns (code_refs, total_symbols, symbols_with_refs),
+    or None if the file cannot be read. text is parsed instead of reading
+    fpath when given.
+    """
+    regex_scope(fpath)
+    extractor = CODE_EXTRACTORS.get(os.path.splitext(fpath)[1].lower())
+    if extractor is None:
+        return [], 0, 0
+    if text is None:
         try:
             with open(fpath, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
+                text = f.read()
         except Exception:
-            continue
+            return None
 
-        # Extract progression table rows (most complete source)
-        prog_rows = re_progression.findall(content)
-        if prog_rows:
-            progression = []
-            for row in prog_rows:
-                progression.append({
-                    "version": row[0],
-                    "findings": int(row[1]),
-                    "fixed": int(row[2]),
-                    "accepted": int(row[3]),
-                    "deferred": int(row[4]),
-                    "gate": row[5].upper(),
-                })
-
-        # Extract summary data (latest file wins)
-        m = re_total.search(content)
-        if m:
-            latest_total = int(m.group(1))
-        m = re_critical.search(content)
-        if m:
-            latest_severity["critical"] = int(m.group(1))
-        m = re_high.search(content)
-        if m:
-            latest_severity["high"] = int(m.group(1))
-        m = re_medium.search(content)
-        if m:
-            latest_severity["medium"] = int(m.group(1))
-        m = re_low.search(content)
-        if m:
-            latest_severity["low"] = int(m.group(1))
-        m = re_corrected.search(content)
-        if m:
-            latest_corrected = int(m.group(1))
-        m = re_accepted.search(content)
-        if m:
-            latest_accepted = int(m.group(1))
-        m = re_deferred.search(content)
-        if m:
-            latest_deferred = int(m.group(1))
-        m = re_gate.search(content)
-        if m:
-            latest_gate = m.group(1).upper()
+    starts, symbols = _build_symbol_index(text, extractor)
+    if not CODE_REF_HINT.search(text):
+        return [], len(symbols), 0
 
-    result["latestGate"] = latest_gate
-    result["totalFindings"] = latest_total
-    result["bySeverity"] = latest_severity
-    result["corrected"] = latest_corrected
-    result["accepted"] = latest_accepted
-    result["deferred"] = latest_deferred
-    result["progression"] = progression
+    code_refs = []
+    symbols_with_refs = 0
+    frel = _rel_path(fpath, project_dir)
+    lines = text.split("\n")
+    for i, comment_line, kind, token_line in _iter_comment_lines(text, extractor):
+        ref_ids = []
+        rm = CODE_REFS_PATTERN.search(comment_line)
+        if rm:
+            raw = rm.group(1)
+            ref_ids = [r.strip() for r in re.split(r'[,\s]+', raw) if r.strip() and classify_id(r.strip())]
+        else:
+            im = CODE_INLINE_REF_PATTERN.match(comment_line, _COMMENT_MARKER_RE.match(comment_line).end())
+            if im:
+                ref_ids = [im.group(1)]
+        if not ref_ids:
+            continue
 
-    sev_parts = []
-    for sev in ("critical", "high", "medium", "low"):
-        if latest_severity[sev]:
-            sev_parts.append(f"{latest_severity[sev]} {sev}")
-    sev_str = ", ".join(sev_parts) if sev_parts else "none"
-    print(f"  Audits: {len(md_files)} files, {latest_total} findings ({sev_str}), gate={latest_gate or 'N/A'}")
+        symbol = f"{os.path.basename(fpath)}:{i+1}"
+        symbol_type = "unknown"
+        k = _ref_symbol_index(starts, lines, i, comment_line, kind, token_line, extractor.indent_scopes)
+        if k >= 0:
+            symbol, symbol_type = symbols[k]
+            symbols_with_refs += 1
+
+        code_refs.append({
+            "file": frel,
+            "line": i + 1,
+            "symbol": symbol,
+            "symbolType": symbol_type,
+            "refIds": ref_ids,
+        })
 
-    return result
+    return code_refs, len(symbols), symbols_with_refs
 
 
-def classify_requirements(artifacts, incoming, outgoing):
-    """Classify REQ artifacts by business domain, technical layer, and functional category."""
-    # Business domain mapping from REQ category prefix
-    domain_map = {
-        # Extraction & Processing
-        "EXT": "Extraction & Processing", "CVA": "Extraction & Processing",
-        "VAL": "Extraction & Processing", "PRO": "Extraction & Processing",
-        "DOC": "Extraction & Processing", "PAR": "Extraction & Processing",
-        "OCR": "Extraction & Processing", "PRM": "Extraction & Processing",
-        "MAT": "Matching & Selection", "OFF": "Matching & Selection",
-        "SEL": "Matching & Selection", "SRC": "Matching & Selection",
-        # Security & Auth
-        "SEC": "Security & Auth", "AUT": "Security & Auth",
-        "PRV": "Security & Auth", "LOG": "Security & Auth",
-        "CRD": "Security & Auth", "TOK": "Security & Auth",
-        "SSO": "Security & Auth",
-        "GDP": "GDPR & Privacy", "GDPR": "GDPR & Privacy",
-        "DPR": "GDPR & Privacy", "RET": "GDPR & Privacy",
-        # Frontend & UI
-        "UI": "Frontend & UI", "UX": "Frontend & UI",
-        "DASH": "Frontend & UI", "NAV": "Frontend & UI",
-        "FORM": "Frontend & UI", "MOD": "Frontend & UI",
-        "VIS": "Frontend & UI", "I18N": "Frontend & UI",
-        "ACC": "Frontend & UI",
-        "CAN": "Candidate Portal", "VPR": "Candidate Portal",
-        "DSH": "Dashboards & Reporting",
-        # Data & Storage
-        "DB": "Data & Storage", "IDX": "Data & Storage",
-        "CAC": "Data & Storage", "MIG": "Data & Storage",
-        "STO": "Data & Storage", "BAK": "Data & Storage",
-        "ARC": "Data & Storage", "CACHE": "Data & Storage",
-        "BLK": "Bulk Operations", "BAT": "Bulk Operations",
-        # Integration & APIs
-        "INT": "Integration & APIs", "WBH": "Integration & APIs",
-        "NOT": "Integration & APIs", "MSG": "Integration & APIs",
-        "EVT": "Integration & APIs", "SYN": "Integration & APIs",
-        "NTF": "Integration & APIs", "INC": "Integration & APIs",
-        # Infrastructure & DevOps
-        "CFG": "Infrastructure & DevOps", "ENV": "Infrastructure & DevOps",
-        "DEP": "Infrastructure & DevOps", "MON": "Infrastructure & DevOps",
-        "INF": "Infrastructure & DevOps", "OPS": "Infrastructure & DevOps",
-        "CI": "Infrastructure & DevOps",
-        "SYS": "Infrastructure & DevOps", "TECH": "Infrastructure & DevOps",
-        "AVAIL": "Infrastructure & DevOps",
-        # Performance & Scalability
-        "PERF": "Performance & Scalability", "SCAL": "Performance & Scalability",
-        "RATE": "Performance & Scalability", "OBS": "Performance & Scalability",
-        # Analytics & Reporting
-        "RPT": "Analytics & Reporting", "ANL": "Analytics & Reporting",
-        "MET": "Analytics & Reporting", "KPI": "Analytics & Reporting",
-        "EXP": "Analytics & Reporting", "AGG": "Analytics & Reporting",
-        # User & Org Management
-        "USR": "User Management", "ROL": "User Management",
-        "PER": "User Management", "ORG": "User Management",
-        "TEN": "User Management",
-        # Derived/Cross-cutting
-        "DER": "Derived Requirements", "MNT": "Infrastructure & DevOps",
-        "REC": "Infrastructure & DevOps",
+def _merge_code_results(total_files, results):
+    """Merge per-file code scan results into (code_refs, code_stats)."""
+    code_refs = []
+    total_symbols = 0
+    symbols_with_refs = 0
+    for result in results:
+        if result is None:
+            continue
+        file_refs, file_symbols, file_with_refs = result
+        code_refs.extend(dict(cr) for cr in file_refs)
+        total_symbols += file_symbols
+        symbols_with_refs += file_with_refs
+    log(f"  Code: {total_files} files, {total_symbols} symbols, {symbols_with_refs} with refs, {len(code_refs)} ref comments")
+    return code_refs, {
+        "totalFiles": total_files,
+        "totalSymbols": total_symbols,
+        "symbolsWithRefs": symbols_with_refs,
     }
 
-    # Find FASE linked to each REQ via TASK chain
-    task_to_fase = {}
-    for art in artifacts.values():
-        if art["type"] == "TASK":
-            m = re.match(r'TASK-F(\d+)-', art["id"])
-            if m:
-                task_to_fase[art["id"]] = int(m.group(1))
-
-    classification_stats = {"byDomain": {}, "byLayer": {}, "byCategory": {}}
 
-    # Title-based domain inference rules: (keywords, domain_name)
-    # Used as fallback when REQ prefix is generic (F, C, NF) or unknown
-    _domain_keyword_rules = [
-        # Customer & User Management
-        (["cliente", "client", "usuario", "user", "alta", "baja", "registro", "registr", "perfil", "profile",
-          "cuenta", "account", "contacto", "suscript", "subscri"], "Customer Management"),
-        # Service & Product Management
-        (["servicio", "service", "pack", "producto", "product", "tarifa", "plan", "oferta", "offer",
-          "catalogo", "catalog", "tipo de servicio", "contratacion", "contrat"], "Service Management"),
-        # Billing & Payments
-        (["factur", "invoice", "billing", "pago", "payment", "cobro", "cargo", "charge", "precio", "price",
-          "descuento", "discount", "impuesto", "tax", "penalizacion", "penal"], "Billing & Payments"),
-        # Provisioning & Activation
-        (["activacion", "activat", "provision", "suspend", "suspens", "reactivac", "reactivat",
-          "desactivac", "deactivat", "permanencia", "portabilidad"], "Provisioning & Lifecycle"),
-        # Incidents & Support
-        (["incidencia", "incident", "ticket", "soporte", "support", "sla", "escalad", "resolucion",
-          "resolut", "averia", "reclam", "claim", "queja", "complaint"], "Incidents & Support"),
-        # Security & Auth
-        (["seguridad", "security", "autenticac", "authenticat", "autorizac", "authorizat", "password",
-          "contrasena", "token", "sesion", "session", "rol", "role", "permiso", "permission",
-          "cifrado", "encrypt", "audit"], "Security & Auth"),
-        # Integration & APIs
-        (["integracion", "integrat", "api", "webhook", "notificacion", "notificat", "email", "sms",
-          "mensaje", "message", "evento", "event", "sincroniz", "sync"], "Integration & APIs"),
-        # Infrastructure & DevOps
-        (["infraestructura", "infrastructure", "deploy", "despliegue", "monitor", "log", "backup",
-          "migracion", "migrat", "config", "entorno", "environment", "ci/cd", "pipeline"], "Infrastructure & DevOps"),
-        # Reporting & Analytics
-        (["reporte", "report", "estadistic", "statistic", "dashboard", "tablero", "metricas",
-          "metrics", "analitic", "analytic", "kpi", "export"], "Analytics & Reporting"),
-        # Frontend & UI
-        (["interfaz", "interface", "ui", "ux", "pantalla", "screen", "formulario", "form",
-          "vista", "view", "navegacion", "navigation", "responsive", "accesibil"], "Frontend & UI"),
-        # Data & Storage
-        (["base de datos", "database", "almacen", "storage", "cache", "indice", "index",
-          "archivo", "file", "import", "export"], "Data & Storage"),
-    ]
+def scan_code_refs(project_dir, code_files=None):
+    """Scan the code roots (or the given code_files) for Refs: comments linking to SDD artifacts."""
+    if not scan_scopes(project_dir)["code"].root_dirs():
+        return [], {"totalFiles": 0, "totalSymbols": 0, "symbolsWithRefs": 0}
+    if code_files is None:
+        code_files = collect_code_files(project_dir)
+    current_phase().add_files(code_files)
+    result = _merge_code_results(len(code_files), (_scan_code_file(fpath, project_dir) for fpath in code_files))
+    regex_scope(None)
+    return result
 
-    # Title-based layer inference rules: (keywords, layer_name)
-    _layer_keyword_rules = [
-        (["ui", "ux", "interfaz", "interface", "pantalla", "screen", "formulario", "form",
-          "vista", "view", "frontend", "navegacion", "navigation", "responsive", "css",
-          "componente visual", "widget", "boton", "button", "modal", "menu", "sidebar"], "Frontend"),
-        (["infraestructura", "infrastructure", "deploy", "despliegue", "ci/cd", "pipeline",
-          "docker", "kubernetes", "terraform", "cloud", "servidor", "server", "nginx",
-          "ssl", "dns", "dominio", "domain", "hosting", "monitor", "log"], "Infrastructure"),
-        (["integracion", "integrat", "webhook", "api extern", "third.party", "tercero",
-          "pasarela", "gateway", "sync", "sincroniz", "import", "export", "migra"], "Integration/Deployment"),
-    ]
 
-    def _infer_domain_from_title(title):
-        """Infer business domain from REQ title using keyword matching."""
-        t = title.lower()
-        for keywords, domain_name in _domain_keyword_rules:
-            if any(kw in t for kw in keywords):
-                return domain_name
-        return "Other"
+# ──────────────────────────────────────────────────────────
+# Test reference scanning (multi-framework)
+# ──────────────────────────────────────────────────────────
 
-    def _infer_layer_from_title(title):
-        """Infer technical layer from REQ title using keyword matching. Defaults to Backend."""
-        t = title.lower()
-        for keywords, layer_name in _layer_keyword_rules:
-            if any(kw in t for kw in keywords):
-                return layer_name
-        # Default to Backend for functional requirements — most common layer
-        return "Backend"
+TEST_REFS_PATTERN = re.compile(r'Refs?:\s*((?:(?:REQ|UC|INV|RN|WF|API|BDD|ADR|NFR|FASE|TASK)[-][A-Za-z0-9-]+(?:,\s*)?)+)')
+_TEST_ID_HINT = r'Refs?:|REQ-|UC-|INV-|RN-|WF-|API-|BDD-|ADR-|NFR-|FASE-|TASK-'
 
-    # Generic REQ prefixes that don't carry domain information (IEEE 830 style)
-    generic_cats = {"F", "NF", "C", "R", "D", "G", "S", "P"}
 
-    from collections import Counter
+class TestFramework:
+    """How to find tests and their enclosing scopes in one language.
 
-    for art in artifacts.values():
-        if art["type"] != "REQ":
-            art["classification"] = None
-            continue
+    candidates finds a keyword on a candidate line — every other line is
+    skipped by the regex engine without Python-level work. scope_pattern finds
+    scope openers on a candidate line: group "name" (or "cname"/"sub") is the
+    label, group "scope" marks suites/classes, and anything else is a test —
+    or, when test_marker is set, a method that becomes a test only after a
+    marker such as JUnit's @Test (whose optional "display" group overrides the
+    name). is_test_name filters plain functions (pytest's test_* convention).
+    Scopes close by brace depth or, when braces is None, by indentation.
+    braces is the language's CodeExtractor: its lexer skips string, template
+    and comment tokens, so only braces in code are counted.
+    """
 
-        cat = art.get("category")
-        title = art.get("title", "")
+    def __init__(self, name, candidates, scope_pattern, braces=None, test_marker=None, is_test_name=None):
+        self.name = name
+        self.candidates = candidates
+        self.scope_pattern = scope_pattern
+        self.brace_tokens = None
+        if braces is not None:
+            token_pattern = braces.token_pattern
+            self.brace_tokens = re.compile(token_pattern.pattern + r'|(?P<brace>[{}])', token_pattern.flags)
+        self.test_marker = test_marker
+        self.is_test_name = is_test_name
 
-        # Business domain: try prefix map first, fallback to title inference
-        if cat and cat not in generic_cats:
-            domain = domain_map.get(cat, None)
-            if domain is None:
-                domain = _infer_domain_from_title(title)
-        else:
-            domain = _infer_domain_from_title(title)
 
-        # Technical layer: follow REQ -> UC -> TASK -> FASE
-        fases = set()
-        # Direct TASK links
-        for tgt in outgoing.get(art["id"], set()):
-            if tgt in task_to_fase:
-                fases.add(task_to_fase[tgt])
-        # Via UCs
-        for src in incoming.get(art["id"], set()):
-            if classify_id(src) == "UC":
-                for tgt in outgoing.get(src, set()):
-                    if tgt in task_to_fase:
-                        fases.add(task_to_fase[tgt])
+def _candidate_lines(keywords):
+    """Matcher for a framework keyword, Refs: or an artifact ID prefix anywhere on a line.
 
-        if fases:
-            # Most frequent layer
-            layers = []
-            for fn in fases:
-                if fn == 0:
-                    layers.append("Infrastructure")
-                elif 1 <= fn <= 6:
-                    layers.append("Backend")
-                elif 7 <= fn <= 8:
-                    layers.append("Frontend")
-                else:
-                    layers.append("Integration/Deployment")
-            layer = Counter(layers).most_common(1)[0][0]
-        else:
-            # Fallback: infer from title keywords instead of showing "Unknown"
-            layer = _infer_layer_from_title(title)
-
-        # Functional category from section or category prefix
-        nfr_cats = {"PERF", "SEC", "SCAL", "AVAIL", "TECH", "CACHE", "OBS", "RATE", "VAL", "I18N", "ACC", "NF"}
-        security_cats = {"SEC", "AUT", "GDP", "GDPR", "DPR"}
-        data_cats = {"RET", "DPR", "AUT", "MNT"}
-        integration_cats = {"NTF", "INC", "DEP", "MON", "REC", "DER"}
-        constraint_cats = {"C"}
-        if cat in nfr_cats:
-            func_cat = "Non-Functional"
-        elif cat in security_cats:
-            func_cat = "Security"
-        elif cat in data_cats:
-            func_cat = "Data"
-        elif cat in integration_cats:
-            func_cat = "Integration"
-        elif cat in constraint_cats:
-            func_cat = "Constraint"
-        else:
-            func_cat = "Functional"
+    Keywords carry no leading \\b so the regex engine can skip ahead by first
+    character; the occasional extra candidate line is rejected by scope_pattern.
+    """
+    return re.compile(keywords + '|' + _TEST_ID_HINT)
 
-        art["classification"] = {
-            "businessDomain": domain,
-            "technicalLayer": layer,
-            "functionalCategory": func_cat,
-        }
 
-        # Stats
-        classification_stats["byDomain"][domain] = classification_stats["byDomain"].get(domain, 0) + 1
-        classification_stats["byLayer"][layer] = classification_stats["byLayer"].get(layer, 0) + 1
-        classification_stats["byCategory"][func_cat] = classification_stats["byCategory"].get(func_cat, 0) + 1
+def _brace_depths(text, brace_tokens):
+    """Return (positions, depths): offsets of code braces and the depth before each, plus the final depth.
 
-    return classification_stats
+    The depth at any offset is depths[bisect_left(positions, offset)].
+    """
+    positions = []
+    depths = [0]
+    depth = 0
+    for m in brace_tokens.finditer(text):
+        if m.lastgroup == "brace":
+            positions.append(m.start())
+            depth += 1 if m.group() == "{" else -1
+            depths.append(depth)
+    return positions, depths
+
+
+def _iter_candidate_lines(pattern, text):
+    """Yield (line_start, line) for each line with at least one pattern hit, in order."""
+    search = pattern.search
+    rfind = text.rfind
+    find = text.find
+    m = search(text)
+    while m:
+        start = rfind("\n", 0, m.start()) + 1
+        end = find("\n", m.end())
+        if end == -1:
+            end = len(text)
+        yield start, text[start:end]
+        m = search(text, end)
+
+
+_JS_TEST_FRAMEWORK = TestFramework(
+    "vitest",
+    _candidate_lines(r'describe|context|suite|it\b|test\b|specify'),
+    re.compile(r'\b(?:(?P<scope>describe|context|suite)|it|test|specify)'
+               r'(?:\.(?:only|skip|todo|concurrent|each\([^)]*\)))*\s*\(\s*(?P<q>[\'"`])(?P<name>.*?)(?P=q)'),
+    braces=CODE_EXTRACTORS[".ts"],
+)
+_PYTEST_FRAMEWORK = TestFramework(
+    "pytest",
+    _candidate_lines(r'def\b|class\b'),
+    re.compile(r'^[ \t]*(?:async[ \t]+)?(?:(?P<scope>class)[ \t]+(?P<cname>\w+)|def[ \t]+(?P<name>\w+))'),
+    is_test_name=lambda name: name.startswith("test"),
+)
+_GO_TEST_FRAMEWORK = TestFramework(
+    "go test",
+    _candidate_lines(r'func\b|\.Run\('),
+    re.compile(r'(?:^func[ \t]+(?P<name>(?:Test|Benchmark|Example|Fuzz)\w*)[ \t]*\(|\b\w+\.Run\(\s*"(?P<sub>[^"]*)")'),
+    braces=CODE_EXTRACTORS[".go"],
+)
+_JUNIT_FRAMEWORK = TestFramework(
+    "junit",
+    _candidate_lines(r'class\b|@Test|@ParameterizedTest|@RepeatedTest|@TestFactory|@DisplayName|void\b|fun\b'),
+    re.compile(r'\b(?:(?P<scope>class)[ \t]+(?P<cname>\w+)|(?:void|fun)[ \t]+(?P<name>\w+)[ \t]*\()'),
+    braces=CODE_EXTRACTORS[".java"],
+    test_marker=re.compile(r'@(?:Test|ParameterizedTest|RepeatedTest|TestFactory)\b'
+                           r'|@DisplayName\(\s*"(?P<display>[^"]*)"'),
+)
 
+TEST_FRAMEWORKS_BY_EXT = {
+    ".ts": _JS_TEST_FRAMEWORK, ".js": _JS_TEST_FRAMEWORK, ".tsx": _JS_TEST_FRAMEWORK,
+    ".jsx": _JS_TEST_FRAMEWORK, ".mjs": _JS_TEST_FRAMEWORK, ".cjs": _JS_TEST_FRAMEWORK,
+    ".py": _PYTEST_FRAMEWORK,
+    ".go": _GO_TEST_FRAMEWORK,
+    ".java": _JUNIT_FRAMEWORK, ".kt": _JUNIT_FRAMEWORK,
+}
+TEST_EXTENSIONS = set(TEST_FRAMEWORKS_BY_EXT)
+
+# Colocated test files picked up from src/ by naming convention
+COLOCATED_TEST_FILE_RE = re.compile(
+    r'(?:\.(?:test|spec)\.[cm]?[jt]sx?|_test\.(?:go|py)|^test_\w+\.py|(?:Test|Tests|IT)\.(?:java|kt))$')
+
+# JS/TS framework detection from imports, most specific first (plain
+# substring checks — much cheaper than a regex scan over the whole file)
+_JS_FRAMEWORK_IMPORTS = [
+    ("vitest", ("'vitest'", '"vitest"')),
+    ("jest", ("@jest/globals", "jest.fn(", "jest.mock(", "jest.spyOn(")),
+    ("mocha", ("'mocha'", '"mocha"', "'chai'", '"chai"')),
+]
+_JS_FRAMEWORK_DEFAULTS = {}  # project_dir -> project-level default framework
 
-def build_graph(project_dir, output_dir, project_name, artifacts, references, all_ref_ids,
-                commits=None, code_refs=None, code_stats=None, test_refs=None, test_stats=None):
-    """Build the traceability graph JSON structure."""
-    if commits is None:
-        commits = []
-    if code_refs is None:
-        code_refs = []
-    if code_stats is None:
-        code_stats = {"totalFiles": 0, "totalSymbols": 0, "symbolsWithRefs": 0}
-    if test_refs is None:
-        test_refs = []
-    if test_stats is None:
-        test_stats = {"totalTestFiles": 0, "totalTests": 0, "testsWithRefs": 0}
 
-    # Read pipeline state
-    pipeline_state_file = os.path.join(project_dir, "pipeline-state.json")
-    pipeline_data = {"currentStage": "unknown", "stages": []}
-    if os.path.exists(pipeline_state_file):
+def _detect_js_test_framework(project_dir):
+    """Project-level default for JS/TS tests: config files, then package.json, then vitest."""
+    try:
+        entries = set(os.listdir(project_dir))
+    except OSError:
+        entries = set()
+    for framework, prefixes in (("vitest", ("vitest.config.", "vitest.workspace.")),
+                                ("jest", ("jest.config.",)),
+                                ("mocha", (".mocharc",))):
+        if any(e.startswith(p) for e in entries for p in prefixes):
+            return framework
+    if "package.json" in entries:
         try:
-            with open(pipeline_state_file, "r", encoding="utf-8") as f:
-                ps = json.load(f)
-            pipeline_data["currentStage"] = ps.get("currentStage", "unknown")
+            with open(os.path.join(project_dir, "package.json"), "r", encoding="utf-8") as f:
+                pkg = json.load(f)
+            deps = {**pkg.get("dependencies", {}), **pkg.get("devDependencies", {})}
+            for framework in ("vitest", "jest", "mocha"):
+                if framework in deps:
+                    return framework
         except Exception:
             pass
+    return "vitest"
+
+
+def _file_test_framework(fpath, text, project_dir):
+    """Return (TestFramework, framework label) for a test file, or (None, None)."""
+    spec = TEST_FRAMEWORKS_BY_EXT.get(os.path.splitext(fpath)[1].lower())
+    if spec is not _JS_TEST_FRAMEWORK:
+        return spec, spec.name if spec else None
+    for framework, needles in _JS_FRAMEWORK_IMPORTS:
+        if any(needle in text for needle in needles):
+            return spec, framework
+    if project_dir not in _JS_FRAMEWORK_DEFAULTS:
+        _JS_FRAMEWORK_DEFAULTS[project_dir] = _detect_js_test_framework(project_dir)
+    return spec, _JS_FRAMEWORK_DEFAULTS[project_dir]
+
+
+def collect_test_files(project_dir):
+    """Collect test files under the tests scope's roots plus colocated tests under its colocated roots (src/)."""
+    scope = scan_scopes(project_dir)["tests"]
+    files = [fpath for fpath, fname in scope.walk()
+             if os.path.splitext(fname)[1].lower() in TEST_EXTENSIONS]
+    seen = set(files)
+    files.extend(fpath for fpath, fname in scope.walk(scope.colocated)
+                 if fpath not in seen and COLOCATED_TEST_FILE_RE.search(fname))
+    return files
 
-    # Count artifacts per stage
-    stage_counts = {}
-    for art in artifacts.values():
-        stage = art.get("stage", "unknown")
-        stage_counts[stage] = stage_counts.get(stage, 0) + 1
 
-    # Build pipeline stages
-    stage_order = [
-        "requirements-engineer",
-        "specifications-engineer",
-        "spec-auditor",
-        "test-planner",
-        "plan-architect",
-        "task-generator",
-        "task-implementer",
-    ]
+def _scan_test_file(fpath, project_dir, text=None):
+    """Scan one test file for Refs: comments and test descriptions.
 
-    if os.path.exists(pipeline_state_file):
+    Only candidate lines (suite/test openers, Refs:, artifact IDs) are
+    visited. Enclosing suites are kept on a scope stack, so nested
+    describe()/class/t.Run() names are joined with " > "; braces inside
+    strings, templates and comments do not close a scope. Returns
+    (test_refs, total_tests, tests_with_refs), or None if the file cannot
+    be read. text is parsed instead of reading fpath when given.
+    """
+    regex_scope(fpath)
+    if text is None:
         try:
-            with open(pipeline_state_file, "r", encoding="utf-8") as f:
-                ps = json.load(f)
-            stages_data = ps.get("stages", {})
+            with open(fpath, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
         except Exception:
-            stages_data = {}
-    else:
-        stages_data = {}
+            return None
 
-    # Count audit files for spec-auditor stage (findings aren't graph artifacts)
-    audits_dir = os.path.join(project_dir, "audits")
-    if os.path.isdir(audits_dir):
-        audit_files = [f for f in os.listdir(audits_dir) if f.lower().endswith(".md")]
-        stage_counts["spec-auditor"] = stage_counts.get("spec-auditor", 0) + len(audit_files)
+    spec, framework = _file_test_framework(fpath, text, project_dir)
+    if spec is None:
+        return [], 0, 0
 
-    # Count test plan documents for test-planner stage
-    test_dir = os.path.join(project_dir, "test")
-    if os.path.isdir(test_dir):
-        test_files = [f for f in os.listdir(test_dir) if f.lower().endswith(".md")]
-        stage_counts["test-planner"] = stage_counts.get("test-planner", 0) + len(test_files)
+    test_refs = []
+    total_tests = 0
+    tests_with_refs = 0
+    fname = os.path.basename(fpath)
+    frel = _rel_path(fpath, project_dir)
+    stack = []  # (name, level) — level is the opener's brace depth or indentation
+    line_idx = 0
+    pos = 0
+    pending_test = False
+    pending_display = None
+    braces = spec.brace_tokens is not None
+    if braces:
+        brace_positions, brace_depths = _brace_depths(text, spec.brace_tokens)
+    test_marker = spec.test_marker
+    scope_finditer = spec.scope_pattern.finditer
+    count = text.count
+
+    for start, line in _iter_candidate_lines(spec.candidates, text):
+        line_idx += count("\n", pos, start)
+        if braces:
+            level = brace_depths[bisect_left(brace_positions, start)]
+        else:
+            level = len(line) - len(line.lstrip())
+        pos = start
+        while stack and level <= stack[-1][1]:
+            stack.pop()
+
+        if test_marker is not None:
+            for mm in test_marker.finditer(line):
+                if mm.group("display") is not None:
+                    pending_display = mm.group("display")
+                else:
+                    pending_test = True
+
+        # Scope openers on this line (suites, classes, test cases)
+        descriptions = []
+        line_has_test = False
+        for sm in scope_finditer(line):
+            groups = sm.groupdict()
+            name = groups.get("name") or groups.get("cname") or groups.get("sub") or ""
+            if groups.get("scope"):
+                is_test = False
+            elif test_marker is not None:
+                is_test = pending_test
+                if is_test and pending_display:
+                    name = pending_display
+                pending_test = False
+                pending_display = None
+            elif spec.is_test_name is not None:
+                is_test = spec.is_test_name(name)
+            else:
+                is_test = True
+            line_has_test = line_has_test or is_test
+            if braces:
+                opener_level = brace_depths[bisect_left(brace_positions, start + sm.start())]
+            else:
+                opener_level = level
+            stack.append((name, opener_level))
+            descriptions.append(name)
+        if line_has_test:
+            total_tests += 1
+
+        # Find refs
+        ref_ids = []
+        rm = TEST_REFS_PATTERN.search(line) if "Ref" in line else None
+        if rm:
+            raw = rm.group(1)
+            ref_ids = [r.strip() for r in re.split(r'[,\s]+', raw) if r.strip() and classify_id(r.strip())]
+
+        # Find refs in suite/test descriptions
+        for desc_text in descriptions:
+            for m in REF_PATTERN.finditer(desc_text):
+                rid = m.group(1)
+                if rid not in ref_ids:
+                    ref_ids.append(rid)
 
-    # Count code + test files for task-implementer stage
-    impl_count = code_stats.get("totalFiles", 0) + test_stats.get("totalTestFiles", 0)
-    if impl_count > 0:
-        stage_counts["task-implementer"] = impl_count
+        if ref_ids:
+            test_name = " > ".join(name for name, _ in stack if name) or f"{fname}:{line_idx+1}"
+            tests_with_refs += 1
+            test_refs.append({
+                "file": frel,
+                "line": line_idx + 1,
+                "testName": test_name,
+                "framework": framework,
+                "refIds": ref_ids,
+            })
 
-    # Fallback: when a stage is done/stale but count is 0, use summary.metrics from pipeline-state.json
-    # This avoids showing misleading "0" for completed stages whose artifacts aren't captured by graph scanning
-    # Each entry: (metric_keys_to_sum, label_override_when_fallback_used)
-    SUMMARY_METRIC_FALLBACKS = {
-        "test-planner": (["bdd_scenarios", "test_matrices", "perf_scenarios"], "scenarios"),
-        "task-implementer": (["tasks_completed", "commits", "tests_passed"], "tasks/commits"),
-        "spec-auditor": (["total_findings"], "findings"),
-        "plan-architect": (["total_fases", "components"], "phases"),
-        "task-generator": (["total_tasks"], "tasks"),
-        "security-auditor": (["total_findings"], "findings"),
-        "tech-designer": (["dimensions_analyzed"], "dimensions"),
-        "ux-designer": (["dimensions_analyzed"], "dimensions"),
-    }
-    summary_label_overrides = {}
-    for sname, (metric_keys, label_override) in SUMMARY_METRIC_FALLBACKS.items():
-        if stage_counts.get(sname, 0) == 0:
-            sd = stages_data.get(sname, {})
-            if sd.get("status") in ("done", "stale"):
-                summary = sd.get("summary")
-                if summary and isinstance(summary.get("metrics"), dict):
-                    metrics = summary["metrics"]
+    return test_refs, total_tests, tests_with_refs
+
+
+def _merge_test_results(total_test_files, results):
+    """Merge per-file test scan results into (test_refs, test_stats)."""
+    test_refs = []
+    total_tests = 0
+    tests_with_refs = 0
+    for result in results:
+        if result is None:
+            continue
+        file_refs, file_tests, file_with_refs = result
+        test_refs.extend(dict(tr) for tr in file_refs)
+        total_tests += file_tests
+        tests_with_refs += file_with_refs
+    log(f"  Tests: {total_test_files} files, {total_tests} tests, {tests_with_refs} with refs")
+    return test_refs, {
+        "totalTestFiles": total_test_files,
+        "totalTests": total_tests,
+        "testsWithRefs": tests_with_refs,
+    }
+
+
+def scan_test_refs(project_dir, test_files=None):
+    """Scan tests/ (or the given test_files) for Refs: comments and test descriptions."""
+    if test_files is None:
+        test_files = collect_test_files(project_dir)
+    current_phase().add_files(test_files)
+    result = _merge_test_results(len(test_files), (_scan_test_file(fpath, project_dir) for fpath in test_files))
+    regex_scope(None)
+    return result
+
+
+# ──────────────────────────────────────────────────────────
+# Test result ingestion (JUnit XML)
+# ──────────────────────────────────────────────────────────
+
+_TEST_NAME_NOISE_RE = re.compile(r'(?:\(\)|\[[^\]]*\])$')  # JUnit "name()", pytest "name[param]"
+_TEST_NAME_SPACE_RE = re.compile(r'[\s_]+')
+
+
+def _norm_test_segments(segments):
+    """Normalize test name segments (case, spaces and underscores folded), dropping empty ones."""
+    normed = (_TEST_NAME_SPACE_RE.sub(" ", seg).strip().lower() for seg in segments)
+    return [seg for seg in normed if seg]
+
+
+def _norm_report_path(path, project_dir):
+    """Project-relative forward-slash path for a file named in a test or coverage report."""
+    path = path.replace("\\", "/")
+    if os.path.isabs(path):
+        path = _rel_path(path, project_dir)
+    return path[2:] if path.startswith("./") else path
+
+
+def collect_result_files(report_paths, extensions=(".xml",)):
+    """Expand report paths (files or directories) into report files, in sorted order."""
+    files = []
+    for path in report_paths:
+        if os.path.isdir(path):
+            for root, dirs, filenames in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                files.extend(os.path.join(root, f) for f in sorted(filenames)
+                             if f.lower().endswith(extensions))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            log(f"  Warning: report not found: {path}")
+    return files
+
+
+def _iter_junit_cases(xml_path):
+    """Stream <testcase> results from a JUnit XML report in constant memory.
+
+    Yields (attrib, status, seconds). Every element is cleared and detached
+    from its parent as soon as it ends, so a multi-hundred-MB report never
+    holds more than the currently open path in memory.
+    """
+    stack = []
+    case = None
+    status = "passed"
+    for event, elem in ET.iterparse(xml_path, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if elem.tag == "testcase":
+                case = dict(elem.attrib)
+                status = "passed"
+            continue
+        stack.pop()
+        tag = elem.tag
+        if case is not None:
+            if tag in ("failure", "error"):
+                status = "failed"
+            elif tag == "skipped" and status != "failed":
+                status = "skipped"
+            elif tag == "testcase":
+                try:
+                    seconds = float(case.get("time") or 0)
+                except ValueError:
+                    seconds = 0.0
+                yield case, status, seconds
+                case = None
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def _index_test_refs(test_refs):
+    """Hash index over scanned testRefs: (file, name key) and (None, name key) -> [testRef].
+
+    File-level refs (a header Refs: line outside any test) are indexed by file
+    under ("file", path) and receive every result reported for that file.
+    """
+    index = {}
+    for tr in test_refs:
+        name = tr.get("testName", "")
+        if name == f"{os.path.basename(tr['file'])}:{tr['line']}":
+            index.setdefault(("file", tr["file"]), []).append(tr)
+            continue
+        key = " ".join(_norm_test_segments(name.split(" > ")))
+        index.setdefault((tr["file"], key), []).append(tr)
+        index.setdefault((None, key), []).append(tr)
+    return index
+
+
+def _result_file(attrib, project_dir, memo):
+    """Test file a result belongs to: its file attribute, or a path-like classname."""
+    raw = attrib.get("file") or attrib.get("classname", "")
+    if raw not in memo:
+        if attrib.get("file") or "/" in raw or os.path.splitext(raw)[1] in TEST_EXTENSIONS:
+            memo[raw] = _norm_report_path(raw, project_dir)
+        else:
+            memo[raw] = None
+    return memo[raw]
+
+
+def _result_name_keys(attrib, file):
+    """Name keys to look up for one result: every prefix of its scope path, with and without its class."""
+    name = _TEST_NAME_NOISE_RE.sub("", attrib.get("name", ""))
+    if " > " in name:
+        segments = name.split(" > ")
+    elif "/" in name and " " not in name:
+        segments = name.split("/")  # go test subtests: TestLogin/rejects_bad_user
+    else:
+        segments = [name]
+    variants = [_norm_test_segments(segments)]
+    classname = attrib.get("classname", "")
+    if classname and classname != file and "/" not in classname:
+        scope = _norm_test_segments(classname.rsplit(".", 1)[-1].split("$"))  # Outer$Inner
+        if scope and not " ".join(variants[0]).startswith(" ".join(scope)):
+            variants.append(scope + variants[0])
+    keys = []
+    for normed in variants:
+        key = ""
+        for seg in normed:
+            key = f"{key} {seg}" if key else seg
+            keys.append(key)
+    return keys
+
+
+def _match_test_result(index, attrib, project_dir, file_memo):
+    """Return the testRefs a result belongs to (exact test, enclosing suites, file-level refs)."""
+    file = _result_file(attrib, project_dir, file_memo)
+    keys = _result_name_keys(attrib, file)
+    matched = []
+    for scope in ((file, None) if file else (None,)):
+        for key in keys:
+            refs = index.get((scope, key))
+            if refs:
+                matched.extend(refs)
+        if matched:
+            break
+    if file:
+        matched.extend(index.get(("file", file), ()))
+    return matched
+
+
+def ingest_test_results(report_paths, test_refs, project_dir):
+    """Attach pass/fail/skip status and durations from JUnit XML reports to testRefs.
+
+    Each matched testRef gets a "result" object ({status, passed, failed,
+    skipped, durationMs}); a ref matched by several cases (parametrized
+    tests, suites) aggregates them and fails if any of them failed.
+    Returns testResultStats for the graph.
+    """
+    report_files = collect_result_files(report_paths)
+    current_phase().add_files(report_files)
+    index = _index_test_refs(test_refs)
+    file_memo = {}
+    stats = {"reportFiles": len(report_files), "totalResults": 0, "matchedResults": 0,
+             "passed": 0, "failed": 0, "skipped": 0, "durationMs": 0}
+
+    for xml_path in report_files:
+        try:
+            for attrib, status, seconds in _iter_junit_cases(xml_path):
+                ms = int(round(seconds * 1000))
+                stats["totalResults"] += 1
+                stats[status] += 1
+                stats["durationMs"] += ms
+                refs = _match_test_result(index, attrib, project_dir, file_memo)
+                if refs:
+                    stats["matchedResults"] += 1
+                seen = set()
+                for tr in refs:
+                    if id(tr) in seen:
+                        continue
+                    seen.add(id(tr))
+                    result = tr.setdefault("result", {"status": "passed", "passed": 0, "failed": 0,
+                                                      "skipped": 0, "durationMs": 0})
+                    result[status] += 1
+                    result["durationMs"] += ms
+        except Exception as e:
+            log(f"  Warning: could not parse test report {xml_path}: {e}")
+
+    for tr in test_refs:
+        result = tr.get("result")
+        if result:
+            result["status"] = _result_status(result)
+
+    log(f"  Test results: {stats['reportFiles']} reports, {stats['totalResults']} cases "
+        f"({stats['passed']} passed, {stats['failed']} failed, {stats['skipped']} skipped), "
+        f"{stats['matchedResults']} matched to testRefs")
+    return stats
+
+
+def _result_status(counts):
+    """Overall status for aggregated result counts: failed > passed > skipped > not-run."""
+    if counts["failed"]:
+        return "failed"
+    if counts["passed"]:
+        return "passed"
+    if counts["skipped"]:
+        return "skipped"
+    return "not-run"
+
+
+# ──────────────────────────────────────────────────────────
+# Line coverage ingestion (LCOV / Cobertura)
+# ──────────────────────────────────────────────────────────
+
+COVERAGE_REPORT_EXTENSIONS = (".info", ".lcov", ".xml")
+
+
+def _iter_lcov_lines(path, project_dir):
+    """Stream (file, line, hits) from an LCOV tracefile (SF:/DA: records)."""
+    current = None
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for raw in f:
+            if raw.startswith("DA:"):
+                if current is None:
+                    continue
+                parts = raw[3:].split(",", 2)
+                try:
+                    yield current, int(parts[0]), int(float(parts[1]))
+                except (ValueError, IndexError):
+                    continue
+            elif raw.startswith("SF:"):
+                current = _norm_report_path(raw[3:].strip(), project_dir)
+            elif raw.startswith("end_of_record"):
+                current = None
+
+
+def _resolve_cobertura_file(filename, sources, project_dir):
+    """Map a Cobertura class filename onto a project-relative path via its <source> roots."""
+    for source in sources:
+        candidate = os.path.join(source, filename)
+        if os.path.exists(candidate):
+            return _norm_report_path(os.path.abspath(candidate), project_dir)
+    return _norm_report_path(filename, project_dir)
+
+
+def _iter_cobertura_lines(path, project_dir):
+    """Stream (file, line, hits) from a Cobertura XML report in constant memory."""
+    stack = []
+    sources = []
+    current = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if not stack and elem.tag != "coverage":
+                return  # not a Cobertura report (e.g. a JUnit file in the same directory)
+            stack.append(elem)
+            if elem.tag == "class":
+                current = _resolve_cobertura_file(elem.get("filename", ""), sources, project_dir)
+            continue
+        stack.pop()
+        if elem.tag == "source" and elem.text:
+            source = elem.text.strip()
+            sources.append(source if os.path.isabs(source) else os.path.join(project_dir, source))
+        elif elem.tag == "line" and current is not None:
+            try:
+                yield current, int(elem.get("number")), int(float(elem.get("hits", "0")))
+            except (TypeError, ValueError):
+                pass
+        elif elem.tag == "class":
+            current = None
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def load_coverage(report_paths, project_dir):
+    """Read LCOV and Cobertura reports into {file: {line: hits}}.
+
+    Reports are streamed line by line (LCOV) or element by element
+    (Cobertura); hits for the same line across reports are summed.
+    """
+    coverage = {}
+    report_files = collect_result_files(report_paths, COVERAGE_REPORT_EXTENSIONS)
+    current_phase().add_files(report_files)
+    parsed = 0
+    for path in report_files:
+        reader = _iter_cobertura_lines if path.lower().endswith(".xml") else _iter_lcov_lines
+        found = False
+        try:
+            for file, line, hits in reader(path, project_dir):
+                found = True
+                lines = coverage.get(file)
+                if lines is None:
+                    lines = coverage[file] = {}
+                lines[line] = lines.get(line, 0) + hits
+        except Exception as e:
+            log(f"  Warning: could not parse coverage report {path}: {e}")
+        parsed += found
+    total = sum(len(lines) for lines in coverage.values())
+    log(f"  Coverage: {parsed} reports, {len(coverage)} files, {total} instrumented lines")
+    return {"reportFiles": parsed, "files": coverage}
+
+
+class IntervalIndex:
+    """Static centered interval tree over closed [start, end] line ranges.
+
+    Built once per file; query(line) returns the payloads of every range
+    containing the line in O(log n + k), so nested symbols (a method inside
+    a class) all receive the line.
+    """
+
+    def __init__(self, intervals):
+        self._root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        center = points[len(points) // 2]
+        left, right, here = [], [], []
+        for iv in intervals:
+            if iv[1] < center:
+                left.append(iv)
+            elif iv[0] > center:
+                right.append(iv)
+            else:
+                here.append(iv)
+        return (center,
+                sorted(here, key=lambda iv: iv[0]),
+                sorted(here, key=lambda iv: -iv[1]),
+                self._build(left),
+                self._build(right))
+
+    def query(self, point):
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                for start, _, payload in by_start:
+                    if start > point:
+                        break
+                    found.append(payload)
+                node = left
+            elif point > center:
+                for _, end, payload in by_end:
+                    if end < point:
+                        break
+                    found.append(payload)
+                node = right
+            else:
+                found.extend(payload for _, _, payload in by_start)
+                break
+        return found
+
+
+def _coverage_intervals(graph, symbols):
+    """Collect per-file (start, end, payload) symbol ranges for coverage mapping.
+
+    Ranges come from codeIntelligence symbols (startLine/endLine) and from
+    codeRefs; a codeRef has only a start line, so it ends where the next
+    known symbol in the file starts (a file-level ref spans the whole file).
+    Payloads are ("ref", codeRef) or ("symbol", refIds).
+    """
+    by_file = {}
+    starts = {}
+    for sym in symbols:
+        ref_ids = set(sym.get("artifactRefs", [])) | set(sym.get("inferredRefs", []))
+        start, end = sym.get("startLine"), sym.get("endLine")
+        fp = sym.get("filePath")
+        if fp and start:
+            starts.setdefault(fp, set()).add(start)
+            if ref_ids and end:
+                by_file.setdefault(fp, []).append((start, end, ("symbol", frozenset(ref_ids))))
+
+    code_refs = {}
+    for art in graph.get("artifacts", []):
+        for cr in art.get("codeRefs", []):
+            code_refs[id(cr)] = cr
+    for cr in code_refs.values():
+        if cr.get("symbolType") != "file":
+            starts.setdefault(cr["file"], set()).add(cr.get("line", 0))
+
+    sorted_starts = {fp: sorted(s) for fp, s in starts.items()}
+    for cr in code_refs.values():
+        fp = cr["file"]
+        if cr.get("symbolType") == "file" or not cr.get("line"):
+            start, end = 1, float("inf")
+        else:
+            start = cr["line"]
+            file_starts = sorted_starts[fp]
+            i = bisect.bisect_right(file_starts, start)
+            end = file_starts[i] - 1 if i < len(file_starts) else float("inf")
+        by_file.setdefault(fp, []).append((start, end, ("ref", cr)))
+    return by_file
+
+
+def apply_coverage(graph, coverage, code_intel=None):
+    """Attach executed-line ratios to codeRefs and artifacts; return coverageStats.
+
+    Each instrumented line of a referenced file is looked up in that file's
+    IntervalIndex once. codeRefs get coverage {lines, covered, ratio} for
+    their own range; artifacts get lineCoverage over the distinct lines of
+    all their codeRefs and indexed symbols.
+    """
+    files = coverage["files"]
+    symbols = code_intel.symbols_for(files) if code_intel is not None and code_intel.indexed else []
+    intervals = _coverage_intervals(graph, symbols)
+    ref_counts = {}   # id(codeRef) -> [lines, covered]
+    art_lines = {}    # artifact id -> {(file, line): covered}
+
+    for fp, ranges in intervals.items():
+        lines = files.get(fp)
+        if not lines:
+            continue
+        index = IntervalIndex(ranges)
+        for line, hits in lines.items():
+            executed = hits > 0
+            for kind, payload in index.query(line):
+                if kind == "ref":
+                    counts = ref_counts.get(id(payload))
+                    if counts is None:
+                        counts = ref_counts[id(payload)] = [payload, 0, 0]
+                    counts[1] += 1
+                    counts[2] += executed
+                    ref_ids = payload.get("refIds", [])
+                else:
+                    ref_ids = payload
+                for rid in ref_ids:
+                    art_lines.setdefault(rid, {})[(fp, line)] = executed
+
+    def _ratio(total, covered):
+        return {"lines": total, "covered": covered,
+                "ratio": round(covered / total, 3) if total else 0}
+
+    for cr, total, covered in ref_counts.values():
+        cr["coverage"] = _ratio(total, covered)
+    for art in graph.get("artifacts", []):
+        lines = art_lines.get(art["id"])
+        if lines:
+            art["lineCoverage"] = _ratio(len(lines), sum(lines.values()))
+
+    total_lines = sum(len(lines) for lines in files.values())
+    covered_lines = sum(1 for lines in files.values() for hits in lines.values() if hits > 0)
+    stats = _ratio(total_lines, covered_lines)
+    stats.update({
+        "reportFiles": coverage["reportFiles"],
+        "files": len(files),
+        "referencedFiles": sum(1 for fp in intervals if fp in files),
+        "artifactsWithCoverage": sum(1 for art in graph.get("artifacts", []) if "lineCoverage" in art),
+    })
+    return stats
+
+
+# ──────────────────────────────────────────────────────────
+# Code intelligence sidecar
+# ──────────────────────────────────────────────────────────
+
+CODE_INTELLIGENCE_FILE = "code-intelligence.jsonl"
+CODE_INTELLIGENCE_FORMAT = "sdd-code-intelligence"
+CODE_INTELLIGENCE_VERSION = 1
+_CI_SECTIONS = ("symbols", "callGraph", "processes")
+_CI_HEADER_FIELDS = ("indexed", "indexedAt", "engine", "engineVersion", "stats")
+
+
+def write_code_intelligence(path, ci):
+    """Write a codeIntelligence block as a JSON Lines sidecar; return its header.
+
+    Line 1 is the header (format, version, engine, sha256 of the body, stats)
+    with byte ranges — relative to the end of the header line — for each
+    section and for each file's block of symbols. Every following line is
+    one symbol, call-graph edge or process, so readers can seek straight to
+    the files they need.
+    """
+    body = bytearray()
+    files = {}
+    sections = {}
+
+    def emit(record):
+        body.extend(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        body.extend(b"\n")
+
+    by_file = {}
+    for sym in ci.get("symbols", []):
+        by_file.setdefault(sym.get("filePath", ""), []).append(sym)
+    start = len(body)
+    for fp in sorted(by_file):
+        file_start = len(body)
+        for sym in by_file[fp]:
+            emit(sym)
+        files[fp] = [file_start, len(body) - file_start]
+    sections["symbols"] = [start, len(body) - start]
+    for name in _CI_SECTIONS[1:]:
+        start = len(body)
+        for record in ci.get(name, []):
+            emit(record)
+        sections[name] = [start, len(body) - start]
+
+    header = {"format": CODE_INTELLIGENCE_FORMAT, "version": CODE_INTELLIGENCE_VERSION}
+    header.update((key, ci[key]) for key in _CI_HEADER_FIELDS if key in ci)
+    header["hash"] = "sha256:" + hashlib.sha256(body).hexdigest()
+    header["sections"] = sections
+    header["files"] = files
+
+    dir_name = os.path.dirname(path) or "."
+    os.makedirs(dir_name, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            f.write(b"\n")
+            f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return header
+
+
+class CodeIntelligenceSidecar:
+    """Lazy reader for a code-intelligence.jsonl sidecar.
+
+    Only the header line is read up front; symbols are read per file by
+    seeking to the byte ranges the header records, and the call graph and
+    processes are never touched unless load() is called.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._header = None
+        self._body_start = 0
+
+    @property
+    def header(self):
+        if self._header is None:
+            with open(self.path, "rb") as f:
+                line = f.readline()
+            header = json.loads(line)
+            if header.get("format") != CODE_INTELLIGENCE_FORMAT:
+                raise ValueError(f"{self.path} is not a code intelligence sidecar")
+            if header.get("version", 0) > CODE_INTELLIGENCE_VERSION:
+                raise ValueError(f"{self.path} has unsupported sidecar version {header.get('version')}")
+            self._header = header
+            self._body_start = len(line)
+        return self._header
+
+    @property
+    def indexed(self):
+        return bool(self.header.get("indexed"))
+
+    def ref(self):
+        """Reference stored in the main graph in place of the inline block."""
+        ref = {"path": os.path.basename(self.path)}
+        ref.update((key, self.header[key]) for key in ("format", "version") + _CI_HEADER_FIELDS + ("hash",)
+                   if key in self.header)
+        return ref
+
+    def _read_ranges(self, ranges):
+        records = []
+        with open(self.path, "rb") as f:
+            for start, length in ranges:
+                f.seek(self._body_start + start)
+                records.extend(json.loads(line) for line in f.read(length).splitlines() if line)
+        return records
+
+    def symbols_for(self, files):
+        """Symbols defined in the given files (in sidecar order)."""
+        index = self.header.get("files", {})
+        return self._read_ranges(index[fp] for fp in sorted(set(files)) if fp in index)
+
+    def section(self, name):
+        span = self.header.get("sections", {}).get(name)
+        return self._read_ranges([span]) if span else []
+
+    def load(self):
+        """The full codeIntelligence block, as code-index produced it."""
+        ci = {key: self.header[key] for key in _CI_HEADER_FIELDS if key in self.header}
+        for name in _CI_SECTIONS:
+            ci[name] = self.section(name)
+        return ci
+
+
+_INLINE_CI_KEY_RE = re.compile(rb'"codeIntelligence"\s*:')
+
+
+def resolve_code_intelligence(output_dir):
+    """Return the project's CodeIntelligenceSidecar, or None when code-index has not run.
+
+    A codeIntelligence block written inline into traceability-graph.json (by
+    an older code-index run) is moved into the sidecar first. The previous
+    graph is only parsed when a byte scan finds the inline key, so the usual
+    regeneration never reads it back.
+    """
+    graph_file = os.path.join(output_dir, "traceability-graph.json")
+    sidecar_path = os.path.join(output_dir, CODE_INTELLIGENCE_FILE)
+    try:
+        with open(graph_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            has_inline = _INLINE_CI_KEY_RE.search(mm) is not None
+    except (OSError, ValueError):
+        has_inline = False  # missing or empty graph
+    if has_inline:
+        try:
+            with open(graph_file, "r", encoding="utf-8") as f:
+                inline = json.load(f).get("codeIntelligence")
+            if inline:
+                write_code_intelligence(sidecar_path, inline)
+                log(f"  Moved inline codeIntelligence to {CODE_INTELLIGENCE_FILE}")
+        except Exception as e:
+            log(f"  Warning: could not migrate inline codeIntelligence: {e}")
+    if not os.path.exists(sidecar_path):
+        return None
+    sidecar = CodeIntelligenceSidecar(sidecar_path)
+    try:
+        sidecar.header
+    except Exception as e:
+        log(f"  Warning: ignoring {sidecar_path}: {e}")
+        return None
+    return sidecar
+
+
+# ──────────────────────────────────────────────────────────
+# Audits, classification and graph assembly
+# ──────────────────────────────────────────────────────────
+
+# Summary table rows: | <label> | <value> |. One alternation with a group per
+# field replaces a separate search per field; the closing pipe is a lookahead
+# so adjacent cells ("| High | 3 | Low | 1 |") are all visible to finditer.
+_AUDIT_FIELD_RE = re.compile(
+    r'\|\s*(?:'
+    r'(?P<totalFindings>Findings in audit|Total hallazgos|Total findings)'
+    r'|(?P<critical>Criticos|Critical|Cr[ií]ticos)'
+    r'|(?P<high>Altos|High)'
+    r'|(?P<medium>Medios|Medium)'
+    r'|(?P<low>Bajos|Low)'
+    r'|(?P<corrected>Corrections applied|Correcciones aplicadas|Corrected)'
+    r'|(?P<accepted>Accepted|Aceptados)'
+    r'|(?P<deferred>Deferred|Diferidos)'
+    r'|(?P<gate>3C Gate|3C)'
+    r')\s*\|\s*(?P<value>\d+|PASS|FAIL)(?P<rest>\s*/?\s*\d*)\s*(?=\|)',
+    re.IGNORECASE,
+)
+# Progression table row: | vN.N | N | N | N | N | PASS/FAIL |
+_AUDIT_PROGRESSION_RE = re.compile(
+    r'\|\s*(v[\d.]+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(PASS|FAIL)\s*\|', re.IGNORECASE
+)
+_AUDIT_FILE_VERSION_RE = re.compile(r'[-_]v(\d+(?:\.\d+)*)', re.IGNORECASE)
+_AUDIT_FIELDS = ("totalFindings", "critical", "high", "medium", "low",
+                 "corrected", "accepted", "deferred", "gate")
+AUDIT_CACHE_FILE = ".audit-cache.json"
+
+
+def _parse_audit(content):
+    """Extract the summary fields and progression rows of one audit report.
+
+    Returns {"fields": {field: value}, "progression": [rows]}; a field is
+    present only if the report has its row (first occurrence wins).
+    """
+    fields = {}
+    for m in _AUDIT_FIELD_RE.finditer(content):
+        name = next(f for f in _AUDIT_FIELDS if m.group(f) is not None)
+        value = m.group("value")
+        if name in fields or (m.group("rest").strip() and name != "corrected"):
+            continue  # only "Corrected" rows may read "6/10"
+        if name == "gate":
+            if not value.isdigit():
+                fields[name] = value.upper()
+        elif value.isdigit():
+            fields[name] = int(value)
+    progression = [{
+        "version": row[0],
+        "findings": int(row[1]),
+        "fixed": int(row[2]),
+        "accepted": int(row[3]),
+        "deferred": int(row[4]),
+        "gate": row[5].upper(),
+    } for row in _AUDIT_PROGRESSION_RE.findall(content)]
+    return {"fields": fields, "progression": progression}
+
+
+def _load_audit_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache.get("files", {}) if cache.get("version") == 1 else {}
+    except Exception:
+        return {}
+
+
+def _cached_audit(fpath, entry):
+    """Return (parsed, entry) for one audit file, reading it only when needed.
+
+    An unchanged (mtime, size) reuses the cached parse without opening the
+    file; a touched file whose sha256 is unchanged reuses it after one read.
+    Returns (None, None) if the file cannot be read.
+    """
+    sig = _file_signature(fpath)
+    if sig is None:
+        return None, None
+    if entry and entry.get("mtimeNs") == sig[0] and entry.get("size") == sig[1]:
+        return entry["parsed"], entry
+    try:
+        with open(fpath, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None, None
+    digest = hashlib.sha256(data).hexdigest()
+    if entry and entry.get("sha256") == digest:
+        parsed = entry["parsed"]
+    else:
+        regex_scope(fpath)
+        parsed = _parse_audit(data.decode("utf-8", errors="replace"))
+    return parsed, {"mtimeNs": sig[0], "size": sig[1], "sha256": digest, "parsed": parsed}
+
+
+def _audit_version_key(version):
+    """Comparable key for "v2", "v2.0", "V2.0.0" (trailing zero components ignored)."""
+    parts = [int(p) for p in version.lstrip("vV").split(".") if p.isdigit()]
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def _audit_history(progression, per_file):
+    """Per-version history: the newest progression table plus versioned audits it lacks.
+
+    per_file is [(fname, parsed)] oldest first. A file whose name carries a
+    version (AUDIT-v1.2.md) adds that version's row if the progression table
+    lacks it, and attaches its file and severity breakdown to the row either
+    way. Rows are sorted by version.
+    """
+    rows = {_audit_version_key(row["version"]): dict(row) for row in progression}
+    for fname, parsed in per_file:
+        vm = _AUDIT_FILE_VERSION_RE.search(fname)
+        if not vm:
+            continue
+        key = _audit_version_key(vm.group(1))
+        fields = parsed["fields"]
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                "version": "v" + vm.group(1),
+                "findings": fields.get("totalFindings", 0),
+                "fixed": fields.get("corrected", 0),
+                "accepted": fields.get("accepted", 0),
+                "deferred": fields.get("deferred", 0),
+                "gate": fields.get("gate"),
+            }
+        row["file"] = f"audits/{fname}"
+        row["bySeverity"] = {sev: fields.get(sev, 0) for sev in ("critical", "high", "medium", "low")}
+    return [rows[key] for key in sorted(rows)]
+
+
+def scan_audits(project_dir, cache_path=None):
+    """Scan audits/*.md for severity breakdown, 3C gate status, corrections, and progression.
+
+    Files are visited newest first (reverse name order) and each field takes
+    the value from the newest report that has it; once every field and the
+    progression table are known, older reports are read only for history
+    versions the progression table lacks. Per-file parses are cached by
+    (mtime, size) and sha256 in cache_path, so an unchanged audit is never
+    re-read.
+    """
+    audits_dir = os.path.join(project_dir, "audits")
+    result = {
+        "auditFiles": [],
+        "latestGate": None,
+        "totalFindings": 0,
+        "bySeverity": {"critical": 0, "high": 0, "medium": 0, "low": 0},
+        "corrected": 0,
+        "accepted": 0,
+        "deferred": 0,
+        "progression": [],
+        "history": [],
+    }
+
+    if not os.path.isdir(audits_dir):
+        return result
+
+    md_files = sorted(
+        [f for f in os.listdir(audits_dir) if f.lower().endswith(".md")]
+    )
+    if not md_files:
+        return result
+
+    result["auditFiles"] = [f"audits/{f}" for f in md_files]
+
+    old_cache = _load_audit_cache(cache_path)
+    cache = {}
+    resolved = {}
+    progression = None
+    known_versions = set()
+    per_file = []
+    dirty = False
+
+    for fname in reversed(md_files):
+        fpath = os.path.join(audits_dir, fname)
+        entry = old_cache.get(fname)
+        if progression is not None and len(resolved) == len(_AUDIT_FIELDS):
+            # Everything is resolved: older reports only matter for history
+            # rows the progression table lacks, or when already cached.
+            vm = _AUDIT_FILE_VERSION_RE.search(fname)
+            cached = entry and _file_signature(fpath) == (entry.get("mtimeNs"), entry.get("size"))
+            if vm is None or (_audit_version_key(vm.group(1)) in known_versions and not cached):
+                if entry:
+                    cache[fname] = entry
+                continue
+            parsed, new_entry = _cached_audit(fpath, entry)
+            if parsed is not None:
+                dirty = dirty or new_entry is not entry
+                cache[fname] = new_entry
+                per_file.append((fname, parsed))
+            continue
+        parsed, new_entry = _cached_audit(fpath, entry)
+        if parsed is None:
+            continue
+        dirty = dirty or new_entry is not entry
+        cache[fname] = new_entry
+        per_file.append((fname, parsed))
+        for field, value in parsed["fields"].items():
+            resolved.setdefault(field, value)
+        if progression is None and parsed["progression"]:
+            progression = parsed["progression"]
+            known_versions = {_audit_version_key(row["version"]) for row in progression}
+    per_file.reverse()
+    regex_scope(None)
+
+    if cache_path and (dirty or set(cache) != set(old_cache)):
+        try:
+            _safe_write_json(cache_path, {"version": 1, "files": cache})
+        except OSError as e:
+            log(f"  Warning: could not write audit cache: {e}")
+
+    latest_severity = {sev: resolved.get(sev, 0) for sev in ("critical", "high", "medium", "low")}
+    latest_total = resolved.get("totalFindings", 0)
+    latest_gate = resolved.get("gate")
+    result["latestGate"] = latest_gate
+    result["totalFindings"] = latest_total
+    result["bySeverity"] = latest_severity
+    result["corrected"] = resolved.get("corrected", 0)
+    result["accepted"] = resolved.get("accepted", 0)
+    result["deferred"] = resolved.get("deferred", 0)
+    result["progression"] = progression or []
+    result["history"] = _audit_history(result["progression"], per_file)
+
+    sev_parts = []
+    for sev in ("critical", "high", "medium", "low"):
+        if latest_severity[sev]:
+            sev_parts.append(f"{latest_severity[sev]} {sev}")
+    sev_str = ", ".join(sev_parts) if sev_parts else "none"
+    log(f"  Audits: {len(md_files)} files, {latest_total} findings ({sev_str}), gate={latest_gate or 'N/A'}")
+
+    return result
+
+
+# Business domain mapping from REQ category prefix
+REQ_DOMAIN_PREFIXES = {
+    # Extraction & Processing
+    "EXT": "Extraction & Processing", "CVA": "Extraction & Processing",
+    "VAL": "Extraction & Processing", "PRO": "Extraction & Processing",
+    "DOC": "Extraction & Processing", "PAR": "Extraction & Processing",
+    "OCR": "Extraction & Processing", "PRM": "Extraction & Processing",
+    "MAT": "Matching & Selection", "OFF": "Matching & Selection",
+    "SEL": "Matching & Selection", "SRC": "Matching & Selection",
+    # Security & Auth
+    "SEC": "Security & Auth", "AUT": "Security & Auth",
+    "PRV": "Security & Auth", "LOG": "Security & Auth",
+    "CRD": "Security & Auth", "TOK": "Security & Auth",
+    "SSO": "Security & Auth",
+    "GDP": "GDPR & Privacy", "GDPR": "GDPR & Privacy",
+    "DPR": "GDPR & Privacy", "RET": "GDPR & Privacy",
+    # Frontend & UI
+    "UI": "Frontend & UI", "UX": "Frontend & UI",
+    "DASH": "Frontend & UI", "NAV": "Frontend & UI",
+    "FORM": "Frontend & UI", "MOD": "Frontend & UI",
+    "VIS": "Frontend & UI", "I18N": "Frontend & UI",
+    "ACC": "Frontend & UI",
+    "CAN": "Candidate Portal", "VPR": "Candidate Portal",
+    "DSH": "Dashboards & Reporting",
+    # Data & Storage
+    "DB": "Data & Storage", "IDX": "Data & Storage",
+    "CAC": "Data & Storage", "MIG": "Data & Storage",
+    "STO": "Data & Storage", "BAK": "Data & Storage",
+    "ARC": "Data & Storage", "CACHE": "Data & Storage",
+    "BLK": "Bulk Operations", "BAT": "Bulk Operations",
+    # Integration & APIs
+    "INT": "Integration & APIs", "WBH": "Integration & APIs",
+    "NOT": "Integration & APIs", "MSG": "Integration & APIs",
+    "EVT": "Integration & APIs", "SYN": "Integration & APIs",
+    "NTF": "Integration & APIs", "INC": "Integration & APIs",
+    # Infrastructure & DevOps
+    "CFG": "Infrastructure & DevOps", "ENV": "Infrastructure & DevOps",
+    "DEP": "Infrastructure & DevOps", "MON": "Infrastructure & DevOps",
+    "INF": "Infrastructure & DevOps", "OPS": "Infrastructure & DevOps",
+    "CI": "Infrastructure & DevOps",
+    "SYS": "Infrastructure & DevOps", "TECH": "Infrastructure & DevOps",
+    "AVAIL": "Infrastructure & DevOps",
+    # Performance & Scalability
+    "PERF": "Performance & Scalability", "SCAL": "Performance & Scalability",
+    "RATE": "Performance & Scalability", "OBS": "Performance & Scalability",
+    # Analytics & Reporting
+    "RPT": "Analytics & Reporting", "ANL": "Analytics & Reporting",
+    "MET": "Analytics & Reporting", "KPI": "Analytics & Reporting",
+    "EXP": "Analytics & Reporting", "AGG": "Analytics & Reporting",
+    # User & Org Management
+    "USR": "User Management", "ROL": "User Management",
+    "PER": "User Management", "ORG": "User Management",
+    "TEN": "User Management",
+    # Derived/Cross-cutting
+    "DER": "Derived Requirements", "MNT": "Infrastructure & DevOps",
+    "REC": "Infrastructure & DevOps",
+}
+
+# Title-based domain inference rules: (keywords, domain_name), first matching rule wins.
+# Used as fallback when REQ prefix is generic (F, C, NF) or unknown
+DOMAIN_KEYWORD_RULES = [
+    # Customer & User Management
+    (["cliente", "client", "usuario", "user", "alta", "baja", "registro", "registr", "perfil", "profile",
+      "cuenta", "account", "contacto", "suscript", "subscri"], "Customer Management"),
+    # Service & Product Management
+    (["servicio", "service", "pack", "producto", "product", "tarifa", "plan", "oferta", "offer",
+      "catalogo", "catalog", "tipo de servicio", "contratacion", "contrat"], "Service Management"),
+    # Billing & Payments
+    (["factur", "invoice", "billing", "pago", "payment", "cobro", "cargo", "charge", "precio", "price",
+      "descuento", "discount", "impuesto", "tax", "penalizacion", "penal"], "Billing & Payments"),
+    # Provisioning & Activation
+    (["activacion", "activat", "provision", "suspend", "suspens", "reactivac", "reactivat",
+      "desactivac", "deactivat", "permanencia", "portabilidad"], "Provisioning & Lifecycle"),
+    # Incidents & Support
+    (["incidencia", "incident", "ticket", "soporte", "support", "sla", "escalad", "resolucion",
+      "resolut", "averia", "reclam", "claim", "queja", "complaint"], "Incidents & Support"),
+    # Security & Auth
+    (["seguridad", "security", "autenticac", "authenticat", "autorizac", "authorizat", "password",
+      "contrasena", "token", "sesion", "session", "rol", "role", "permiso", "permission",
+      "cifrado", "encrypt", "audit"], "Security & Auth"),
+    # Integration & APIs
+    (["integracion", "integrat", "api", "webhook", "notificacion", "notificat", "email", "sms",
+      "mensaje", "message", "evento", "event", "sincroniz", "sync"], "Integration & APIs"),
+    # Infrastructure & DevOps
+    (["infraestructura", "infrastructure", "deploy", "despliegue", "monitor", "log", "backup",
+      "migracion", "migrat", "config", "entorno", "environment", "ci/cd", "pipeline"], "Infrastructure & DevOps"),
+    # Reporting & Analytics
+    (["reporte", "report", "estadistic", "statistic", "dashboard", "tablero", "metricas",
+      "metrics", "analitic", "analytic", "kpi", "export"], "Analytics & Reporting"),
+    # Frontend & UI
+    (["interfaz", "interface", "ui", "ux", "pantalla", "screen", "formulario", "form",
+      "vista", "view", "navegacion", "navigation", "responsive", "accesibil"], "Frontend & UI"),
+    # Data & Storage
+    (["base de datos", "database", "almacen", "storage", "cache", "indice", "index",
+      "archivo", "file", "import", "export"], "Data & Storage"),
+]
+
+# Title-based layer inference rules: (keywords, layer_name), first matching rule wins
+LAYER_KEYWORD_RULES = [
+    (["ui", "ux", "interfaz", "interface", "pantalla", "screen", "formulario", "form",
+      "vista", "view", "frontend", "navegacion", "navigation", "responsive", "css",
+      "componente visual", "widget", "boton", "button", "modal", "menu", "sidebar"], "Frontend"),
+    (["infraestructura", "infrastructure", "deploy", "despliegue", "ci/cd", "pipeline",
+      "docker", "kubernetes", "terraform", "cloud", "servidor", "server", "nginx",
+      "ssl", "dns", "dominio", "domain", "hosting", "monitor", "log"], "Infrastructure"),
+    (["integracion", "integrat", "webhook", "api extern", "third.party", "tercero",
+      "pasarela", "gateway", "sync", "sincroniz", "import", "export", "migra"], "Integration/Deployment"),
+]
+
+# Generic REQ prefixes that don't carry domain information (IEEE 830 style)
+GENERIC_REQ_CATEGORIES = {"F", "NF", "C", "R", "D", "G", "S", "P"}
+
+# Functional category from category prefix, checked in this order
+FUNCTIONAL_CATEGORY_RULES = [
+    ({"PERF", "SEC", "SCAL", "AVAIL", "TECH", "CACHE", "OBS", "RATE", "VAL", "I18N", "ACC", "NF"}, "Non-Functional"),
+    ({"SEC", "AUT", "GDP", "GDPR", "DPR"}, "Security"),
+    ({"RET", "DPR", "AUT", "MNT"}, "Data"),
+    ({"NTF", "INC", "DEP", "MON", "REC", "DER"}, "Integration"),
+    ({"C"}, "Constraint"),
+]
+
+
+def _keyword_trie_pattern(keywords):
+    """Regex alternation for keywords, factored as a trie so each position tries one branch per next character.
+
+    Terminal nodes are optional groups, so the match at a position is the
+    longest keyword starting there.
+    """
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordClassifier:
+    """First-matching-rule substring classifier compiled into one regex.
+
+    Equivalent to checking ``any(kw in title for kw in keywords)`` rule by
+    rule, but scans the title once: the trie pattern finds the longest
+    keyword at each hit position, and since every other keyword matching
+    there is a prefix of it, each keyword maps to the best rule among its
+    prefixes. Results are memoized per lowercased title.
+    """
+
+    def __init__(self, rules, default):
+        self.default = default
+        self.labels = [label for _, label in rules]
+        priority = {}
+        for index, (keywords, _) in enumerate(rules):
+            for kw in keywords:
+                priority.setdefault(kw.lower(), index)
+        self._priority = {kw: min(p for prefix, p in priority.items() if kw.startswith(prefix))
+                          for kw in priority}
+        self._pattern = (track_regex(f"KeywordClassifier({default})", re.compile(_keyword_trie_pattern(priority)))
+                         if priority else None)
+        self._memo = {}
+
+    def classify(self, title):
+        key = title.lower()
+        label = self._memo.get(key)
+        if label is None:
+            best = None
+            # search() (not a lookahead finditer) lets the regex engine skip ahead
+            # by first character; restarting one past each hit keeps overlaps
+            m = self._pattern.search(key) if self._pattern is not None else None
+            while m:
+                p = self._priority[m.group()]
+                if best is None or p < best:
+                    best = p
+                    if p == 0:
+                        break
+                m = self._pattern.search(key, m.start() + 1)
+            label = self._memo[key] = self.labels[best] if best is not None else self.default
+        return label
+
+
+_CLASSIFIER_CACHE = {}  # project classification config (JSON) -> (domain map, domain, layer classifiers)
+
+
+def _requirement_classifiers(config):
+    """Compile the domain/layer classifiers once per distinct classification config.
+
+    Project rules from .sdd/dashboard.json ("classification": {"domainPrefixes",
+    "domainKeywords", "layerKeywords"}) take priority over the built-in ones.
+    """
+    cfg = (config or {}).get("classification") or {}
+    cache_key = json.dumps(cfg, sort_keys=True)
+    if cache_key not in _CLASSIFIER_CACHE:
+        def project_rules(entries):
+            return [(entry.get("keywords", []), entry["label"]) for entry in entries or [] if entry.get("label")]
+
+        domain_map = dict(REQ_DOMAIN_PREFIXES)
+        domain_map.update(cfg.get("domainPrefixes") or {})
+        _CLASSIFIER_CACHE[cache_key] = (
+            domain_map,
+            KeywordClassifier(project_rules(cfg.get("domainKeywords")) + DOMAIN_KEYWORD_RULES, "Other"),
+            # Default to Backend for functional requirements — most common layer
+            KeywordClassifier(project_rules(cfg.get("layerKeywords")) + LAYER_KEYWORD_RULES, "Backend"),
+        )
+    return _CLASSIFIER_CACHE[cache_key]
+
+
+def classify_requirements(artifacts, incoming, outgoing, config=None):
+    """Classify REQ artifacts by business domain, technical layer, and functional category."""
+    domain_map, domain_classifier, layer_classifier = _requirement_classifiers(config)
+
+    # Find FASE linked to each REQ via TASK chain
+    task_to_fase = {}
+    for art in artifacts.values():
+        if art["type"] == "TASK":
+            m = re.match(r'TASK-F(\d+)-', art["id"])
+            if m:
+                task_to_fase[art["id"]] = int(m.group(1))
+
+    classification_stats = {"byDomain": {}, "byLayer": {}, "byCategory": {}}
+
+    for art in artifacts.values():
+        if art["type"] != "REQ":
+            art["classification"] = None
+            continue
+
+        cat = art.get("category")
+        title = art.get("title", "")
+
+        # Business domain: try prefix map first, fallback to title inference
+        domain = domain_map.get(cat) if cat and cat not in GENERIC_REQ_CATEGORIES else None
+        if domain is None:
+            domain = domain_classifier.classify(title)
+
+        # Technical layer: follow REQ -> UC -> TASK -> FASE
+        fases = set()
+        # Direct TASK links
+        for tgt in outgoing.get(art["id"], set()):
+            if tgt in task_to_fase:
+                fases.add(task_to_fase[tgt])
+        # Via UCs
+        for src in incoming.get(art["id"], set()):
+            if classify_id(src) == "UC":
+                for tgt in outgoing.get(src, set()):
+                    if tgt in task_to_fase:
+                        fases.add(task_to_fase[tgt])
+
+        if fases:
+            # Most frequent layer
+            layers = []
+            for fn in fases:
+                if fn == 0:
+                    layers.append("Infrastructure")
+                elif 1 <= fn <= 6:
+                    layers.append("Backend")
+                elif 7 <= fn <= 8:
+                    layers.append("Frontend")
+                else:
+                    layers.append("Integration/Deployment")
+            layer = Counter(layers).most_common(1)[0][0]
+        else:
+            # Fallback: infer from title keywords instead of showing "Unknown"
+            layer = layer_classifier.classify(title)
+
+        # Functional category from category prefix
+        func_cat = next((name for cats, name in FUNCTIONAL_CATEGORY_RULES if cat in cats), "Functional")
+
+        art["classification"] = {
+            "businessDomain": domain,
+            "technicalLayer": layer,
+            "functionalCategory": func_cat,
+        }
+
+        # Stats
+        classification_stats["byDomain"][domain] = classification_stats["byDomain"].get(domain, 0) + 1
+        classification_stats["byLayer"][layer] = classification_stats["byLayer"].get(layer, 0) + 1
+        classification_stats["byCategory"][func_cat] = classification_stats["byCategory"].get(func_cat, 0) + 1
+
+    return classification_stats
+
+
+STATS_LIST_LIMIT = 50  # orphans / brokenReferences kept in the graph statistics
+
+
+def build_graph(project_dir, output_dir, project_name, artifacts, references, all_ref_ids,
+                commits=None, code_refs=None, code_stats=None, test_refs=None, test_stats=None,
+                test_result_stats=None, coverage=None, audit_data=None, list_limit=STATS_LIST_LIMIT,
+                reachability=None, code_files=None):
+    """Build the traceability graph JSON structure.
+
+    test_result_stats is the summary from ingest_test_results(); when given,
+    testRefs already carry their "result" and each artifact gets a
+    testResults rollup plus verified-REQ coverage. coverage is the result
+    of load_coverage(); it is mapped onto codeRefs and codeIntelligence
+    symbols once the graph is assembled. audit_data is a scan_audits()
+    result to use instead of scanning audits/ here. list_limit caps the
+    orphan and broken-reference lists (None keeps them whole).
+    reachability is a ReachabilityIndex to bring up to date and answer the
+    propagation counts from; without one, each count walks the graph itself.
+    code_files (project-relative) replaces the walk of the code scope that
+    expands glob pins in .sdd/overrides.json.
+    """
+    if commits is None:
+        commits = []
+    if code_refs is None:
+        code_refs = []
+    if code_stats is None:
+        code_stats = {"totalFiles": 0, "totalSymbols": 0, "symbolsWithRefs": 0}
+    if test_refs is None:
+        test_refs = []
+    if test_stats is None:
+        test_stats = {"totalTestFiles": 0, "totalTests": 0, "testsWithRefs": 0}
+
+    # Read pipeline state
+    pipeline_state_file = os.path.join(project_dir, "pipeline-state.json")
+    pipeline_data = {"currentStage": "unknown", "stages": []}
+    if os.path.exists(pipeline_state_file):
+        try:
+            with open(pipeline_state_file, "r", encoding="utf-8") as f:
+                ps = json.load(f)
+            pipeline_data["currentStage"] = ps.get("currentStage", "unknown")
+        except Exception:
+            pass
+
+    # Count artifacts per stage
+    stage_counts = {}
+    for art in artifacts.values():
+        stage = art.get("stage", "unknown")
+        stage_counts[stage] = stage_counts.get(stage, 0) + 1
+
+    # Build pipeline stages
+    stage_order = [
+        "requirements-engineer",
+        "specifications-engineer",
+        "spec-auditor",
+        "test-planner",
+        "plan-architect",
+        "task-generator",
+        "task-implementer",
+    ]
+
+    if os.path.exists(pipeline_state_file):
+        try:
+            with open(pipeline_state_file, "r", encoding="utf-8") as f:
+                ps = json.load(f)
+            stages_data = ps.get("stages", {})
+        except Exception:
+            stages_data = {}
+    else:
+        stages_data = {}
+
+    # Count audit files for spec-auditor stage (findings aren't graph artifacts)
+    audits_dir = os.path.join(project_dir, "audits")
+    if os.path.isdir(audits_dir):
+        audit_files = [f for f in os.listdir(audits_dir) if f.lower().endswith(".md")]
+        stage_counts["spec-auditor"] = stage_counts.get("spec-auditor", 0) + len(audit_files)
+
+    # Count test plan documents for test-planner stage
+    test_dir = os.path.join(project_dir, "test")
+    if os.path.isdir(test_dir):
+        test_files = [f for f in os.listdir(test_dir) if f.lower().endswith(".md")]
+        stage_counts["test-planner"] = stage_counts.get("test-planner", 0) + len(test_files)
+
+    # Count code + test files for task-implementer stage
+    impl_count = code_stats.get("totalFiles", 0) + test_stats.get("totalTestFiles", 0)
+    if impl_count > 0:
+        stage_counts["task-implementer"] = impl_count
+
+    # Fallback: when a stage is done/stale but count is 0, use summary.metrics from pipeline-state.json
+    # This avoids showing misleading "0" for completed stages whose artifacts aren't captured by graph scanning
+    # Each entry: (metric_keys_to_sum, label_override_when_fallback_used)
+    SUMMARY_METRIC_FALLBACKS = {
+        "test-planner": (["bdd_scenarios", "test_matrices", "perf_scenarios"], "scenarios"),
+        "task-implementer": (["tasks_completed", "commits", "tests_passed"], "tasks/commits"),
+        "spec-auditor": (["total_findings"], "findings"),
+        "plan-architect": (["total_fases", "components"], "phases"),
+        "task-generator": (["total_tasks"], "tasks"),
+        "security-auditor": (["total_findings"], "findings"),
+        "tech-designer": (["dimensions_analyzed"], "dimensions"),
+        "ux-designer": (["dimensions_analyzed"], "dimensions"),
+    }
+    summary_label_overrides = {}
+    for sname, (metric_keys, label_override) in SUMMARY_METRIC_FALLBACKS.items():
+        if stage_counts.get(sname, 0) == 0:
+            sd = stages_data.get(sname, {})
+            if sd.get("status") in ("done", "stale"):
+                summary = sd.get("summary")
+                if summary and isinstance(summary.get("metrics"), dict):
+                    metrics = summary["metrics"]
                     fallback = sum(metrics.get(k, 0) for k in metric_keys)
                     if fallback > 0:
                         stage_counts[sname] = fallback
                         summary_label_overrides[sname] = label_override
 
-    # Fallback: count files recursively for test-planner if still 0
-    if stage_counts.get("test-planner", 0) == 0:
-        test_dir = os.path.join(project_dir, "test")
-        if os.path.isdir(test_dir):
-            count = 0
-            for root, dirs, filenames in os.walk(test_dir):
-                count += sum(1 for f in filenames if f.lower().endswith(".md"))
-            if count > 0:
-                stage_counts["test-planner"] = count
+    # Fallback: count files recursively for test-planner if still 0
+    if stage_counts.get("test-planner", 0) == 0:
+        test_dir = os.path.join(project_dir, "test")
+        if os.path.isdir(test_dir):
+            count = 0
+            for root, dirs, filenames in os.walk(test_dir):
+                count += sum(1 for f in filenames if f.lower().endswith(".md"))
+            if count > 0:
+                stage_counts["test-planner"] = count
+
+    # Fallback: count src/tests files with broader extensions for task-implementer if still 0
+    if stage_counts.get("task-implementer", 0) == 0:
+        broad_exts = {".ts", ".js", ".tsx", ".jsx", ".py", ".go", ".rs", ".java", ".kt", ".rb", ".cs", ".cpp", ".c", ".swift"}
+        impl_fallback = 0
+        for search_dir in ["src", "app", "lib", "tests", "test"]:
+            d = os.path.join(project_dir, search_dir)
+            if os.path.isdir(d):
+                for root, dirs, filenames in os.walk(d):
+                    dirs[:] = [dd for dd in dirs if dd not in SKIP_DIRS]
+                    impl_fallback += sum(1 for f in filenames if os.path.splitext(f)[1].lower() in broad_exts)
+        if impl_fallback > 0:
+            stage_counts["task-implementer"] = impl_fallback
+
+    pipeline_stages = []
+    for sname in stage_order:
+        sd = stages_data.get(sname, {})
+        stage_entry = {
+            "name": sname,
+            "status": sd.get("status", "unknown"),
+            "lastRun": sd.get("lastRun"),
+            "artifactCount": stage_counts.get(sname, 0),
+            "stageLabel": summary_label_overrides.get(sname, STAGE_COUNT_UNITS.get(sname, "artifacts")),
+        }
+        if sd.get("summary"):
+            stage_entry["summary"] = sd["summary"]
+        pipeline_stages.append(stage_entry)
+    pipeline_data["stages"] = pipeline_stages
+
+    # Lateral stages (security-auditor, req-change)
+    lateral_names = ["security-auditor", "req-change", "tech-designer", "ux-designer"]
+    lateral_stages = []
+    for lname in lateral_names:
+        ld = stages_data.get(lname)
+        if ld:
+            lateral_entry = {
+                "name": lname,
+                "status": ld.get("status", "unknown"),
+                "lastRun": ld.get("lastRun"),
+                "artifactCount": stage_counts.get(lname, 0),
+                "stageLabel": summary_label_overrides.get(lname, STAGE_COUNT_UNITS.get(lname, "artifacts")),
+            }
+            if ld.get("summary"):
+                lateral_entry["summary"] = ld["summary"]
+            lateral_stages.append(lateral_entry)
+    if lateral_stages:
+        pipeline_data["lateralStages"] = lateral_stages
+
+    # Collapse references into weighted relationships
+    if not isinstance(references, ReferenceAggregator):
+        aggregator = ReferenceAggregator()
+        aggregator.extend(references)
+        references = aggregator
+    seen_rels = set()
+    deduped_rels = []
+    with profile_phase("relationships"):
+        for src, tgt, occurrences, file_count, locations in references.edges():
+            src_type = classify_id(src)
+            tgt_type = classify_id(tgt)
+            if not src_type or not tgt_type:
+                continue
+            rel_type = infer_relationship_type(src_type, tgt_type)
+            seen_rels.add((src, tgt, rel_type))
+            rel = {
+                "source": src,
+                "target": tgt,
+                "type": rel_type,
+                "sourceFile": locations[0][0],
+                "line": locations[0][1],
+                "occurrences": occurrences,
+            }
+            # A single statement is fully described by sourceFile/line
+            if occurrences > 1:
+                rel["fileCount"] = file_count
+                rel["locations"] = locations
+            deduped_rels.append(rel)
+
+    # Compute statistics
+    by_type = {}
+    for art in artifacts.values():
+        by_type[art["type"]] = by_type.get(art["type"], 0) + 1
+
+    # Build incoming/outgoing indexes for coverage
+    incoming = {}  # target -> set of source IDs
+    outgoing = {}  # source -> set of target IDs
+    for rel in deduped_rels:
+        incoming.setdefault(rel["target"], set()).add(rel["source"])
+        outgoing.setdefault(rel["source"], set()).add(rel["target"])
+
+    # REQ coverage
+    reqs = [a for a in artifacts.values() if a["type"] == "REQ"]
+    total_reqs = len(reqs)
+
+    # Categories that don't need Use Cases (they trace to NFR specs or are project constraints)
+    _NO_UC_CATEGORIES = {"NF", "C"}
+
+    def _req_needs_uc(req):
+        """Return True if this REQ type is expected to have a Use Case."""
+        cat = req.get("category")
+        return cat not in _NO_UC_CATEGORIES
+
+    # Functional REQs = those expected to have UCs
+    functional_reqs = [r for r in reqs if _req_needs_uc(r)]
+    total_functional_reqs = len(functional_reqs)
+
+    def _neighbors(node_id):
+        """Return all directly connected artifact IDs (both directions)."""
+        return incoming.get(node_id, set()) | outgoing.get(node_id, set())
+
+    neighbor_types = {}  # node -> types of its direct neighbours, shared by the counts below
+
+    def _neighbor_types(node_id):
+        types = neighbor_types.get(node_id)
+        if types is None:
+            types = neighbor_types[node_id] = {classify_id(n) for n in _neighbors(node_id)}
+        return types
+
+    def count_reqs_with(target_type):
+        return sum(1 for req in reqs if target_type in _neighbor_types(req["id"]))
+
+    def count_reqs_with_transitive(target_type, req_subset=None, bridge_types=("UC", "WF")):
+        """Count REQs linked to target_type within 2 hops via bridge artifacts.
+
+        Checks: REQ↔TARGET (1-hop) then REQ↔bridge↔TARGET (2-hop).
+        bridge_types=None means any artifact type can serve as bridge.
+        req_subset: if provided, only count from this subset of REQs.
+        """
+        subset = req_subset if req_subset is not None else reqs
+        count = 0
+        for req in subset:
+            rid = req["id"]
+            # 1-hop: direct REQ↔TARGET
+            if target_type in _neighbor_types(rid):
+                count += 1
+                continue
+            # 2-hop: REQ↔bridge↔TARGET
+            for n in _neighbors(rid):
+                n_type = classify_id(n)
+                if n_type == "REQ":
+                    continue  # skip REQ→REQ→TARGET to avoid noise
+                if bridge_types is not None and n_type not in bridge_types:
+                    continue
+                if target_type in _neighbor_types(n):
+                    count += 1
+                    break
+        return count
+
+    # UC coverage: only count functional REQs (NF/C don't need UCs by design)
+    reqs_with_uc = count_reqs_with_transitive("UC", req_subset=functional_reqs, bridge_types=None)
+    reqs_with_bdd = count_reqs_with_transitive("BDD", bridge_types=None)
+    reqs_with_task = count_reqs_with_transitive("TASK")
+
+    # Functional-only variants for implementation metrics
+    # (NF/C REQs don't generate UCs, tasks, or code — so they shouldn't penalize coverage)
+    functional_req_ids = {r["id"] for r in functional_reqs}
+    reqs_with_bdd_functional = count_reqs_with_transitive("BDD", req_subset=functional_reqs, bridge_types=None)
+    reqs_with_task_functional = count_reqs_with_transitive("TASK", req_subset=functional_reqs)
+
+    # Find orphans: artifacts defined but never referenced by any other artifact
+    all_defined = set(artifacts.keys())
+    all_referenced = set()
+    for rel in deduped_rels:
+        all_referenced.add(rel["target"])
+        all_referenced.add(rel["source"])
+    orphans = sorted(all_defined - all_referenced)
+
+    # Find broken references: IDs referenced but never defined
+    broken_refs = []
+    broken_ids = set()
+    for tgt, (sfile, line) in references.first_by_target.items():
+        if tgt not in artifacts and tgt not in broken_ids:
+            broken_ids.add(tgt)
+            broken_refs.append({
+                "ref": tgt,
+                "referencedIn": sfile,
+                "line": line,
+            })
+
+    # ── Commit processing ──────────────────────────────────
+    artifact_commit_refs = {}  # artifact id -> list of commitRef objects
+
+    for commit in commits:
+        commit_ref = {
+            "sha": commit["sha"],
+            "fullSha": commit["fullSha"],
+            "message": commit["message"],
+            "author": commit["author"],
+            "date": commit["date"],
+            "taskId": commit.get("taskId"),
+            "refIds": commit.get("refIds", []),
+            "files": commit.get("files", []),
+        }
+        # Attach to each referenced artifact
+        for ref_id in commit.get("refIds", []):
+            artifact_commit_refs.setdefault(ref_id, []).append(commit_ref)
+            # Create implemented-by-commit relationship
+            if ref_id in artifacts:
+                rel_key = (commit["sha"], ref_id, "implemented-by-commit")
+                if rel_key not in seen_rels:
+                    seen_rels.add(rel_key)
+                    deduped_rels.append({
+                        "source": commit["sha"],
+                        "target": ref_id,
+                        "type": "implemented-by-commit",
+                        "sourceFile": "git-log",
+                        "line": 0,
+                    })
+        # Attach to task artifact if present
+        task_id = commit.get("taskId")
+        if task_id and task_id in artifacts:
+            artifact_commit_refs.setdefault(task_id, []).append(commit_ref)
+
+    # Inject commitRefs into artifact objects
+    for art in artifacts.values():
+        art["commitRefs"] = artifact_commit_refs.get(art["id"], [])
+
+    # ── Code refs processing (Step 1.4: merge direct + inferred) ──
+    # 1. Tag direct code refs with origin
+    for cr in code_refs:
+        cr["origin"] = "direct"
+        cr["inferredFrom"] = None
+
+    # 2. Infer code refs from commits (Step 1.2)
+    with profile_phase("inference"):
+        inferred_code_refs = infer_code_refs_from_commits(commits, artifacts, incoming, outgoing,
+                                                          scan_scopes(project_dir)["sources"])
+
+    # 3. Deduplicate: if file+refId already has direct ref, skip inferred
+    direct_keys = set()
+    for cr in code_refs:
+        for rid in cr.get("refIds", []):
+            direct_keys.add((cr["file"], rid))
+
+    deduped_inferred = []
+    for cr in inferred_code_refs:
+        new_ref_ids = [rid for rid in cr["refIds"] if (cr["file"], rid) not in direct_keys]
+        if new_ref_ids:
+            cr["refIds"] = new_ref_ids
+            deduped_inferred.append(cr)
+
+    # 4. Apply overrides (Step 1.5)
+    overrides_path = os.path.join(project_dir, ".sdd", "overrides.json")
+    all_code_refs = code_refs + deduped_inferred
+    with profile_phase("overrides"):
+        override_rules = load_overrides(overrides_path)
+        all_code_refs, override_count = apply_overrides(all_code_refs, override_rules, project_dir, code_files)
+
+    # 5. Build artifact_code_refs map from merged refs
+    artifact_code_refs = {}
+    for cr in all_code_refs:
+        for ref_id in cr.get("refIds", []):
+            artifact_code_refs.setdefault(ref_id, []).append(cr)
+    for art in artifacts.values():
+        art["codeRefs"] = artifact_code_refs.get(art["id"], [])
+
+    # ── Test refs processing ──────────────────────────────────
+    artifact_test_refs = {}
+    for tr in test_refs:
+        for ref_id in tr.get("refIds", []):
+            artifact_test_refs.setdefault(ref_id, []).append(tr)
+    for art in artifacts.values():
+        art["testRefs"] = artifact_test_refs.get(art["id"], [])
+
+    # ── Test results rollup (--test-results) ──────────────────
+    artifact_passing_tests = {}  # artifacts with passing and no failing results
+    artifact_failing_tests = {}
+    if test_result_stats is not None:
+        for art in artifacts.values():
+            if not art["testRefs"]:
+                continue
+            # Counted per testRef, so a file-level ref and a test ref sharing one case both count
+            counts = {"passed": 0, "failed": 0, "skipped": 0, "notRun": 0, "durationMs": 0}
+            for tr in art["testRefs"]:
+                result = tr.get("result")
+                if not result:
+                    counts["notRun"] += 1
+                    continue
+                counts[result["status"]] += 1
+                counts["durationMs"] += result["durationMs"]
+            counts["status"] = _result_status(counts)
+            art["testResults"] = counts
+            if counts["failed"]:
+                artifact_failing_tests[art["id"]] = art["testRefs"]
+            elif counts["passed"]:
+                artifact_passing_tests[art["id"]] = art["testRefs"]
+
+    # ── BFS N-hop propagation to REQs (Step 1.3) ──────────────
+    req_ids = {r["id"] for r in reqs}
+    reach = None
+    with profile_phase("propagation"):
+        if reachability is not None:
+            reachability.update(req_ids, incoming, outgoing,
+                                {"code": artifact_code_refs, "tests": artifact_test_refs, "commits": artifact_commit_refs})
+            reach = reachability.reach
+        reqs_with_code_set = propagate_refs_to_reqs(req_ids, artifact_code_refs, incoming, outgoing, reach=reach)
+        reqs_with_tests_set = propagate_refs_to_reqs(req_ids, artifact_test_refs, incoming, outgoing, reach=reach)
+        reqs_with_commits_set = propagate_refs_to_reqs(req_ids, artifact_commit_refs, incoming, outgoing, reach=reach)
+
+    reqs_with_code = len(reqs_with_code_set)
+    reqs_with_code_functional = len(reqs_with_code_set & functional_req_ids)
+    reqs_with_tests = len(reqs_with_tests_set)
+    reqs_with_tests_functional = len(reqs_with_tests_set & functional_req_ids)
+    reqs_with_commits = len(reqs_with_commits_set)
+    reqs_with_commits_functional = len(reqs_with_commits_set & functional_req_ids)
+
+    # Verified = reaches passing tests and no failing ones within the same hops
+    with profile_phase("propagation.results"):
+        reqs_failing_set = propagate_refs_to_reqs(req_ids, artifact_failing_tests, incoming, outgoing, reach=reach)
+        reqs_verified_set = (propagate_refs_to_reqs(req_ids, artifact_passing_tests, incoming, outgoing, reach=reach)
+                             - reqs_failing_set)
+    reqs_verified = len(reqs_verified_set)
+    reqs_verified_functional = len(reqs_verified_set & functional_req_ids)
+
+    # ── Classification ────────────────────────────────────────
+    with profile_phase("classification"):
+        classification_stats = classify_requirements(artifacts, incoming, outgoing, load_dashboard_config(project_dir))
+
+    # Commit stats
+    commits_with_refs = sum(1 for c in commits if c.get("refIds"))
+    commits_with_tasks = sum(1 for c in commits if c.get("taskId"))
+    unique_tasks = len(set(c["taskId"] for c in commits if c.get("taskId")))
+
+    commit_stats = {
+        "totalCommits": len(commits),
+        "commitsWithRefs": commits_with_refs,
+        "commitsWithTasks": commits_with_tasks,
+        "uniqueTasksCovered": unique_tasks,
+    }
+
+    # Enhanced code stats with inference breakdown (Step 1.6)
+    direct_refs_count = sum(1 for cr in all_code_refs if cr.get("origin") == "direct")
+    inferred_refs_count = sum(1 for cr in all_code_refs if cr.get("origin") in ("commit-inferred", "task-inferred"))
+    code_stats["directRefs"] = direct_refs_count
+    code_stats["inferredRefs"] = inferred_refs_count
+    code_stats["manualOverrides"] = override_count
+
+    stats = {
+        "totalArtifacts": len(artifacts),
+        "byType": OrderedDict(sorted(by_type.items())),
+        "totalRelationships": len(deduped_rels),
+        "traceabilityCoverage": {
+            "totalReqs": total_reqs,
+            "totalFunctionalReqs": total_functional_reqs,
+            "reqBreakdown": classification_stats.get("byCategory", {}),
+            "reqsWithUCs": {
+                "count": reqs_with_uc,
+                "total": total_functional_reqs,
+                "percentage": round(reqs_with_uc / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            },
+            "reqsWithBDD": {
+                "count": reqs_with_bdd,
+                "total": total_reqs,
+                "percentage": round(reqs_with_bdd / total_reqs * 100, 1) if total_reqs > 0 else 0,
+                "functionalCount": reqs_with_bdd_functional,
+                "functionalTotal": total_functional_reqs,
+                "functionalPercentage": round(reqs_with_bdd_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            },
+            "reqsWithTasks": {
+                "count": reqs_with_task,
+                "total": total_reqs,
+                "percentage": round(reqs_with_task / total_reqs * 100, 1) if total_reqs > 0 else 0,
+                "functionalCount": reqs_with_task_functional,
+                "functionalTotal": total_functional_reqs,
+                "functionalPercentage": round(reqs_with_task_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            },
+            "reqsWithCode": {
+                "count": reqs_with_code,
+                "total": total_reqs,
+                "percentage": round(reqs_with_code / total_reqs * 100, 1) if total_reqs > 0 else 0,
+                "functionalCount": reqs_with_code_functional,
+                "functionalTotal": total_functional_reqs,
+                "functionalPercentage": round(reqs_with_code_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            },
+            "reqsWithTests": {
+                "count": reqs_with_tests,
+                "total": total_reqs,
+                "percentage": round(reqs_with_tests / total_reqs * 100, 1) if total_reqs > 0 else 0,
+                "functionalCount": reqs_with_tests_functional,
+                "functionalTotal": total_functional_reqs,
+                "functionalPercentage": round(reqs_with_tests_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            },
+            "reqsWithCommits": {
+                "count": reqs_with_commits,
+                "total": total_reqs,
+                "percentage": round(reqs_with_commits / total_reqs * 100, 1) if total_reqs > 0 else 0,
+                "functionalCount": reqs_with_commits_functional,
+                "functionalTotal": total_functional_reqs,
+                "functionalPercentage": round(reqs_with_commits_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            },
+        },
+        "orphans": orphans[:list_limit],  # capped to avoid bloat
+        "brokenReferences": broken_refs[:list_limit],
+        "codeStats": code_stats,
+        "testStats": test_stats,
+        "commitStats": commit_stats,
+        "classificationStats": classification_stats,
+    }
+
+    if test_result_stats is not None:
+        stats["traceabilityCoverage"]["reqsVerified"] = {
+            "count": reqs_verified,
+            "total": total_reqs,
+            "percentage": round(reqs_verified / total_reqs * 100, 1) if total_reqs > 0 else 0,
+            "functionalCount": reqs_verified_functional,
+            "functionalTotal": total_functional_reqs,
+            "functionalPercentage": round(reqs_verified_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
+            "failingCount": len(reqs_failing_set),
+        }
+        stats["testResultStats"] = test_result_stats
+    if override_rules is not None:
+        stats["overrideStats"] = override_rules.stats()
+
+    # ── Adoption data (loaded from dashboard/adoption-data.json) ─────────
+    adoption_file = os.path.join(output_dir, "adoption-data.json")
+    adoption = {"present": False}
+    adoption_stats = None
+    if os.path.exists(adoption_file):
+        with open(adoption_file, "r", encoding="utf-8") as f:
+            adoption_data = json.load(f)
+        adoption = adoption_data.get("adoption", {"present": False})
+        adoption_stats = adoption_data.get("adoptionStats", None)
+
+    stats["adoptionStats"] = adoption_stats
+    if audit_data is None:
+        with profile_phase("audits"):
+            audit_data = scan_audits(project_dir, os.path.join(output_dir, AUDIT_CACHE_FILE))
+    stats["auditData"] = audit_data
+
+    graph = {
+        "$schema": "traceability-graph-v6",
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "projectName": project_name,
+        "pipeline": pipeline_data,
+        "artifacts": list(artifacts.values()),
+        "relationships": deduped_rels,
+        "statistics": stats,
+        "adoption": adoption,
+    }
+
+    # Code intelligence lives in a sidecar next to the graph (Step 2.1);
+    # the graph only carries a reference to it
+    with profile_phase("codeIntelligence"):
+        code_intel = resolve_code_intelligence(output_dir)
+        if code_intel is not None:
+            graph["codeIntelligenceRef"] = code_intel.ref()
+            # Refine with code intelligence if available (Step 2.3)
+            _refine_with_code_intelligence(graph, code_intel)
+
+    # Executed-line ratios from LCOV/Cobertura (--coverage)
+    if coverage is not None:
+        with profile_phase("lineCoverage"):
+            stats["coverageStats"] = apply_coverage(graph, coverage, code_intel)
+
+    return graph
+
+
+def _refine_with_code_intelligence(graph, code_intel):
+    """Refine file-level inferred codeRefs with symbol-level data from codeIntelligence (Step 2.3).
+
+    For each codeRef with origin "commit-inferred" and symbolType "file",
+    if codeIntelligence has symbols for that file, replace with symbol-level refs.
+    Only the symbols of those files are read from the sidecar, and they are
+    looked up through an inverted (filePath, artifactId) index, so each ref
+    costs one lookup per refId instead of a pass over the file's symbols.
+    """
+    if code_intel is None or not code_intel.indexed:
+        return
+
+    def _is_refinable(cr):
+        return cr.get("origin") in ("commit-inferred", "task-inferred") and cr.get("symbolType") == "file"
+
+    wanted = {cr["file"] for art in graph.get("artifacts", []) for cr in art.get("codeRefs", []) if _is_refinable(cr)}
+    if not wanted:
+        return
+
+    # Build (filePath, artifactId) → symbol positions index, in symbol order
+    symbols = code_intel.symbols_for(wanted)
+    indexed_files = set()
+    symbols_by_ref = {}
+    for pos, sym in enumerate(symbols):
+        fp = sym.get("filePath", "")
+        indexed_files.add(fp)
+        for rid in set(sym.get("artifactRefs", []) + sym.get("inferredRefs", [])):
+            symbols_by_ref.setdefault((fp, rid), []).append(pos)
+
+    for art in graph.get("artifacts", []):
+        refined = []
+        refined_files = set()
+        for cr in art.get("codeRefs", []):
+            if _is_refinable(cr) and cr["file"] in indexed_files:
+                # Replace with symbol-level refs: symbol position -> overlapping refIds
+                overlap = {}
+                for rid in dict.fromkeys(cr["refIds"]):
+                    for pos in symbols_by_ref.get((cr["file"], rid), ()):
+                        overlap.setdefault(pos, []).append(rid)
+                for pos in sorted(overlap):
+                    sym = symbols[pos]
+                    refined.append({
+                        "file": cr["file"],
+                        "line": sym.get("startLine", 0),
+                        "symbol": sym["name"],
+                        "symbolType": sym.get("type", "unknown").lower(),
+                        "refIds": overlap[pos],
+                        "origin": "code-index",
+                        "inferredFrom": cr.get("inferredFrom"),
+                    })
+                    refined_files.add(cr["file"])
+                # If no symbol matched, keep original file-level ref
+                if cr["file"] not in refined_files:
+                    refined.append(cr)
+                    refined_files.add(cr["file"])
+            else:
+                refined.append(cr)
+                refined_files.add(cr["file"])
+        art["codeRefs"] = refined
+
+
+class GraphEncoder:
+    """JSON text of a graph for traceability-graph.json and the HTML dashboard (--watch).
+
+    encode() returns the indented text json.dump(indent=2) writes and the
+    compact text generate_html() embeds. Every artifact and relationship
+    keeps its encoding between calls and is encoded again only when it no
+    longer compares equal to the one encoded last time, so a regeneration
+    after a small edit re-encodes just what the edit touched.
+    """
+
+    KEYS = {
+        "artifacts": lambda art: art["id"],
+        "relationships": lambda rel: (rel["source"], rel["target"], rel["type"]),
+    }
+
+    def __init__(self):
+        self._indented = json.JSONEncoder(indent=2, ensure_ascii=False)
+        self._compact = json.JSONEncoder(ensure_ascii=False)
+        self._chunks = {name: {} for name in self.KEYS}  # name -> key -> (item, indented, compact)
+
+    def _encode_list(self, name, items):
+        key_of, previous, current = self.KEYS[name], self._chunks[name], {}
+        indented, compact = [], []
+        for item in items:
+            key = key_of(item)
+            chunk = previous.get(key)
+            if chunk is None or chunk[0] != item:
+                chunk = (item, self._indented.encode(item).replace("\n", "\n    "), self._compact.encode(item))
+            current[key] = chunk
+            indented.append(chunk[1])
+            compact.append(chunk[2])
+        self._chunks[name] = current
+        if not items:
+            return "[]", "[]"
+        return "[\n    " + ",\n    ".join(indented) + "\n  ]", "[" + ", ".join(compact) + "]"
+
+    def encode(self, graph):
+        """Return (indented, compact) JSON text for graph."""
+        indented, compact = [], []
+        for key, value in graph.items():
+            if key in self.KEYS:
+                value_indented, value_compact = self._encode_list(key, value)
+            else:
+                value_indented = self._indented.encode(value).replace("\n", "\n  ")
+                value_compact = self._compact.encode(value)
+            name = self._compact.encode(key)
+            indented.append(f"{name}: {value_indented}")
+            compact.append(f"{name}: {value_compact}")
+        return "{\n  " + ",\n  ".join(indented) + "\n}", "{" + ", ".join(compact) + "}"
+
+
+def generate_html(graph, template_file, html_file, data_json=None):
+    """Read the HTML template and inject the graph JSON.
+
+    data_json is the graph's compact JSON when the caller already has it
+    (GraphEncoder).
+    """
+    if not os.path.exists(template_file):
+        log(f"  Warning: HTML template not found at {template_file}")
+        log("  Skipping HTML generation.")
+        return False
+
+    with open(template_file, "r", encoding="utf-8") as f:
+        template_md = f.read()
+
+    # Extract HTML between ```html and ```
+    m = re.search(r'```html\s*\n(.*?)\n```', template_md, re.DOTALL)
+    if not m:
+        log("  Warning: could not find ```html block in template.")
+        return False
+
+    html = m.group(1)
+
+    # Serialize JSON (compact but readable)
+    if data_json is None:
+        data_json = json.dumps(graph, ensure_ascii=False)
+
+    # Replace placeholders (the project name in the template parts; the
+    # multi-megabyte JSON is scanned, and only copied if it holds one too)
+    project_name = graph.get("projectName", "SDD Project")
+    parts = [part.replace("{{PROJECT_NAME}}", project_name) for part in html.split("{{DATA_JSON}}")]
+    if "{{PROJECT_NAME}}" in data_json:
+        data_json = data_json.replace("{{PROJECT_NAME}}", project_name)
+    html = data_json.join(parts)
+
+    _safe_write_text(html_file, html)
+
+    return True
+
+
+def generate_guide(guide_template_file, guide_file):
+    """Extract the static guide HTML from its template and write guide.html."""
+    if not os.path.exists(guide_template_file):
+        return False
+    try:
+        with open(guide_template_file, "r", encoding="utf-8") as f:
+            guide_md = f.read()
+        gm = re.search(r'```html\s*\n(.*?)\n```', guide_md, re.DOTALL)
+        if gm:
+            _safe_write_text(guide_file, gm.group(1))
+            return True
+    except Exception as e:
+        log(f"  Warning: guide generation failed: {e}")
+    return False
+
+
+def generate_live_status(live_status_file):
+    """Write the idle live-status.js seed file."""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    live_status_js = f"""// SDD Live Status — generated by /sdd:dashboard
+// Skills update this file during execution to show real-time progress
+window.__SDD_LIVE_UPDATE({{
+  "sessionId": null,
+  "currentStage": null,
+  "status": "idle",
+  "lastHeartbeat": "{now_iso}",
+  "progress": null,
+  "message": "Dashboard generated. Waiting for pipeline activity.",
+  "history": []
+}});"""
+    _safe_write_text(live_status_file, live_status_js)
+
+
+def resolve_output_paths(project_dir, output_dir):
+    """Resolve template and output file locations for a project."""
+    template_file = resolve_template(project_dir)
+    return {
+        "template": template_file,
+        "guideTemplate": os.path.join(os.path.dirname(template_file), "guide-template.md"),
+        "graph": os.path.join(output_dir, "traceability-graph.json"),
+        "html": os.path.join(output_dir, "index.html"),
+        "guide": os.path.join(output_dir, "guide.html"),
+        "liveStatus": os.path.join(output_dir, "live-status.js"),
+        "reachability": os.path.join(output_dir, REACHABILITY_FILE),
+    }
+
+
+def print_statistics(graph):
+    """Print the summary statistics block for a built graph."""
+    stats = graph["statistics"]
+    log(f"\n{'='*60}")
+    log("STATISTICS")
+    log(f"{'='*60}")
+    log(f"Total artifacts: {stats['totalArtifacts']}")
+    for t, c in stats["byType"].items():
+        log(f"  {t}: {c}")
+    log(f"Total relationships: {stats['totalRelationships']}")
+    cov = stats["traceabilityCoverage"]
+    log(f"REQs with UCs:   {cov['reqsWithUCs']['count']}/{cov['reqsWithUCs']['total']} ({cov['reqsWithUCs']['percentage']}%)")
+    log(f"REQs with BDDs:  {cov['reqsWithBDD']['count']}/{cov['reqsWithBDD']['total']} ({cov['reqsWithBDD']['percentage']}%)")
+    log(f"REQs with TASKs: {cov['reqsWithTasks']['count']}/{cov['reqsWithTasks']['total']} ({cov['reqsWithTasks']['percentage']}%)")
+    if "reqsWithCommits" in cov:
+        log(f"REQs with Commits: {cov['reqsWithCommits']['count']}/{cov['reqsWithCommits']['total']} ({cov['reqsWithCommits']['percentage']}%)")
+    cs = stats.get("commitStats", {})
+    if cs.get("totalCommits", 0) > 0:
+        log(f"Commits: {cs['totalCommits']} total, {cs['commitsWithRefs']} with refs, {cs['commitsWithTasks']} with tasks, {cs['uniqueTasksCovered']} tasks covered")
+    log(f"Orphans: {len(stats['orphans'])}")
+    log(f"Broken references: {len(stats['brokenReferences'])}")
+
+    # Print code/test stats
+    cs2 = stats.get("codeStats", {})
+    ts2 = stats.get("testStats", {})
+    if cs2.get("totalFiles", 0) > 0:
+        cov2 = stats["traceabilityCoverage"]
+        log(f"REQs with Code:  {cov2['reqsWithCode']['count']}/{cov2['reqsWithCode']['total']} ({cov2['reqsWithCode']['percentage']}%)")
+        log(f"REQs with Tests: {cov2['reqsWithTests']['count']}/{cov2['reqsWithTests']['total']} ({cov2['reqsWithTests']['percentage']}%)")
+        log(f"Code files: {cs2['totalFiles']}, symbols: {cs2['totalSymbols']}, with refs: {cs2['symbolsWithRefs']}")
+        log(f"Test files: {ts2['totalTestFiles']}, tests: {ts2['totalTests']}, with refs: {ts2['testsWithRefs']}")
+    if "reqsVerified" in stats["traceabilityCoverage"]:
+        rv = stats["traceabilityCoverage"]["reqsVerified"]
+        log(f"REQs verified:   {rv['count']}/{rv['total']} ({rv['percentage']}%), {rv['failingCount']} with failing tests")
+    if "coverageStats" in stats:
+        cv = stats["coverageStats"]
+        log(f"Line coverage:   {cv['covered']}/{cv['lines']} lines ({cv['ratio']*100:.1f}%), "
+            f"{cv['artifactsWithCoverage']} artifacts with executed-line ratios")
+
+
+# ──────────────────────────────────────────────────────────
+# Watch mode (incremental regeneration)
+# ──────────────────────────────────────────────────────────
+
+def _file_signature(path):
+    """Return a cheap change signature (mtime_ns, size) for a file, or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _git_signature(project_dir):
+    """Signature of .git/HEAD, packed-refs and loose refs — changes on commit, fetch or checkout."""
+    git_dir = os.path.join(project_dir, ".git")
+    if not os.path.isdir(git_dir):
+        return _file_signature(git_dir)
+    sig = [_file_signature(os.path.join(git_dir, "HEAD")),
+           _file_signature(os.path.join(git_dir, "packed-refs"))]
+    for root, dirs, filenames in os.walk(os.path.join(git_dir, "refs")):
+        dirs.sort()
+        for fname in sorted(filenames):
+            fpath = os.path.join(root, fname)
+            sig.append((fpath, _file_signature(fpath)))
+    return tuple(sig)
+
+
+class IncrementalScanner:
+    """Scanner state kept in memory between regenerations (--watch).
+
+    Per-file results of the markdown, code and test scanners are cached with
+    their (mtime, size) signature; refresh() re-parses only files whose
+    signature changed and re-runs git log only when HEAD or refs moved.
+    The merged results of each scanner are kept too and merged again only
+    when one of its files changed. test_results and coverage_reports are
+    re-read only when a report file changed. fixed maps deselected scan
+    phases (--only/--skip) to the output they keep for the whole session.
+    """
+
+    def __init__(self, project_dir, test_results=None, coverage_reports=None, fixed=None):
+        self.project_dir = project_dir
+        self.test_results = [os.path.abspath(p) for p in test_results or []]
+        self.coverage_reports = [os.path.abspath(p) for p in coverage_reports or []]
+        self.fixed = dict(fixed or {})
+        self._md = {}      # abs path -> (signature, result)
+        self._code = {}
+        self._test = {}
+        self._md_files = []
+        self._code_files = []
+        self._test_files = []
+        self._git_sig = object()  # forces the first commit scan
+        self._commits = []
+        self._aux_sig = None
+        self._report_sigs = (None, None)  # (test results, coverage)
+        self._merged = {}  # scanner -> merged output, dropped when one of its files changes
+        self._test_result_stats = None
+        self._coverage = None
+        self.reparsed = 0
+
+    def _tracked(self, path):
+        return path in self._md or path in self._code or path in self._test
+
+    def _is_report(self, path):
+        return any(path == root or path.startswith(root + os.sep)
+                   for root in self.test_results + self.coverage_reports)
+
+    def _needs_walk(self, changed_paths):
+        """A walk is needed when files appeared or disappeared under a scan root."""
+        git_dir = os.path.join(self.project_dir, ".git") + os.sep
+        for path in changed_paths:
+            if self._tracked(path):
+                if not os.path.isfile(path):
+                    return True
+            elif (not path.startswith(git_dir) and os.path.basename(path) != "pipeline-state.json"
+                  and not self._is_report(path)):
+                return True
+        return False
+
+    def _reparse(self, cache, paths, scan_fn):
+        """Re-parse the paths whose signature changed; return how many gave a different result."""
+        different = 0
+        for path in paths:
+            sig = _file_signature(path)
+            cached = cache.get(path)
+            if cached is None or cached[0] != sig:
+                result = scan_fn(path, self.project_dir)
+                if cached is None or cached[1] != result:
+                    different += 1
+                cache[path] = (sig, result)
+                self.reparsed += 1
+        return different
+
+    def _aux_signature(self):
+        """Signature of inputs read directly by build_graph (pipeline state, overrides, audits)."""
+        sig = [_file_signature(os.path.join(self.project_dir, "pipeline-state.json")),
+               _file_signature(os.path.join(self.project_dir, ".sdd", "overrides.json"))]
+        audits_dir = os.path.join(self.project_dir, "audits")
+        if os.path.isdir(audits_dir):
+            for fname in sorted(os.listdir(audits_dir)):
+                sig.append((fname, _file_signature(os.path.join(audits_dir, fname))))
+        return tuple(sig)
+
+    @staticmethod
+    def _reports_signature(report_paths, extensions):
+        """Signature of every report file under report_paths (quiet about missing ones)."""
+        sig = []
+        for path in report_paths:
+            if os.path.isdir(path):
+                for root, dirs, filenames in os.walk(path):
+                    dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                    sig.extend((os.path.join(root, f), _file_signature(os.path.join(root, f)))
+                               for f in sorted(filenames) if f.lower().endswith(extensions))
+            else:
+                sig.append((path, _file_signature(path)))
+        return tuple(sig)
+
+    def refresh(self, changed_paths=None):
+        """Bring the cached per-file results up to date.
+
+        changed_paths is the set of absolute paths reported by the watcher, or
+        None to re-stat every tracked file and rediscover the file lists.
+        Returns True if any input changed since the results were last assembled.
+        """
+        self.reparsed = 0
+        scanners = [(name, cache, scan_fn) for name, cache, scan_fn in (
+            ("md", self._md, _scan_md_file), ("code", self._code, _scan_code_file),
+            ("tests", self._test, _scan_test_file)) if name not in self.fixed]
+        if changed_paths is None or self._needs_walk(changed_paths):
+            collectors = {"md": collect_md_files, "code": collect_code_files, "tests": collect_test_files}
+            changed_paths = None
+            for name, cache, _ in scanners:
+                attr = {"md": "_md_files", "code": "_code_files", "tests": "_test_files"}[name]
+                files = collectors[name](self.project_dir)
+                if files != getattr(self, attr):
+                    setattr(self, attr, files)
+                    self._merged.pop(name, None)
+                for stale in set(cache) - set(files):
+                    del cache[stale]
+        for name, cache, scan_fn in scanners:
+            if changed_paths is None:
+                paths = {"md": self._md_files, "code": self._code_files, "tests": self._test_files}[name]
+            else:
+                paths = [p for p in changed_paths if p in cache]
+            if self._reparse(cache, paths, scan_fn):
+                self._merged.pop(name, None)
+        changed = any(name not in self._merged for name, _, _ in scanners)
+
+        if "commits" not in self.fixed:
+            git_sig = _git_signature(self.project_dir)
+            if git_sig != self._git_sig:
+                self._git_sig = git_sig
+                self._commits = scan_commits(self.project_dir)
+                changed = True
+
+        aux_sig = self._aux_signature()
+        if aux_sig != self._aux_sig:
+            self._aux_sig = aux_sig
+            changed = True
+
+        report_sigs = (self._reports_signature(self.test_results, (".xml",)),
+                       self._reports_signature(self.coverage_reports, COVERAGE_REPORT_EXTENSIONS))
+        if report_sigs != self._report_sigs:
+            if report_sigs[0] != self._report_sigs[0]:
+                self._merged.pop("tests", None)  # results are attached to freshly merged testRefs
+            if report_sigs[1] != self._report_sigs[1]:
+                self._coverage = None
+            self._report_sigs = report_sigs
+            changed = True
+        return changed
+
+    def _merge(self, name):
+        """Merged output of one scanner, from the cache when none of its files changed."""
+        if name not in self._merged:
+            if name in self.fixed:
+                merged = self.fixed[name]
+                if name == "tests":
+                    merged = [dict(tr) for tr in merged[0]], merged[1]
+            elif name == "md":
+                merged = _merge_md_results(self._md[p][1] for p in self._md_files)
+            elif name == "code":
+                merged = _merge_code_results(len(self._code_files), (self._code[p][1] for p in self._code_files))
+            else:
+                merged = _merge_test_results(len(self._test_files), (self._test[p][1] for p in self._test_files))
+            if name == "tests" and self.test_results:
+                self._test_result_stats = ingest_test_results(self.test_results, merged[0], self.project_dir)
+            self._merged[name] = merged
+        return self._merged[name]
+
+    def results(self):
+        """Assemble fresh scan outputs from the cache, in the same shape as the full scanners.
+
+        Artifacts, codeRefs and commits are copied (build_graph() annotates
+        them); the aggregated references and testRefs are shared between calls.
+        """
+        md_artifacts, references, all_ref_ids = self._merge("md")
+        artifacts = OrderedDict((art_id, dict(art)) for art_id, art in md_artifacts.items())
+        code_refs, code_stats = self._merge("code")
+        code_refs, code_stats = [dict(cr) for cr in code_refs], dict(code_stats)
+        test_refs, test_stats = self._merge("tests")
+        commits = [dict(c) for c in self.fixed.get("commits", self._commits)]
+        return artifacts, references, all_ref_ids, commits, code_refs, code_stats, test_refs, dict(test_stats)
+
+    def build_inputs(self):
+        """Keyword arguments for build_graph(), like scan_inputs() returns for a one-shot run."""
+        (artifacts, references, all_ref_ids, commits,
+         code_refs, code_stats, test_refs, test_stats) = self.results()
+        if self.coverage_reports and self._coverage is None:
+            self._coverage = load_coverage(self.coverage_reports, self.project_dir)
+        return {"artifacts": artifacts, "references": references, "all_ref_ids": all_ref_ids,
+                "commits": commits, "code_refs": code_refs, "code_stats": code_stats,
+                "test_refs": test_refs, "test_stats": test_stats,
+                "test_result_stats": dict(self._test_result_stats) if self.test_results else None,
+                "coverage": self._coverage, "audit_data": self.fixed.get("audits")}
+
+
+def _watch_targets(project_dir, report_paths=()):
+    """Return (recursive_dirs, flat_dirs) to watch for a project (and its report files or directories)."""
+    scopes = scan_scopes(project_dir)
+    recursive = scopes["markdown"].root_dirs() + scopes["code"].root_dirs() + scopes["tests"].root_dirs()
+    recursive.extend(scopes["tests"].root_dirs(scopes["tests"].colocated))
+    recursive.append(os.path.join(project_dir, "audits"))
+    recursive.append(os.path.join(project_dir, ".sdd"))
+    recursive.append(os.path.join(project_dir, ".git", "refs"))
+    recursive.extend(report_paths)
+    recursive = list(OrderedDict.fromkeys(d for d in recursive if os.path.isdir(d)))
+    flat = [project_dir]
+    if os.path.isdir(os.path.join(project_dir, ".git")):
+        flat.append(os.path.join(project_dir, ".git"))
+    # A report file is watched through its directory
+    for path in report_paths:
+        if not os.path.isdir(path) and os.path.isdir(os.path.dirname(path)):
+            flat.append(os.path.dirname(path))
+    return recursive, list(OrderedDict.fromkeys(flat))
+
+
+def _is_watch_noise(path, project_dir, output_dir):
+    """Filter events we never react to: our own outputs, temp files and git internals."""
+    if path.endswith(".tmp") or path == output_dir or path.startswith(output_dir + os.sep):
+        return True
+    git_dir = os.path.join(project_dir, ".git")
+    if os.path.dirname(path) == git_dir:
+        return os.path.basename(path) not in ("HEAD", "packed-refs")
+    return False
+
+
+class _InotifyWatcher:
+    """Linux inotify watcher via ctypes (no third-party dependency)."""
+
+    name = "inotify"
+    _IN_MODIFY = 0x002
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_FROM = 0x040
+    _IN_MOVED_TO = 0x080
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_DELETE_SELF = 0x400
+    _IN_Q_OVERFLOW = 0x4000
+    _IN_ISDIR = 0x40000000
+    _MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+             | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF)
+
+    def __init__(self, project_dir, output_dir, report_paths=()):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify not supported")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.project_dir = project_dir
+        self.output_dir = output_dir
+        self.report_paths = list(report_paths)
+        self._wd_paths = {}
+        self._add_targets()
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self._MASK)
+        if wd >= 0:
+            self._wd_paths[wd] = path
+
+    def _add_targets(self):
+        recursive, flat = _watch_targets(self.project_dir, self.report_paths)
+        scope = scan_scopes(self.project_dir)["project"]
+        for top in recursive:
+            for root, dirs, _ in os.walk(top):
+                dirs[:] = [d for d in dirs if not scope.prunes(os.path.join(root, d))]
+                self._add_watch(root)
+        for d in flat:
+            self._add_watch(d)
+
+    def wait(self, timeout):
+        """Block up to timeout seconds (None = forever).
+
+        Returns the set of changed paths (empty on timeout), or None when the
+        kernel queue overflowed and the exact change set is unknown.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        rewatch = False
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _cookie, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+            offset += 16 + length
+            if mask & self._IN_Q_OVERFLOW:
+                return None
+            base = self._wd_paths.get(wd)
+            if base is None:
+                continue
+            path = os.path.join(base, os.fsdecode(name)) if name else base
+            if mask & self._IN_ISDIR and mask & (self._IN_CREATE | self._IN_MOVED_TO):
+                rewatch = True
+            if _is_watch_noise(path, self.project_dir, self.output_dir):
+                continue
+            changed.add(path)
+        if rewatch:
+            self._add_targets()
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Portable fallback: periodic os.scandir snapshot of the watched trees."""
+
+    name = "polling"
+
+    def __init__(self, project_dir, output_dir, interval=1.0, report_paths=()):
+        self.project_dir = project_dir
+        self.output_dir = output_dir
+        self.interval = interval
+        self.report_paths = list(report_paths)
+        self._snapshot = self._take_snapshot()
+
+    def _scan_tree(self, top, recursive, snap):
+        try:
+            entries = list(os.scandir(top))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not self._scope.prunes(entry.path):
+                        self._scan_tree(entry.path, True, snap)
+                    elif not recursive:
+                        snap[entry.path] = None
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            if not _is_watch_noise(entry.path, self.project_dir, self.output_dir):
+                snap[entry.path] = (st.st_mtime_ns, st.st_size)
+
+    def _take_snapshot(self):
+        snap = {}
+        self._scope = scan_scopes(self.project_dir)["project"]
+        recursive, flat = _watch_targets(self.project_dir, self.report_paths)
+        for d in recursive:
+            self._scan_tree(d, True, snap)
+        for d in flat:
+            self._scan_tree(d, False, snap)
+        return snap
+
+    def wait(self, timeout):
+        """Poll until something changes or timeout elapses; returns the changed paths."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            step = self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic()))
+            time.sleep(step)
+            snap = self._take_snapshot()
+            old = self._snapshot
+            self._snapshot = snap
+            changed = {p for p in snap.keys() | old.keys() if snap.get(p) != old.get(p)}
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def _create_watcher(project_dir, output_dir, poll_interval, report_paths=()):
+    """Prefer inotify; fall back to polling where it is unavailable."""
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(project_dir, output_dir, report_paths)
+        except (OSError, AttributeError) as e:
+            log(f"  inotify unavailable ({e}) — falling back to polling")
+    return _PollingWatcher(project_dir, output_dir, poll_interval, report_paths)
+
+
+def watch(project_dir, output_dir, project_name, paths, debounce=0.3, poll_interval=1.0,
+          test_results=None, coverage_reports=None, phases=None):
+    """Regenerate outputs whenever inputs change, re-parsing only the affected files.
+
+    test_results and coverage_reports are watched and re-read when they
+    change. phases (select_phases()) leaves deselected scan phases at the
+    output they had when the session started (reused from the phase cache
+    like a one-shot run) and skips deselected html/guide outputs.
+    """
+    phases = set(PHASES) if phases is None else set(phases)
+    cache = PhaseCache(output_dir)
+    fixed = {phase: scan_phase(phase, project_dir, output_dir, phases, cache)
+             for phase in CACHED_PHASES if phase not in phases}
+    scanner = IncrementalScanner(project_dir, test_results, coverage_reports, fixed)
+    reachability = ReachabilityIndex.load(paths["reachability"])
+    encoder = GraphEncoder()
+    watcher = _create_watcher(project_dir, output_dir, poll_interval,
+                              scanner.test_results + scanner.coverage_reports)
+
+    def _regenerate(changed, force=False):
+        """Rebuild and write the outputs; returns (graph, ms), or (None, ms) when no input changed."""
+        start = time.perf_counter()
+        if not scanner.refresh(changed) and not force:
+            return None, (time.perf_counter() - start) * 1000
+        graph = build_graph(project_dir, output_dir, project_name, reachability=reachability,
+                            **scanner.build_inputs())
+        graph_json, data_json = encoder.encode(graph)
+        _safe_write_text(paths["graph"], graph_json)
+        reachability.write(paths["reachability"])
+        if "html" in phases:
+            generate_html(graph, paths["template"], paths["html"], data_json)
+        return graph, (time.perf_counter() - start) * 1000
+
+    graph, elapsed = _regenerate(None, force=True)
+    if "guide" in phases:
+        generate_guide(paths["guideTemplate"], paths["guide"])
+    generate_live_status(paths["liveStatus"])
+    print_statistics(graph)
+    log(f"\n[watch] Initial build in {elapsed:.0f} ms. Watching {project_dir} ({watcher.name}) — Ctrl+C to stop.")
+
+    try:
+        while True:
+            changed = watcher.wait(None)
+            if changed is not None and not changed:
+                continue
+            # Debounce: absorb the rest of the burst until the tree is quiet
+            while True:
+                more = watcher.wait(debounce)
+                if more is None:
+                    changed = None
+                elif not more:
+                    break
+                elif changed is not None:
+                    changed |= more
+            graph, elapsed = _regenerate(changed)
+            what = "full rescan" if changed is None else f"{len(changed)} path(s) changed"
+            if graph is None:
+                log(f"[watch] {what}, {scanner.reparsed} file(s) re-parsed — no input changed ({elapsed:.0f} ms)")
+                continue
+            log(f"[watch] {what}, {scanner.reparsed} file(s) re-parsed — regenerated in {elapsed:.0f} ms "
+                f"({graph['statistics']['totalArtifacts']} artifacts)")
+    except KeyboardInterrupt:
+        log("\n[watch] Stopped.")
+    finally:
+        watcher.close()
+    return 0
+
+
+# ──────────────────────────────────────────────────────────
+# Daemon mode (resident generator over a Unix-domain socket)
+# ──────────────────────────────────────────────────────────
+
+IMPACT_DEPTH_LABELS = {1: "WILL_BREAK", 2: "LIKELY_AFFECTED", 3: "MAY_NEED_REVIEW"}
+
+
+def _socket_dir():
+    """The current user's directory for daemon sockets.
+
+    $XDG_RUNTIME_DIR when set, otherwise sdd-dashboard-<uid>/ in the temp
+    dir, created 0700. A directory that another user owns or can write to
+    is refused (OSError), so nobody else can place a socket in it.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+    path = os.path.join(tempfile.gettempdir(), f"sdd-dashboard-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise OSError(f"{path} is not a private directory of the current user")
+    return path
+
+
+def default_socket_path(project_dir):
+    """Per-project socket path in the user's socket dir (kept short for the AF_UNIX path limit)."""
+    digest = hashlib.sha1(project_dir.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(_socket_dir(), f"sdd-dashboard-{digest}.sock")
+
+
+class DashboardService:
+    """Project model held in memory; answers daemon requests (and their in-process fallback)."""
+
+    def __init__(self, project_dir, output_dir, project_name, paths, test_results=None, coverage_reports=None):
+        self.project_dir = project_dir
+        self.output_dir = output_dir
+        self.project_name = project_name
+        self.paths = paths
+        self.scanner = IncrementalScanner(project_dir, test_results, coverage_reports)
+        self.reachability = ReachabilityIndex.load(paths["reachability"])
+        self.encoder = GraphEncoder()
+        self.graph = None
+        self.index = None
+
+    def _current_graph(self):
+        """Refresh the scanner (stat-only for unchanged files) and rebuild the graph if needed."""
+        if self.scanner.refresh() or self.graph is None:
+            self.graph = build_graph(self.project_dir, self.output_dir, self.project_name,
+                                     reachability=self.reachability, **self.scanner.build_inputs())
+        return self.graph
+
+    def _current_index(self):
+        """query.GraphIndex over the current graph, rebuilt when the graph is."""
+        import query  # query imports this module, so it is loaded on first use
+        graph = self._current_graph()
+        if self.index is None or self.index.graph is not graph:
+            self.index = query.GraphIndex(graph, os.path.dirname(self.paths["graph"]))
+        return self.index
+
+    def handle(self, request):
+        """Dispatch one JSON request; returns the JSON-serializable result."""
+        cmd = request.get("cmd")
+        if cmd == "ping":
+            return {"project": self.project_dir, "output": self.output_dir}
+        if cmd == "regenerate":
+            start = time.perf_counter()
+            graph = self._current_graph()
+            graph_json, data_json = self.encoder.encode(graph)
+            _safe_write_text(self.paths["graph"], graph_json)
+            self.reachability.write(self.paths["reachability"])
+            generate_html(graph, self.paths["template"], self.paths["html"], data_json)
+            generate_guide(self.paths["guideTemplate"], self.paths["guide"])
+            generate_live_status(self.paths["liveStatus"])
+            return {
+                "graph": self.paths["graph"],
+                "statistics": graph["statistics"],
+                "elapsedMs": round((time.perf_counter() - start) * 1000, 1),
+            }
+        if cmd == "stats":
+            return self._current_graph()["statistics"]
+        if cmd == "artifact":
+            artifact_id = request.get("id")
+            art = self._current_index().by_id.get(artifact_id)
+            if art is None:
+                raise KeyError(f'Artifact "{artifact_id}" not found')
+            return art
+        if cmd == "impact":
+            return self._current_index().impact(request.get("id"), request.get("direction", "downstream"),
+                                                int(request.get("maxDepth", 3)))
+        raise ValueError(f"Unknown command: {cmd!r}")
+
+
+def serve_daemon(service, socket_path):
+    """Serve newline-delimited JSON requests on a Unix-domain socket until 'shutdown'."""
+    if not hasattr(socket, "AF_UNIX"):
+        log("Error: daemon mode requires Unix-domain sockets (not available on this platform).")
+        return 1
+    if os.path.exists(socket_path):
+        if daemon_request(socket_path, {"cmd": "ping"}, timeout=1) is not None:
+            log(f"Error: a daemon is already listening on {socket_path}")
+            return 1
+        try:
+            os.unlink(socket_path)
+        except OSError as e:
+            log(f"Error: cannot remove the stale socket {socket_path}: {e}")
+            return 1
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            try:
+                request = json.loads(line)
+                if request.get("cmd") == "shutdown":
+                    response = {"ok": True, "result": None}
+                    self.server.stop = True
+                else:
+                    response = {"ok": True, "result": service.handle(request)}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    # Created 0600 from the start: a chmod after bind would leave a window
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.stop = False
+    service._current_graph()
+    log(f"[daemon] Listening on {socket_path} — model loaded ({len(service.graph['artifacts'])} artifacts)")
+    try:
+        while not server.stop:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+        log("[daemon] Stopped.")
+    return 0
+
+
+def daemon_request(socket_path, request, timeout=120):
+    """Send one request to a running daemon. Returns the response dict, or None if no daemon answers."""
+    if not hasattr(socket, "AF_UNIX") or not socket_path or not os.path.exists(socket_path):
+        return None
+    if os.stat(socket_path).st_uid != os.getuid():
+        log(f"  Warning: ignoring {socket_path}: owned by another user")
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+
+def _request_from_args(words, args):
+    """Build a protocol request from '--request CMD [ID]' words."""
+    request = {"cmd": words[0]}
+    if len(words) > 1:
+        request["id"] = words[1]
+    if words[0] == "impact":
+        request["direction"] = args.direction
+        request["maxDepth"] = args.max_depth
+    return request
+
+
+# ──────────────────────────────────────────────────────────
+# Phase selection (--only / --skip) and phase cache
+# ──────────────────────────────────────────────────────────
+
+PHASES = ("md", "code", "tests", "commits", "audits", "html", "guide")
+CACHED_PHASES = ("md", "code", "tests", "commits", "audits")
+PHASE_CACHE_DIR = ".phase-cache"
+PHASE_CACHE_VERSION = 1
+
+
+def select_phases(only=None, skip=None):
+    """Phases to run for --only / --skip (comma-separated, repeatable); raises ValueError on unknown names."""
+    def parse(values):
+        names = {name.strip() for value in values for name in value.split(",") if name.strip()}
+        unknown = sorted(names - set(PHASES))
+        if unknown:
+            raise ValueError(f"unknown phase(s) {', '.join(unknown)} (choose from {', '.join(PHASES)})")
+        return names
+    selected = parse(only) if only else set(PHASES)
+    return selected - parse(skip or [])
+
+
+def _audit_files(project_dir):
+    audits_dir = os.path.join(project_dir, "audits")
+    if not os.path.isdir(audits_dir):
+        return []
+    return [os.path.join(audits_dir, f) for f in sorted(os.listdir(audits_dir)) if f.lower().endswith(".md")]
+
+
+def phase_fingerprint(project_dir, files=(), extra=None):
+    """sha256 over the (mtime, size) of a phase's input files plus any extra signature.
+
+    generate.py itself and .sdd/dashboard.json are always included, so a
+    generator upgrade or config change invalidates every cached phase.
+    """
+    h = hashlib.sha256(f"v{PHASE_CACHE_VERSION}\n".encode("utf-8"))
+    for path in (os.path.abspath(__file__), os.path.join(project_dir, ".sdd", "dashboard.json")):
+        h.update(f"{path}\0{_file_signature(path)}\n".encode("utf-8"))
+    for path in files:
+        h.update(f"{path}\0{_file_signature(path)}\n".encode("utf-8"))
+    h.update(repr(extra).encode("utf-8"))
+    return h.hexdigest()
+
+
+class PhaseCache:
+    """Outputs of the cacheable phases from previous runs, under OUTPUT/.phase-cache/.
+
+    Each phase is one file: a header line ({version, phase, fingerprint})
+    followed by the phase output as one JSON line, so freshness is checked
+    without parsing the payload. load() refuses an entry whose fingerprint
+    differs from the current inputs.
+    """
+
+    def __init__(self, output_dir):
+        self.dir = os.path.join(output_dir, PHASE_CACHE_DIR)
+
+    def _path(self, phase):
+        return os.path.join(self.dir, f"{phase}.jsonl")
+
+    def _header(self, phase):
+        try:
+            with open(self._path(phase), "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        return header if header.get("version") == PHASE_CACHE_VERSION else None
+
+    def fingerprint(self, phase):
+        """Fingerprint the cached entry was stored with (None when absent)."""
+        header = self._header(phase)
+        return header.get("fingerprint") if header else None
+
+    def load(self, phase, fingerprint):
+        """The cached output for phase, or None when missing or stale."""
+        if self.fingerprint(phase) != fingerprint:
+            return None
+        try:
+            with open(self._path(phase), "r", encoding="utf-8") as f:
+                f.readline()
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+
+    def store(self, phase, fingerprint, data):
+        if self.fingerprint(phase) == fingerprint:
+            return
+        header = {"version": PHASE_CACHE_VERSION, "phase": phase, "fingerprint": fingerprint,
+                  "generatedAt": datetime.now(timezone.utc).isoformat()}
+        try:
+            _safe_write_text(self._path(phase), json.dumps(header) + "\n"
+                             + json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            log(f"  Warning: could not cache phase {phase}: {e}")
+
+
+def _encode_phase(phase, output):
+    if phase == "md":
+        artifacts, references, all_ref_ids = output
+        return {"artifacts": list(artifacts.values()), "references": references.to_json(),
+                "refIds": sorted(all_ref_ids)}
+    if phase in ("code", "tests"):
+        return {"refs": output[0], "stats": output[1]}
+    return output  # commits list, audit data dict
+
+
+def _decode_phase(phase, data):
+    if phase == "md":
+        return (OrderedDict((art["id"], art) for art in data["artifacts"]),
+                ReferenceAggregator.from_json(data["references"]), set(data["refIds"]))
+    if phase in ("code", "tests"):
+        return data["refs"], data["stats"]
+    return data
+
+
+def _run_cached_phase(phase, profile_name, selected, cache, fingerprint, run):
+    """Run a cacheable phase, or reuse its cached output when the phase is not selected.
+
+    A deselected phase whose cache is missing or stale (inputs changed since
+    it was stored) runs anyway. Every run stores its output for later reuse.
+    """
+    if phase not in selected:
+        with profile_phase(f"cache.{phase}"):
+            data = cache.load(phase, fingerprint)
+            output = _decode_phase(phase, data) if data is not None else None
+        if output is not None:
+            log(f"  Reusing cached {phase} results")
+            return output
+        reason = "inputs changed" if cache.fingerprint(phase) else "no cached results"
+        log(f"  Running skipped phase {phase}: {reason}")
+    with profile_phase(profile_name):
+        output = run()
+    cache.store(phase, fingerprint, _encode_phase(phase, output))
+    return output
+
+
+def scan_phase(phase, project_dir, output_dir, selected, cache):
+    """Output of one cacheable scan phase (CACHED_PHASES): run, or reused from the phase cache."""
+    if phase == "md":
+        md_files = collect_md_files(project_dir)
+        return _run_cached_phase("md", "scan.markdown", selected, cache, phase_fingerprint(project_dir, md_files),
+                                 lambda: scan_files(project_dir, md_files))
+    if phase == "code":
+        code_files = collect_code_files(project_dir)
+        return _run_cached_phase("code", "scan.code", selected, cache, phase_fingerprint(project_dir, code_files),
+                                 lambda: scan_code_refs(project_dir, code_files))
+    if phase == "tests":
+        test_files = collect_test_files(project_dir)
+        return _run_cached_phase("tests", "scan.tests", selected, cache, phase_fingerprint(project_dir, test_files),
+                                 lambda: scan_test_refs(project_dir, test_files))
+    if phase == "commits":
+        return _run_cached_phase("commits", "scan.commits", selected, cache,
+                                 phase_fingerprint(project_dir, extra=_git_signature(project_dir)),
+                                 lambda: scan_commits(project_dir))
+    return _run_cached_phase("audits", "scan.audits", selected, cache,
+                             phase_fingerprint(project_dir, _audit_files(project_dir)),
+                             lambda: scan_audits(project_dir, os.path.join(output_dir, AUDIT_CACHE_FILE)))
+
+
+def scan_inputs(project_dir, output_dir, selected, test_results=None, coverage_reports=None):
+    """Run (or reuse from the phase cache) every scan phase; return build_graph() keyword arguments.
+
+    Scan phases missing from selected reuse their cached output when the
+    inputs are unchanged (see _run_cached_phase()).
+    """
+    cache = PhaseCache(output_dir)
+
+    # Extract artifacts and references
+    artifacts, references, all_ref_ids = scan_phase("md", project_dir, output_dir, selected, cache)
+
+    log(f"\nExtracted {len(artifacts)} artifact definitions")
+    log(f"Extracted {len(references)} raw references")
+
+    # Scan source code
+    log("\nScanning source code...")
+    code_refs, code_stats = scan_phase("code", project_dir, output_dir, selected, cache)
+
+    # Scan tests
+    log("\nScanning tests...")
+    test_refs, test_stats = scan_phase("tests", project_dir, output_dir, selected, cache)
+
+    # Ingest test results
+    test_result_stats = None
+    if test_results:
+        log("\nIngesting test results...")
+        with profile_phase("ingest.testResults"):
+            test_result_stats = ingest_test_results(test_results, test_refs, project_dir)
+
+    # Ingest line coverage
+    coverage = None
+    if coverage_reports:
+        log("\nIngesting coverage...")
+        with profile_phase("ingest.coverage"):
+            coverage = load_coverage(coverage_reports, project_dir)
+
+    # Scan commits
+    log("\nScanning git commits...")
+    commits = scan_phase("commits", project_dir, output_dir, selected, cache)
+
+    audit_data = scan_phase("audits", project_dir, output_dir, selected, cache)
+
+    return {"artifacts": artifacts, "references": references, "all_ref_ids": all_ref_ids,
+            "commits": commits, "code_refs": code_refs, "code_stats": code_stats,
+            "test_refs": test_refs, "test_stats": test_stats, "test_result_stats": test_result_stats,
+            "coverage": coverage, "audit_data": audit_data}
+
+
+class Generation:
+    """One regeneration split into steps: scan() -> build() -> write() -> render().
+
+    run() chains them the way the CLI does. Library callers can stop after
+    build() for an in-memory graph that leaves the output directory alone,
+    or call a single step again (e.g. render() after editing the template).
+    phases is the set from select_phases() (all by default). Deselected
+    scan phases (md, code, tests, commits, audits) are filled from the phase
+    cache when their inputs are unchanged; deselected html/guide leave the
+    previous file in place. Each step runs inside a profile_phase(), so a
+    Profiler installed with enable_profiling() sees the same phases as
+    --profile.
+    """
+
+    def __init__(self, project_dir, output_dir=None, project_name=None, test_results=None,
+                 coverage_reports=None, phases=None, paths=None):
+        self.project_dir = os.path.abspath(project_dir)
+        self.output_dir = os.path.abspath(output_dir) if output_dir else os.path.join(self.project_dir, "dashboard")
+        self.project_name = project_name or detect_project_name(self.project_dir)
+        self.paths = paths or resolve_output_paths(self.project_dir, self.output_dir)
+        self.test_results = list(test_results or [])
+        self.coverage_reports = list(coverage_reports or [])
+        self.phases = set(PHASES) if phases is None else set(phases)
+        self.inputs = None
+        self.graph = None
+        self.reachability = None
+
+    def scan(self):
+        """Run (or reuse from the phase cache) the scan phases; return the build_graph() inputs."""
+        self.inputs = scan_inputs(self.project_dir, self.output_dir, self.phases,
+                                  self.test_results, self.coverage_reports)
+        return self.inputs
+
+    def build(self, list_limit=STATS_LIST_LIMIT):
+        """Build the graph from the scanned inputs (scanning first if needed); return it."""
+        if self.inputs is None:
+            self.scan()
+        if self.reachability is None:
+            self.reachability = ReachabilityIndex.load(self.paths["reachability"])
+        with profile_phase("build"):
+            self.graph = build_graph(self.project_dir, self.output_dir, self.project_name,
+                                     list_limit=list_limit, reachability=self.reachability, **self.inputs)
+        return self.graph
+
+    def write(self):
+        """Write traceability-graph.json (crash-safe — Step 0.5) and reachability.json; return the graph path."""
+        graph = self.graph if self.graph is not None else self.build()
+        with profile_phase("write.graph"):
+            _safe_write_json(self.paths["graph"], graph)
+        with profile_phase("write.reachability"):
+            self.reachability.write(self.paths["reachability"])
+        log(f"\nWrote {self.paths['graph']}")
+        return self.paths["graph"]
+
+    def render(self):
+        """Write the selected HTML dashboard and guide, and the live-status.js seed."""
+        graph = self.graph if self.graph is not None else self.build()
+        if "html" in self.phases:
+            log(f"\nGenerating HTML dashboard...")
+            with profile_phase("render.html"):
+                html_ok = generate_html(graph, self.paths["template"], self.paths["html"])
+            if html_ok:
+                log(f"Wrote {self.paths['html']}")
+            else:
+                log("HTML generation failed.")
+        else:
+            log(f"\nSkipped HTML dashboard ({self.paths['html']} left as is)")
+
+        if "guide" in self.phases:
+            with profile_phase("render.guide"):
+                guide_ok = generate_guide(self.paths["guideTemplate"], self.paths["guide"])
+            if guide_ok:
+                log(f"Wrote {self.paths['guide']}")
+
+        with profile_phase("write.liveStatus"):
+            generate_live_status(self.paths["liveStatus"])
+        log(f"Wrote {self.paths['liveStatus']}")
+
+    def run(self):
+        """scan, build, write, print statistics and render; return the graph."""
+        self.scan()
+        self.build()
+        self.write()
+        print_statistics(self.graph)
+        self.render()
+        return self.graph
+
+
+def generate_dashboard(project_dir, output_dir, project_name, paths, test_results=None, coverage_reports=None,
+                       phases=None):
+    """One-shot regeneration: scan everything, build the graph and write all outputs; return the graph."""
+    return Generation(project_dir, output_dir, project_name, test_results, coverage_reports, phases, paths).run()
+
+
+GENERATE_OPTIONS = {
+    "output_dir": None,        # default: PROJECT/dashboard
+    "project_name": None,      # default: detect_project_name()
+    "test_results": (),        # JUnit XML files or directories
+    "coverage": (),            # LCOV / Cobertura files or directories
+    "only": (),                # phase names, as --only
+    "skip": (),                # phase names, as --skip
+    "write": True,             # False: build the graph in memory and write nothing
+    "logger": None,            # callable or logging.Logger; default: logging.getLogger("sdd.dashboard")
+}
+
+
+def generate(project_dir, options=None):
+    """Library entry point: regenerate a project in-process and return its graph dict.
+
+    options is a dict with any of the GENERATE_OPTIONS keys. Progress goes
+    to the logger instead of stdout; with the default logger it is silent
+    unless the caller configures logging. Raises ValueError on unknown
+    options or phase names. Use Generation directly to run single steps.
+    """
+    opts = dict(GENERATE_OPTIONS)
+    unknown = set(options or {}) - set(opts)
+    if unknown:
+        raise ValueError(f"unknown generate() options: {', '.join(sorted(unknown))}")
+    opts.update(options or {})
+    only, skip = ([value] if isinstance(value, str) else list(value) for value in (opts["only"], opts["skip"]))
+    phases = select_phases(only, skip)
+    gen = Generation(project_dir, opts["output_dir"], opts["project_name"], opts["test_results"],
+                     opts["coverage"], phases)
+    previous = set_logger(opts["logger"] or logging.getLogger("sdd.dashboard"))
+    try:
+        return gen.run() if opts["write"] else gen.build()
+    finally:
+        set_logger(previous)
 
-    # Fallback: count src/tests files with broader extensions for task-implementer if still 0
-    if stage_counts.get("task-implementer", 0) == 0:
-        broad_exts = {".ts", ".js", ".tsx", ".jsx", ".py", ".go", ".rs", ".java", ".kt", ".rb", ".cs", ".cpp", ".c", ".swift"}
-        impl_fallback = 0
-        for search_dir in ["src", "app", "lib", "tests", "test"]:
-            d = os.path.join(project_dir, search_dir)
-            if os.path.isdir(d):
-                for root, dirs, filenames in os.walk(d):
-                    dirs[:] = [dd for dd in dirs if dd not in SKIP_DIRS]
-                    impl_fallback += sum(1 for f in filenames if os.path.splitext(f)[1].lower() in broad_exts)
-        if impl_fallback > 0:
-            stage_counts["task-implementer"] = impl_fallback
 
-    pipeline_stages = []
-    for sname in stage_order:
-        sd = stages_data.get(sname, {})
-        stage_entry = {
-            "name": sname,
-            "status": sd.get("status", "unknown"),
-            "lastRun": sd.get("lastRun"),
-            "artifactCount": stage_counts.get(sname, 0),
-            "stageLabel": summary_label_overrides.get(sname, STAGE_COUNT_UNITS.get(sname, "artifacts")),
-        }
-        if sd.get("summary"):
-            stage_entry["summary"] = sd["summary"]
-        pipeline_stages.append(stage_entry)
-    pipeline_data["stages"] = pipeline_stages
+# ──────────────────────────────────────────────────────────
+# Batch mode (--batch)
+# ──────────────────────────────────────────────────────────
 
-    # Lateral stages (security-auditor, req-change)
-    lateral_names = ["security-auditor", "req-change", "tech-designer", "ux-designer"]
-    lateral_stages = []
-    for lname in lateral_names:
-        ld = stages_data.get(lname)
-        if ld:
-            lateral_entry = {
-                "name": lname,
-                "status": ld.get("status", "unknown"),
-                "lastRun": ld.get("lastRun"),
-                "artifactCount": stage_counts.get(lname, 0),
-                "stageLabel": summary_label_overrides.get(lname, STAGE_COUNT_UNITS.get(lname, "artifacts")),
-            }
-            if ld.get("summary"):
-                lateral_entry["summary"] = ld["summary"]
-            lateral_stages.append(lateral_entry)
-    if lateral_stages:
-        pipeline_data["lateralStages"] = lateral_stages
+BATCH_FORMAT = "sdd-dashboard-batch"
+BATCH_LOG_TAIL = 20  # lines of captured output shown for a failed project
 
-    # Deduplicate relationships
-    seen_rels = set()
-    deduped_rels = []
-    for (src, tgt, sfile, line) in references:
-        src_type = classify_id(src)
-        tgt_type = classify_id(tgt)
-        if not src_type or not tgt_type:
-            continue
-        rel_type = infer_relationship_type(src_type, tgt_type)
-        key = (src, tgt, rel_type)
-        if key not in seen_rels:
-            seen_rels.add(key)
-            deduped_rels.append({
-                "source": src,
-                "target": tgt,
-                "type": rel_type,
-                "sourceFile": sfile,
-                "line": line,
-            })
 
-    # Compute statistics
-    by_type = {}
-    for art in artifacts.values():
-        by_type[art["type"]] = by_type.get(art["type"], 0) + 1
+def batch_projects(spec):
+    """Resolve a --batch argument to project directories.
 
-    # Build incoming/outgoing indexes for coverage
-    incoming = {}  # target -> set of source IDs
-    outgoing = {}  # source -> set of target IDs
-    for rel in deduped_rels:
-        incoming.setdefault(rel["target"], set()).add(rel["source"])
-        outgoing.setdefault(rel["source"], set()).add(rel["target"])
+    spec is a text file with one project path per line (blank lines and
+    # comments skipped, relative paths taken from the file's directory) or
+    a glob matching project directories ("work/*").
+    """
+    if os.path.isfile(spec):
+        base = os.path.dirname(os.path.abspath(spec))
+        with open(spec, "r", encoding="utf-8") as f:
+            entries = [line.strip() for line in f]
+        paths = [os.path.join(base, os.path.expanduser(e)) for e in entries if e and not e.startswith("#")]
+    else:
+        paths = [p for p in sorted(glob.glob(os.path.expanduser(spec))) if os.path.isdir(p)]
+    return list(OrderedDict.fromkeys(os.path.abspath(p) for p in paths))
 
-    # REQ coverage
-    reqs = [a for a in artifacts.values() if a["type"] == "REQ"]
-    total_reqs = len(reqs)
 
-    # Categories that don't need Use Cases (they trace to NFR specs or are project constraints)
-    _NO_UC_CATEGORIES = {"NF", "C"}
+def batch_output_dirs(projects, output_root=None):
+    """Output directory per project: its own dashboard/, or under output_root.
 
-    def _req_needs_uc(req):
-        """Return True if this REQ type is expected to have a Use Case."""
-        cat = req.get("category")
-        return cat not in _NO_UC_CATEGORIES
+    Under output_root each project keeps its path relative to the
+    projects' common parent ("a/app", "b/app"), so projects that share a
+    directory name never share an output. Raises ValueError on duplicate
+    projects or outputs.
+    """
+    duplicates = sorted(p for p, n in Counter(projects).items() if n > 1)
+    if duplicates:
+        raise ValueError(f"projects listed more than once: {', '.join(duplicates)}")
+    if not output_root:
+        return [os.path.join(p, "dashboard") for p in projects]
+    common = os.path.commonpath(projects) if projects else output_root
+    if common in projects:
+        common = os.path.dirname(common)
+    outputs = [os.path.join(output_root, os.path.relpath(p, common)) for p in projects]
+    clashes = sorted(o for o, n in Counter(outputs).items() if n > 1)
+    if clashes:
+        raise ValueError(f"projects would share an output directory: {', '.join(clashes)}")
+    return outputs
+
+
+def run_batch_project(project_dir, output_dir, phases=None):
+    """Regenerate one project of a batch; never raises.
+
+    Progress output (log() and stdout) is captured rather than interleaved
+    with the other workers; an installed logger is set aside meanwhile.
+    Returns {project, name (directory name), output, ok, elapsedMs,
+    phases, ...} with the wall time of every top-level phase, the artifact
+    count on success and the error plus the tail of the captured output on
+    failure.
+    """
+    captured = io.StringIO()
+    result = {"project": project_dir, "name": os.path.basename(project_dir), "output": output_dir, "ok": False}
+    start = time.perf_counter()
+    profiler = enable_profiling(trace_memory=False)
+    previous_logger = set_logger(lambda message: captured.write(f"{message}\n"))
+    try:
+        with contextlib.redirect_stdout(captured):
+            if not os.path.isdir(project_dir):
+                raise FileNotFoundError(f"project directory not found: {project_dir}")
+            project_name = detect_project_name(project_dir)
+            result["projectName"] = project_name
+            graph = generate_dashboard(project_dir, output_dir, project_name,
+                                       resolve_output_paths(project_dir, output_dir), phases=phases)
+        result["ok"] = True
+        result["artifacts"] = graph["statistics"]["totalArtifacts"]
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        result["error"] = f"{type(e).__name__}: {e}"
+        captured.write(traceback.format_exc())
+        result["logTail"] = captured.getvalue().splitlines()[-BATCH_LOG_TAIL:]
+    finally:
+        set_logger(previous_logger)
+        disable_profiling()
+    result["elapsedMs"] = round((time.perf_counter() - start) * 1000, 1)
+    result["phases"] = {p["name"]: p["wallMs"] for p in profiler.phases if p["depth"] == 0}
+    return result
 
-    # Functional REQs = those expected to have UCs
-    functional_reqs = [r for r in reqs if _req_needs_uc(r)]
-    total_functional_reqs = len(functional_reqs)
 
-    def _neighbors(node_id):
-        """Return all directly connected artifact IDs (both directions)."""
-        return incoming.get(node_id, set()) | outgoing.get(node_id, set())
+def run_batch(projects, output_root=None, jobs=None, phases=None):
+    """Regenerate many projects in one process tree; return the batch summary.
 
-    def count_reqs_with(target_type):
-        count = 0
-        for req in reqs:
-            rid = req["id"]
-            for neighbor in _neighbors(rid):
-                if classify_id(neighbor) == target_type:
-                    count += 1
-                    break
-        return count
+    Projects run on a shared pool of jobs worker processes (default: one
+    per CPU, at most one per project). Workers stay up across projects, so
+    imports and compiled patterns are paid once per worker rather than
+    once per project. At most jobs projects are in flight; a worker that
+    exits takes the pool down with it, so the projects in flight at that
+    point are re-run one at a time on a fresh worker and only the one that
+    kills its worker again is failed. jobs=1 runs everything in this
+    process.
+    """
+    outputs = batch_output_dirs(projects, output_root)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(projects) or 1))
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    ordered = [None] * len(projects)
+
+    def report(index, result):
+        ordered[index] = result
+        status = "ok" if result["ok"] else "FAIL"
+        detail = f"{result.get('artifacts', 0)} artifacts" if result["ok"] else result["error"]
+        done = sum(1 for r in ordered if r is not None)
+        log(f"  [{done}/{len(projects)}] {status:<4} {result['name']:<30} "
+            f"{result['elapsedMs']:>9.0f} ms  {detail}")
+
+    def crashed(index):
+        project = projects[index]
+        return {"project": project, "name": os.path.basename(project),
+                "output": outputs[index], "ok": False,
+                "error": "worker process exited abruptly", "elapsedMs": 0, "phases": {}}
+
+    if jobs == 1:
+        for index, project in enumerate(projects):
+            report(index, run_batch_project(project, outputs[index], phases))
+    else:
+        pending = list(range(len(projects)))
+        suspects = []
+        while pending:
+            in_flight = {}
+            broken = False
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                while (pending or in_flight) and not broken:
+                    while pending and len(in_flight) < jobs:
+                        index = pending.pop(0)
+                        project = projects[index]
+                        future = pool.submit(run_batch_project, project, outputs[index], phases)
+                        in_flight[future] = index
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        try:
+                            report(index, future.result())
+                        except BrokenProcessPool:
+                            suspects.append(index)
+                            broken = True
+            # The pool died: keep what finished; the rest were in flight when a worker exited
+            for future, index in in_flight.items():
+                if future.done() and not future.exception():
+                    report(index, future.result())
+                else:
+                    suspects.append(index)
+        # Re-run each project that was in flight when a pool died on its own worker to find the culprit
+        for index in suspects:
+            project = projects[index]
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                future = pool.submit(run_batch_project, project, outputs[index], phases)
+                try:
+                    report(index, future.result())
+                except BrokenProcessPool:
+                    report(index, crashed(index))
+
+    phase_totals = {}
+    for result in ordered:
+        for name, ms in result["phases"].items():
+            phase_totals[name] = round(phase_totals.get(name, 0) + ms, 3)
+    return {
+        "format": BATCH_FORMAT,
+        "version": 1,
+        "generatedAt": started_at,
+        "jobs": jobs,
+        "wallMs": round((time.perf_counter() - start) * 1000, 1),
+        "projectMs": round(sum(r["elapsedMs"] for r in ordered), 1),
+        "succeeded": sum(1 for r in ordered if r["ok"]),
+        "failed": sum(1 for r in ordered if not r["ok"]),
+        "phaseTotals": phase_totals,
+        "projects": ordered,
+    }
 
-    def count_reqs_with_transitive(target_type, req_subset=None, bridge_types=("UC", "WF")):
-        """Count REQs linked to target_type within 2 hops via bridge artifacts.
 
-        Checks: REQ↔TARGET (1-hop) then REQ↔bridge↔TARGET (2-hop).
-        bridge_types=None means any artifact type can serve as bridge.
-        req_subset: if provided, only count from this subset of REQs.
-        """
-        subset = req_subset if req_subset is not None else reqs
-        count = 0
-        for req in subset:
-            rid = req["id"]
-            found = False
-            neighbors = _neighbors(rid)
-            # 1-hop: direct REQ↔TARGET
-            for n in neighbors:
-                if classify_id(n) == target_type:
-                    found = True
-                    break
-            if not found:
-                # 2-hop: REQ↔bridge↔TARGET
-                for n in neighbors:
-                    n_type = classify_id(n)
-                    if n_type == "REQ":
-                        continue  # skip REQ→REQ→TARGET to avoid noise
-                    if bridge_types is not None and n_type not in bridge_types:
-                        continue
-                    for n2 in _neighbors(n):
-                        if classify_id(n2) == target_type:
-                            found = True
-                            break
-                    if found:
-                        break
-            if found:
-                count += 1
-        return count
+def print_batch_summary(summary):
+    """Print the combined timing table of a batch run, slowest projects and phases first."""
+    log(f"\nBatch: {summary['succeeded']} ok, {summary['failed']} failed, {len(summary['projects'])} projects "
+        f"in {summary['wallMs'] / 1000:.1f} s wall with {summary['jobs']} workers "
+        f"({summary['projectMs'] / 1000:.1f} s of project time)")
+    log(f"  {'project':<30} {'status':<6} {'ms':>9}")
+    for result in sorted(summary["projects"], key=lambda r: -r["elapsedMs"]):
+        log(f"  {result['name'][:30]:<30} {'ok' if result['ok'] else 'FAIL':<6} {result['elapsedMs']:>9.0f}")
+    if summary["phaseTotals"]:
+        log(f"\n  {'phase (all projects)':<30} {'ms':>16}")
+        for name, ms in sorted(summary["phaseTotals"].items(), key=lambda kv: -kv[1]):
+            log(f"  {name:<30} {ms:>16.0f}")
+    for result in summary["projects"]:
+        if not result["ok"]:
+            log(f"\nFAILED {result['project']}: {result['error']}")
+            for line in result.get("logTail", []):
+                log(f"    {line}")
 
-    # UC coverage: only count functional REQs (NF/C don't need UCs by design)
-    reqs_with_uc = count_reqs_with_transitive("UC", req_subset=functional_reqs, bridge_types=None)
-    reqs_with_bdd = count_reqs_with_transitive("BDD", bridge_types=None)
-    reqs_with_task = count_reqs_with_transitive("TASK")
 
-    # Functional-only variants for implementation metrics
-    # (NF/C REQs don't generate UCs, tasks, or code — so they shouldn't penalize coverage)
-    functional_req_ids = {r["id"] for r in functional_reqs}
-    reqs_with_bdd_functional = count_reqs_with_transitive("BDD", req_subset=functional_reqs, bridge_types=None)
-    reqs_with_task_functional = count_reqs_with_transitive("TASK", req_subset=functional_reqs)
+# ──────────────────────────────────────────────────────────
+# Changed-files impact (--impact-of)
+# ──────────────────────────────────────────────────────────
 
-    # Find orphans: artifacts defined but never referenced by any other artifact
-    all_defined = set(artifacts.keys())
-    all_referenced = set()
-    for rel in deduped_rels:
-        all_referenced.add(rel["target"])
-        all_referenced.add(rel["source"])
-    orphans = sorted(all_defined - all_referenced)
+IMPACT_FORMAT = "sdd-impact"
+IMPACT_VERSION = 1
+IMPACT_INDEX_FILE = ".impact-index.json"
+IMPACT_INDEX_FORMAT = "sdd-impact-index"
+IMPACT_INDEX_VERSION = 2
+IMPACT_TYPE_ORDER = ("REQ", "UC", "INV", "TASK")  # reported first; other types follow alphabetically
+_IMPACT_INDEX_CACHE = {}  # index path -> (graph signature, index)
+_DIFF_HUNK_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+def build_impact_index(graph):
+    """Invert a built graph into the lookup tables --impact-of answers from.
+
+    "files" maps each project-relative path to {via: [artifact IDs]}: "defined"
+    for the artifacts the file defines, "test" for testRefs, "commit" for the
+    files of linked commits and the codeRef origin for code refs ("code" for
+    Refs: comments, "commit-inferred"/"task-inferred" for refs inferred from
+    commit trailers). "edges" lists the (source, target) pairs each file
+    states and "truncated" the edges whose locations were capped, so a file
+    missing from their locations may still state them. "commits" maps short
+    and full SHAs to the artifact IDs the graph links them to: the commit's
+    trailer IDs and the artifacts of codeRefs inferred from it (a Task:
+    trailer reaches those through the graph). "adjacency" is the undirected
+    relationship graph the coverage propagation walks (commit edges
+    excluded).
+    """
+    artifacts = {}
+    files = {}
+    commits = {}
+
+    def add(path, via, art_id):
+        files.setdefault(path, {}).setdefault(via, set()).add(art_id)
+
+    for art in graph["artifacts"]:
+        art_id = art["id"]
+        artifacts[art_id] = [art["type"], art.get("title") or "", art.get("file") or "", art.get("line") or 0]
+        if art.get("file"):
+            add(art["file"], "defined", art_id)
+        for ref in art.get("codeRefs") or ():
+            origin = ref.get("origin") or "direct"
+            add(ref["file"], "code" if origin == "direct" else origin, art_id)
+            sha = (ref.get("inferredFrom") or {}).get("commitSha")
+            if sha:
+                commits.setdefault(sha, set()).add(art_id)
+        for ref in art.get("testRefs") or ():
+            add(ref["file"], "test", art_id)
+        for commit in art.get("commitRefs") or ():
+            for sha in (commit.get("sha"), commit.get("fullSha")):
+                if sha:
+                    commits.setdefault(sha, set()).add(art_id)
+            for path in commit.get("files") or ():
+                add(path, "commit", art_id)
+
+    edges = {}
+    truncated = set()
+    adjacency = {}
+    for rel in graph["relationships"]:
+        if rel["type"] == "implemented-by-commit":
+            continue
+        src, tgt = rel["source"], rel["target"]
+        adjacency.setdefault(src, set()).add(tgt)
+        adjacency.setdefault(tgt, set()).add(src)
+        locations = rel.get("locations") or [[rel.get("sourceFile"), rel.get("line")]]
+        for path in {loc[0] for loc in locations if loc[0]}:
+            edges.setdefault(path, set()).add((src, tgt))
+        if rel.get("occurrences", 1) > len(locations):
+            truncated.add((src, tgt))
+
+    return {
+        "format": IMPACT_INDEX_FORMAT,
+        "version": IMPACT_INDEX_VERSION,
+        "artifacts": artifacts,
+        "files": {path: {via: sorted(ids) for via, ids in sorted(vias.items())}
+                  for path, vias in sorted(files.items())},
+        "edges": {path: sorted(pairs) for path, pairs in sorted(edges.items())},
+        "truncated": sorted(truncated),
+        "commits": {sha: sorted(ids) for sha, ids in sorted(commits.items())},
+        "adjacency": {node: sorted(nbrs) for node, nbrs in sorted(adjacency.items())},
+    }
 
-    # Find broken references: IDs referenced but never defined
-    broken_refs = []
-    broken_ids = set()
-    for (src, tgt, sfile, line) in references:
-        if tgt not in artifacts and tgt not in broken_ids:
-            broken_ids.add(tgt)
-            broken_refs.append({
-                "ref": tgt,
-                "referencedIn": sfile,
-                "line": line,
-            })
 
-    # ── Commit processing ──────────────────────────────────
-    artifact_commit_refs = {}  # artifact id -> list of commitRef objects
+def load_impact_index(graph_path):
+    """Return the impact index for a traceability-graph.json, or None if there is no graph.
 
-    for commit in commits:
-        commit_ref = {
-            "sha": commit["sha"],
-            "fullSha": commit["fullSha"],
-            "message": commit["message"],
-            "author": commit["author"],
-            "date": commit["date"],
-            "taskId": commit.get("taskId"),
-            "refIds": commit.get("refIds", []),
-            "files": commit.get("files", []),
-        }
-        # Attach to each referenced artifact
-        for ref_id in commit.get("refIds", []):
-            artifact_commit_refs.setdefault(ref_id, []).append(commit_ref)
-            # Create implemented-by-commit relationship
-            if ref_id in artifacts:
-                rel_key = (commit["sha"], ref_id, "implemented-by-commit")
-                if rel_key not in seen_rels:
-                    seen_rels.add(rel_key)
-                    deduped_rels.append({
-                        "source": commit["sha"],
-                        "target": ref_id,
-                        "type": "implemented-by-commit",
-                        "sourceFile": "git-log",
-                        "line": 0,
-                    })
-        # Attach to task artifact if present
-        task_id = commit.get("taskId")
-        if task_id and task_id in artifacts:
-            artifact_commit_refs.setdefault(task_id, []).append(commit_ref)
+    The index is cached next to the graph (.impact-index.json) and in memory,
+    keyed by the graph's (mtime, size) signature; it is rebuilt from the
+    graph only after a regeneration.
+    """
+    graph_sig = _file_signature(graph_path)
+    if graph_sig is None:
+        return None
+    index_path = os.path.join(os.path.dirname(graph_path), IMPACT_INDEX_FILE)
+    cached = _IMPACT_INDEX_CACHE.get(index_path)
+    if cached is not None and cached[0] == graph_sig:
+        return cached[1]
+    index = None
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if (index.get("format") != IMPACT_INDEX_FORMAT or index.get("version") != IMPACT_INDEX_VERSION
+                or index.get("graph") != list(graph_sig)):
+            index = None
+    except (OSError, ValueError):
+        index = None
+    if index is None:
+        with open(graph_path, "r", encoding="utf-8") as f:
+            index = build_impact_index(json.load(f))
+        index["graph"] = list(graph_sig)
+        try:
+            _safe_write_text(index_path, json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+        except OSError as e:
+            log(f"  Warning: could not write {index_path}: {e}")
+        log(f"  Built impact index ({len(index['files'])} files, {len(index['artifacts'])} artifacts)")
+    _IMPACT_INDEX_CACHE[index_path] = (graph_sig, index)
+    return index
 
-    # Inject commitRefs into artifact objects
-    for art in artifacts.values():
-        art["commitRefs"] = artifact_commit_refs.get(art["id"], [])
 
-    # ── Code refs processing (Step 1.4: merge direct + inferred) ──
-    # 1. Tag direct code refs with origin
-    for cr in code_refs:
-        cr["origin"] = "direct"
-        cr["inferredFrom"] = None
+def _git_output(project_dir, args, timeout=60):
+    """stdout of a git command run in the project, or None if git is unavailable or fails."""
+    try:
+        result = subprocess.run(["git", "-c", "core.quotePath=false"] + list(args),
+                                capture_output=True, text=True, cwd=project_dir, timeout=timeout)
+    except Exception:
+        return None
+    return result.stdout if result.returncode == 0 else None
 
-    # 2. Infer code refs from commits (Step 1.2)
-    inferred_code_refs = infer_code_refs_from_commits(commits, artifacts, incoming, outgoing)
 
-    # 3. Deduplicate: if file+refId already has direct ref, skip inferred
-    direct_keys = set()
-    for cr in code_refs:
-        for rid in cr.get("refIds", []):
-            direct_keys.add((cr["file"], rid))
+def _impact_base(project_dir, rev_range):
+    """The revision a "base..head" / "base...head" range is diffed against (HEAD when omitted)."""
+    if "..." in rev_range:
+        left, right = rev_range.split("...", 1)
+        out = _git_output(project_dir, ["merge-base", left or "HEAD", right or "HEAD"])
+        return out.strip() if out else left or "HEAD"
+    return rev_range.split("..", 1)[0] or "HEAD"
 
-    deduped_inferred = []
-    for cr in inferred_code_refs:
-        new_ref_ids = [rid for rid in cr["refIds"] if (cr["file"], rid) not in direct_keys]
-        if new_ref_ids:
-            cr["refIds"] = new_ref_ids
-            deduped_inferred.append(cr)
 
-    # 4. Apply overrides (Step 1.5)
-    overrides_path = os.path.join(project_dir, ".sdd", "overrides.json")
-    all_code_refs = code_refs + deduped_inferred
-    all_code_refs, override_count = apply_overrides(all_code_refs, overrides_path)
+def _diff_hunks(project_dir, base, paths):
+    """New-side changed line ranges per file, from git diff -U0 of base against the working tree.
 
-    # 5. Build artifact_code_refs map from merged refs
-    artifact_code_refs = {}
-    for cr in all_code_refs:
-        for ref_id in cr.get("refIds", []):
-            artifact_code_refs.setdefault(ref_id, []).append(cr)
-    for art in artifacts.values():
-        art["codeRefs"] = artifact_code_refs.get(art["id"], [])
+    Files git reports nothing for (untracked, or git unavailable) are left
+    out, so callers treat them as changed throughout.
+    """
+    if not paths:
+        return {}
+    out = _git_output(project_dir, ["diff", "-U0", "--no-color", "--no-ext-diff", "--no-renames",
+                                    "--relative", base, "--"] + list(paths))
+    hunks = {}
+    current = None
+    for line in (out or "").splitlines():
+        if line.startswith("+++ "):
+            current = line[6:] if line.startswith("+++ b/") else None
+            if current is not None:
+                hunks.setdefault(current, [])
+        elif current is not None and line.startswith("@@"):
+            m = _DIFF_HUNK_RE.match(line)
+            if m:
+                start = int(m.group(1))
+                count = 1 if m.group(2) is None else int(m.group(2))
+                hunks[current].append((start, start + max(count, 1) - 1))
+    return hunks
+
+
+def _impact_scanners(abs_path, scopes):
+    """The scanners ("markdown", "tests", "code") a full regeneration would parse a file with."""
+    fname = os.path.basename(abs_path)
+    ext = os.path.splitext(fname)[1].lower()
+
+    def covers(scope, roots=None):
+        return scope.accepts(abs_path) and any(abs_path.startswith(os.path.join(top, ""))
+                                               for top in scope.root_dirs(roots))
+
+    if fname.lower().endswith(".md"):
+        return ["markdown"] if covers(scopes["markdown"]) else []
+    scanners = []
+    tests = scopes["tests"]
+    if ext in TEST_EXTENSIONS and (covers(tests) or (COLOCATED_TEST_FILE_RE.search(fname)
+                                                     and covers(tests, tests.colocated))):
+        scanners.append("tests")
+    if ext in CODE_EXTENSIONS and covers(scopes["code"]):
+        scanners.append("code")
+    return scanners
+
+
+def _touched_definitions(before_ids, after_defs, titles, hunks):
+    """Definitions a markdown edit touched: added, removed, retitled or overlapping a changed line.
+
+    after_defs are the file's definitions as re-parsed; hunks are its
+    changed line ranges (None: the whole file counts as changed). Each
+    definition spans from its line to the line before the next one.
+    """
+    touched = set(before_ids).symmetric_difference(after_defs)
+    kept = [d for d in after_defs.values() if d["id"] in before_ids]
+    if hunks is None:
+        return touched | {d["id"] for d in kept}
+    starts = sorted((d["line"], d["id"]) for d in after_defs.values())
+    for d in kept:
+        if d.get("title", "") != titles.get(d["id"], ""):
+            touched.add(d["id"])
+            continue
+        later = [line for line, _ in starts if line > d["line"]]
+        end = later[0] - 1 if later else float("inf")
+        if any(lo <= end and hi >= d["line"] for lo, hi in hunks):
+            touched.add(d["id"])
+    return touched
 
-    # ── Test refs processing ──────────────────────────────────
-    artifact_test_refs = {}
-    for tr in test_refs:
-        for ref_id in tr.get("refIds", []):
-            artifact_test_refs.setdefault(ref_id, []).append(tr)
-    for art in artifacts.values():
-        art["testRefs"] = artifact_test_refs.get(art["id"], [])
 
-    # ── BFS N-hop propagation to REQs (Step 1.3) ──────────────
-    req_ids = {r["id"] for r in reqs}
-    reqs_with_code_set = propagate_refs_to_reqs(req_ids, artifact_code_refs, incoming, outgoing)
-    reqs_with_tests_set = propagate_refs_to_reqs(req_ids, artifact_test_refs, incoming, outgoing)
-    reqs_with_commits_set = propagate_refs_to_reqs(req_ids, artifact_commit_refs, incoming, outgoing)
+def impact_walk(seeds, adjacency, max_depth=3, extra=None):
+    """Multi-source BFS from the seeds: {node: (depth, parent)} within max_depth hops.
 
-    reqs_with_code = len(reqs_with_code_set)
-    reqs_with_code_functional = len(reqs_with_code_set & functional_req_ids)
-    reqs_with_tests = len(reqs_with_tests_set)
-    reqs_with_tests_functional = len(reqs_with_tests_set & functional_req_ids)
-    reqs_with_commits = len(reqs_with_commits_set)
-    reqs_with_commits_functional = len(reqs_with_commits_set & functional_req_ids)
+    Like the coverage propagation, paths run through non-REQ nodes only: a
+    REQ is reached but never expanded, so the REQs found are exactly those
+    whose coverage the seeds can feed. extra holds neighbors to add to the
+    adjacency (edges not in the graph yet).
+    """
+    extra = extra or {}
+    found = {seed: (0, None) for seed in seeds}
+    frontier = sorted(seed for seed in seeds if classify_id(seed) != "REQ")
+    for depth in range(1, max_depth + 1):
+        next_frontier = []
+        for node in frontier:
+            nbrs = adjacency.get(node, ())
+            if node in extra:
+                nbrs = set(nbrs) | extra[node]
+            for nbr in sorted(nbrs):
+                if nbr not in found:
+                    found[nbr] = (depth, node)
+                    if classify_id(nbr) != "REQ":
+                        next_frontier.append(nbr)
+        frontier = next_frontier
+    return found
+
+
+def impact_of(project_dir, graph_path, spec, max_depth=3):
+    """Report the artifacts a set of changed files can affect, without rebuilding the graph.
+
+    spec is a single "base..head" (or "base...head") git range, or a list of
+    file paths (absolute or project-relative). The last generated graph is
+    taken as the before state through its cached impact index; changed
+    files that exist are re-parsed (markdown, code and test scanners, as a
+    full regeneration would) for the after state, so added refs and
+    definitions count too. For markdown, only definitions overlapping a
+    changed line (git diff against the working tree), retitled, added or
+    removed are seeds, plus both ends of every added or removed reference.
+    Commits in the range seed their Refs:/Task: trailer IDs and the
+    artifacts the graph links them to (the index's "commits" table). The
+    new side of a range is read from the working tree, so check out its
+    head.
+
+    Raises ValueError when there is no graph to answer from or the range is
+    not valid git.
+    """
+    started = time.perf_counter()
+    index = load_impact_index(graph_path)
+    if index is None:
+        raise ValueError(f"no {os.path.basename(graph_path)} in {os.path.dirname(graph_path)} — "
+                         "generate the dashboard first")
+    scopes = scan_scopes(project_dir)
+    spec = list(spec)
+    rev_range = None
+    if len(spec) == 1 and ".." in spec[0] and not os.path.exists(os.path.join(project_dir, spec[0])):
+        rev_range = spec[0]
+        out = _git_output(project_dir, ["diff", "--name-status", "--no-renames", "--relative", rev_range])
+        if out is None:
+            raise ValueError(f"git diff {rev_range} failed in {project_dir}")
+        changed = []
+        for line in out.splitlines():
+            status, _, path = line.partition("\t")
+            if path:
+                changed.append((path, "deleted" if status.startswith("D") else
+                                "added" if status.startswith("A") else "modified"))
+        commits = scan_commits(project_dir, rev_range)
+        base = _impact_base(project_dir, rev_range)
+    else:
+        changed = []
+        for path in spec:
+            rel = _rel_path(path, project_dir) if os.path.isabs(path) else path.replace("\\", "/")
+            rel = os.path.normpath(rel).replace(os.sep, "/")
+            status = "modified" if os.path.isfile(os.path.join(project_dir, rel)) else "deleted"
+            changed.append((rel, status))
+        commits = []
+        base = "HEAD"
 
-    # ── Classification ────────────────────────────────────────
-    classification_stats = classify_requirements(artifacts, incoming, outgoing)
+    artifacts = index["artifacts"]
+    truncated = {tuple(pair) for pair in index["truncated"]}
+    reasons = {}  # artifact ID -> set of reasons
+    new_defs = {}  # IDs defined by a changed file but not in the graph yet
+    overlay = {}  # adjacency for references added since the graph was built
+    md_paths = [rel for rel, status in changed if status != "deleted" and rel.lower().endswith(".md")]
+    hunks = _diff_hunks(project_dir, base, md_paths)
+
+    def seed(art_id, reason, seeded):
+        reasons.setdefault(art_id, set()).add(reason)
+        seeded.add(art_id)
+
+    files = []
+    for rel, status in changed:
+        abs_path = os.path.join(project_dir, rel)
+        before = index["files"].get(rel, {})
+        scanners = _impact_scanners(abs_path, scopes) if status != "deleted" else []
+        seeded = set()
+        for via, ids in before.items():
+            if via != "defined" or "markdown" not in scanners:
+                for art_id in ids:
+                    seed(art_id, f"{rel} ({via})", seeded)
+        before_edges = {tuple(pair) for pair in index["edges"].get(rel, ())}
+        if "markdown" in scanners:
+            result = _scan_md_file(abs_path, project_dir)
+            defs, refs = (result[0], result[1]) if result else ([], [])
+            after_defs = OrderedDict((d["id"], d) for d in defs)
+            titles = {art_id: artifacts[art_id][1] for art_id in before.get("defined", ()) if art_id in artifacts}
+            for art_id in _touched_definitions(before.get("defined", ()), after_defs, titles, hunks.get(rel)):
+                seed(art_id, f"{rel} (defined)", seeded)
+            for art_id, d in after_defs.items():
+                if art_id not in artifacts:
+                    new_defs[art_id] = d
+            after_edges = {(src, tgt) for src, tgt, _, _ in refs if classify_id(src) and classify_id(tgt)}
+            # An edge whose locations were capped may be stated here without being listed
+            added = {e for e in after_edges - before_edges if e not in truncated}
+            for src, tgt in added:
+                overlay.setdefault(src, set()).add(tgt)
+                overlay.setdefault(tgt, set()).add(src)
+            for src, tgt in added | (before_edges - after_edges):
+                seed(src, f"{rel} (references)", seeded)
+                seed(tgt, f"{rel} (references)", seeded)
+        elif status == "deleted":
+            for src, tgt in before_edges:
+                seed(src, f"{rel} (references)", seeded)
+                seed(tgt, f"{rel} (references)", seeded)
+        if "tests" in scanners:
+            result = _scan_test_file(abs_path, project_dir)
+            for ref in (result[0] if result else ()):
+                for art_id in ref.get("refIds", ()):
+                    seed(art_id, f"{rel} (test)", seeded)
+        if "code" in scanners:
+            result = _scan_code_file(abs_path, project_dir)
+            for ref in (result[0] if result else ()):
+                for art_id in ref.get("refIds", ()):
+                    seed(art_id, f"{rel} (code)", seeded)
+        files.append({"path": rel, "status": status, "artifacts": sorted(seeded)})
+
+    commit_list = []
+    for commit in commits:
+        ids = list(commit["refIds"]) + ([commit["taskId"]] if commit["taskId"] else [])
+        for sha in (commit["sha"], commit["fullSha"]):
+            ids.extend(index["commits"].get(sha, ()))
+        for art_id in ids:
+            reasons.setdefault(art_id, set()).add(f"commit {commit['sha']}")
+        commit_list.append({"sha": commit["sha"], "message": commit["message"], "artifacts": sorted(set(ids))})
+
+    found = impact_walk(reasons, index["adjacency"], max_depth, overlay)
+    affected = {}
+    for node, (depth, parent) in found.items():
+        if node in artifacts:
+            art_type, title = artifacts[node][0], artifacts[node][1]
+        elif node in new_defs:
+            art_type, title = new_defs[node]["type"], new_defs[node].get("title", "")
+        else:
+            continue
+        entry = {"id": node, "title": title, "depth": depth}
+        if node in reasons:
+            entry["via"] = sorted(reasons[node])
+        if parent is not None:
+            entry["from"] = parent
+        if node in new_defs:
+            entry["new"] = True
+        affected.setdefault(art_type, []).append(entry)
+    order = {t: i for i, t in enumerate(IMPACT_TYPE_ORDER)}
+    affected = {t: sorted(affected[t], key=lambda e: (e["depth"], e["id"]))
+                for t in sorted(affected, key=lambda t: (order.get(t, len(order)), t))}
+    return {
+        "format": IMPACT_FORMAT,
+        "version": IMPACT_VERSION,
+        "range": rev_range,
+        "maxDepth": max_depth,
+        "files": files,
+        "commits": commit_list,
+        "counts": {t: len(entries) for t, entries in affected.items()},
+        "affected": affected,
+        "unknownIds": sorted(i for i in reasons if i not in artifacts and i not in new_defs),
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# ──────────────────────────────────────────────────────────
+# History snapshots (--history)
+# ──────────────────────────────────────────────────────────
 
-    # Commit stats
-    commits_with_refs = sum(1 for c in commits if c.get("refIds"))
-    commits_with_tasks = sum(1 for c in commits if c.get("taskId"))
-    unique_tasks = len(set(c["taskId"] for c in commits if c.get("taskId")))
+HISTORY_FILE = "history.json"
+HISTORY_FORMAT = "sdd-history"
+HISTORY_VERSION = 1
+# Inputs build_graph reads from the project itself (plus audits/*.md), copied
+# per revision into a scratch directory
+HISTORY_AUX_FILES = ("pipeline-state.json", ".sdd/dashboard.json", ".sdd/overrides.json")
+_HISTORY_SCANNERS = {"markdown": _scan_md_file, "code": _scan_code_file, "tests": _scan_test_file}
 
-    commit_stats = {
-        "totalCommits": len(commits),
-        "commitsWithRefs": commits_with_refs,
-        "commitsWithTasks": commits_with_tasks,
-        "uniqueTasksCovered": unique_tasks,
-    }
 
-    # Enhanced code stats with inference breakdown (Step 1.6)
-    direct_refs_count = sum(1 for cr in all_code_refs if cr.get("origin") == "direct")
-    inferred_refs_count = sum(1 for cr in all_code_refs if cr.get("origin") in ("commit-inferred", "task-inferred"))
-    code_stats["directRefs"] = direct_refs_count
-    code_stats["inferredRefs"] = inferred_refs_count
-    code_stats["manualOverrides"] = override_count
+class GitBlobReader:
+    """Read blobs through one long-lived `git cat-file --batch` process.
 
-    stats = {
-        "totalArtifacts": len(artifacts),
-        "byType": OrderedDict(sorted(by_type.items())),
-        "totalRelationships": len(deduped_rels),
-        "traceabilityCoverage": {
-            "totalReqs": total_reqs,
-            "totalFunctionalReqs": total_functional_reqs,
-            "reqBreakdown": classification_stats.get("byCategory", {}),
-            "reqsWithUCs": {
-                "count": reqs_with_uc,
-                "total": total_functional_reqs,
-                "percentage": round(reqs_with_uc / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
-            },
-            "reqsWithBDD": {
-                "count": reqs_with_bdd,
-                "total": total_reqs,
-                "percentage": round(reqs_with_bdd / total_reqs * 100, 1) if total_reqs > 0 else 0,
-                "functionalCount": reqs_with_bdd_functional,
-                "functionalTotal": total_functional_reqs,
-                "functionalPercentage": round(reqs_with_bdd_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
-            },
-            "reqsWithTasks": {
-                "count": reqs_with_task,
-                "total": total_reqs,
-                "percentage": round(reqs_with_task / total_reqs * 100, 1) if total_reqs > 0 else 0,
-                "functionalCount": reqs_with_task_functional,
-                "functionalTotal": total_functional_reqs,
-                "functionalPercentage": round(reqs_with_task_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
-            },
-            "reqsWithCode": {
-                "count": reqs_with_code,
-                "total": total_reqs,
-                "percentage": round(reqs_with_code / total_reqs * 100, 1) if total_reqs > 0 else 0,
-                "functionalCount": reqs_with_code_functional,
-                "functionalTotal": total_functional_reqs,
-                "functionalPercentage": round(reqs_with_code_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
-            },
-            "reqsWithTests": {
-                "count": reqs_with_tests,
-                "total": total_reqs,
-                "percentage": round(reqs_with_tests / total_reqs * 100, 1) if total_reqs > 0 else 0,
-                "functionalCount": reqs_with_tests_functional,
-                "functionalTotal": total_functional_reqs,
-                "functionalPercentage": round(reqs_with_tests_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
-            },
-            "reqsWithCommits": {
-                "count": reqs_with_commits,
-                "total": total_reqs,
-                "percentage": round(reqs_with_commits / total_reqs * 100, 1) if total_reqs > 0 else 0,
-                "functionalCount": reqs_with_commits_functional,
-                "functionalTotal": total_functional_reqs,
-                "functionalPercentage": round(reqs_with_commits_functional / total_functional_reqs * 100, 1) if total_functional_reqs > 0 else 0,
-            },
-        },
-        "orphans": orphans[:50],  # cap at 50 to avoid bloat
-        "brokenReferences": broken_refs[:50],
-        "codeStats": code_stats,
-        "testStats": test_stats,
-        "commitStats": commit_stats,
-        "classificationStats": classification_stats,
-    }
+    read_many() feeds the requests from a writer thread while the contents
+    are read back, so a revision's worth of blobs costs no process start
+    and no round trip per blob. Use as a context manager.
+    """
 
-    # ── Adoption data (loaded from dashboard/adoption-data.json) ─────────
-    adoption_file = os.path.join(output_dir, "adoption-data.json")
-    adoption = {"present": False}
-    adoption_stats = None
-    if os.path.exists(adoption_file):
-        with open(adoption_file, "r", encoding="utf-8") as f:
-            adoption_data = json.load(f)
-        adoption = adoption_data.get("adoption", {"present": False})
-        adoption_stats = adoption_data.get("adoptionStats", None)
+    def __init__(self, repo_dir):
+        self._proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo_dir,
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE)
 
-    stats["adoptionStats"] = adoption_stats
-    stats["auditData"] = scan_audits(project_dir)
+    def read_many(self, shas):
+        """Yield (sha, bytes) in request order; bytes is None for a missing object."""
+        shas = list(shas)
 
-    graph = {
-        "$schema": "traceability-graph-v6",
-        "generatedAt": datetime.now(timezone.utc).isoformat(),
-        "projectName": project_name,
-        "pipeline": pipeline_data,
-        "artifacts": list(artifacts.values()),
-        "relationships": deduped_rels,
-        "statistics": stats,
-        "adoption": adoption,
-    }
+        def feed():
+            try:
+                self._proc.stdin.write(b"".join(sha.encode() + b"\n" for sha in shas))
+                self._proc.stdin.flush()
+            except OSError:
+                pass
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        out = self._proc.stdout
+        try:
+            for sha in shas:
+                header = out.readline()
+                if not header:
+                    raise RuntimeError("git cat-file --batch exited early")
+                fields = header.split()
+                if len(fields) < 3 or fields[1] == b"missing":
+                    yield sha, None
+                    continue
+                data = out.read(int(fields[2]))
+                out.read(1)  # the newline after each object
+                yield sha, data
+        finally:
+            writer.join()
 
-    # Preserve codeIntelligence from previous graph if it exists (Step 2.1)
-    graph_file = os.path.join(output_dir, "traceability-graph.json")
-    if os.path.exists(graph_file):
+    def close(self):
         try:
-            with open(graph_file, "r", encoding="utf-8") as f:
-                prev_graph = json.load(f)
-            if "codeIntelligence" in prev_graph:
-                graph["codeIntelligence"] = prev_graph["codeIntelligence"]
+            self._proc.stdin.close()
+            self._proc.wait(timeout=10)
         except Exception:
-            pass
+            self._proc.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _git_tree_blobs(project_dir, rev):
+    """{project-relative path: blob SHA} for the regular files of rev under the project directory."""
+    out = _git_output(project_dir, ["ls-tree", "-r", "-z", rev])
+    if out is None:
+        raise ValueError(f"cannot list the tree of {rev}")
+    blobs = {}
+    for entry in out.split("\0"):
+        meta, _, path = entry.partition("\t")
+        fields = meta.split()
+        if len(fields) == 3 and fields[1] == "blob" and fields[0] != "120000":
+            blobs[path] = fields[2]
+    return blobs
+
+
+def _walk_order(rel_path):
+    """Sort key putting a directory's files before its subdirectories, as the scope walks do."""
+    parts = rel_path.split("/")
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+
+def history_revisions(project_dir, specs):
+    """Expand --history arguments: globs ("v*") become the matching tags, oldest first; revisions stay as given."""
+    revisions = []
+    for spec in specs:
+        if any(c in spec for c in "*?["):
+            out = _git_output(project_dir, ["tag", "--list", spec, "--sort=version:refname",
+                                            "--sort=creatordate"])
+            revisions.extend(line for line in (out or "").splitlines() if line)
+        else:
+            revisions.append(spec)
+    return list(OrderedDict.fromkeys(revisions))
+
+
+class HistoryScanner:
+    """Build graph statistics for past revisions straight from git objects, without a checkout.
+
+    Each snapshot lists the revision's tree (git ls-tree), picks the files
+    the markdown, code and test scopes would walk, and reads only the blobs
+    not parsed yet through a GitBlobReader. Per-file results are cached by
+    (scanner, path, blob SHA), so a file unchanged between revisions is
+    parsed once; entries the latest revision did not use are dropped, which
+    keeps the cache at about one revision's size. pipeline-state.json,
+    .sdd/dashboard.json, .sdd/overrides.json and audits/*.md are copied from
+    the revision into a scratch directory that stands in for the project
+    when the graph is built; commits come from git log of the revision. The
+    ReachabilityIndex is carried from one snapshot to the next, so the
+    coverage walks are redone only around what changed. Use as a context
+    manager.
+    """
 
-    # Refine with code intelligence if available (Step 2.3)
-    if "codeIntelligence" in graph:
-        _refine_with_code_intelligence(graph)
+    def __init__(self, project_dir, project_name=None):
+        self.project_dir = os.path.abspath(project_dir)
+        self.project_name = project_name or detect_project_name(self.project_dir)
+        self.reachability = ReachabilityIndex()
+        self._parsed = {}  # (scanner, path, blob sha) -> scan result
+        self._reader = GitBlobReader(self.project_dir)
+        self._scratch = tempfile.mkdtemp(prefix="sdd-history-")
+
+    def close(self):
+        self._reader.close()
+        shutil.rmtree(self._scratch, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_aux_files(self, blobs):
+        shutil.rmtree(self._scratch, ignore_errors=True)
+        os.makedirs(self._scratch)
+        aux = [path for path in sorted(blobs) if path in HISTORY_AUX_FILES
+               or (path.startswith("audits/") and path.count("/") == 1 and path.lower().endswith(".md"))]
+        for path, (_, data) in zip(aux, self._reader.read_many(blobs[path] for path in aux)):
+            if data is None:
+                continue
+            target = os.path.join(self._scratch, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+
+    def _select_files(self, blobs):
+        """The files each scanner would parse at this revision, in walk order."""
+        scopes = scan_scopes(self._scratch)
+        tests = scopes["tests"]
+        ordered = sorted(blobs, key=_walk_order)
+        files = {"markdown": [], "code": [], "tests": []}
+        for path in ordered:
+            ext = os.path.splitext(path)[1].lower()
+            if path.lower().endswith(".md") and scopes["markdown"].covers(path):
+                files["markdown"].append(path)
+            if ext in CODE_EXTENSIONS and scopes["code"].covers(path):
+                files["code"].append(path)
+            if ext in TEST_EXTENSIONS and tests.covers(path):
+                files["tests"].append(path)
+        seen = set(files["tests"])
+        files["tests"].extend(path for path in ordered if path not in seen
+                              and COLOCATED_TEST_FILE_RE.search(path.rsplit("/", 1)[-1])
+                              and tests.covers(path, tests.colocated))
+        return files
+
+    def snapshot(self, rev):
+        """Scan one revision and build its graph in memory; return its statistics snapshot.
+
+        Raises ValueError if rev does not name a commit.
+        """
+        started = time.perf_counter()
+        info = _git_output(self.project_dir, ["show", "-s", "--format=%H%x00%h%x00%aI%x00%s", rev + "^{commit}"])
+        if not info or info.count("\0") < 3:
+            raise ValueError(f"unknown revision {rev!r}")
+        full_sha, short_sha, date, subject = info.rstrip("\n").split("\0", 3)
+        blobs = _git_tree_blobs(self.project_dir, full_sha)
+        self._write_aux_files(blobs)
+        files = self._select_files(blobs)
+
+        keys = {(scanner, path, blobs[path]) for scanner, paths in files.items() for path in paths}
+        missing = sorted(key for key in keys if key not in self._parsed)
+        by_sha = OrderedDict()
+        for key in missing:
+            by_sha.setdefault(key[2], []).append(key)
+        for sha, data in self._reader.read_many(by_sha):
+            text = _decode_blob(data) if data is not None else None
+            for key in by_sha[sha]:
+                scanner, path = key[0], key[1]
+                fpath = os.path.join(self.project_dir, path)
+                self._parsed[key] = (_HISTORY_SCANNERS[scanner](fpath, self.project_dir, text=text)
+                                     if text is not None else None)
+        regex_scope(None)
+        self._parsed = {key: self._parsed[key] for key in keys}
+
+        def results(scanner):
+            return (self._parsed[(scanner, path, blobs[path])] for path in files[scanner])
+
+        artifacts, references, all_ref_ids = _merge_md_results(results("markdown"))
+        code_refs, code_stats = _merge_code_results(len(files["code"]), results("code"))
+        test_refs, test_stats = _merge_test_results(len(files["tests"]), results("tests"))
+        graph = build_graph(self._scratch, os.path.join(self._scratch, "dashboard"), self.project_name,
+                            artifacts, references, all_ref_ids,
+                            commits=scan_commits(self.project_dir, full_sha),
+                            code_refs=code_refs, code_stats=code_stats,
+                            test_refs=test_refs, test_stats=test_stats,
+                            audit_data=scan_audits(self._scratch),
+                            reachability=self.reachability, code_files=files["code"])
+        return {
+            "rev": rev,
+            "sha": full_sha,
+            "shortSha": short_sha,
+            "date": date,
+            "subject": subject,
+            "files": {scanner: len(paths) for scanner, paths in files.items()},
+            "parsed": len(missing),
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+            "metrics": check_metrics(graph),
+            "statistics": graph["statistics"],
+        }
 
-    return graph
 
+# ──────────────────────────────────────────────────────────
+# CI gate (--check)
+# ──────────────────────────────────────────────────────────
 
-def _refine_with_code_intelligence(graph):
-    """Refine file-level inferred codeRefs with symbol-level data from codeIntelligence (Step 2.3).
+CHECK_FORMAT = "sdd-dashboard-check"
+CHECK_VERSION = 1
+_CHECK_COVERAGE_METRICS = ("reqsWithUCs", "reqsWithBDD", "reqsWithTasks", "reqsWithCode",
+                           "reqsWithTests", "reqsWithCommits", "reqsVerified")
+_CHECK_COUNT_METRICS = ("brokenReferences", "orphans", "reqsFailing")
 
-    For each codeRef with origin "commit-inferred" and symbolType "file",
-    if codeIntelligence has symbols for that file, replace with symbol-level refs.
-    """
-    ci = graph.get("codeIntelligence")
-    if not ci or not ci.get("indexed"):
-        return
 
-    # Build file→symbols index
-    file_symbols = {}
-    for sym in ci.get("symbols", []):
-        fp = sym.get("filePath", "")
-        file_symbols.setdefault(fp, []).append(sym)
+def check_metric_names():
+    """Every metric --check can gate on: coverage percentages (minimums) and counts (maximums)."""
+    names = []
+    for name in _CHECK_COVERAGE_METRICS:
+        names.extend((name, name + "Functional"))
+    return names + list(_CHECK_COUNT_METRICS)
 
-    for art in graph.get("artifacts", []):
-        refined = []
-        for cr in art.get("codeRefs", []):
-            if (cr.get("origin") in ("commit-inferred", "task-inferred")
-                    and cr.get("symbolType") == "file"
-                    and cr["file"] in file_symbols):
-                # Replace with symbol-level refs
-                for sym in file_symbols[cr["file"]]:
-                    sym_ref_ids = list(set(sym.get("artifactRefs", []) + sym.get("inferredRefs", [])))
-                    # Only include if there's overlap with the inferred refIds
-                    overlap = set(sym_ref_ids) & set(cr["refIds"])
-                    if overlap:
-                        refined.append({
-                            "file": cr["file"],
-                            "line": sym.get("startLine", 0),
-                            "symbol": sym["name"],
-                            "symbolType": sym.get("type", "unknown").lower(),
-                            "refIds": list(overlap),
-                            "origin": "code-index",
-                            "inferredFrom": cr.get("inferredFrom"),
-                        })
-                # If no symbol matched, keep original file-level ref
-                if not any(r for r in refined if r["file"] == cr["file"]):
-                    refined.append(cr)
-            else:
-                refined.append(cr)
-        art["codeRefs"] = refined
 
+def _check_limit_kind(metric):
+    return "max" if metric in _CHECK_COUNT_METRICS else "min"
 
-def generate_html(graph, template_file, html_file):
-    """Read the HTML template and inject the graph JSON."""
-    if not os.path.exists(template_file):
-        print(f"  Warning: HTML template not found at {template_file}")
-        print("  Skipping HTML generation.")
-        return False
 
-    with open(template_file, "r", encoding="utf-8") as f:
-        template_md = f.read()
+def check_metrics(graph):
+    """Flatten a graph's statistics into {metric: value} for --check.
 
-    # Extract HTML between ```html and ```
-    m = re.search(r'```html\s*\n(.*?)\n```', template_md, re.DOTALL)
-    if not m:
-        print("  Warning: could not find ```html block in template.")
-        return False
+    Coverage metrics are percentages (<name> over all REQs, <name>Functional
+    over functional REQs only); brokenReferences, orphans and reqsFailing
+    are counts. Metrics the run has no data for (reqsVerified without test
+    results) are left out.
+    """
+    stats = graph["statistics"]
+    cov = stats["traceabilityCoverage"]
+    metrics = {}
+    for name in _CHECK_COVERAGE_METRICS:
+        entry = cov.get(name)
+        if entry is None:
+            continue
+        metrics[name] = entry["percentage"]
+        metrics[name + "Functional"] = entry.get("functionalPercentage", entry["percentage"])
+    metrics["brokenReferences"] = len(stats["brokenReferences"])
+    metrics["orphans"] = len(stats["orphans"])
+    if "reqsVerified" in cov:
+        metrics["reqsFailing"] = cov["reqsVerified"]["failingCount"]
+    return metrics
 
-    html = m.group(1)
 
-    # Serialize JSON (compact but readable)
-    data_json = json.dumps(graph, ensure_ascii=False)
+def parse_check_thresholds(config, overrides=()):
+    """Merge thresholds from .sdd/dashboard.json ("check": {"thresholds": {...}}) and NAME=VALUE flags.
+
+    Flags win over the config. Raises ValueError on unknown metric names or
+    non-numeric values.
+    """
+    known = set(check_metric_names())
+    raw = dict((config.get("check") or {}).get("thresholds") or {})
+    for item in overrides:
+        name, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"threshold must be NAME=VALUE: {item!r}")
+        raw[name.strip()] = value.strip()
+    thresholds = {}
+    for name, value in raw.items():
+        if name not in known:
+            raise ValueError(f"unknown check metric {name!r} (known: {', '.join(sorted(known))})")
+        try:
+            thresholds[name] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"threshold {name} must be a number, got {value!r}")
+    return thresholds
 
-    # Replace placeholders
-    html = html.replace("{{DATA_JSON}}", data_json)
-    html = html.replace("{{PROJECT_NAME}}", graph.get("projectName", "SDD Project"))
 
-    _safe_write_text(html_file, html)
+def evaluate_check(metrics, thresholds, baseline=None):
+    """Compare metrics against thresholds and an optional baseline check result; return failures.
 
-    return True
+    Each failure is {metric, kind, actual, limit}: kind "min"/"max" for a
+    threshold, "missing" for a threshold on a metric with no data, and
+    "regression" for a coverage drop or a count increase against the
+    baseline's metrics.
+    """
+    failures = []
+    for name in sorted(thresholds):
+        limit = thresholds[name]
+        kind = _check_limit_kind(name)
+        actual = metrics.get(name)
+        if actual is None:
+            failures.append({"metric": name, "kind": "missing", "actual": None, "limit": limit})
+        elif (actual < limit) if kind == "min" else (actual > limit):
+            failures.append({"metric": name, "kind": kind, "actual": actual, "limit": limit})
+    for name, previous in sorted(((baseline or {}).get("metrics") or {}).items()):
+        actual = metrics.get(name)
+        if actual is None or not isinstance(previous, (int, float)):
+            continue
+        worse = actual > previous if _check_limit_kind(name) == "max" else actual < previous
+        if worse:
+            failures.append({"metric": name, "kind": "regression", "actual": actual, "limit": previous})
+    return failures
+
+
+def run_check(project_dir, output_dir, project_name, thresholds, baseline=None,
+              test_results=None, coverage_reports=None):
+    """Scan the project and gate on its statistics without writing any dashboard output.
+
+    Scan phases reuse the phase cache when their inputs are unchanged, and
+    the graph is only held in memory (no traceability-graph.json, HTML,
+    guide or live-status). Returns the check result; its orphans and
+    brokenReferences lists are complete rather than capped.
+    """
+    graph = Generation(project_dir, output_dir, project_name, test_results, coverage_reports,
+                       phases=set()).build(list_limit=None)
+    stats = graph["statistics"]
+    metrics = check_metrics(graph)
+    failures = evaluate_check(metrics, thresholds, baseline)
+    return {
+        "format": CHECK_FORMAT,
+        "version": CHECK_VERSION,
+        "project": project_name,
+        "generatedAt": graph["generatedAt"],
+        "passed": not failures,
+        "metrics": metrics,
+        "thresholds": thresholds,
+        "failures": failures,
+        "brokenReferences": stats["brokenReferences"],
+        "orphans": stats["orphans"],
+    }
 
 
 def main():
@@ -1926,20 +6497,258 @@ def main():
         "--output", default=None,
         help="Output directory (default: PROJECT/dashboard)"
     )
+    parser.add_argument(
+        "--test-results", action="append", default=[], metavar="PATH",
+        help="JUnit XML report file or directory to attach pass/fail status to testRefs (repeatable)"
+    )
+    parser.add_argument(
+        "--coverage", action="append", default=[], metavar="PATH",
+        help="LCOV (.info) or Cobertura (.xml) report file or directory for executed-line ratios (repeatable)"
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="", default=None, metavar="DIR",
+        help="Record wall/CPU time, files, bytes and memory peak per phase and write profile.json "
+             "and profile-trace.json (Chrome trace events) to DIR (default: the output directory)"
+    )
+    parser.add_argument(
+        "--profile-regex", action="store_true",
+        help="With --profile (implied): count attempts, matches and time for every compiled regex, "
+             "per file type, and list the slowest lines"
+    )
+    parser.add_argument(
+        "--only", action="append", default=[], metavar="PHASES",
+        help="Run only these phases (comma-separated: " + ", ".join(PHASES) + "); the other scan "
+             "phases reuse their cached results from the previous run when still fresh"
+    )
+    parser.add_argument(
+        "--skip", action="append", default=[], metavar="PHASES",
+        help="Skip these phases (comma-separated), reusing cached results when still fresh"
+    )
+    parser.add_argument(
+        "--batch", default=None, metavar="LIST|GLOB",
+        help="Regenerate many projects in one run: a file with one project path per line, or a glob "
+             "of project directories; with --output, each project writes to OUTPUT/<path below the projects' "
+             "common parent>"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, metavar="N",
+        help="Worker processes shared by all --batch projects (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--batch-summary", default=None, metavar="FILE",
+        help="Also write the --batch timing summary as JSON to FILE"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="CI gate: compute statistics only (no dashboard files), print a JSON result with every "
+             "orphan and broken reference, and exit 1 when a threshold or the baseline is not met"
+    )
+    parser.add_argument(
+        "--threshold", action="append", default=[], metavar="NAME=VALUE",
+        help="--check threshold, overriding .sdd/dashboard.json check.thresholds (repeatable): "
+             "minimum percentage for coverage metrics (e.g. reqsWithCode=80, reqsWithTestsFunctional=90), "
+             "maximum count for brokenReferences, orphans and reqsFailing"
+    )
+    parser.add_argument(
+        "--check-baseline", default=None, metavar="FILE",
+        help="Previous --check result; any coverage drop or count increase against it fails the check"
+    )
+    parser.add_argument(
+        "--impact-of", nargs="+", default=None, metavar="RANGE|PATH",
+        help="Print the TASKs, UCs, INVs, REQs and other artifacts a change can affect, as JSON, "
+             "without rebuilding: a git range (base..head) or changed file paths; answers from the "
+             "last generated graph plus a re-parse of the changed files"
+    )
+    parser.add_argument(
+        "--history", nargs="+", default=None, metavar="REV|GLOB",
+        help="Write OUTPUT/history.json with one statistics snapshot per revision (a glob such as "
+             "'v*' expands to matching tags, oldest first), read from git objects without a checkout"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running and regenerate incrementally when inputs change"
+    )
+    parser.add_argument(
+        "--debounce", type=float, default=0.3,
+        help="Seconds of quiet to wait after a change before regenerating (--watch, default: 0.3)"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=1.0,
+        help="Polling interval in seconds when inotify is unavailable (--watch, default: 1.0)"
+    )
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="Run as a resident generator serving requests on a Unix-domain socket"
+    )
+    parser.add_argument(
+        "--socket", default=None,
+        help="Daemon socket path (default: per-project path in $XDG_RUNTIME_DIR or a private temp directory)"
+    )
+    parser.add_argument(
+        "--request", nargs="+", metavar="CMD",
+        help="Send a request (regenerate | stats | artifact ID | impact ID | shutdown) to the daemon; "
+             "runs in-process when no daemon is running"
+    )
+    parser.add_argument(
+        "--no-daemon", action="store_true",
+        help="Never delegate to a running daemon"
+    )
+    parser.add_argument(
+        "--direction", choices=["upstream", "downstream"], default="downstream",
+        help="Traversal direction for 'impact' requests (default: downstream)"
+    )
+    parser.add_argument(
+        "--max-depth", type=int, default=3,
+        help="Maximum depth for 'impact' requests and --impact-of (default: 3)"
+    )
     args = parser.parse_args()
+    if args.profile_regex and args.profile is None:
+        args.profile = ""
+    try:
+        phases = select_phases(args.only, args.skip)
+    except ValueError as e:
+        parser.error(str(e))
+    selective = bool(args.only or args.skip)
+
+    if args.batch:
+        projects = batch_projects(args.batch)
+        if not projects:
+            parser.error(f"--batch {args.batch} matched no projects")
+        if args.test_results or args.coverage or args.check or args.profile is not None or args.watch or args.daemon:
+            print("Note: --batch runs plain regenerations; --test-results, --coverage, --check, --profile, "
+                  "--watch and --daemon are ignored\n")
+        output_root = os.path.abspath(args.output) if args.output else None
+        print(f"Batch: {len(projects)} projects")
+        try:
+            summary = run_batch(projects, output_root, args.jobs, phases)
+        except ValueError as e:
+            parser.error(str(e))
+        print_batch_summary(summary)
+        if args.batch_summary:
+            _safe_write_json(os.path.abspath(args.batch_summary), summary)
+            print(f"Wrote {args.batch_summary}")
+        return 0 if not summary["failed"] else 1
 
     # Resolve paths
     project_dir = os.path.abspath(args.project)
     output_dir = os.path.abspath(args.output) if args.output else os.path.join(project_dir, "dashboard")
     project_name = detect_project_name(project_dir)
+    paths = resolve_output_paths(project_dir, output_dir)
+    try:
+        socket_path = args.socket or default_socket_path(project_dir)
+    except OSError as e:
+        if args.daemon:
+            print(f"Error: {e}")
+            return 1
+        socket_path = None  # no private socket dir: never delegate
+
+    if args.check:
+        try:
+            thresholds = parse_check_thresholds(load_dashboard_config(project_dir), args.threshold)
+        except ValueError as e:
+            parser.error(str(e))
+        baseline = None
+        if args.check_baseline:
+            try:
+                with open(args.check_baseline, "r", encoding="utf-8") as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                parser.error(f"could not read --check-baseline {args.check_baseline}: {e}")
+        # Keep stdout clean for the JSON result — progress goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_check(project_dir, output_dir, project_name, thresholds, baseline,
+                               args.test_results, args.coverage)
+            for failure in result["failures"]:
+                print(f"  FAIL {failure['metric']}: {failure['actual']} ({failure['kind']} {failure['limit']})")
+            print(f"Check {'passed' if result['passed'] else 'failed'}: "
+                  f"{result['metrics']['brokenReferences']} broken references, {result['metrics']['orphans']} orphans")
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0 if result["passed"] else 1
+
+    if args.history:
+        revisions = history_revisions(project_dir, args.history)
+        if not revisions:
+            parser.error(f"--history {' '.join(args.history)} matched no revisions")
+
+        def warnings_only(message):
+            if str(message).lstrip().startswith("Warning"):
+                print(message)
+
+        print(f"History: {len(revisions)} revisions of {project_dir}")
+        snapshots = []
+        previous = set_logger(warnings_only)
+        try:
+            with HistoryScanner(project_dir, project_name) as scanner:
+                for rev in revisions:
+                    try:
+                        snapshot = scanner.snapshot(rev)
+                    except ValueError as e:
+                        print(f"  Warning: skipping {rev}: {e}")
+                        continue
+                    snapshots.append(snapshot)
+                    stats = snapshot["statistics"]
+                    metrics = snapshot["metrics"]
+                    print(f"  {rev:<20} {snapshot['shortSha']} {snapshot['date'][:10]}  "
+                          f"{stats['totalArtifacts']:>6} artifacts  reqsWithCode {metrics['reqsWithCode']:>5}%  "
+                          f"reqsWithTests {metrics['reqsWithTests']:>5}%  "
+                          f"parsed {snapshot['parsed']}/{sum(snapshot['files'].values())}  "
+                          f"{snapshot['elapsedMs']} ms")
+        finally:
+            set_logger(previous)
+        history_path = os.path.join(output_dir, HISTORY_FILE)
+        _safe_write_json(history_path, {
+            "format": HISTORY_FORMAT,
+            "version": HISTORY_VERSION,
+            "project": project_name,
+            "generatedAt": datetime.now(timezone.utc).isoformat(),
+            "revisions": snapshots,
+        })
+        print(f"Wrote {history_path}")
+        return 0 if snapshots else 1
 
-    # Resolve template locations
-    template_file = resolve_template(project_dir)
-    guide_template_file = os.path.join(os.path.dirname(template_file), "guide-template.md")
-    graph_file = os.path.join(output_dir, "traceability-graph.json")
-    html_file = os.path.join(output_dir, "index.html")
-    guide_file = os.path.join(output_dir, "guide.html")
-    live_status_file = os.path.join(output_dir, "live-status.js")
+    if args.impact_of:
+        # Keep stdout clean for the JSON report — progress goes to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                report = impact_of(project_dir, paths["graph"], args.impact_of, args.max_depth)
+            except ValueError as e:
+                parser.error(str(e))
+            counts = ", ".join(f"{n} {t}" for t, n in report["counts"].items()) or "nothing"
+            print(f"Impact of {len(report['files'])} files, {len(report['commits'])} commits: "
+                  f"{counts} ({report['elapsedMs']} ms)")
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    if args.request:
+        request = _request_from_args(args.request, args)
+        response = None if args.no_daemon else daemon_request(socket_path, request)
+        if response is None:
+            if request["cmd"] == "shutdown":
+                print(json.dumps({"ok": False, "error": "no daemon running"}))
+                return 1
+            service = DashboardService(project_dir, output_dir, project_name, paths,
+                                       args.test_results, args.coverage)
+            # Keep stdout clean for the JSON response — progress goes to stderr
+            with contextlib.redirect_stdout(sys.stderr):
+                try:
+                    response = {"ok": True, "result": service.handle(request)}
+                except Exception as e:
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(response, indent=2, ensure_ascii=False))
+        return 0 if response.get("ok") else 1
+
+    # The daemon's "regenerate" request carries no report paths: runs with them stay in-process
+    if not (args.daemon or args.watch or args.no_daemon or args.profile is not None or selective
+            or args.test_results or args.coverage):
+        response = daemon_request(socket_path, {"cmd": "ping"}, timeout=2)
+        if response and response.get("ok") and response["result"] == {"project": project_dir, "output": output_dir}:
+            response = daemon_request(socket_path, {"cmd": "regenerate"})
+            if response and response.get("ok"):
+                result = response["result"]
+                print(f"Regenerated by daemon ({socket_path}) in {result['elapsedMs']} ms")
+                print(f"Wrote {result['graph']}")
+                print_statistics(result)
+                return 0
 
     print("=" * 60)
     print("SDD Dashboard Generator")
@@ -1947,100 +6756,39 @@ def main():
     print(f"Project: {project_dir}")
     print(f"Name:    {project_name}")
     print(f"Output:  {output_dir}")
-    print(f"Template:{template_file}")
+    print(f"Template:{paths['template']}")
     print()
 
-    # Extract artifacts and references
-    artifacts, references, all_ref_ids = scan_files(project_dir)
-
-    print(f"\nExtracted {len(artifacts)} artifact definitions")
-    print(f"Extracted {len(references)} raw references")
-
-    # Scan source code
-    print("\nScanning source code...")
-    code_refs, code_stats = scan_code_refs(project_dir)
-
-    # Scan tests
-    print("\nScanning tests...")
-    test_refs, test_stats = scan_test_refs(project_dir)
-
-    # Scan commits
-    print("\nScanning git commits...")
-    commits = scan_commits(project_dir)
-
-    # Build graph
-    graph = build_graph(project_dir, output_dir, project_name, artifacts, references, all_ref_ids,
-                        commits, code_refs, code_stats, test_refs, test_stats)
-
-    # Write JSON (crash-safe — Step 0.5)
-    _safe_write_json(graph_file, graph)
-    print(f"\nWrote {graph_file}")
-
-    # Print statistics
-    stats = graph["statistics"]
-    print(f"\n{'='*60}")
-    print("STATISTICS")
-    print(f"{'='*60}")
-    print(f"Total artifacts: {stats['totalArtifacts']}")
-    for t, c in stats["byType"].items():
-        print(f"  {t}: {c}")
-    print(f"Total relationships: {stats['totalRelationships']}")
-    cov = stats["traceabilityCoverage"]
-    print(f"REQs with UCs:   {cov['reqsWithUCs']['count']}/{cov['reqsWithUCs']['total']} ({cov['reqsWithUCs']['percentage']}%)")
-    print(f"REQs with BDDs:  {cov['reqsWithBDD']['count']}/{cov['reqsWithBDD']['total']} ({cov['reqsWithBDD']['percentage']}%)")
-    print(f"REQs with TASKs: {cov['reqsWithTasks']['count']}/{cov['reqsWithTasks']['total']} ({cov['reqsWithTasks']['percentage']}%)")
-    if "reqsWithCommits" in cov:
-        print(f"REQs with Commits: {cov['reqsWithCommits']['count']}/{cov['reqsWithCommits']['total']} ({cov['reqsWithCommits']['percentage']}%)")
-    cs = stats.get("commitStats", {})
-    if cs.get("totalCommits", 0) > 0:
-        print(f"Commits: {cs['totalCommits']} total, {cs['commitsWithRefs']} with refs, {cs['commitsWithTasks']} with tasks, {cs['uniqueTasksCovered']} tasks covered")
-    print(f"Orphans: {len(stats['orphans'])}")
-    print(f"Broken references: {len(stats['brokenReferences'])}")
-
-    # Print code/test stats
-    cs2 = stats.get("codeStats", {})
-    ts2 = stats.get("testStats", {})
-    if cs2.get("totalFiles", 0) > 0:
-        cov2 = stats["traceabilityCoverage"]
-        print(f"REQs with Code:  {cov2['reqsWithCode']['count']}/{cov2['reqsWithCode']['total']} ({cov2['reqsWithCode']['percentage']}%)")
-        print(f"REQs with Tests: {cov2['reqsWithTests']['count']}/{cov2['reqsWithTests']['total']} ({cov2['reqsWithTests']['percentage']}%)")
-        print(f"Code files: {cs2['totalFiles']}, symbols: {cs2['totalSymbols']}, with refs: {cs2['symbolsWithRefs']}")
-        print(f"Test files: {ts2['totalTestFiles']}, tests: {ts2['totalTests']}, with refs: {ts2['testsWithRefs']}")
-
-    # Generate HTML
-    print(f"\nGenerating HTML dashboard...")
-    if generate_html(graph, template_file, html_file):
-        print(f"Wrote {html_file}")
-    else:
-        print("HTML generation failed.")
-
-    # Generate guide.html
-    if os.path.exists(guide_template_file):
-        try:
-            with open(guide_template_file, "r", encoding="utf-8") as f:
-                guide_md = f.read()
-            gm = re.search(r'```html\s*\n(.*?)\n```', guide_md, re.DOTALL)
-            if gm:
-                _safe_write_text(guide_file, gm.group(1))
-                print(f"Wrote {guide_file}")
-        except Exception as e:
-            print(f"  Warning: guide generation failed: {e}")
-
-    # Generate live-status.js seed file
-    now_iso = datetime.now(timezone.utc).isoformat()
-    live_status_js = f"""// SDD Live Status — generated by /sdd:dashboard
-// Skills update this file during execution to show real-time progress
-window.__SDD_LIVE_UPDATE({{
-  "sessionId": null,
-  "currentStage": null,
-  "status": "idle",
-  "lastHeartbeat": "{now_iso}",
-  "progress": null,
-  "message": "Dashboard generated. Waiting for pipeline activity.",
-  "history": []
-}});"""
-    _safe_write_text(live_status_file, live_status_js)
-    print(f"Wrote {live_status_file}")
+    profiler = None
+    if args.profile is not None and (args.daemon or args.watch):
+        print("Note: --profile applies to one-shot runs; ignored with --watch/--daemon\n")
+    if selective and args.daemon:
+        print("Note: --only/--skip apply to one-shot and --watch runs; ignored with --daemon\n")
+    if args.profile is not None and not (args.daemon or args.watch):
+        profiler = enable_profiling()
+    telemetry = enable_regex_telemetry() if profiler is not None and args.profile_regex else None
+
+    if args.daemon:
+        return serve_daemon(DashboardService(project_dir, output_dir, project_name, paths,
+                                             args.test_results, args.coverage), socket_path)
+
+    if args.watch:
+        return watch(project_dir, output_dir, project_name, paths,
+                     debounce=args.debounce, poll_interval=args.poll_interval,
+                     test_results=args.test_results, coverage_reports=args.coverage, phases=phases)
+
+    generate_dashboard(project_dir, output_dir, project_name, paths, args.test_results, args.coverage, phases)
+
+    if profiler is not None:
+        disable_profiling()
+        if telemetry is not None:
+            disable_regex_telemetry()
+            profiler.sections["regex"] = telemetry.report(project_dir)
+        profile_dir = os.path.abspath(args.profile) if args.profile else output_dir
+        report_path, trace_path = profiler.write(profile_dir, project_dir)
+        print_profile(profiler.report(project_dir))
+        print(f"Wrote {report_path}")
+        print(f"Wrote {trace_path}")
 
     print(f"\n{'='*60}")
     print("Done!")
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+SDD Dashboard Query Engine
+Answers trace, impact, coverage, context and search queries against a
+traceability-graph.json from Python, with the same results as the MCP
+server's sdd_trace / sdd_impact / sdd_coverage / sdd_context / sdd_query
+tools (minus their next-step hints). The graph is parsed once into a
+GraphIndex — by id, by type, by file, and forward/reverse adjacency — that
+is cached per graph file and rebuilt only when the file changes, and each
+query result is memoized on the index.
+
+Usage:
+    python query.py trace REQ-AUTH-001
+    python query.py impact UC-003 --direction upstream --max-depth 2
+    python query.py coverage --domain "Security"
+    python query.py context TASK-F01-003 --project /path/to/project
+    python query.py search login --type REQ --limit 5
+
+Library:
+    import query
+    index = query.load_index("/path/to/project")
+    index.trace("REQ-AUTH-001")["status"]
+    index.impact("UC-003", direction="upstream")
+"""
+
+import os
+import sys
+import json
+import argparse
+from operator import itemgetter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import generate  # noqa: E402
+
+GRAPH_FILENAME = "traceability-graph.json"
+DASHBOARD_DIR = "dashboard"
+GRAPH_SEARCH_DEPTH = 6
+
+CHAIN_ORDER = ("REQ", "UC", "WF", "API", "BDD", "INV", "ADR", "TASK", "COMMIT", "CODE", "TEST")
+CHAIN_KEY_LEVELS = ("UC", "BDD", "TASK", "CODE", "TEST")
+CHAIN_REF_LIMIT = 20
+COVERAGE_UNCOVERED_LIMIT = 20
+COVERAGE_GAPS_LIMIT = 15
+QUERY_LIMIT = 20
+
+
+# ──────────────────────────────────────────────────────────
+# Graph index
+# ──────────────────────────────────────────────────────────
+
+def _round(value):
+    """Math.round: halves round up, so percentages match the MCP server's."""
+    return int(value + 0.5) if value >= 0 else -int(-value + 0.5)
+
+
+class GraphIndex:
+    """A traceability graph with the lookup tables every query needs.
+
+    by_id, by_type and by_file map to artifacts; rel_by_source is the
+    forward adjacency (relationships an artifact states, i.e. upstream) and
+    rel_by_target the reverse one (relationships pointing at it, i.e.
+    downstream); code_refs_by_file maps a source file to (artifact, codeRef)
+    pairs. trace() walks its own per-direction adjacency, built on first
+    use. Query results are memoized on the instance and shared between
+    callers, so treat them as read-only.
+    """
+
+    def __init__(self, graph, graph_dir=None):
+        self.graph = graph
+        self.graph_dir = graph_dir
+        self.by_id = {}
+        self.by_type = {}
+        self.by_file = {}
+        self.rel_by_source = {}
+        self.rel_by_target = {}
+        self.code_refs_by_file = {}
+        for art in graph.get("artifacts", []):
+            self.by_id[art["id"]] = art
+            self.by_type.setdefault(art["type"], []).append(art)
+            self.by_file.setdefault(art.get("file", ""), []).append(art)
+            for cr in art.get("codeRefs", []):
+                self.code_refs_by_file.setdefault(cr["file"], []).append((art, cr))
+        for rel in graph.get("relationships", []):
+            self.rel_by_source.setdefault(rel["source"], []).append(rel)
+            self.rel_by_target.setdefault(rel["target"], []).append(rel)
+        self._memo = {}
+        self._code_intelligence = None
+        self._ci_resolved = False
+        self._ci_by_artifact = None
+        self._req_coverage = None
+
+    def _cached(self, key, compute):
+        try:
+            return self._memo[key]
+        except KeyError:
+            result = self._memo[key] = compute()
+            return result
+
+    # ── Code intelligence ─────────────────────────────────
+
+    @property
+    def code_intelligence(self):
+        """The codeIntelligence block — inline, or read from the sidecar on first use."""
+        if not self._ci_resolved:
+            self._ci_resolved = True
+            ci = self.graph.get("codeIntelligence")
+            ref = self.graph.get("codeIntelligenceRef")
+            if ci is None and ref and self.graph_dir:
+                try:
+                    ci = generate.CodeIntelligenceSidecar(os.path.join(self.graph_dir, ref["path"])).load()
+                except (OSError, ValueError, KeyError):
+                    ci = None
+            self._code_intelligence = ci if ci and ci.get("indexed") else None
+        return self._code_intelligence
+
+    def _symbols_for(self, artifact_id):
+        """(symbols referencing the artifact, processes referencing it), both in sidecar order."""
+        ci = self.code_intelligence
+        if ci is None:
+            return [], []
+        if self._ci_by_artifact is None:
+            symbols, processes = {}, {}
+            for sym in ci.get("symbols", []):
+                for ref in dict.fromkeys(sym.get("artifactRefs", []) + sym.get("inferredRefs", [])):
+                    symbols.setdefault(ref, []).append(sym)
+            for proc in ci.get("processes", []):
+                for ref in dict.fromkeys(proc.get("artifactRefs", [])):
+                    processes.setdefault(ref, []).append(proc)
+            self._ci_by_artifact = (symbols, processes)
+        symbols, processes = self._ci_by_artifact
+        return symbols.get(artifact_id, []), processes.get(artifact_id, [])
+
+    # ── Trace ─────────────────────────────────────────────
+
+    def _trace_adjacency(self, direction):
+        """Artifact id -> ((neighbor id, neighbor type, chain item), ...) for trace's walk in one direction.
+
+        Built once per direction. Only artifact neighbors are kept (the walk
+        neither reports nor expands the others), each at its first
+        relationship (a later one would find it visited); the chain item is
+        the entry the neighbor gets in trace()'s chain when reached that way.
+        """
+        def compute():
+            adjacency = self.rel_by_target if direction == "downstream" else self.rel_by_source
+            neighbor_key = "source" if direction == "downstream" else "target"
+            by_id = self.by_id
+            entries = {}
+            for node_id, rels in adjacency.items():
+                if node_id not in by_id:
+                    continue
+                neighbors = {}
+                for rel in rels:
+                    neighbor_id = rel[neighbor_key]
+                    if neighbor_id not in neighbors and neighbor_id in by_id:
+                        neighbors[neighbor_id] = self._chain_entry(by_id[neighbor_id], rel["type"])
+                entries[node_id] = tuple(neighbors.values())
+            return entries
+        return self._cached(("adjacency", direction), compute)
+
+    @staticmethod
+    def _chain_entry(art, rel_type):
+        return art["id"], art["type"], {"id": art["id"], "title": art["title"], "file": art["file"],
+                                        "relationship": rel_type}
+
+    def _collect_connected(self, start_id, direction, visited):
+        """Chain entries of every artifact reachable from start_id, breadth-first.
+
+        Walks one BFS level at a time: the level's unvisited neighbors are
+        gathered in order and each keeps the entry it was first reached by.
+        """
+        adjacency = self._trace_adjacency(direction)
+        results = []
+        frontier = [start_id]
+        while frontier:
+            reached = [entry for node_id in frontier for entry in adjacency.get(node_id, ())
+                       if entry[0] not in visited]
+            ids = list(map(itemgetter(0), reached))
+            first = dict(zip(reversed(ids), reversed(reached)))  # id -> the entry that reached it first
+            frontier = list(dict.fromkeys(ids))
+            visited.update(frontier)
+            results.extend(map(first.__getitem__, frontier))
+        return results
+
+    def _chain_refs(self):
+        """Artifact id -> {"CODE" | "COMMIT" | "TEST": chain items}, for artifacts with refs."""
+        def compute():
+            refs = {}
+            for art in self.graph.get("artifacts", []):
+                code = []
+                for cr in art.get("codeRefs", []):
+                    item = {"id": f"{cr['symbol']}@{cr['file']}:{cr['line']}",
+                            "title": f"{cr['symbol']} ({cr.get('symbolType')})", "file": cr["file"]}
+                    origin = cr.get("origin", "direct")
+                    if origin != "direct":
+                        item["relationship"] = f"origin:{origin}"
+                    code.append(item)
+                commits = [{"id": cr["sha"], "title": cr.get("message"), "file": cr.get("taskId") or "no task"}
+                           for cr in art.get("commitRefs", [])]
+                tests = [{"id": f"{tr['testName']}@{tr['file']}:{tr['line']}", "title": tr["testName"],
+                          "file": tr["file"]}
+                         for tr in art.get("testRefs", [])]
+                if code or commits or tests:
+                    refs[art["id"]] = {"CODE": code, "COMMIT": commits, "TEST": tests}
+            return refs
+        return self._cached(("chainRefs",), compute)
+
+    def trace(self, artifact_id):
+        """Full REQ → … → TEST chain around an artifact, with its breaks (sdd_trace)."""
+        return self._cached(("trace", artifact_id), lambda: self._trace(artifact_id))
+
+    def _trace(self, artifact_id):
+        root = self.by_id.get(artifact_id)
+        if root is None:
+            return {"error": f'Artifact "{artifact_id}" not found'}
+        visited = {artifact_id}
+        upstream = self._collect_connected(artifact_id, "upstream", visited)
+        downstream = self._collect_connected(artifact_id, "downstream", set(visited))
+        connected = [self._chain_entry(root, "self")] + upstream + downstream
+
+        by_level = {}
+        for _, art_type, item in connected:
+            by_level.setdefault(art_type, []).append(item)
+        chain_refs = self._chain_refs()
+        holders = [chain_refs[art_id] for art_id, _, _ in connected if art_id in chain_refs]
+        chain = []
+        for level in CHAIN_ORDER:
+            if level in ("CODE", "COMMIT", "TEST"):
+                items = []
+                for refs in holders:
+                    items.extend(refs[level])
+                    if len(items) >= CHAIN_REF_LIMIT:
+                        break
+                items = items[:CHAIN_REF_LIMIT]
+            else:
+                items = by_level.get(level)
+            if items:
+                chain.append({"level": level, "artifacts": items})
+        types_seen = [link["level"] for link in chain]
+
+        breaks = []
+        if root["type"] in CHAIN_ORDER:
+            root_index = CHAIN_ORDER.index(root["type"])
+            breaks.extend(f"Missing {level} link upstream of {root['type']}"
+                          for level in CHAIN_ORDER[:root_index] if level not in types_seen)
+            breaks.extend(f"Missing {level} link downstream of {root['type']}"
+                          for level in CHAIN_ORDER[root_index + 1:]
+                          if level not in types_seen and level in CHAIN_KEY_LEVELS)
+        if not breaks:
+            status = "COMPLETE"
+        elif len(breaks) <= 2:
+            status = "PARTIAL"
+        else:
+            status = "FRAGMENTED"
+        return {
+            "artifact": {"id": root["id"], "type": root["type"], "title": root["title"]},
+            "status": status,
+            "chainLength": len(chain),
+            "totalArtifactsInChain": len(connected),
+            "chain": chain,
+            "breaks": breaks,
+            "typesCovered": types_seen,
+            "typesMissing": [level for level in CHAIN_ORDER if level not in types_seen],
+        }
+
+    # ── Impact ────────────────────────────────────────────
+
+    def impact(self, artifact_id, direction="downstream", max_depth=3):
+        """Blast radius by depth with risk classification (sdd_impact)."""
+        return self._cached(("impact", artifact_id, direction, max_depth),
+                            lambda: self._impact(artifact_id, direction, max_depth))
+
+    def _impact(self, artifact_id, direction, max_depth):
+        root = self.by_id.get(artifact_id)
+        if root is None:
+            return {"error": f'Artifact "{artifact_id}" not found'}
+        adjacency = self.rel_by_target if direction == "downstream" else self.rel_by_source
+        neighbor_key = "source" if direction == "downstream" else "target"
+        visited = {artifact_id}
+        by_depth = {}
+        current_level = [artifact_id]
+        for depth in range(1, max_depth + 1):
+            next_level = []
+            items = by_depth[depth] = []
+            level_items = {}  # neighbor id -> item, to add the weight of every edge reaching it
+            for node_id in current_level:
+                for rel in adjacency.get(node_id, ()):
+                    neighbor_id = rel[neighbor_key]
+                    weight = rel.get("occurrences", 1)
+                    if neighbor_id in level_items:
+                        level_items[neighbor_id]["weight"] += weight
+                        continue
+                    if neighbor_id in visited:
+                        continue
+                    visited.add(neighbor_id)
+                    neighbor = self.by_id.get(neighbor_id)
+                    if neighbor:
+                        item = {"id": neighbor["id"], "type": neighbor["type"], "title": neighbor["title"],
+                                "file": neighbor["file"], "viaRelationship": rel["type"], "weight": weight}
+                        items.append(item)
+                        level_items[neighbor_id] = item
+                    next_level.append(neighbor_id)
+            items.sort(key=lambda item: -item["weight"])  # most-stated links first
+            current_level = next_level
+            if not current_level:
+                break
+
+        total = sum(len(items) for items in by_depth.values())
+        first = len(by_depth.get(1, []))
+        if first > 5 or total > 20:
+            risk = "HIGH"
+        elif first > 2 or total > 10:
+            risk = "MEDIUM"
+        else:
+            risk = "LOW"
+        stages = {}
+        for items in by_depth.values():
+            for item in items:
+                stage = self.by_id[item["id"]].get("stage")
+                if stage:
+                    stages[stage] = True
+        result = {
+            "artifact": {"id": root["id"], "type": root["type"], "title": root["title"]},
+            "direction": direction,
+            "maxDepth": max_depth,
+            "risk": risk,
+            "totalAffected": total,
+            "byDepth": {
+                str(d): {"label": generate.IMPACT_DEPTH_LABELS.get(d, f"DEPTH_{d}"),
+                         "count": len(items), "artifacts": items}
+                for d, items in by_depth.items()
+            },
+            "affectedStages": list(stages),
+        }
+        symbols, _ = self._symbols_for(artifact_id)
+        if symbols:
+            callers = list(dict.fromkeys(caller for sym in symbols for caller in sym.get("callers", [])))
+            result["codeImpact"] = {
+                "directSymbols": [{"name": s["name"], "file": s["filePath"], "type": s["type"]} for s in symbols],
+                "transitiveCallers": callers,
+                "totalCallChainDepth": len(symbols) + len(callers),
+            }
+        return result
+
+    # ── Coverage ──────────────────────────────────────────
+
+    def _coverage_rows(self):
+        """(req, domain, layer, missing links) for every REQ, computed once per index."""
+        if self._req_coverage is None:
+            rows = []
+            for req in self.by_type.get("REQ", []):
+                classification = req.get("classification") or {}
+                linked = {self.by_id[rel["source"]]["type"]
+                          for rel in self.rel_by_target.get(req["id"], ()) if rel["source"] in self.by_id}
+                missing = [name for name, present in (
+                    ("UC", "UC" in linked),
+                    ("BDD", "BDD" in linked),
+                    ("Code", bool(req.get("codeRefs"))),
+                    ("Tests", bool(req.get("testRefs"))),
+                ) if not present]
+                rows.append((req, classification.get("businessDomain"), classification.get("technicalLayer"),
+                             missing))
+            self._req_coverage = rows
+        return self._req_coverage
+
+    def coverage(self, domain=None, layer=None):
+        """Coverage gaps grouped by business domain and technical layer (sdd_coverage)."""
+        return self._cached(("coverage", domain, layer), lambda: self._coverage(domain, layer))
+
+    def _coverage(self, domain, layer):
+        rows = self._coverage_rows()
+        if domain:
+            rows = [row for row in rows if row[1] and domain.lower() in row[1].lower()]
+        if layer:
+            rows = [row for row in rows if row[2] and layer.lower() in row[2].lower()]
+
+        by_domain, by_layer = {}, {}
+        uncovered, top_gaps = [], []
+        origins = {"direct": 0, "commit-inferred": 0, "task-inferred": 0, "manual-override": 0, "code-index": 0}
+        for req, domain_key, layer_key, missing in rows:
+            buckets = (by_domain.setdefault(domain_key or "Unclassified",
+                                            {"total": 0, "covered": 0, "partial": 0, "uncovered": 0}),
+                       by_layer.setdefault(layer_key or "Unknown",
+                                           {"total": 0, "covered": 0, "partial": 0, "uncovered": 0}))
+            if not missing:
+                status = "covered"
+            elif len(missing) < 4:
+                status = "partial"
+                if len(missing) <= 2:
+                    top_gaps.append({"id": req["id"], "title": req["title"], "missingLinks": missing})
+            else:
+                status = "uncovered"
+                uncovered.append({"id": req["id"], "title": req["title"], "missingLinks": missing})
+            for bucket in buckets:
+                bucket["total"] += 1
+                bucket[status] += 1
+            for cr in req.get("codeRefs", []):
+                origin = cr.get("origin", "direct")
+                if origin in origins:
+                    origins[origin] += 1
+        top_gaps.sort(key=lambda gap: len(gap["missingLinks"]))
+
+        def percent(stats):
+            return _round(stats["covered"] / stats["total"] * 100) if stats["total"] else 0
+
+        result = {
+            "filters": {"domain": domain, "layer": layer},
+            "totalReqs": len(rows),
+            "overallCoverage": self.graph.get("statistics", {}).get("traceabilityCoverage"),
+            "codeInferenceBreakdown": {
+                "directRefs": origins["direct"],
+                "commitInferred": origins["commit-inferred"],
+                "taskInferred": origins["task-inferred"],
+                "manualOverrides": origins["manual-override"],
+                "codeIndex": origins["code-index"],
+            },
+            "byDomain": [dict({"domain": name}, **stats, coveragePercent=percent(stats))
+                         for name, stats in by_domain.items()],
+            "byLayer": [dict({"layer": name}, **stats, coveragePercent=percent(stats))
+                        for name, stats in by_layer.items()],
+            "uncovered": uncovered[:COVERAGE_UNCOVERED_LIMIT],
+            "topGaps": top_gaps[:COVERAGE_GAPS_LIMIT],
+        }
+        ci = self.code_intelligence
+        if ci is not None:
+            stats = ci.get("stats", {})
+            total = stats.get("totalSymbols", 0)
+            annotated = stats.get("symbolsWithRefs", 0)
+            inferred = stats.get("symbolsWithInferredRefs", 0)
+            result["codeIntelligence"] = {
+                "totalSymbols": total,
+                "annotated": annotated,
+                "inferred": inferred,
+                "uncoveredSymbols": stats.get("uncoveredSymbols"),
+                "annotatedPercentage": _round(annotated / total * 100) if total else 0,
+                "totalCoveredPercentage": _round((annotated + inferred) / total * 100) if total else 0,
+            }
+        return result
+
+    # ── Context ───────────────────────────────────────────
+
+    def context(self, artifact_id):
+        """360° view of one artifact: links, refs, gaps and coverage status (sdd_context)."""
+        return self._cached(("context", artifact_id), lambda: self._context(artifact_id))
+
+    def _link(self, rel, neighbor_id):
+        neighbor = self.by_id.get(neighbor_id)
+        return {"id": neighbor_id,
+                "type": neighbor["type"] if neighbor else "unknown",
+                "title": neighbor["title"] if neighbor else "unknown",
+                "relationship": rel["type"],
+                "file": rel.get("sourceFile")}
+
+    def _context(self, artifact_id):
+        art = self.by_id.get(artifact_id)
+        if art is None:
+            return {"error": f'Artifact "{artifact_id}" not found'}
+        upstream = [self._link(rel, rel["target"]) for rel in self.rel_by_source.get(artifact_id, ())]
+        downstream = [self._link(rel, rel["source"]) for rel in self.rel_by_target.get(artifact_id, ())]
+        code_refs = art.get("codeRefs", [])
+        test_refs = art.get("testRefs", [])
+        commit_refs = art.get("commitRefs", [])
+        down_types = {link["type"] for link in downstream}
+        up_types = {link["type"] for link in upstream}
+
+        gaps = []
+        if art["type"] == "REQ":
+            if not upstream and not downstream:
+                gaps.append("ORPHAN: No relationships found — this REQ is isolated")
+            if "UC" not in down_types:
+                gaps.append("MISSING_UC: No use case implements this requirement")
+            if "BDD" not in down_types:
+                gaps.append("MISSING_BDD: No BDD scenario verifies this requirement")
+            if "TASK" not in down_types:
+                gaps.append("MISSING_TASK: No task decomposes this requirement")
+            if not code_refs:
+                gaps.append("MISSING_CODE: No code references found")
+            if not test_refs:
+                gaps.append("MISSING_TESTS: No test references found")
+            if not commit_refs:
+                gaps.append("MISSING_COMMITS: No commit references found")
+
+        has_uc = "UC" in down_types or "UC" in up_types
+        has_bdd = "BDD" in down_types or "BDD" in up_types
+        if has_uc and has_bdd and code_refs and test_refs:
+            coverage_status = "Complete"
+        elif has_uc and (code_refs or test_refs):
+            coverage_status = "In Progress"
+        elif has_uc:
+            coverage_status = "Specified"
+        else:
+            coverage_status = "Not Started"
+
+        inferred = []
+        for cr in code_refs:
+            if cr.get("origin", "direct") == "direct":
+                continue
+            item = dict(cr)
+            source = cr.get("inferredFrom")
+            if source:
+                task = f" → {source['taskId']}" if source.get("taskId") else ""
+                item["inferencePath"] = f"via commit:{source.get('commitSha')}{task}"
+            inferred.append(item)
+        result = {
+            "artifact": {key: art.get(key) for key in
+                         ("id", "type", "category", "title", "file", "line", "priority", "stage", "classification")},
+            "coverageStatus": coverage_status,
+            "upstream": upstream,
+            "downstream": downstream,
+            "codeRefs": [cr for cr in code_refs if cr.get("origin", "direct") == "direct"],
+            "inferredCodeRefs": inferred,
+            "testRefs": test_refs,
+            "commitRefs": commit_refs,
+            "gaps": gaps,
+        }
+        symbols, processes = self._symbols_for(artifact_id)
+        if symbols:
+            result["codeIntelligence"] = {
+                "symbols": [{"name": s["name"], "type": s["type"], "file": s["filePath"],
+                             "lines": f"{s.get('startLine')}-{s.get('endLine')}",
+                             "callers": s.get("callers", []), "callees": s.get("callees", []),
+                             "isInferred": artifact_id in s.get("inferredRefs", [])} for s in symbols],
+                "processes": [{"name": p["name"], "steps": p.get("steps"), "entryPoint": p.get("entryPoint")}
+                              for p in processes],
+            }
+        return result
+
+    # ── Search ────────────────────────────────────────────
+
+    def query(self, text, type=None, domain=None, limit=QUERY_LIMIT):
+        """Artifacts matching text by id, title, file, code/test refs or category (sdd_query)."""
+        return self._cached(("query", text, type, domain, limit), lambda: self._query(text, type, domain, limit))
+
+    def _query(self, text, type, domain, limit):
+        needle = text.lower()
+        candidates = self.by_type.get(type.upper(), []) if type else self.graph.get("artifacts", [])
+        if domain:
+            candidates = [a for a in candidates
+                          if domain.lower() in ((a.get("classification") or {}).get("businessDomain") or "").lower()]
+        scored = []
+        for art in candidates:
+            score, reasons = 0, []
+            art_id = art["id"].lower()
+            if art_id == needle:
+                score += 100
+                reasons.append("exact ID match")
+            elif needle in art_id:
+                score += 60
+                reasons.append("partial ID match")
+            if needle in art["title"].lower():
+                score += 40
+                reasons.append("title match")
+            if needle in art["file"].lower():
+                score += 20
+                reasons.append("file path match")
+            for cr in art.get("codeRefs", []):
+                if needle in cr["file"].lower() or needle in cr["symbol"].lower():
+                    score += 30
+                    reasons.append(f"code ref: {cr['symbol']} in {cr['file']}")
+                    break
+            for tr in art.get("testRefs", []):
+                if needle in tr["file"].lower() or needle in tr["testName"].lower():
+                    score += 25
+                    reasons.append(f"test ref: {tr['testName']}")
+                    break
+            if needle in (art.get("category") or "").lower():
+                score += 15
+                reasons.append("category match")
+            if score:
+                scored.append((score, art, reasons))
+        scored.sort(key=lambda entry: -entry[0])
+        results = scored[:limit]
+        if not results:
+            return {"query": text, "matches": 0, "results": []}
+        return {
+            "query": text,
+            "filters": {"type": type, "domain": domain},
+            "matches": len(results),
+            "totalCandidates": len(candidates),
+            "results": [{"id": art["id"], "type": art["type"], "title": art["title"], "file": art["file"],
+                         "score": score, "matchReasons": reasons,
+                         "hasCode": bool(art.get("codeRefs")), "hasTests": bool(art.get("testRefs")),
+                         "hasCommits": bool(art.get("commitRefs"))}
+                        for score, art, reasons in results],
+        }
+
+
+# ──────────────────────────────────────────────────────────
+# Cached loading
+# ──────────────────────────────────────────────────────────
+
+_GRAPH_PATH_CACHE = {}  # start path -> resolved graph file
+_INDEX_CACHE = {}  # graph file -> (file signature, GraphIndex)
+
+
+def find_graph_file(start=None):
+    """Resolve a graph file, dashboard directory or project directory to traceability-graph.json.
+
+    A directory without the graph is searched upwards for
+    dashboard/traceability-graph.json, as the MCP server does.
+    """
+    start = os.path.abspath(start or os.getcwd())
+    if os.path.isfile(start):
+        return start
+    if os.path.isfile(os.path.join(start, GRAPH_FILENAME)):
+        return os.path.join(start, GRAPH_FILENAME)
+    directory = start
+    for _ in range(GRAPH_SEARCH_DEPTH):
+        candidate = os.path.join(directory, DASHBOARD_DIR, GRAPH_FILENAME)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return None
+
+
+def load_index(start=None):
+    """The GraphIndex for a project, reused until its graph file changes on disk.
+
+    Raises FileNotFoundError when no graph can be found.
+    """
+    key = start or os.getcwd()
+    path = _GRAPH_PATH_CACHE.get(key)
+    if path is None or not os.path.isfile(path):
+        path = find_graph_file(start)
+        if path is None:
+            raise FileNotFoundError(f"No {DASHBOARD_DIR}/{GRAPH_FILENAME} found from {os.path.abspath(key)}")
+        _GRAPH_PATH_CACHE[key] = path
+    signature = generate._file_signature(path)
+    cached = _INDEX_CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        index = GraphIndex(json.load(f), os.path.dirname(path))
+    _INDEX_CACHE[path] = (signature, index)
+    return index
+
+
+# ──────────────────────────────────────────────────────────
+# Main
+# ──────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a project's traceability graph")
+    parser.add_argument("--project", default=None,
+                        help="Project directory, dashboard directory or graph file (default: search up from cwd)")
+    parser.add_argument("--compact", action="store_true", help="Print single-line JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("trace", help="Trace the full chain around an artifact").add_argument("id")
+    impact = commands.add_parser("impact", help="Blast radius of changing an artifact")
+    impact.add_argument("id")
+    impact.add_argument("--direction", choices=["downstream", "upstream"], default="downstream")
+    impact.add_argument("--max-depth", type=int, default=3)
+    coverage = commands.add_parser("coverage", help="Coverage gaps by domain and layer")
+    coverage.add_argument("--domain", default=None)
+    coverage.add_argument("--layer", default=None)
+    commands.add_parser("context", help="360-degree view of an artifact").add_argument("id")
+    search = commands.add_parser("search", help="Search artifacts by text")
+    search.add_argument("text")
+    search.add_argument("--type", default=None)
+    search.add_argument("--domain", default=None)
+    search.add_argument("--limit", type=int, default=QUERY_LIMIT)
+    args = parser.parse_args()
+
+    try:
+        index = load_index(args.project)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if args.command == "trace":
+        result = index.trace(args.id)
+    elif args.command == "impact":
+        result = index.impact(args.id, args.direction, args.max_depth)
+    elif args.command == "coverage":
+        result = index.coverage(args.domain, args.layer)
+    elif args.command == "context":
+        result = index.context(args.id)
+    else:
+        result = index.query(args.text, args.type, args.domain, args.limit)
+    print(json.dumps(result, ensure_ascii=False, indent=None if args.compact else 2))
+    return 1 if "error" in result else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
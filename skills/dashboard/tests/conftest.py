@@ -0,0 +1,47 @@
+"""Shared fixtures for the dashboard generator tests (run: python -m pytest skills/dashboard/tests)."""
+
+import os
+import sys
+
+import pytest
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+import generate  # noqa: E402
+
+SAMPLE_FILES = {
+    "requirements/REQUIREMENTS.md": (
+        "# Requirements\n"
+        "### REQ-SEC-001: User authentication\n"
+        "Refs: UC-001\n"
+    ),
+    "spec/use-cases/UC-001-login.md": "# UC-001: Login\nImplements REQ-SEC-001.\n",
+    "task/TASKS.md": "# Tasks\n### TASK-F1-001: Implement login\nRefs: UC-001\n",
+    "src/auth/login.ts": "// Refs: UC-001\nexport function login() {}\n",
+    "tests/unit/login.test.ts": "describe('Login', () => {\n  it('logs in UC-001', () => {});\n});\n",
+}
+
+
+def write_files(root, files):
+    for rel, text in files.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+@pytest.fixture
+def sample_project(tmp_path):
+    """A small SDD project (one REQ, UC, TASK, source file and test file); no git repository."""
+    write_files(str(tmp_path), SAMPLE_FILES)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def run_main(monkeypatch):
+    """Call generate.main() with the given CLI arguments; returns its exit code."""
+    def run(*argv):
+        monkeypatch.setattr(sys, "argv", ["generate.py"] + list(argv))
+        return generate.main()
+    return run
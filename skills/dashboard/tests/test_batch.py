@@ -0,0 +1,48 @@
+"""--batch output directories."""
+
+import os
+
+import pytest
+
+import generate
+from conftest import SAMPLE_FILES, write_files
+
+
+def test_same_named_projects_get_separate_outputs(tmp_path):
+    projects = []
+    for parent in ("a", "b"):
+        project = tmp_path / parent / "app"
+        write_files(str(project), SAMPLE_FILES)
+        projects.append(str(project))
+    out = tmp_path / "out"
+    summary = generate.run_batch(projects, str(out), jobs=1)
+    assert not summary["failed"]
+    for parent in ("a", "b"):
+        assert os.path.isfile(out / parent / "app" / "traceability-graph.json")
+
+
+def test_batch_output_dirs_rejects_duplicates(tmp_path):
+    project = str(tmp_path / "app")
+    with pytest.raises(ValueError):
+        generate.batch_output_dirs([project, project], str(tmp_path / "out"))
+
+
+def test_batch_output_dirs_single_project_uses_its_name(tmp_path):
+    project = str(tmp_path / "app")
+    assert generate.batch_output_dirs([project], "/out") == [os.path.join("/out", "app")]
+    assert generate.batch_output_dirs([project]) == [os.path.join(project, "dashboard")]
+
+
+def test_batch_project_captures_output_of_an_installed_logger(tmp_path):
+    messages = []
+    previous = generate.set_logger(messages.append)
+    try:
+        result = generate.run_batch_project(str(tmp_path / "missing"), str(tmp_path / "out"))
+        assert not result["ok"] and result["logTail"]
+        project = tmp_path / "app"
+        write_files(str(project), SAMPLE_FILES)
+        assert generate.run_batch_project(str(project), str(tmp_path / "out"))["ok"]
+    finally:
+        restored = generate.set_logger(previous)
+    assert messages == []
+    assert restored == messages.append
@@ -0,0 +1,26 @@
+"""Synthetic benchmark projects."""
+
+import shutil
+import subprocess
+
+import pytest
+
+import benchmark
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_synthetic_history_starts_from_the_generated_tree_and_leaves_it_clean(tmp_path):
+    root = str(tmp_path / "bench")
+    benchmark.generate_project(root, 1000, seed=0, git=True)
+
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True, check=True).stdout
+
+    assert git("status", "--porcelain") == ""
+    first = git("rev-list", "--max-parents=0", "HEAD").strip()
+    imported = git("ls-tree", "-r", "--name-only", first).split()
+    assert any(path.startswith("requirements/") for path in imported)
+    assert any(path.startswith("src/") for path in imported)
+    feat = git("log", "-1", "--format=%H", "--grep=^feat: ").strip()
+    diff = git("show", "--format=", feat)
+    assert "+// change" in diff or "+# change" in diff
@@ -0,0 +1,18 @@
+"""--check: thresholds and baseline regressions."""
+
+import generate
+
+
+def test_evaluate_check_fails_on_baseline_drops_and_missing_metrics():
+    metrics = {"reqsWithCode": 80.0, "reqsWithTests": 90.0, "orphans": 3}
+    baseline = {"metrics": {"reqsWithCode": 85.0, "reqsWithTests": 90.0, "orphans": 2, "reqsVerified": 50.0}}
+    thresholds = {"reqsWithTests": 75.0, "reqsVerified": 60.0}
+
+    failures = generate.evaluate_check(metrics, thresholds, baseline)
+
+    assert failures == [
+        {"metric": "reqsVerified", "kind": "missing", "actual": None, "limit": 60.0},
+        {"metric": "orphans", "kind": "regression", "actual": 3, "limit": 2},
+        {"metric": "reqsWithCode", "kind": "regression", "actual": 80.0, "limit": 85.0},
+    ]
+    assert generate.evaluate_check(baseline["metrics"], {"reqsWithCode": 85.0}, {"metrics": metrics}) == []
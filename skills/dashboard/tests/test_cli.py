@@ -0,0 +1,75 @@
+"""main() flag combinations: which mode runs and what it is given."""
+
+import os
+
+import generate
+
+
+def _stub_modes(monkeypatch):
+    calls = {}
+    monkeypatch.setattr(generate, "watch", lambda *a, **kw: calls.setdefault("watch", (a, kw)) and 0)
+    monkeypatch.setattr(generate, "serve_daemon", lambda *a, **kw: calls.setdefault("daemon", (a, kw)) and 0)
+    monkeypatch.setattr(generate, "enable_profiling",
+                        lambda *a, **kw: calls.setdefault("profiling", True) and None)
+    return calls
+
+
+def test_watch_with_only_does_not_crash(sample_project, run_main, monkeypatch):
+    calls = _stub_modes(monkeypatch)
+    assert run_main("--project", sample_project, "--watch", "--only", "md") == 0
+    assert "watch" in calls
+
+
+def test_daemon_with_skip_does_not_crash(sample_project, run_main, monkeypatch):
+    calls = _stub_modes(monkeypatch)
+    assert run_main("--project", sample_project, "--daemon", "--skip", "html") == 0
+    assert "daemon" in calls
+
+
+def test_watch_with_profile_leaves_profiling_off(sample_project, run_main, monkeypatch):
+    calls = _stub_modes(monkeypatch)
+    assert run_main("--project", sample_project, "--watch", "--profile") == 0
+    assert "profiling" not in calls
+
+
+def _fake_daemon(monkeypatch, project_dir):
+    """A "running" daemon for project_dir that records the requests it receives."""
+    requests = []
+    output_dir = os.path.join(project_dir, "dashboard")
+
+    def daemon_request(socket_path, request, timeout=None):
+        requests.append(request["cmd"])
+        if request["cmd"] == "ping":
+            return {"ok": True, "result": {"project": project_dir, "output": output_dir}}
+        return None  # a failed regenerate falls back to an in-process run
+
+    monkeypatch.setattr(generate, "daemon_request", daemon_request)
+    return requests
+
+
+def test_test_results_are_not_delegated_to_daemon(sample_project, run_main, monkeypatch, tmp_path):
+    requests = _fake_daemon(monkeypatch, sample_project)
+    report = tmp_path / "junit.xml"
+    report.write_text('<testsuite name="s"><testcase classname="Login" name="logs in UC-001"/></testsuite>')
+    assert run_main("--project", sample_project, "--test-results", str(report)) == 0
+    assert "regenerate" not in requests
+
+
+def test_coverage_is_not_delegated_to_daemon(sample_project, run_main, monkeypatch, tmp_path):
+    requests = _fake_daemon(monkeypatch, sample_project)
+    report = tmp_path / "lcov.info"
+    report.write_text("SF:src/auth/login.ts\nDA:2,1\nend_of_record\n")
+    assert run_main("--project", sample_project, "--coverage", str(report)) == 0
+    assert "regenerate" not in requests
+
+
+def test_watch_is_given_reports_and_phases(sample_project, run_main, monkeypatch, tmp_path):
+    calls = _stub_modes(monkeypatch)
+    report = tmp_path / "junit.xml"
+    report.write_text('<testsuite name="s"><testcase classname="Login" name="logs in UC-001"/></testsuite>')
+    assert run_main("--project", sample_project, "--watch", "--only", "md,html",
+                    "--test-results", str(report), "--coverage", str(report)) == 0
+    kwargs = calls["watch"][1]
+    assert kwargs["test_results"] == [str(report)]
+    assert kwargs["coverage_reports"] == [str(report)]
+    assert set(kwargs["phases"]) == {"md", "html"}
@@ -0,0 +1,63 @@
+"""Which symbol a Refs: comment in source code is attributed to."""
+
+import generate
+
+PYTHON_SOURCE = '''"""Module docstring."""
+import os
+# Refs: UC-009
+
+class Foo:
+    """Refs: UC-001"""
+
+    def bar(self):
+        """Does bar.
+
+        Refs: UC-002
+        """
+        x = 1  # Refs: UC-003
+
+    # Refs: UC-004
+    y = 2
+
+# Refs: UC-005
+def baz():
+    pass
+'''
+
+TS_SOURCE = """/**
+ * Refs: UC-001
+ */
+export function login() {}
+
+// Refs: UC-002
+@Injectable()
+export class AuthService {
+  logout() {
+    // Refs: UC-003
+  }
+}
+"""
+
+
+def _symbols(tmp_path, name, source):
+    path = tmp_path / name
+    path.write_text(source, encoding="utf-8")
+    refs, _, _ = generate._scan_code_file(str(path), str(tmp_path))
+    return {ref["refIds"][0]: ref["symbol"] for ref in refs}
+
+
+def test_python_refs_use_enclosing_symbol(tmp_path):
+    symbols = _symbols(tmp_path, "mod.py", PYTHON_SOURCE)
+    assert symbols == {
+        "UC-009": "mod.py:3",   # module level, separated from the class by a blank line
+        "UC-001": "Foo",        # class docstring, not the method below it
+        "UC-002": "bar",
+        "UC-003": "bar",
+        "UC-004": "Foo",        # class body after the method
+        "UC-005": "baz",        # comment right above the def
+    }
+
+
+def test_leading_comments_attach_to_next_declaration(tmp_path):
+    symbols = _symbols(tmp_path, "auth.ts", TS_SOURCE)
+    assert symbols == {"UC-001": "login", "UC-002": "AuthService", "UC-003": "AuthService"}
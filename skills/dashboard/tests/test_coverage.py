@@ -0,0 +1,43 @@
+"""--coverage: LCOV and Cobertura lines mapped onto codeRef ranges."""
+
+import pytest
+
+import generate
+
+
+# src/pay.ts: UC-001's codeRef starts at line 3 and runs until UC-002's at line 10
+LCOV = "SF:src/pay.ts\nDA:1,5\nDA:3,1\nDA:4,0\nDA:5,2\nDA:10,0\nDA:11,0\nend_of_record\n"
+
+COBERTURA = """<?xml version="1.0"?>
+<coverage>
+  <sources><source>.</source></sources>
+  <packages><package name="src"><classes>
+    <class name="pay" filename="src/pay.ts"><lines>
+      <line number="1" hits="5"/><line number="3" hits="1"/><line number="4" hits="0"/>
+      <line number="5" hits="2"/><line number="10" hits="0"/><line number="11" hits="0"/>
+    </lines></class>
+  </classes></package></packages>
+</coverage>
+"""
+
+
+@pytest.mark.parametrize("name, report", [("lcov.info", LCOV), ("coverage.xml", COBERTURA)])
+def test_coverage_lines_map_onto_code_ref_ranges(tmp_path, name, report):
+    path = tmp_path / name
+    path.write_text(report, encoding="utf-8")
+    graph = {"artifacts": [
+        {"id": "UC-001", "codeRefs": [{"file": "src/pay.ts", "line": 3, "symbolType": "function",
+                                       "refIds": ["UC-001"]}]},
+        {"id": "UC-002", "codeRefs": [{"file": "src/pay.ts", "line": 10, "symbolType": "function",
+                                       "refIds": ["UC-002"]}]},
+        {"id": "UC-003", "codeRefs": []},
+    ]}
+
+    stats = generate.apply_coverage(graph, generate.load_coverage([str(path)], str(tmp_path)))
+
+    uc1, uc2, uc3 = graph["artifacts"]
+    assert uc1["codeRefs"][0]["coverage"] == {"lines": 3, "covered": 2, "ratio": 0.667}
+    assert uc1["lineCoverage"] == {"lines": 3, "covered": 2, "ratio": 0.667}
+    assert uc2["lineCoverage"] == {"lines": 2, "covered": 0, "ratio": 0}
+    assert "lineCoverage" not in uc3
+    assert (stats["lines"], stats["covered"], stats["artifactsWithCoverage"]) == (6, 3, 2)
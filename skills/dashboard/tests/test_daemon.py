@@ -0,0 +1,81 @@
+"""Daemon socket: a per-user directory, a 0600 socket, and clients that only talk to their own user's daemon."""
+
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+import generate
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix-domain sockets")
+
+
+class _StubService:
+    graph = {"artifacts": []}
+
+    def _current_graph(self):
+        return self.graph
+
+    def handle(self, request):
+        return {"project": "p", "output": "o"}
+
+
+def test_socket_dir_is_private(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(generate.tempfile, "tempdir", str(tmp_path))
+    path = generate.default_socket_path("/some/project")
+    directory = os.path.dirname(path)
+    assert directory == str(tmp_path / f"sdd-dashboard-{os.getuid()}")
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+    os.chmod(directory, 0o777)
+    with pytest.raises(OSError):
+        generate.default_socket_path("/some/project")
+
+
+def test_daemon_socket_is_private_and_foreign_sockets_are_ignored(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "d.sock")
+    thread = threading.Thread(target=generate.serve_daemon, args=(_StubService(), socket_path))
+    thread.start()
+    try:
+        for _ in range(200):
+            if os.path.exists(socket_path):
+                break
+            thread.join(0.01)
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert generate.daemon_request(socket_path, {"cmd": "ping"})["ok"]
+
+        uid = os.getuid()
+        monkeypatch.setattr(generate.os, "getuid", lambda: uid + 1)
+        assert generate.daemon_request(socket_path, {"cmd": "ping"}) is None
+        monkeypatch.setattr(generate.os, "getuid", lambda: uid)
+    finally:
+        generate.daemon_request(socket_path, {"cmd": "shutdown"})
+        thread.join(5)
+    assert not os.path.exists(socket_path)
+
+
+def test_serve_daemon_reports_a_socket_it_cannot_remove(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "stale.sock")
+    open(socket_path, "w").close()
+
+    def unlink(path):
+        raise PermissionError(13, "Permission denied", path)
+
+    monkeypatch.setattr(generate.os, "unlink", unlink)
+    assert generate.serve_daemon(_StubService(), socket_path) == 1
+
+
+def test_service_answers_impact_and_artifact_from_the_query_index(sample_project):
+    output_dir = os.path.join(sample_project, "dashboard")
+    paths = generate.resolve_output_paths(sample_project, output_dir)
+    service = generate.DashboardService(sample_project, output_dir, "sample", paths)
+
+    impact = service.handle({"cmd": "impact", "id": "REQ-SEC-001", "maxDepth": 2})
+    assert [item["id"] for item in impact["byDepth"]["1"]["artifacts"]] == ["UC-001"]
+    assert impact["byDepth"]["2"]["artifacts"][0]["id"] == "TASK-F1-001"
+    assert service.handle({"cmd": "artifact", "id": "UC-001"})["title"] == "Login"
+    with pytest.raises(KeyError):
+        service.handle({"cmd": "artifact", "id": "UC-404"})
@@ -0,0 +1,86 @@
+"""federate.py: namespacing, cross-project mappings, the segment cache and the streaming reader."""
+
+import json
+import os
+
+import federate
+
+
+def write_graph(path, name, artifacts, relationships):
+    graph = {
+        "$schema": "traceability-graph-v6",
+        "projectName": name,
+        "artifacts": [{"id": aid, "type": aid.split("-")[0], "title": aid} for aid in artifacts],
+        "relationships": [{"source": s, "target": t, "type": "implements"} for s, t in relationships],
+        "statistics": {"totalArtifacts": len(artifacts), "byType": {}},
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(graph, f, indent=2)
+
+
+def federation_of(tmp_path):
+    platform = str(tmp_path / "platform" / "traceability-graph.json")
+    billing = str(tmp_path / "billing" / "traceability-graph.json")
+    write_graph(platform, "platform", ["REQ-AUTH-001"], [])
+    write_graph(billing, "billing", ["UC-001", "REQ-PAY-001"],
+                [("UC-001", "REQ-AUTH-001"), ("UC-001", "REQ-AUTH-404"), ("UC-001", "REQ-PAY-001")])
+    return {
+        "name": "acme",
+        "projects": [{"namespace": "platform", "graph": platform}, {"namespace": "billing", "graph": billing}],
+        "mappings": [{"from": "billing", "ids": ["REQ-AUTH-*"], "to": "platform"}],
+    }
+
+
+def test_federated_graph_namespaces_ids_and_resolves_mapped_references(tmp_path):
+    result = federate.federate(federation_of(tmp_path), str(tmp_path / "out"))
+    with open(result["graph"], "r", encoding="utf-8") as f:
+        graph = json.load(f)
+
+    ids = {a["id"]: a for a in graph["artifacts"]}
+    assert set(ids) == {"platform:REQ-AUTH-001", "billing:UC-001", "billing:REQ-PAY-001"}
+    assert ids["billing:UC-001"]["localId"] == "UC-001"
+    assert ids["billing:UC-001"]["project"] == "billing"
+
+    edges = {(r["source"], r["target"]): r.get("crossProject", False) for r in graph["relationships"]}
+    assert edges == {
+        ("billing:UC-001", "platform:REQ-AUTH-001"): True,   # mapped, and platform defines it
+        ("billing:UC-001", "platform:REQ-AUTH-404"): True,   # mapped, but platform has no such REQ
+        ("billing:UC-001", "billing:REQ-PAY-001"): False,    # no mapping: stays in its project
+    }
+    stats = graph["statistics"]
+    assert stats["crossProjectRelationships"] == 2
+    assert stats["unresolvedCrossReferences"] == 1
+    assert graph["federation"]["unresolved"] == [{"source": "billing:UC-001", "target": "platform:REQ-AUTH-404"}]
+    assert stats["crossProjectCoverage"]["platform"] == {"count": 1, "total": 1, "percentage": 100.0}
+
+
+def test_unchanged_projects_are_reused_on_the_next_run(tmp_path):
+    federation = federation_of(tmp_path)
+    out = str(tmp_path / "out")
+    first = federate.federate(federation, out)
+    assert first["rebuilt"] == ["platform", "billing"]
+
+    second = federate.federate(federation, out)
+    assert second["rebuilt"] == [] and second["reused"] == ["platform", "billing"]
+    assert not second["written"]
+
+    write_graph(federation["projects"][1]["graph"], "billing", ["UC-001", "UC-002"], [])
+    third = federate.federate(federation, out)
+    assert third["rebuilt"] == ["billing"] and third["reused"] == ["platform"]
+    assert third["written"]
+
+
+def test_graph_stream_reads_past_chunk_boundaries(tmp_path):
+    awkward = 'brace } and { "quoted \\" [text]", back\\\\slash, ünïcode'
+    artifacts = [{"id": f"REQ-X-{i:04d}", "title": f"{awkward} {i}", "n": i * 1.5} for i in range(2000)]
+    graph = {"projectName": "big", "artifacts": artifacts, "relationships": [], "statistics": {"totalArtifacts": 2000}}
+    path = str(tmp_path / "graph.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(graph, f, ensure_ascii=False)
+    assert os.path.getsize(path) > federate.READ_CHUNK
+
+    stream = federate.GraphStream(path)
+    read = {key: list(value) if key in federate.STREAMED_KEYS else value for key, value in stream.sections()}
+    assert read == graph
+    assert stream.hexdigest() == federate.graph_hash(path)
@@ -0,0 +1,32 @@
+"""Graph relationships built by generate.py."""
+
+import json
+import os
+
+from conftest import SAMPLE_FILES, write_files
+
+
+def _relationships(project, run_main):
+    out = os.path.join(project, "dashboard")
+    assert run_main("--project", project, "--output", out) == 0
+    with open(os.path.join(out, "traceability-graph.json"), encoding="utf-8") as f:
+        graph = json.load(f)
+    return {(r["source"], r["target"]): r for r in graph["relationships"]}
+
+
+def test_locations_only_on_repeated_references(tmp_path, run_main):
+    files = dict(SAMPLE_FILES)
+    files["spec/use-cases/UC-001-login.md"] = (
+        "# UC-001: Login\nImplements REQ-SEC-001.\n\nSee also REQ-SEC-001.\n"
+    )
+    write_files(str(tmp_path), files)
+    rels = _relationships(str(tmp_path), run_main)
+
+    repeated = rels[("UC-001", "REQ-SEC-001")]
+    assert repeated["occurrences"] == 2
+    assert repeated["fileCount"] == 1
+    assert [loc[1] for loc in repeated["locations"]] == [2, 4]
+
+    single = rels[("TASK-F1-001", "UC-001")]
+    assert single["occurrences"] == 1
+    assert "locations" not in single and "fileCount" not in single
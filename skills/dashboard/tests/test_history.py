@@ -0,0 +1,61 @@
+"""--history snapshots built from git objects."""
+
+import os
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import generate
+from conftest import SAMPLE_FILES, write_files
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-c", "user.name=Test", "-c", "user.email=test@example.invalid", *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_project(tmp_path):
+    """SAMPLE_FILES committed twice: a task commit, then a commit that touches no scanned file."""
+    repo = str(tmp_path / "repo")
+    write_files(repo, SAMPLE_FILES)
+    git(repo, "init", "-q")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "feat: login\n\nRefs: UC-001\nTask: TASK-F1-001")
+    write_files(repo, {"notes.txt": "nothing scanned here\n"})
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "chore: notes")
+    return repo
+
+
+def test_snapshot_matches_a_live_build(git_project, tmp_path):
+    live = generate.Generation(git_project, str(tmp_path / "out"), "sample", phases=set()).build()
+    with generate.HistoryScanner(git_project, "sample") as scanner:
+        snapshot = scanner.snapshot("HEAD")
+    assert snapshot["statistics"] == live["statistics"]
+    assert snapshot["metrics"] == generate.check_metrics(live)
+    assert snapshot["metrics"]["reqsWithCommits"] == 100
+
+
+def test_unchanged_files_are_not_parsed_again(git_project):
+    with generate.HistoryScanner(git_project, "sample") as scanner:
+        first = scanner.snapshot("HEAD~1")
+        second = scanner.snapshot("HEAD")
+    assert first["parsed"] == sum(first["files"].values()) > 0
+    assert second["parsed"] == 0
+    assert second["statistics"]["totalArtifacts"] == first["statistics"]["totalArtifacts"]
+
+
+def test_unknown_revisions_are_skipped_with_a_warning(git_project, tmp_path, run_main, capsys):
+    out = str(tmp_path / "out")
+    assert run_main("--project", git_project, "--output", out, "--history", "HEAD~1", "no-such-tag", "HEAD") == 0
+    printed = capsys.readouterr().out
+    assert "Warning: skipping no-such-tag" in printed
+    assert "parsed 0/" in printed
+    with open(os.path.join(out, generate.HISTORY_FILE), "r", encoding="utf-8") as f:
+        history = json.load(f)
+    assert [snapshot["rev"] for snapshot in history["revisions"]] == ["HEAD~1", "HEAD"]
@@ -0,0 +1,22 @@
+"""--impact-of index: what build_impact_index() records for each file and commit."""
+
+import generate
+
+
+def test_commit_table_includes_artifacts_inferred_from_the_commit():
+    commit = {"sha": "abc1234", "fullSha": "abc1234" + "0" * 33, "files": ["src/a.ts"]}
+    graph = {
+        "artifacts": [
+            {"id": "TASK-F1-001", "type": "TASK", "title": "t", "file": "task/TASKS.md", "line": 2,
+             "commitRefs": [commit]},
+            {"id": "UC-001", "type": "UC", "title": "u", "file": "spec/UC-001.md", "line": 1,
+             "codeRefs": [{"file": "src/a.ts", "line": 0, "symbol": "a.ts", "symbolType": "file",
+                           "origin": "task-inferred",
+                           "inferredFrom": {"commitSha": "abc1234", "taskId": "TASK-F1-001"}}]},
+        ],
+        "relationships": [],
+    }
+    index = generate.build_impact_index(graph)
+    assert index["commits"]["abc1234"] == ["TASK-F1-001", "UC-001"]
+    assert index["commits"][commit["fullSha"]] == ["TASK-F1-001"]
+    assert index["files"]["src/a.ts"] == {"commit": ["TASK-F1-001"], "task-inferred": ["UC-001"]}
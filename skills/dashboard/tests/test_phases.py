@@ -0,0 +1,29 @@
+"""--only / --skip: deselected scan phases come from the phase cache while their inputs are unchanged."""
+
+import os
+
+import generate
+
+
+def test_phase_cache_is_invalidated_when_inputs_change(sample_project, tmp_path, monkeypatch):
+    out = str(tmp_path / "out")
+    cache = generate.PhaseCache(out)
+    refs, _ = generate.scan_phase("code", sample_project, out, set(generate.PHASES), cache)
+    assert [ref["refIds"] for ref in refs] == [["UC-001"]]
+
+    scan_code_refs = generate.scan_code_refs
+    scans = []
+    monkeypatch.setattr(generate, "scan_code_refs", lambda *a: scans.append(a) or scan_code_refs(*a))
+    refs, _ = generate.scan_phase("code", sample_project, out, set(), cache)
+    assert scans == [] and [ref["refIds"] for ref in refs] == [["UC-001"]]
+
+    source = os.path.join(sample_project, "src", "auth", "login.ts")
+    with open(source, "a", encoding="utf-8") as f:
+        f.write("// Refs: UC-002\nexport function logout() {}\n")
+    mtime = os.stat(source).st_mtime_ns + 10**9
+    os.utime(source, ns=(mtime, mtime))
+    refs, _ = generate.scan_phase("code", sample_project, out, set(), cache)
+    assert len(scans) == 1
+    assert sorted(ref["refIds"][0] for ref in refs) == ["UC-001", "UC-002"]
+    assert generate.scan_phase("code", sample_project, out, set(), cache)[0] == refs
+    assert len(scans) == 1
@@ -0,0 +1,38 @@
+"""query.py: trace() walks breadth-first and keeps the first relationship that reaches an artifact."""
+
+import query
+
+
+def _art(art_id, art_type, **refs):
+    return {"id": art_id, "type": art_type, "title": art_id, "file": f"{art_type.lower()}.md", **refs}
+
+
+def _rel(source, target, rel_type):
+    return {"source": source, "target": target, "type": rel_type}
+
+
+def test_trace_order_relationships_and_ref_limit():
+    code_refs = [{"file": "src/a.ts", "symbol": f"f{i}", "symbolType": "function", "line": i} for i in range(15)]
+    graph = {
+        "artifacts": [
+            _art("REQ-001", "REQ"), _art("UC-002", "UC", codeRefs=code_refs),
+            _art("UC-001", "UC", codeRefs=code_refs), _art("TASK-001", "TASK"),
+        ],
+        "relationships": [
+            _rel("UC-002", "REQ-001", "implements"),
+            _rel("UC-001", "REQ-001", "implements"),
+            _rel("UC-002", "REQ-001", "traces-to"),
+            _rel("TASK-001", "UC-001", "decomposes"),
+            _rel("TASK-001", "UC-002", "traces-to"),
+            _rel("BDD-404", "REQ-001", "verifies"),  # not an artifact: never reported
+        ],
+    }
+    result = query.GraphIndex(graph).trace("REQ-001")
+    chain = {link["level"]: link["artifacts"] for link in result["chain"]}
+
+    assert [(a["id"], a["relationship"]) for a in chain["UC"]] == [("UC-002", "implements"),
+                                                                  ("UC-001", "implements")]
+    assert [(a["id"], a["relationship"]) for a in chain["TASK"]] == [("TASK-001", "traces-to")]
+    assert "BDD" not in chain
+    assert len(chain["CODE"]) == query.CHAIN_REF_LIMIT
+    assert result["totalArtifactsInChain"] == 4
@@ -0,0 +1,40 @@
+"""ReachabilityIndex: incremental updates against a full rebuild."""
+
+import copy
+
+import generate
+
+
+def chain_graph(n):
+    """REQ-X-i <- UC-i <- TASK-i, with a code ref on every task."""
+    incoming, outgoing, code = {}, {}, {}
+    for i in range(n):
+        req, uc, task = f"REQ-X-{i:03d}", f"UC-{i:03d}", f"TASK-F1-{i:03d}"
+        outgoing.setdefault(uc, set()).add(req)
+        incoming.setdefault(req, set()).add(uc)
+        outgoing.setdefault(task, set()).add(uc)
+        incoming.setdefault(uc, set()).add(task)
+        code[task] = [{"file": f"src/f{i}.ts", "symbol": f"f{i}"}]
+    reqs = {f"REQ-X-{i:03d}" for i in range(n)}
+    return reqs, incoming, outgoing, {"code": code, "tests": {}, "commits": {}}
+
+
+def test_incremental_update_matches_a_full_rebuild():
+    reqs, incoming, outgoing, ref_maps = chain_graph(20)
+    index = generate.ReachabilityIndex()
+    assert index.update(reqs, incoming, outgoing, ref_maps)["full"]
+
+    incoming, outgoing, ref_maps = copy.deepcopy((incoming, outgoing, ref_maps))
+    ref_maps["code"]["TASK-F1-003"] = [{"file": "src/moved.ts", "symbol": "f3"}]
+    outgoing["TASK-F1-005"].add("UC-004")  # TASK-F1-005 now also implements UC-004
+    incoming["UC-004"].add("TASK-F1-005")
+    reqs.discard("REQ-X-019")
+    update = index.update(reqs, incoming, outgoing, ref_maps)
+    assert not update["full"] and 0 < update["recomputed"] < len(reqs)
+
+    rebuilt = generate.ReachabilityIndex()
+    rebuilt.update(reqs, incoming, outgoing, ref_maps)
+    assert index.reach == rebuilt.reach
+    assert index.to_json() == rebuilt.to_json()
+    assert index.reqs_for("files", "src/f5.ts") == {"REQ-X-004", "REQ-X-005"}
+    assert index.targets("REQ-X-003", "files") == {"src/moved.ts"}
@@ -0,0 +1,39 @@
+"""Suite scopes and test names found by the test scanner."""
+
+import generate
+
+JS_SOURCE = """describe('Outer', () => {
+  const s = "}";
+  const t = `{${s}}}`;  // a comment with a } too
+  it('first UC-001', () => {});
+  it('second UC-002', () => {});
+});
+it('top UC-003', () => {});
+"""
+
+GO_SOURCE = """package auth
+
+func TestLogin(t *testing.T) {
+\tmsg := "}}"
+\tt.Run("valid UC-001", func(t *testing.T) {})
+}
+"""
+
+
+def _test_names(tmp_path, name, source):
+    path = tmp_path / name
+    path.write_text(source, encoding="utf-8")
+    refs, _, _ = generate._scan_test_file(str(path), str(tmp_path))
+    return {ref["refIds"][0]: ref["testName"] for ref in refs}
+
+
+def test_braces_in_strings_do_not_close_scopes(tmp_path):
+    assert _test_names(tmp_path, "auth.test.ts", JS_SOURCE) == {
+        "UC-001": "Outer > first UC-001",
+        "UC-002": "Outer > second UC-002",
+        "UC-003": "top UC-003",
+    }
+
+
+def test_go_subtests_keep_parent_with_braces_in_strings(tmp_path):
+    assert _test_names(tmp_path, "auth_test.go", GO_SOURCE) == {"UC-001": "TestLogin > valid UC-001"}
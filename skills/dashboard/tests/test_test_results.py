@@ -0,0 +1,38 @@
+"""--test-results: JUnit XML results matched to testRefs."""
+
+import generate
+
+LOGIN_TEST = """describe('Login', () => {
+  it('logs in UC-001', () => {});
+  it('rejects a bad password UC-002', () => {});
+});
+"""
+
+JUNIT = """<?xml version="1.0"?>
+<testsuites>
+  <testsuite name="Login">
+    <testcase classname="Login" name="logs in UC-001" time="0.25"/>
+    <testcase file="tests/login.test.ts" classname="Login" name="Login &gt; rejects a bad password UC-002" time="0.5">
+      <failure message="expected 401">stack</failure>
+    </testcase>
+    <testcase classname="Other" name="unrelated" time="1"><skipped/></testcase>
+  </testsuite>
+</testsuites>
+"""
+
+
+def test_junit_results_reach_their_test_refs(tmp_path):
+    test_file = tmp_path / "tests" / "login.test.ts"
+    test_file.parent.mkdir()
+    test_file.write_text(LOGIN_TEST, encoding="utf-8")
+    refs, _, _ = generate._scan_test_file(str(test_file), str(tmp_path))
+    report = tmp_path / "junit.xml"
+    report.write_text(JUNIT, encoding="utf-8")
+
+    stats = generate.ingest_test_results([str(report)], refs, str(tmp_path))
+
+    results = {ref["refIds"][0]: ref["result"] for ref in refs}
+    assert results["UC-001"] == {"status": "passed", "passed": 1, "failed": 0, "skipped": 0, "durationMs": 250}
+    assert results["UC-002"] == {"status": "failed", "passed": 0, "failed": 1, "skipped": 0, "durationMs": 500}
+    assert (stats["totalResults"], stats["matchedResults"]) == (3, 2)
+    assert (stats["passed"], stats["failed"], stats["skipped"]) == (1, 1, 1)
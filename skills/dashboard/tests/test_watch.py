@@ -0,0 +1,39 @@
+"""Watch-mode building blocks: IncrementalScanner change detection and GraphEncoder."""
+
+import copy
+import json
+import os
+
+import generate
+
+
+def test_refresh_reports_no_change_for_untouched_or_identical_files(sample_project):
+    scanner = generate.IncrementalScanner(sample_project)
+    scanner.refresh()
+    scanner.build_inputs()
+    assert scanner.refresh() is False
+
+    path = os.path.join(sample_project, "spec/use-cases/UC-001-login.md")
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path, (0, 0))
+    assert scanner.refresh({path}) is False
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("Depends on REQ-SEC-002.\n")
+    assert scanner.refresh({path}) is True
+
+
+def test_graph_encoder_matches_json_dumps(sample_project, tmp_path):
+    scanner = generate.IncrementalScanner(sample_project)
+    scanner.refresh()
+    graph = generate.build_graph(sample_project, str(tmp_path), "sample", **scanner.build_inputs())
+    encoder = generate.GraphEncoder()
+    for _ in range(2):  # the second pass reuses the cached chunks
+        indented, compact = encoder.encode(graph)
+        assert indented == json.dumps(graph, indent=2, ensure_ascii=False)
+        assert compact == json.dumps(graph, ensure_ascii=False)
+        graph = copy.deepcopy(graph)
+        graph["artifacts"][0]["title"] = "Renamed"